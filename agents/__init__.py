@@ -1,7 +1,14 @@
+import logging
+
 from .central_agent import CentralAgent
 from .specialized_agent_base import SpecializedAgentBase
 from .specialized_agents import SpecializedAgentA, SpecializedAgentB
 from .agent_squad import AgentSquad
+from .dispatcher import Dispatcher
+from .metrics import MetricsRegistry
+
+# Library modules only emit records; applications opt in with agents.logging_config.configure_logging()
+logging.getLogger(__name__).addHandler(logging.NullHandler())
 
 __all__ = [
     "CentralAgent",
@@ -9,4 +16,6 @@ __all__ = [
     "SpecializedAgentA",
     "SpecializedAgentB",
     "AgentSquad",
+    "Dispatcher",
+    "MetricsRegistry",
 ]
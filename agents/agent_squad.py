@@ -1,12 +1,52 @@
+import asyncio
+import functools
+import logging
+from typing import AsyncIterator, Iterator
+
 from mcp_stubs.stub_servers import MCPStubServerC
+from .deadline import Deadline, DeadlineExceeded, HedgePolicy, _acquire_timeout, call_server, call_server_async
+from .escalation import Escalation
+from .metrics import MetricsRegistry
+from .rate_limit import RATE_LIMITED, RateLimitedError
+from .result_cache import MISS, ResultCacheRegistry
+from .server_pool import ServerPoolError, ServerPoolRegistry
+from .transport import MCPTransportError, TransportRegistry
+
+logger = logging.getLogger(__name__)
 
 class AgentSquad:
-    def __init__(self, squad_name="AgentSquad"):
+    def __init__(
+        self,
+        squad_name="AgentSquad",
+        server_pools: ServerPoolRegistry | None = None,
+        result_caches: ResultCacheRegistry | None = None,
+        metrics: MetricsRegistry | None = None,
+        hedge_policies: dict[str, HedgePolicy] | None = None,
+        transports: TransportRegistry | None = None,
+    ):
         self.squad_name = squad_name
-        self.mcp_server_c = MCPStubServerC("MCPStubServerC")
+        self.server_pools = server_pools if server_pools is not None else ServerPoolRegistry()
+        self.result_caches = result_caches if result_caches is not None else ResultCacheRegistry()
+        self.metrics = metrics if metrics is not None else MetricsRegistry()
+        self.hedge_policies = hedge_policies if hedge_policies is not None else {}
+        self.transports = transports if transports is not None else TransportRegistry()
+        # Pool of MCPStubServerC sessions, shared with the specialized agents through server_pools
+        self.mcp_server_c = self.server_pools.pool(
+            "MCPStubServerC", lambda **server_options: self.create_server(**server_options)
+        )
+
+    def create_server(self, **server_options):
+        return self.transports.connect(
+            "MCPStubServerC", functools.partial(MCPStubServerC, "MCPStubServerC"), **server_options
+        )
 
-    def enrich_and_solve(self, escalation_details: dict) -> dict:
-        print(f"AgentSquad: Received escalation: {escalation_details}")
+    def _extract_enrichment_data(self, escalation_details: Escalation | dict):
+        logger.debug("Received escalation: %s", escalation_details)
+        if type(escalation_details) is Escalation:
+            # CentralAgent's envelope points straight at the original request
+            return escalation_details.original_request.get('data')
+
+        # Legacy nested-dict escalations from callers that build their own
         partial_data_dict = escalation_details.get('partial_data', {})
 
         data_to_enrich = None
@@ -29,23 +69,212 @@ class AgentSquad:
         if data_to_enrich is None:
              data_to_enrich = partial_data_dict
 
-        # Ensure data_to_enrich is not None (it could be if partial_data_dict was empty and no original_request data)
-        # and is suitable for the server. For MCPStubServerC, enrich_and_solve expects a string or dict.
-        # If data_to_enrich is a dictionary, it might need specific formatting or extraction.
-        # For this stub, we'll assume it can handle a dictionary by converting it or expecting a certain structure.
-        # If it's just a string, that's fine.
-
-        # The stub's enrich_and_solve expects a single argument `partial_data`
-        # Let's ensure we pass what it expects. The current stub takes `partial_data` directly.
-        # If `data_to_enrich` was extracted from a nested structure, use that.
-        # If we are passing the whole `partial_data_dict` because specific data wasn't found, that's also fine for the stub.
-
-        print("AgentSquad: Attempting enrichment with MCPStubServerC")
-        server_response = self.mcp_server_c.enrich_and_solve(data_to_enrich)
+        # MCPStubServerC's enrich_and_solve takes a single `partial_data` argument and accepts
+        # either a string or a dict, so whatever was extracted above is passed through as is.
+        return data_to_enrich
 
+    def _squad_result(self, server_response: dict) -> dict:
         if server_response.get("success"):
-            print("AgentSquad: Enrichment successful.")
+            logger.debug("Enrichment successful.")
             return {"solved": True, "result": server_response['data']}
         else:
-            print("AgentSquad: Enrichment failed.")
+            logger.warning("Enrichment failed: %s", server_response.get('error'))
             return {"solved": False, "error": server_response.get('error', f'{self.squad_name} failed to enrich and solve')}
+
+    def _record_call(self, stage: str, start: int, server_response: dict):
+        self.metrics.observe(stage, "MCPStubServerC", start)
+        self.metrics.increment("mcp_calls", "MCPStubServerC", "success" if server_response.get("success") else "error")
+
+    def _session_failure(self, error: ServerPoolError) -> dict:
+        logger.warning("%s: %s", self.squad_name, error)
+        if isinstance(error, RateLimitedError):
+            self.metrics.increment("mcp_calls", "MCPStubServerC", "rate_limited")
+            return {"solved": False, "error": str(error), "error_code": RATE_LIMITED}
+        if isinstance(error, MCPTransportError):
+            self.metrics.increment("mcp_calls", "MCPStubServerC", "transport_error")
+        return {"solved": False, "error": str(error)}
+
+    def _deadline_failure(self) -> dict:
+        logger.warning("%s: MCPStubServerC did not answer before the deadline", self.squad_name)
+        self.metrics.increment("mcp_calls", "MCPStubServerC", "timeout")
+        return {"solved": False, "error": f"{self.squad_name} did not finish before the deadline."}
+
+    def _hedging(self) -> dict:
+        policy = self.hedge_policies.get("MCPStubServerC")
+        if policy is None:
+            return {}
+        return {
+            "hedge_delay": policy.delay(self.metrics, "mcp_enrich_and_solve", "MCPStubServerC"),
+            "on_hedge": lambda: self.metrics.increment("hedges", "MCPStubServerC", "sent"),
+        }
+
+    def enrich_and_solve(self, escalation_details: Escalation | dict, deadline: Deadline | None = None) -> dict:
+        data_to_enrich = self._extract_enrichment_data(escalation_details)
+        cache_key, server_response = self.result_caches.lookup("MCPStubServerC", data_to_enrich)
+        if server_response is MISS:
+            logger.debug("Attempting enrichment with MCPStubServerC")
+            start = self.metrics.clock()
+            try:
+                server_response = call_server(
+                    self.mcp_server_c, lambda server: server.enrich_and_solve(data_to_enrich), deadline, **self._hedging()
+                )
+            except ServerPoolError as error:
+                return self._session_failure(error)
+            except DeadlineExceeded:
+                return self._deadline_failure()
+            self._record_call("mcp_enrich_and_solve", start, server_response)
+            self.result_caches.store("MCPStubServerC", cache_key, server_response)
+        return self._squad_result(server_response)
+
+    def enrich_and_solve_many(self, escalations: list[Escalation | dict], deadline: Deadline | None = None) -> list[dict]:
+        # Batched enrich_and_solve: cache hits are answered directly and every miss
+        # goes to MCPStubServerC in a single round trip, bounded by the deadline.
+        results: list[dict | None] = [None] * len(escalations)
+        misses = []
+        for index, escalation_details in enumerate(escalations):
+            data_to_enrich = self._extract_enrichment_data(escalation_details)
+            cache_key, server_response = self.result_caches.lookup("MCPStubServerC", data_to_enrich)
+            if server_response is MISS:
+                misses.append((index, cache_key, data_to_enrich))
+            else:
+                results[index] = self._squad_result(server_response)
+        if not misses:
+            return results
+
+        logger.debug("Attempting batched enrichment of %d escalations with MCPStubServerC", len(misses))
+        datas = [data for _, _, data in misses]
+        start = self.metrics.clock()
+        try:
+            server_responses = call_server(
+                self.mcp_server_c,
+                lambda server: {"success": True, "results": server.enrich_and_solve_many(datas)},
+                deadline,
+            )["results"]
+        except (ServerPoolError, DeadlineExceeded) as error:
+            failure = self._session_failure(error) if isinstance(error, ServerPoolError) else self._deadline_failure()
+            for index, _, _ in misses:
+                results[index] = dict(failure)
+            return results
+        self.metrics.observe("mcp_enrich_and_solve_many", "MCPStubServerC", start)
+        for (index, cache_key, _), server_response in zip(misses, server_responses):
+            self.metrics.increment("mcp_calls", "MCPStubServerC", "success" if server_response.get("success") else "error")
+            self.result_caches.store("MCPStubServerC", cache_key, server_response)
+            results[index] = self._squad_result(server_response)
+        return results
+
+    async def enrich_and_solve_async(self, escalation_details: Escalation | dict, deadline: Deadline | None = None) -> dict:
+        data_to_enrich = self._extract_enrichment_data(escalation_details)
+        cache_key, server_response = self.result_caches.lookup("MCPStubServerC", data_to_enrich)
+        if server_response is MISS:
+            logger.debug("Attempting enrichment with MCPStubServerC")
+            start = self.metrics.clock()
+            try:
+                server_response = await call_server_async(
+                    self.mcp_server_c, lambda server: server.enrich_and_solve_async(data_to_enrich), deadline, **self._hedging()
+                )
+            except ServerPoolError as error:
+                return self._session_failure(error)
+            except DeadlineExceeded:
+                return self._deadline_failure()
+            self._record_call("mcp_enrich_and_solve", start, server_response)
+            self.result_caches.store("MCPStubServerC", cache_key, server_response)
+        return self._squad_result(server_response)
+
+    def _cached_stream_event(self, server_response: dict) -> dict:
+        # A cached answer goes out as a single chunk
+        if server_response.get("success"):
+            return {"solved": True, "chunk": server_response['data']}
+        return self._squad_result(server_response)
+
+    def _finish_stream(self, cache_key, start: int, chunks: list) -> None:
+        server_response = {"success": True, "data": "".join(chunks)}
+        self._record_call("mcp_enrich_and_solve_stream", start, server_response)
+        self.result_caches.store("MCPStubServerC", cache_key, server_response)
+
+    def enrich_and_solve_stream(self, escalation_details: Escalation | dict, deadline: Deadline | None = None) -> Iterator[dict]:
+        # Streaming enrich_and_solve: yields {"solved": True, "chunk": str} as MCPStubServerC
+        # produces each chunk, or ends with a single {"solved": False, "error": ...}. The
+        # pooled session is held until the stream ends; a stream abandoned half way hands
+        # it back as unhealthy. The deadline is checked between chunks, and a completed
+        # stream is cached like a whole answer.
+        data_to_enrich = self._extract_enrichment_data(escalation_details)
+        cache_key, server_response = self.result_caches.lookup("MCPStubServerC", data_to_enrich)
+        if server_response is not MISS:
+            yield self._cached_stream_event(server_response)
+            return
+        if deadline is not None and deadline.expired():
+            yield self._deadline_failure()
+            return
+
+        logger.debug("Attempting streamed enrichment with MCPStubServerC")
+        start = self.metrics.clock()
+        chunks = []
+        try:
+            with self.mcp_server_c.session(timeout=_acquire_timeout(self.mcp_server_c, deadline)) as server:
+                for event in server.enrich_and_solve_stream(data_to_enrich):
+                    if not event.get("success"):
+                        self.mcp_server_c.report(server, False)
+                        self._record_call("mcp_enrich_and_solve_stream", start, event)
+                        yield self._squad_result(event)
+                        return
+                    if not chunks:
+                        self.metrics.observe("mcp_enrich_and_solve_first_chunk", "MCPStubServerC", start)
+                    chunks.append(event['chunk'])
+                    yield {"solved": True, "chunk": event['chunk']}
+                    if deadline is not None and deadline.expired():
+                        # Raised inside the session so the half-read stream's session is discarded
+                        raise DeadlineExceeded("MCPStubServerC stream overran the deadline")
+        except ServerPoolError as error:
+            yield self._session_failure(error)
+            return
+        except DeadlineExceeded:
+            yield self._deadline_failure()
+            return
+        self._finish_stream(cache_key, start, chunks)
+
+    async def enrich_and_solve_stream_async(
+        self, escalation_details: Escalation | dict, deadline: Deadline | None = None
+    ) -> AsyncIterator[dict]:
+        # Async enrich_and_solve_stream; here the deadline also bounds the wait for each chunk.
+        data_to_enrich = self._extract_enrichment_data(escalation_details)
+        cache_key, server_response = self.result_caches.lookup("MCPStubServerC", data_to_enrich)
+        if server_response is not MISS:
+            yield self._cached_stream_event(server_response)
+            return
+        if deadline is not None and deadline.expired():
+            yield self._deadline_failure()
+            return
+
+        logger.debug("Attempting streamed enrichment with MCPStubServerC")
+        start = self.metrics.clock()
+        chunks = []
+        try:
+            async with self.mcp_server_c.session_async(timeout=_acquire_timeout(self.mcp_server_c, deadline)) as server:
+                events = server.enrich_and_solve_stream_async(data_to_enrich)
+                try:
+                    while True:
+                        try:
+                            if deadline is None:
+                                event = await events.__anext__()
+                            else:
+                                event = await asyncio.wait_for(events.__anext__(), deadline.remaining())
+                        except StopAsyncIteration:
+                            break
+                        if not event.get("success"):
+                            self.mcp_server_c.report(server, False)
+                            self._record_call("mcp_enrich_and_solve_stream", start, event)
+                            yield self._squad_result(event)
+                            return
+                        if not chunks:
+                            self.metrics.observe("mcp_enrich_and_solve_first_chunk", "MCPStubServerC", start)
+                        chunks.append(event['chunk'])
+                        yield {"solved": True, "chunk": event['chunk']}
+                finally:
+                    await events.aclose()
+        except ServerPoolError as error:
+            yield self._session_failure(error)
+            return
+        except asyncio.TimeoutError:  # wait_for's timeout, raised inside the session so it is discarded
+            yield self._deadline_failure()
+            return
+        self._finish_stream(cache_key, start, chunks)
@@ -0,0 +1,191 @@
+import collections
+import threading
+import time
+from typing import Callable
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    # Per-server breaker with the usual three states:
+    #   closed    - calls go through; the last `window_size` outcomes are kept and the
+    #               circuit opens once at least `min_calls` of them are in the window
+    #               and the failure rate reaches `failure_threshold`.
+    #   open      - calls are rejected for `open_duration` seconds.
+    #   half_open - up to `half_open_probes` probe calls go through; if they all succeed
+    #               the circuit closes, any failure opens it again. A probe whose outcome
+    #               is never recorded gives up its slot after another `open_duration`.
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: float = 0.5,
+        window_size: int = 20,
+        min_calls: int = 10,
+        open_duration: float = 30.0,
+        half_open_probes: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not 0 < failure_threshold <= 1:
+            raise ValueError("failure_threshold must be in (0, 1]")
+        if window_size < 1 or min_calls < 1 or half_open_probes < 1:
+            raise ValueError("window_size, min_calls and half_open_probes must be at least 1")
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.window_size = window_size
+        self.min_calls = min(min_calls, window_size)
+        self.open_duration = open_duration
+        self.half_open_probes = half_open_probes
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._window: collections.deque = collections.deque(maxlen=window_size)
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started: list[float] = []
+        self._probe_successes = 0
+
+        self.rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._advance_locked(self.clock())
+            return self._state
+
+    def _advance_locked(self, now: float):
+        if self._state == OPEN and now >= self._opened_at + self.open_duration:
+            self._state = HALF_OPEN
+            self._probe_started = []
+            self._probe_successes = 0
+
+    def _open_locked(self, now: float):
+        self._state = OPEN
+        self._opened_at = now
+        self._window.clear()
+        self._failures = 0
+        self._probe_started = []
+        self.times_opened += 1
+
+    def allow(self) -> bool:
+        # True if a call may go to the server now. In half_open a True answer reserves
+        # a probe slot, so every allowed call must be followed by record() or release().
+        with self._lock:
+            now = self.clock()
+            self._advance_locked(now)
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN:
+                self._probe_started = [started for started in self._probe_started if now - started < self.open_duration]
+                if len(self._probe_started) + self._probe_successes < self.half_open_probes:
+                    self._probe_started.append(now)
+                    return True
+            self.rejected += 1
+            return False
+
+    def record(self, success: bool):
+        with self._lock:
+            now = self.clock()
+            self._advance_locked(now)
+            if self._state == HALF_OPEN:
+                if self._probe_started:
+                    self._probe_started.pop(0)
+                if not success:
+                    self._open_locked(now)
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_probes:
+                    self._state = CLOSED
+                return
+            if self._state == OPEN:
+                # Outcome of a call admitted before the circuit opened
+                return
+
+            if len(self._window) == self._window.maxlen and not self._window[0]:
+                self._failures -= 1
+            self._window.append(success)
+            if not success:
+                self._failures += 1
+            if len(self._window) >= self.min_calls and self._failures / len(self._window) >= self.failure_threshold:
+                self._open_locked(now)
+
+    def release(self):
+        # For an allowed call that never reached the server (e.g. it was rate limited):
+        # frees its probe slot without counting a success or a failure
+        with self._lock:
+            self._advance_locked(self.clock())
+            if self._state == HALF_OPEN and self._probe_started:
+                self._probe_started.pop(0)
+
+    def reset(self):
+        with self._lock:
+            self._state = CLOSED
+            self._window.clear()
+            self._failures = 0
+            self._probe_started = []
+            self._probe_successes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._advance_locked(self.clock())
+            return {
+                "state": self._state,
+                "window_calls": len(self._window),
+                "window_failures": self._failures,
+                "rejected": self.rejected,
+                "times_opened": self.times_opened,
+            }
+
+
+class CircuitBreakerRegistry:
+    # One CircuitBreaker per MCP server name, created on first use from the defaults
+    # merged with any per-server settings. Disabled servers always allow calls.
+    def __init__(self, **default_settings):
+        self.default_settings = default_settings
+        self._settings: dict[str, dict] = {}
+        self._disabled: set[str] = set()
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, name: str, **settings):
+        # Per-server overrides; the breaker is rebuilt (closed) with the new settings.
+        with self._lock:
+            self._settings.setdefault(name, {}).update(settings)
+            self._disabled.discard(name)
+            self._breakers.pop(name, None)
+
+    def disable(self, name: str):
+        with self._lock:
+            self._disabled.add(name)
+            self._breakers.pop(name, None)
+
+    def get(self, name: str) -> CircuitBreaker | None:
+        breaker = self._breakers.get(name)
+        if breaker is None and name not in self._disabled:
+            with self._lock:
+                breaker = self._breakers.get(name)
+                if breaker is None and name not in self._disabled:
+                    settings = {**self.default_settings, **self._settings.get(name, {})}
+                    breaker = CircuitBreaker(name, **settings)
+                    self._breakers[name] = breaker
+        return breaker
+
+    def allow(self, name: str) -> bool:
+        breaker = self.get(name)
+        return breaker is None or breaker.allow()
+
+    def record(self, name: str, success: bool):
+        breaker = self.get(name)
+        if breaker is not None:
+            breaker.record(success)
+
+    def release(self, name: str):
+        breaker = self.get(name)
+        if breaker is not None:
+            breaker.release()
+
+    def stats(self) -> dict:
+        return {name: breaker.stats() for name, breaker in list(self._breakers.items())}
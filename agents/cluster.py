@@ -0,0 +1,377 @@
+import bisect
+import concurrent.futures
+import hashlib
+import logging
+import math
+import multiprocessing
+import os
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Any, Callable, Hashable, Iterable
+
+from .central_agent import CentralAgent
+from .result_cache import canonical_key
+from .serialization import JSONCodec, get_codec
+
+logger = logging.getLogger(__name__)
+
+
+class ClusterError(Exception):
+    pass
+
+
+class ClusterFullError(ClusterError):
+    # Raised by submit() when a worker's request ring stays full for put_timeout seconds.
+    pass
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    # Consistent hashing: every node owns `vnodes` points on a 64-bit ring and a key goes
+    # to the node owning the first point at or after the key's hash. Removing a node
+    # only moves the keys it owned.
+    def __init__(self, nodes: Iterable[Hashable] = (), vnodes: int = 64):
+        if vnodes < 1:
+            raise ValueError("vnodes must be at least 1")
+        self.vnodes = vnodes
+        self._points: list[int] = []
+        self._owners: list[Hashable] = []
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: Hashable):
+        for replica in range(self.vnodes):
+            point = _hash(f"{node}#{replica}")
+            index = bisect.bisect_left(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+
+    def remove(self, node: Hashable):
+        kept = [(point, owner) for point, owner in zip(self._points, self._owners) if owner != node]
+        self._points = [point for point, _ in kept]
+        self._owners = [owner for _, owner in kept]
+
+    @property
+    def nodes(self) -> set:
+        return set(self._owners)
+
+    def node_for(self, key: str) -> Hashable:
+        if not self._points:
+            raise ClusterError("The hash ring has no nodes")
+        index = bisect.bisect_left(self._points, _hash(key))
+        return self._owners[index % len(self._owners)]
+
+
+class ShmRing:
+    # Single-producer, single-consumer ring of byte messages in a shared memory block.
+    # The producer copies [length][message] into the data area and then advances `head`;
+    # the consumer reads it and advances `tail`. Both counters only grow, each is written
+    # by one side only, and they sit on separate cache lines. A semaphore counts the
+    # messages so an idle consumer sleeps instead of spinning; a producer facing a full
+    # ring polls with backoff. Nothing is pickled: messages are plain bytes.
+    _COUNTER = struct.Struct("<Q")
+    _LENGTH = struct.Struct("<I")
+    _HEAD = 0
+    _TAIL = 64
+    _DATA = 128
+
+    def __init__(self, capacity: int, context=None):
+        if capacity < 64:
+            raise ValueError("capacity must be at least 64 bytes")
+        context = context or multiprocessing.get_context()
+        self.capacity = capacity
+        self.shm = shared_memory.SharedMemory(create=True, size=self._DATA + capacity)
+        self.shm.buf[:self._DATA] = bytes(self._DATA)
+        self.items = context.Semaphore(0)
+        # Only the creating process unlinks the block (a forked worker holds this very object)
+        self._owner_pid = os.getpid()
+
+    def __getstate__(self):
+        # Sent to the worker process when it is started
+        return {"capacity": self.capacity, "name": self.shm.name, "items": self.items}
+
+    def __setstate__(self, state):
+        self.capacity = state["capacity"]
+        self.shm = shared_memory.SharedMemory(name=state["name"])
+        self.items = state["items"]
+        self._owner_pid = None
+
+    def _counter(self, offset: int) -> int:
+        return self._COUNTER.unpack_from(self.shm.buf, offset)[0]
+
+    def _copy_in(self, position: int, data: bytes | memoryview):
+        offset = position % self.capacity
+        first = min(len(data), self.capacity - offset)
+        buf = self.shm.buf
+        buf[self._DATA + offset:self._DATA + offset + first] = data[:first]
+        if first < len(data):
+            buf[self._DATA:self._DATA + len(data) - first] = data[first:]
+
+    def _copy_out(self, position: int, size: int) -> bytes:
+        offset = position % self.capacity
+        first = min(size, self.capacity - offset)
+        buf = self.shm.buf
+        data = bytes(buf[self._DATA + offset:self._DATA + offset + first])
+        if first < size:
+            data += bytes(buf[self._DATA:self._DATA + size - first])
+        return data
+
+    def put(self, message: bytes, timeout: float | None = None):
+        size = self._LENGTH.size + len(message)
+        if size > self.capacity:
+            raise ValueError(f"Message of {len(message)} bytes does not fit a {self.capacity}-byte ring")
+        head = self._counter(self._HEAD)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        backoff = 0.00005
+        while self.capacity - (head - self._counter(self._TAIL)) < size:
+            if deadline is not None and time.monotonic() >= deadline:
+                raise ClusterFullError("Ring is full")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 0.005)
+        self._copy_in(head, self._LENGTH.pack(len(message)))
+        self._copy_in(head + self._LENGTH.size, message)
+        self._COUNTER.pack_into(self.shm.buf, self._HEAD, head + size)
+        self.items.release()
+
+    def get(self, timeout: float | None = None) -> bytes | None:
+        # The next message, or None if none arrived within timeout
+        if not self.items.acquire(timeout=timeout):
+            return None
+        tail = self._counter(self._TAIL)
+        (length,) = self._LENGTH.unpack(self._copy_out(tail, self._LENGTH.size))
+        message = self._copy_out(tail + self._LENGTH.size, length)
+        self._COUNTER.pack_into(self.shm.buf, self._TAIL, tail + self._LENGTH.size + length)
+        return message
+
+    def close(self):
+        self.shm.close()
+        if self._owner_pid == os.getpid():
+            self.shm.unlink()
+
+
+# Request message: (request id, timeout or NaN) + the JSON request. Response message:
+# request id + the JSON response. Request id 0 tells the worker to stop.
+_REQUEST = struct.Struct("<Qd")
+_RESPONSE = struct.Struct("<Q")
+_STOP = 0
+
+
+def _worker_main(requests: ShmRing, responses: ShmRing, agent_factory: Callable[[], CentralAgent], threads: int):
+    central_agent = agent_factory()
+    send_lock = threading.Lock()  # the response ring has one producer at a time
+
+    def handle(request_id: int, timeout: float | None, body: bytes):
+        try:
+            # Bytes in, bytes out: cached answers come back pre-serialized
+            response = central_agent.handle_request_bytes(body, timeout)
+        except Exception as error:
+            logger.exception("Cluster worker %d failed a request", os.getpid())
+            response = central_agent.encode_response({"success": False, "error": f"Cluster worker error: {error}"})
+        message = _RESPONSE.pack(request_id) + response
+        if ShmRing._LENGTH.size + len(message) > responses.capacity:
+            message = _RESPONSE.pack(request_id) + central_agent.encode_response(
+                {"success": False, "error": f"Response of {len(response)} bytes exceeds the cluster's ring size."}
+            )
+        with send_lock:
+            responses.put(message)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads, thread_name_prefix="cluster-worker") as executor:
+        while True:
+            message = requests.get()
+            request_id, timeout = _REQUEST.unpack_from(message)
+            if request_id == _STOP:
+                break
+            executor.submit(handle, request_id, None if math.isnan(timeout) else timeout, message[_REQUEST.size:])
+    central_agent.close()
+    requests.close()
+    responses.close()
+
+
+class _Worker:
+    __slots__ = ("index", "process", "requests", "responses", "send_lock", "collector", "submitted", "alive")
+
+    def __init__(self, index: int, process, requests: ShmRing, responses: ShmRing):
+        self.index = index
+        self.process = process
+        self.requests = requests
+        self.responses = responses
+        self.send_lock = threading.Lock()  # the request ring has one producer at a time
+        self.collector: threading.Thread | None = None
+        self.submitted = 0
+        self.alive = True
+
+
+class Cluster:
+    # A local cluster of `workers` processes, each running its own CentralAgent (built by
+    # agent_factory, which must be picklable for non-fork start methods) on `threads`
+    # threads. Requests are spread by consistent hashing on (mcp_server, canonical
+    # payload key), so identical requests always reach the same worker and its result
+    # caches, single-flight table and session pools stay warm. Requests and responses
+    # travel as JSON bytes through a pair of shared-memory rings per worker (ShmRing),
+    # never pickled; workers answer with CentralAgent.handle_request_bytes.
+    #
+    # A worker that dies fails its outstanding requests and leaves the hash ring, which
+    # moves only its keys to the remaining workers.
+    def __init__(
+        self,
+        workers: int | None = None,
+        agent_factory: Callable[[], CentralAgent] = CentralAgent,
+        threads: int = 8,
+        ring_bytes: int = 1 << 20,
+        vnodes: int = 64,
+        shard_key: Callable[[Any], str] | None = None,
+        put_timeout: float = 5.0,
+        codec: JSONCodec | str | None = None,
+        mp_context=None,
+    ):
+        workers = workers or os.cpu_count() or 1
+        context = mp_context or multiprocessing.get_context()
+        self.codec = get_codec(codec)
+        self.shard_key = shard_key or self.default_shard_key
+        self.put_timeout = put_timeout
+        self.ring = HashRing(range(workers), vnodes)
+        self._lock = threading.Lock()
+        self._pending: dict[int, tuple[int, concurrent.futures.Future]] = {}
+        self._next_id = 1
+        self._closed = False
+
+        self.workers: list[_Worker] = []
+        for index in range(workers):
+            requests = ShmRing(ring_bytes, context)
+            responses = ShmRing(ring_bytes, context)
+            process = context.Process(
+                target=_worker_main,
+                args=(requests, responses, agent_factory, threads),
+                name=f"central-agent-{index}",
+                daemon=True,
+            )
+            process.start()
+            self.workers.append(_Worker(index, process, requests, responses))
+        # Only once every worker is forked, so no worker inherits a collector mid-lock
+        for worker in self.workers:
+            worker.collector = threading.Thread(
+                target=self._collect, args=(worker,), name=f"cluster-collector-{worker.index}", daemon=True
+            )
+            worker.collector.start()
+
+    @staticmethod
+    def default_shard_key(client_request) -> str:
+        # The result cache's key, so a worker owns every cache entry of its keys
+        if not isinstance(client_request, dict):
+            return ""
+        mcp_server = client_request.get("mcp_server")
+        try:
+            return f"{mcp_server}\x00{canonical_key(client_request.get('data'))}"
+        except TypeError:
+            return f"{mcp_server}"
+
+    def worker_for(self, client_request) -> int:
+        return self.ring.node_for(self.shard_key(client_request))
+
+    def submit(self, client_request, timeout: float | None = None) -> concurrent.futures.Future:
+        # Future of the response dict; raises ClusterFullError if the worker is not keeping up
+        if self._closed:
+            raise ClusterError("Cluster is shut down")
+        body = self.codec.dumps(client_request)
+        future = concurrent.futures.Future()
+        with self._lock:
+            try:
+                worker = self.workers[self.ring.node_for(self.shard_key(client_request))]
+            except ClusterError:
+                future.set_result({"success": False, "error": "No cluster worker is alive."})
+                return future
+            request_id = self._next_id
+            self._next_id += 1
+            self._pending[request_id] = (worker.index, future)
+            worker.submitted += 1
+        message = _REQUEST.pack(request_id, math.nan if timeout is None else timeout) + body
+        try:
+            with worker.send_lock:
+                worker.requests.put(message, timeout=self.put_timeout)
+        except (ClusterFullError, ValueError) as error:
+            with self._lock:
+                self._pending.pop(request_id, None)
+            if isinstance(error, ValueError):
+                raise
+            raise ClusterFullError(f"Cluster worker {worker.index} is not keeping up") from None
+        return future
+
+    def handle_client_request(self, client_request, timeout: float | None = None) -> dict:
+        return self.submit(client_request, timeout).result()
+
+    def map(self, client_requests: Iterable, timeout: float | None = None) -> list[dict]:
+        futures = [self.submit(client_request, timeout) for client_request in client_requests]
+        return [future.result() for future in futures]
+
+    def _collect(self, worker: _Worker):
+        while True:
+            message = worker.responses.get(timeout=0.1)
+            if message is None:
+                if not worker.process.is_alive():
+                    self._worker_died(worker)
+                    return
+                continue
+            (request_id,) = _RESPONSE.unpack_from(message)
+            with self._lock:
+                entry = self._pending.pop(request_id, None)
+            if entry is not None:
+                entry[1].set_result(self.codec.loads(message[_RESPONSE.size:]))
+
+    def _worker_died(self, worker: _Worker):
+        with self._lock:
+            worker.alive = False
+            if not self._closed:
+                logger.error("Cluster worker %d exited with code %s", worker.index, worker.process.exitcode)
+                self.ring.remove(worker.index)
+            failed = [request_id for request_id, (index, _) in self._pending.items() if index == worker.index]
+            futures = [self._pending.pop(request_id)[1] for request_id in failed]
+        for future in futures:
+            future.set_result({"success": False, "error": f"Cluster worker {worker.index} exited."})
+
+    def shutdown(self, wait: bool = True, timeout: float = 10.0):
+        # Stops the workers once they have answered what they were sent (with wait=True)
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        for worker in self.workers:
+            if worker.process.is_alive():
+                try:
+                    with worker.send_lock:
+                        worker.requests.put(_REQUEST.pack(_STOP, math.nan), timeout=self.put_timeout)
+                except ClusterFullError:
+                    worker.process.terminate()
+        for worker in self.workers:
+            if not wait:
+                worker.process.terminate()
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join()
+            worker.collector.join()
+            worker.requests.close()
+            worker.responses.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = [0] * len(self.workers)
+            for index, _ in self._pending.values():
+                pending[index] += 1
+            return {
+                "workers": [
+                    {"pid": worker.process.pid, "alive": worker.alive, "submitted": worker.submitted,
+                     "pending": pending[worker.index]}
+                    for worker in self.workers
+                ],
+            }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
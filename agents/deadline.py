@@ -0,0 +1,182 @@
+import asyncio
+import concurrent.futures
+import threading
+import time
+from typing import Any, Awaitable, Callable
+
+from .server_pool import ServerPool
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class Deadline:
+    # Absolute point in time by which a request must be answered. Created once in
+    # CentralAgent.handle_client_request and handed down to every stage.
+    __slots__ = ("expires_at", "clock")
+
+    def __init__(self, timeout: float, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.expires_at = clock() + timeout
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - self.clock())
+
+    def expired(self) -> bool:
+        return self.clock() >= self.expires_at
+
+
+class HedgePolicy:
+    # Hedging for an idempotent MCP server: when the first call has not answered after
+    # the server's observed `quantile` latency (clamped to [min_delay, max_delay]), a
+    # duplicate goes out on a second pooled session and the first answer wins. The
+    # quantile is re-read from the metrics at most every refresh_interval seconds.
+    def __init__(
+        self,
+        quantile: float = 0.95,
+        min_delay: float = 0.001,
+        max_delay: float = 1.0,
+        refresh_interval: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.quantile = quantile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.refresh_interval = refresh_interval
+        self.clock = clock
+        self._delay = min_delay
+        self._refreshed_at: float | None = None
+
+    def delay(self, metrics, stage: str, server: str) -> float:
+        now = self.clock()
+        if self._refreshed_at is None or now - self._refreshed_at >= self.refresh_interval:
+            observed = metrics.quantile(stage, server, self.quantile)
+            if observed is not None:
+                self._delay = min(self.max_delay, max(self.min_delay, observed))
+            self._refreshed_at = now
+        return self._delay
+
+
+# Blocking MCP calls that must respect a deadline run here, so the caller can stop
+# waiting. A call that overruns keeps its worker thread and its pooled session until it
+# returns, but no longer holds up the request.
+_call_executor: concurrent.futures.ThreadPoolExecutor | None = None
+_call_executor_lock = threading.Lock()
+
+
+def _executor() -> concurrent.futures.ThreadPoolExecutor:
+    global _call_executor
+    if _call_executor is None:
+        with _call_executor_lock:
+            if _call_executor is None:
+                _call_executor = concurrent.futures.ThreadPoolExecutor(max_workers=64, thread_name_prefix="mcp-call")
+    return _call_executor
+
+
+def _acquire_timeout(pool: ServerPool, deadline: Deadline | None) -> float | None:
+    return None if deadline is None else min(pool.acquire_timeout, deadline.remaining())
+
+
+def _invoke(pool: ServerPool, invoke: Callable[[Any], dict], deadline: Deadline | None) -> dict:
+    with pool.session(timeout=_acquire_timeout(pool, deadline)) as server:
+        response = invoke(server)
+        pool.report(server, bool(response.get("success")))
+        return response
+
+
+def call_server(
+    pool: ServerPool,
+    invoke: Callable[[Any], dict],
+    deadline: Deadline | None = None,
+    hedge_delay: float | None = None,
+    on_hedge: Callable[[], None] | None = None,
+) -> dict:
+    # Runs invoke(session) on a pooled session. Without a deadline or hedging this is a
+    # plain blocking call; otherwise the call runs on a worker thread and the caller
+    # waits at most deadline.remaining(). Raises DeadlineExceeded or ServerPoolError.
+    if deadline is None and hedge_delay is None:
+        return _invoke(pool, invoke, None)
+    if deadline is not None and deadline.expired():
+        raise DeadlineExceeded(f"Deadline exceeded before calling {pool.name}")
+
+    executor = _executor()
+    pending = {executor.submit(_invoke, pool, invoke, deadline)}
+    if hedge_delay is not None:
+        wait_for = hedge_delay if deadline is None else min(hedge_delay, deadline.remaining())
+        done, _ = concurrent.futures.wait(pending, timeout=wait_for)
+        if not done and (deadline is None or not deadline.expired()):
+            pending.add(executor.submit(_invoke, pool, invoke, deadline))
+            if on_hedge is not None:
+                on_hedge()
+
+    error: BaseException | None = None
+    while pending:
+        done, pending = concurrent.futures.wait(
+            pending,
+            timeout=None if deadline is None else deadline.remaining(),
+            return_when=concurrent.futures.FIRST_COMPLETED,
+        )
+        if not done:
+            break
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+    if error is not None and not pending:
+        raise error
+    raise DeadlineExceeded(f"{pool.name} did not answer before the deadline")
+
+
+async def _invoke_async(pool: ServerPool, invoke: Callable[[Any], Awaitable[dict]], deadline: Deadline | None) -> dict:
+    async with pool.session_async(timeout=_acquire_timeout(pool, deadline)) as server:
+        response = await invoke(server)
+        pool.report(server, bool(response.get("success")))
+        return response
+
+
+async def call_server_async(
+    pool: ServerPool,
+    invoke: Callable[[Any], Awaitable[dict]],
+    deadline: Deadline | None = None,
+    hedge_delay: float | None = None,
+    on_hedge: Callable[[], None] | None = None,
+) -> dict:
+    # Async call_server: the losing hedge and any call still running at the deadline are
+    # cancelled before returning, which hands their sessions back to the pool as unhealthy.
+    if deadline is None and hedge_delay is None:
+        return await _invoke_async(pool, invoke, None)
+    if deadline is not None and deadline.expired():
+        raise DeadlineExceeded(f"Deadline exceeded before calling {pool.name}")
+
+    pending = {asyncio.ensure_future(_invoke_async(pool, invoke, deadline))}
+    try:
+        if hedge_delay is not None:
+            wait_for = hedge_delay if deadline is None else min(hedge_delay, deadline.remaining())
+            done, _ = await asyncio.wait(pending, timeout=wait_for)
+            if not done and (deadline is None or not deadline.expired()):
+                pending.add(asyncio.ensure_future(_invoke_async(pool, invoke, deadline)))
+                if on_hedge is not None:
+                    on_hedge()
+
+        error: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=None if deadline is None else deadline.remaining(),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                break
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        if error is not None and not pending:
+            raise error
+        raise DeadlineExceeded(f"{pool.name} did not answer before the deadline")
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,341 @@
+import collections
+import concurrent.futures
+import os
+import threading
+from typing import Callable, Hashable, Iterable
+
+from .central_agent import CentralAgent
+from .metrics import server_label
+from .scheduler import NORMAL, PRIORITIES, FairQueue
+
+
+class DispatcherFullError(Exception):
+    # Raised by submit() when the bounded submission queue has no room.
+    pass
+
+
+# Process mode: each worker builds its CentralAgent once, in the initializer, so only
+# the request and the response cross the process boundary.
+_worker_agent: CentralAgent | None = None
+
+
+def _init_worker(agent_factory: Callable[[], CentralAgent]):
+    global _worker_agent
+    _worker_agent = agent_factory()
+
+
+def _handle_in_worker(client_request: dict) -> dict:
+    return _worker_agent.handle_client_request(client_request)
+
+
+def _begin_in_worker(client_request: dict):
+    return _worker_agent.begin_client_request(client_request)
+
+
+class Dispatcher:
+    # Runs CentralAgent.handle_client_request in one of three modes:
+    #   "inline"  - in the submitting thread (no concurrency, useful for tests/debugging)
+    #   "thread"  - on a thread pool sharing one CentralAgent
+    #   "process" - on a process pool with one CentralAgent per worker process
+    # Submissions are bounded by max_queue (queued + running). In thread and process mode
+    # at most max_workers requests run at once; the rest wait in a FairQueue
+    # (agents/scheduler.py): strict priority classes, and weighted fair queuing between
+    # (tenant, mcp_server) flows within a class, so one tenant flooding one server only
+    # delays itself. Flow weight is tenant_weights[tenant] * server_weights[mcp_server]
+    # (default 1). Requests for an MCP server at its concurrency limit keep their place
+    # in the queue without occupying a worker, so one saturated backend cannot starve
+    # the others.
+    #
+    # With max_escalations set, a request its specialized agent cannot answer leaves its
+    # worker and is finished on a separate escalation lane: at most max_escalations
+    # AgentSquad calls at once (run by this process's CentralAgent, also in process
+    # mode) and max_escalation_queue waiting; beyond that the request fails fast. During
+    # an incident the squad's cost then cannot hold up the primary path.
+    #
+    # Metrics (on central_agent.metrics): "queue_wait" and "escalation_queue_wait" stage
+    # histograms, the "scheduler_queue_depth" gauge (per server and lane) and
+    # "scheduler"/"escalation_rejected" counters.
+    MODES = ("inline", "thread", "process")
+
+    def __init__(
+        self,
+        mode: str = "thread",
+        max_workers: int | None = None,
+        max_queue: int = 1024,
+        agent_factory: Callable[[], CentralAgent] = CentralAgent,
+        server_concurrency_limits: dict[str, int] | None = None,
+        tenant_weights: dict[Hashable, float] | None = None,
+        server_weights: dict[str, float] | None = None,
+        max_escalations: int | None = None,
+        max_escalation_queue: int = 256,
+    ):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown dispatch mode {mode!r}; expected one of {self.MODES}")
+        if max_escalations is not None and max_escalations < 1:
+            raise ValueError("max_escalations must be at least 1")
+        self.mode = mode
+        self.max_queue = max_queue
+        # The local agent serves inline/thread mode and supplies the routing table's limits
+        self.central_agent = agent_factory()
+        self.metrics = self.central_agent.metrics
+        if server_concurrency_limits is None:
+            self.server_concurrency_limits = self.central_agent.server_concurrency_limits
+            # Follows wildcard routes and routing table reloads
+            self._concurrency_limit = self.central_agent.routing.concurrency_limit
+        else:
+            self.server_concurrency_limits = dict(server_concurrency_limits)
+            self._concurrency_limit = self.server_concurrency_limits.get
+        self.tenant_weights = dict(tenant_weights or {})
+        self.server_weights = dict(server_weights or {})
+        self.max_escalations = max_escalations if mode != "inline" else None
+        self.max_escalation_queue = max_escalation_queue
+
+        if mode == "thread":
+            # ThreadPoolExecutor's own default size
+            self.max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="central-agent"
+            )
+        elif mode == "process":
+            self.max_workers = max_workers or os.cpu_count()
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=(agent_factory,),
+            )
+        else:
+            self.max_workers = 1
+            self._executor = None
+        self._escalation_executor = None
+        if self.max_escalations is not None:
+            self._escalation_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.max_escalations, thread_name_prefix="agent-squad"
+            )
+
+        self._slots = threading.BoundedSemaphore(max_queue)
+        self._lock = threading.Lock()
+        self._running: collections.Counter = collections.Counter()
+        self._active = 0  # requests on the primary workers
+        self._queue = FairQueue(self._flow_weight)
+        self._escalations = FairQueue(self._flow_weight)
+        self._escalating = 0
+        self._escalations_idle = threading.Condition(self._lock)
+        self.escalations_rejected = 0
+        self._closed = False
+        self.metrics.register_gauge("scheduler_queue_depth", self._queue_depths, label="lane")
+
+    def _flow_weight(self, flow) -> float:
+        tenant, mcp_server = flow
+        return self.tenant_weights.get(tenant, 1.0) * self.server_weights.get(mcp_server, 1.0)
+
+    def submit(
+        self,
+        client_request: dict,
+        timeout: float | None = 0,
+        priority: str = NORMAL,
+        tenant: Hashable = None,
+    ) -> concurrent.futures.Future:
+        # timeout=0 fails fast when the queue is full; None waits for room. priority is
+        # one of scheduler.PRIORITIES; tenant (e.g. an API key) and the request's
+        # mcp_server make up its flow for fair queuing. Inline mode ignores both.
+        if self._closed:
+            raise RuntimeError("Dispatcher is shut down")
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r}; expected one of {PRIORITIES}")
+        blocking = timeout is None or timeout > 0
+        if not self._slots.acquire(blocking=blocking, timeout=timeout if blocking else None):
+            raise DispatcherFullError(f"Dispatcher queue is full ({self.max_queue} requests)")
+
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        future.add_done_callback(lambda _: self._slots.release())
+        if self._executor is None:
+            self._run_inline(client_request, future)
+            return future
+
+        mcp_server = client_request.get('mcp_server') if isinstance(client_request, dict) else None
+        if not isinstance(mcp_server, str):
+            mcp_server = None
+        job = (mcp_server, tenant, client_request, future, self.metrics.clock())
+        with self._lock:
+            self._queue.push(job, (tenant, mcp_server), priority)
+        self._schedule()
+        return future
+
+    def _run_inline(self, client_request: dict, future: concurrent.futures.Future):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(self.central_agent.handle_client_request(client_request))
+        except BaseException as error:
+            future.set_exception(error)
+
+    def _has_capacity_locked(self, flow) -> bool:
+        mcp_server = flow[1]
+        limit = self._concurrency_limit(mcp_server)
+        return limit is None or self._running[mcp_server] < limit
+
+    def _schedule(self):
+        # Starts queued requests, in fair order, while workers are free
+        while True:
+            with self._lock:
+                if self._closed or self._active >= self.max_workers:
+                    return
+                job = self._queue.pop(self._has_capacity_locked)
+                if job is None:
+                    return
+                self._active += 1
+                self._running[job[0]] += 1
+            self._start(job)
+
+    def _start(self, job: tuple):
+        mcp_server, _, client_request, future, enqueued_at = job
+        if not future.set_running_or_notify_cancel():
+            self._finished(mcp_server)
+            return
+        self.metrics.observe("queue_wait", server_label(mcp_server, self.central_agent.routing), enqueued_at)
+        if self.max_escalations is None:
+            task = self.central_agent.handle_client_request if self.mode == "thread" else _handle_in_worker
+        else:
+            task = self.central_agent.begin_client_request if self.mode == "thread" else _begin_in_worker
+        try:
+            inner = self._executor.submit(task, client_request)
+        except RuntimeError as error:  # executor already shut down
+            future.set_exception(error)
+            self._finished(mcp_server)
+            return
+        inner.add_done_callback(lambda done: self._complete(job, done))
+
+    def _complete(self, job: tuple, inner: concurrent.futures.Future):
+        mcp_server, tenant, _, future, _ = job
+        self._finished(mcp_server)
+        error = inner.exception()
+        if error is not None:
+            future.set_exception(error)
+        elif self.max_escalations is None:
+            future.set_result(inner.result())
+        else:
+            response, escalation, deadline = inner.result()
+            if escalation is None:
+                future.set_result(response)
+            else:
+                self._enqueue_escalation(tenant, future, escalation, deadline)
+
+    def _finished(self, mcp_server):
+        # Frees the worker and the per-server slot for the next queued request
+        with self._lock:
+            self._active -= 1
+            self._running[mcp_server] -= 1
+        self._schedule()
+
+    def _enqueue_escalation(self, tenant, future: concurrent.futures.Future, escalation, deadline):
+        server = server_label(escalation.mcp_server, self.central_agent.routing)
+        with self._lock:
+            full = len(self._escalations) >= self.max_escalation_queue and self._escalating >= self.max_escalations
+            if full:
+                self.escalations_rejected += 1
+            else:
+                item = (future, escalation, deadline, self.metrics.clock())
+                self._escalations.push(item, (tenant, escalation.mcp_server))
+        if full:
+            self.metrics.increment("requests", server, "failed")
+            self.metrics.increment("scheduler", server, "escalation_rejected")
+            future.set_result({"success": False, "error": "Escalation lane is full."})
+            return
+        self._schedule_escalations()
+
+    def _schedule_escalations(self):
+        while True:
+            with self._lock:
+                if self._escalating >= self.max_escalations:
+                    return
+                item = self._escalations.pop()
+                if item is None:
+                    return
+                self._escalating += 1
+            future, escalation, deadline, enqueued_at = item
+            self.metrics.observe("escalation_queue_wait", server_label(escalation.mcp_server, self.central_agent.routing), enqueued_at)
+            inner = self._escalation_executor.submit(self.central_agent.finish_escalation, escalation, deadline)
+            inner.add_done_callback(lambda done, future=future: self._escalation_done(future, done))
+
+    def _escalation_done(self, future: concurrent.futures.Future, inner: concurrent.futures.Future):
+        with self._lock:
+            self._escalating -= 1
+            self._escalations_idle.notify_all()
+        error = inner.exception()
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(inner.result())
+        self._schedule_escalations()
+
+    def map(
+        self,
+        client_requests: Iterable[dict],
+        timeout: float | None = None,
+        priority: str = NORMAL,
+        tenant: Hashable = None,
+    ) -> list[dict]:
+        futures = [
+            self.submit(client_request, timeout=None, priority=priority, tenant=tenant)
+            for client_request in client_requests
+        ]
+        return [future.result(timeout=timeout) for future in futures]
+
+    def _queue_depths(self) -> dict:
+        # {server: {priority or "escalation": queued requests}}, read by the metrics gauge
+        depths: dict = {}
+        with self._lock:
+            lanes = list(self._queue.depths().items()) + [
+                ("escalation", flows) for flows in self._escalations.depths().values()
+            ]
+        for lane, flows in lanes:
+            for (_, mcp_server), count in flows.items():
+                server = depths.setdefault(server_label(mcp_server, self.central_agent.routing), {})
+                server[lane] = server.get(lane, 0) + count
+        return depths
+
+    def stats(self) -> dict:
+        with self._lock:
+            queued = self._queue.depths()
+            waiting: collections.Counter = collections.Counter()
+            for flows in queued.values():
+                for (_, mcp_server), count in flows.items():
+                    waiting[mcp_server] += count
+            return {
+                "mode": self.mode,
+                "running": {server: count for server, count in self._running.items() if count},
+                "waiting": dict(waiting),
+                "queued": {priority: sum(flows.values()) for priority, flows in queued.items()},
+                "escalations": {
+                    "running": self._escalating,
+                    "queued": len(self._escalations),
+                    "rejected": self.escalations_rejected,
+                },
+            }
+
+    def shutdown(self, wait: bool = True):
+        # Queued requests are cancelled. With wait, running requests finish, including
+        # their escalations; otherwise queued escalations fail.
+        with self._lock:
+            self._closed = True
+            waiting = self._queue.drain()
+        for job in waiting:
+            job[3].cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+        if self._escalation_executor is not None:
+            with self._lock:
+                if wait:
+                    while self._escalating or len(self._escalations):
+                        self._escalations_idle.wait()
+                abandoned = self._escalations.drain()
+            for future, *_ in abandoned:
+                future.set_exception(RuntimeError("Dispatcher is shut down"))
+            self._escalation_executor.shutdown(wait=wait)
+        self.metrics.unregister_gauge("scheduler_queue_depth")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
@@ -0,0 +1,62 @@
+from typing import Any
+
+# Why a request was handed to AgentSquad
+AGENT_FAILED = "agent_failed"
+CIRCUIT_OPEN = "circuit_open"
+NO_AGENT = "no_agent"
+
+
+class Escalation:
+    # What CentralAgent hands to AgentSquad when a request is escalated. It holds a
+    # reference to the validated client request (never a copy), so during an outage,
+    # when every request escalates, no payload is duplicated. AgentSquad reads
+    # escalation.data directly instead of searching nested dicts for it.
+    #
+    #   cause           AGENT_FAILED, CIRCUIT_OPEN or NO_AGENT
+    #   error           the specialized agent's error or the routing reason
+    #   stage_timings   ((stage, nanoseconds), ...) of the stages run before escalating
+    __slots__ = ("original_request", "cause", "error", "stage_timings")
+
+    def __init__(self, original_request: dict, cause: str, error: str | None = None, stage_timings: tuple = ()):
+        object.__setattr__(self, "original_request", original_request)
+        object.__setattr__(self, "cause", cause)
+        object.__setattr__(self, "error", error)
+        object.__setattr__(self, "stage_timings", stage_timings)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Escalation is immutable")
+
+    def __reduce__(self):
+        # Pickled by value, e.g. from Dispatcher's process workers back to its escalation lane
+        return Escalation, (self.original_request, self.cause, self.error, self.stage_timings)
+
+    @property
+    def mcp_server(self):
+        return self.original_request.get('mcp_server')
+
+    @property
+    def data(self) -> Any:
+        return self.original_request.get('data')
+
+    def stage_time_ns(self, stage: str) -> int | None:
+        for name, duration_ns in self.stage_timings:
+            if name == stage:
+                return duration_ns
+        return None
+
+    def to_dict(self) -> dict:
+        return {
+            "original_request": self.original_request,
+            "cause": self.cause,
+            "error": self.error,
+            "stage_timings": dict(self.stage_timings),
+        }
+
+    @classmethod
+    def from_dict(cls, record: dict) -> "Escalation":
+        # Inverse of to_dict(), e.g. for escalations replayed from an EscalationLog
+        return cls(record["original_request"], record["cause"], record.get("error"),
+                   tuple(record.get("stage_timings", {}).items()))
+
+    def __repr__(self) -> str:
+        return f"Escalation(mcp_server={self.mcp_server!r}, cause={self.cause!r}, error={self.error!r})"
@@ -0,0 +1,269 @@
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Any
+
+from .serialization import JSONCodec, get_codec
+
+logger = logging.getLogger(__name__)
+
+# Record: header (payload length, crc32 of kind + id + payload, kind, entry id), then the
+# JSON payload. ENTRY records carry an escalation, ACK records mark one as done.
+_HEADER = struct.Struct("<IIcQ")
+ENTRY = b"E"
+ACK = b"A"
+SEGMENT_SUFFIX = ".wal"
+
+
+class EscalationLogError(Exception):
+    pass
+
+
+def _crc(kind: bytes, entry_id: int, payload: bytes) -> int:
+    return zlib.crc32(payload, zlib.crc32(kind + entry_id.to_bytes(8, "little")))
+
+
+def read_segment(path: str):
+    # Yields (kind, entry_id, payload) up to the end of the file or the first torn or
+    # corrupt record (a crash mid-write), whichever comes first.
+    with open(path, "rb") as segment:
+        data = segment.read()
+    offset = 0
+    while offset + _HEADER.size <= len(data):
+        length, crc, kind, entry_id = _HEADER.unpack_from(data, offset)
+        start = offset + _HEADER.size
+        payload = data[start:start + length]
+        if len(payload) < length or _crc(kind, entry_id, payload) != crc or kind not in (ENTRY, ACK):
+            logger.warning("Ignoring torn record at byte %d of %s", offset, path)
+            return
+        yield kind, entry_id, payload
+        offset = start + length
+
+
+class EscalationLog:
+    # Append-only write-ahead log of escalations, as numbered segment files in
+    # `directory`. append() returns once its record is on disk: a background thread
+    # fsyncs every `sync_interval` seconds, so concurrent appenders share one fsync (group
+    # commit). ack() marks an entry done without waiting for the disk; an ack lost in a
+    # crash only means the entry is replayed again (at-least-once).
+    #
+    # A segment is closed once it reaches `segment_bytes` and deleted once every entry in
+    # it and in every older segment is acknowledged (oldest first, so the acks of an old
+    # segment's entries, which live in newer segments, are never deleted before it).
+    # Opening a log recovers the unacknowledged entries of the segments already there
+    # (see pending()) and always starts a new segment. One process per directory.
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = 16 << 20,
+        sync_interval: float = 0.002,
+        fsync: bool = True,
+        codec: JSONCodec | str | None = None,
+    ):
+        if segment_bytes < 1:
+            raise ValueError("segment_bytes must be at least 1")
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.sync_interval = sync_interval
+        self.fsync = fsync
+        self.codec = get_codec(codec)
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._synced_condition = threading.Condition(self._lock)
+        self._work = threading.Event()
+        self._closed = False
+        self._segment_unacked: dict[int, set[int]] = {}  # segment number -> unacknowledged entry ids
+        self._entry_segment: dict[int, int] = {}
+        self._pending: list[tuple[int, Any]] = []
+        self._next_id = 1
+        self._written = 0  # records written so far
+        self._synced = 0  # records known to be on disk
+
+        self.appended = 0
+        self.acked = 0
+        self.syncs = 0
+        self.segments_removed = 0
+
+        self._recover()
+        self._segment_number = max(self._segment_unacked, default=0) + 1
+        self._open_segment()
+        self._trim_locked()
+        self._syncer = threading.Thread(target=self._sync_loop, name="escalation-log-sync", daemon=True)
+        self._syncer.start()
+
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self.directory, f"{number:012d}{SEGMENT_SUFFIX}")
+
+    def _segment_numbers(self) -> list[int]:
+        numbers = []
+        for name in os.listdir(self.directory):
+            stem, suffix = os.path.splitext(name)
+            if suffix == SEGMENT_SUFFIX and stem.isdigit():
+                numbers.append(int(stem))
+        return sorted(numbers)
+
+    def _recover(self):
+        entries: dict[int, tuple[int, bytes]] = {}
+        acked = set()
+        max_id = 0
+        for number in self._segment_numbers():
+            self._segment_unacked[number] = set()
+            for kind, entry_id, payload in read_segment(self._segment_path(number)):
+                max_id = max(max_id, entry_id)
+                if kind == ENTRY:
+                    entries[entry_id] = (number, payload)
+                else:
+                    acked.add(entry_id)
+        for entry_id in sorted(entries):
+            if entry_id in acked:
+                continue
+            number, payload = entries[entry_id]
+            try:
+                record = self.codec.loads(payload)
+            except ValueError:
+                logger.warning("Dropping undecodable escalation %d", entry_id)
+                continue
+            self._segment_unacked[number].add(entry_id)
+            self._entry_segment[entry_id] = number
+            self._pending.append((entry_id, record))
+        self._next_id = max_id + 1
+        if self._pending:
+            logger.info("Recovered %d unacknowledged escalations from %s", len(self._pending), self.directory)
+
+    def pending(self) -> list[tuple[int, Any]]:
+        # (entry id, record) of every entry that was not acknowledged when the log was
+        # opened, oldest first. Handed out once.
+        pending, self._pending = self._pending, []
+        return pending
+
+    def _open_segment(self):
+        self._file = open(self._segment_path(self._segment_number), "ab")
+        self._segment_unacked.setdefault(self._segment_number, set())
+        self._file_size = 0
+
+    def _trim_locked(self):
+        # Deletes the oldest closed segments while they hold no unacknowledged entry
+        for number in sorted(self._segment_unacked):
+            if number == self._segment_number or self._segment_unacked[number]:
+                return
+            del self._segment_unacked[number]
+            try:
+                os.remove(self._segment_path(number))
+            except FileNotFoundError:
+                pass
+            self.segments_removed += 1
+
+    def _rotate_locked(self):
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._file.close()
+        self._synced = self._written
+        self._synced_condition.notify_all()
+        self._segment_number += 1
+        self._open_segment()
+        self._trim_locked()
+
+    def _write_locked(self, kind: bytes, entry_id: int, payload: bytes) -> int:
+        if self._closed:
+            raise EscalationLogError(f"Escalation log {self.directory} is closed")
+        if self._file_size >= self.segment_bytes:
+            self._rotate_locked()
+        self._file.write(_HEADER.pack(len(payload), _crc(kind, entry_id, payload), kind, entry_id))
+        self._file.write(payload)
+        self._file_size += _HEADER.size + len(payload)
+        self._written += 1
+        return self._written
+
+    def append(self, record: Any) -> int:
+        # Writes one JSON-serializable record and waits until it is durable. Returns its entry id.
+        payload = self.codec.dumps(record)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            sequence = self._write_locked(ENTRY, entry_id, payload)
+            self._segment_unacked[self._segment_number].add(entry_id)
+            self._entry_segment[entry_id] = self._segment_number
+            self.appended += 1
+            self._work.set()
+            while self._synced < sequence:
+                if self._closed:
+                    raise EscalationLogError(f"Escalation log {self.directory} closed before the record was synced")
+                self._synced_condition.wait()
+        return entry_id
+
+    def ack(self, entry_id: int):
+        with self._lock:
+            if self._closed:
+                # Unacknowledged, so the next process replays it
+                return
+            number = self._entry_segment.pop(entry_id, None)
+            if number is None:
+                return
+            self._write_locked(ACK, entry_id, b"")
+            self.acked += 1
+            self._work.set()
+            self._segment_unacked[number].discard(entry_id)
+            self._trim_locked()
+
+    def _sync_once(self):
+        with self._lock:
+            if self._closed or self._synced >= self._written:
+                return
+            target = self._written
+            self._file.flush()
+            fd = os.dup(self._file.fileno())
+        try:
+            if self.fsync:
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+        with self._lock:
+            self.syncs += 1
+            if target > self._synced:
+                self._synced = target
+            self._synced_condition.notify_all()
+
+    def _sync_loop(self):
+        while True:
+            self._work.wait()
+            if not self._closed:
+                # Let concurrent appenders join this fsync
+                time.sleep(self.sync_interval)
+            self._work.clear()
+            if self._closed:
+                return
+            try:
+                self._sync_once()
+            except OSError:
+                logger.exception("Failed to sync escalation log %s", self.directory)
+                self._work.set()  # appenders are still waiting: retry
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._file.close()
+            self._synced = self._written
+            self._closed = True
+            self._synced_condition.notify_all()
+            self._work.set()
+        self._syncer.join()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "segments": len(self._segment_unacked),
+                "unacked": len(self._entry_segment),
+                "appended": self.appended,
+                "acked": self.acked,
+                "syncs": self.syncs,
+                "segments_removed": self.segments_removed,
+            }
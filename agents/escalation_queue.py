@@ -0,0 +1,122 @@
+import collections
+import concurrent.futures
+import logging
+import threading
+from typing import Callable
+
+from .escalation import Escalation
+from .escalation_log import EscalationLog
+from .metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class EscalationQueue:
+    # Runs escalations in the background instead of inline. submit() appends the
+    # escalation to `log` and returns its id once the record is durable; `workers`
+    # threads drain the log through handler(escalation) (CentralAgent.finish_escalation)
+    # and acknowledge each entry once it has been handled, whether or not AgentSquad
+    # solved it. Results are delivered to on_result(escalation_id, response), if given,
+    # and can be polled with poll()/result() for the last `max_completed` ids.
+    # recover() replays what an earlier process left unacknowledged.
+    def __init__(
+        self,
+        handler: Callable[[Escalation], dict],
+        log: EscalationLog,
+        workers: int = 4,
+        on_result: Callable[[int, dict], None] | None = None,
+        max_completed: int = 10_000,
+        metrics: MetricsRegistry | None = None,
+    ):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.handler = handler
+        self.log = log
+        self.on_result = on_result
+        self.max_completed = max_completed
+        self.metrics = metrics if metrics is not None else MetricsRegistry()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="escalation")
+        self._lock = threading.Lock()
+        self._futures: dict[int, concurrent.futures.Future] = {}
+        self._completed: collections.deque = collections.deque()  # ids of completed futures, oldest first
+        self._backlog = 0
+        self.submitted = 0
+        self.replayed = 0
+        self.completed = 0
+        self.metrics.register_gauge("escalation_backlog", self._backlog_gauge, label="queue")
+
+    def _backlog_gauge(self) -> dict:
+        return {"": {"durable": self._backlog}}
+
+    def _enqueue(self, entry_id: int, escalation: Escalation) -> concurrent.futures.Future:
+        future = concurrent.futures.Future()
+        with self._lock:
+            self._futures[entry_id] = future
+            self._backlog += 1
+        self._executor.submit(self._run, entry_id, escalation, future)
+        return future
+
+    def submit(self, escalation: Escalation) -> int:
+        entry_id = self.log.append(escalation.to_dict())
+        with self._lock:
+            self.submitted += 1
+        self._enqueue(entry_id, escalation)
+        return entry_id
+
+    def recover(self) -> int:
+        # Queues the entries the log recovered on open; returns how many
+        pending = self.log.pending()
+        for entry_id, record in pending:
+            self._enqueue(entry_id, Escalation.from_dict(record))
+        with self._lock:
+            self.replayed += len(pending)
+        return len(pending)
+
+    def _run(self, entry_id: int, escalation: Escalation, future: concurrent.futures.Future):
+        try:
+            response = self.handler(escalation)
+        except Exception as error:
+            logger.exception("Escalation %d failed", entry_id)
+            response = {"success": False, "error": f"Escalation failed: {error}"}
+        self.log.ack(entry_id)
+        with self._lock:
+            self._backlog -= 1
+            self.completed += 1
+            self._completed.append(entry_id)
+            while len(self._completed) > self.max_completed:
+                self._futures.pop(self._completed.popleft(), None)
+        future.set_result(response)
+        if self.on_result is not None:
+            try:
+                self.on_result(entry_id, response)
+            except Exception:
+                logger.exception("Escalation result callback failed for %d", entry_id)
+
+    def future(self, escalation_id: int) -> concurrent.futures.Future | None:
+        return self._futures.get(escalation_id)
+
+    def poll(self, escalation_id: int) -> dict | None:
+        # The response once the escalation has been handled, None while it is pending.
+        # Raises KeyError for ids this queue does not know (or no longer remembers).
+        future = self._futures[escalation_id]
+        return future.result() if future.done() else None
+
+    def result(self, escalation_id: int, timeout: float | None = None) -> dict:
+        return self._futures[escalation_id].result(timeout)
+
+    def close(self, wait: bool = True):
+        # With wait=False, queued escalations stay unacknowledged in the log and are
+        # replayed by the next process
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+        self.metrics.unregister_gauge("escalation_backlog")
+        self.log.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backlog": self._backlog,
+                "submitted": self.submitted,
+                "replayed": self.replayed,
+                "completed": self.completed,
+                "log": self.log.stats(),
+            }
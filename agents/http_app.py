@@ -0,0 +1,211 @@
+import argparse
+import asyncio
+import contextlib
+import logging
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from .central_agent import CentralAgent
+from .circuit_breaker import OPEN
+
+logger = logging.getLogger(__name__)
+
+
+class InFlightLimiter:
+    # Bounds the requests being served at once. Only touched from the event loop, so a
+    # plain counter is enough. Once draining, no new request is admitted and drain()
+    # waits for the in-flight ones to finish.
+    def __init__(self, max_in_flight: int):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.draining = False
+        self.rejected = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def try_acquire(self) -> bool:
+        if self.draining or self.in_flight >= self.max_in_flight:
+            self.rejected += 1
+            return False
+        self.in_flight += 1
+        self._idle.clear()
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+        if self.in_flight == 0:
+            self._idle.set()
+
+    async def drain(self, timeout: float | None) -> bool:
+        # True if every in-flight request finished within timeout
+        self.draining = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "draining": self.draining,
+            "rejected": self.rejected,
+        }
+
+
+def _error(status_code: int, message: str, headers: dict | None = None) -> JSONResponse:
+    return JSONResponse({"success": False, "error": message}, status_code=status_code, headers=headers)
+
+
+def _json(body: bytes) -> Response:
+    return Response(body, media_type="application/json")
+
+
+def create_app(
+    central_agent: CentralAgent | None = None,
+    max_in_flight: int = 256,
+    max_batch_size: int = 1000,
+    drain_timeout: float = 30.0,
+    retry_after: int = 1,
+) -> FastAPI:
+    # ASGI front end for CentralAgent:
+    #   POST /v1/requests          one request -> handle_request_bytes_async (200 unless rejected; errors are in the body)
+    #   POST /v1/requests/batch    a JSON array -> handle_client_requests (one batched pass, bounded by request_timeout)
+    #   POST /v1/requests/stream   one request -> NDJSON events of handle_client_request_stream_async
+    #   GET  /healthz              liveness
+    #   GET  /readyz               readiness, with in-flight, MCP pool and circuit breaker state
+    #   GET  /metrics              Prometheus exposition of central_agent.metrics
+    # At most max_in_flight requests (a batch counts as one) are served at once; beyond
+    # that requests get 429 with Retry-After, and 503 once the app is draining. On
+    # shutdown the app stops admitting requests, waits up to drain_timeout seconds for
+    # in-flight ones and then closes the agent (CentralAgent.close).
+    central_agent = central_agent if central_agent is not None else CentralAgent()
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app: FastAPI):
+        app.state.limiter.draining = False
+        yield
+        if not await app.state.limiter.drain(drain_timeout):
+            logger.warning("Shutting down with %d requests still in flight", app.state.limiter.in_flight)
+        central_agent.close()
+
+    app = FastAPI(title="TrendAgent", lifespan=lifespan)
+    app.state.central_agent = central_agent
+    app.state.limiter = InFlightLimiter(max_in_flight)
+
+    def rejection(limiter: InFlightLimiter) -> JSONResponse:
+        if limiter.draining:
+            return _error(503, "Server is shutting down.")
+        return _error(429, "Too many requests in flight.", headers={"Retry-After": str(retry_after)})
+
+    @app.post("/v1/requests")
+    async def handle_request(request: Request):
+        limiter = app.state.limiter
+        if not limiter.try_acquire():
+            return rejection(limiter)
+        try:
+            # Bytes in, bytes out: parsed straight into the validated request, and cached
+            # answers come back pre-serialized
+            return _json(await central_agent.handle_request_bytes_async(await request.body()))
+        finally:
+            limiter.release()
+
+    @app.post("/v1/requests/batch")
+    async def handle_batch(request: Request):
+        limiter = app.state.limiter
+        if not limiter.try_acquire():
+            return rejection(limiter)
+        try:
+            try:
+                client_requests = central_agent.codec.loads(await request.body())
+            except ValueError as error:
+                return _error(400, f"Invalid JSON: {error}")
+            if not isinstance(client_requests, list):
+                return _error(400, "Batch body must be a JSON array.")
+            if len(client_requests) > max_batch_size:
+                return _error(413, f"Batch exceeds {max_batch_size} requests.")
+            # The batch path issues blocking solve_many calls, so it runs off the event loop
+            responses = await run_in_threadpool(central_agent.handle_client_requests, client_requests)
+            return _json(central_agent.encode_response(responses))
+        finally:
+            limiter.release()
+
+    @app.post("/v1/requests/stream")
+    async def handle_stream(request: Request):
+        limiter = app.state.limiter
+        if not limiter.try_acquire():
+            return rejection(limiter)
+        try:
+            client_request = central_agent.codec.loads(await request.body())
+        except ValueError as error:
+            limiter.release()
+            return _error(400, f"Invalid JSON: {error}")
+
+        async def events():
+            # The slot is held until the last chunk has been sent
+            try:
+                async for event in central_agent.handle_client_request_stream_async(client_request):
+                    yield central_agent.encode_response(event) + b"\n"
+            finally:
+                limiter.release()
+
+        return StreamingResponse(events(), media_type="application/x-ndjson")
+
+    @app.get("/healthz")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/readyz")
+    async def readiness():
+        limiter = app.state.limiter
+        breakers = central_agent.circuit_breakers.stats()
+        body = {
+            "ready": not limiter.draining,
+            **limiter.stats(),
+            "open_circuits": sorted(name for name, stats in breakers.items() if stats["state"] == OPEN),
+            "server_pools": central_agent.server_pools.stats(),
+            "rate_limits": central_agent.limiters.stats(),
+            "circuit_breakers": breakers,
+        }
+        return JSONResponse(body, status_code=503 if limiter.draining else 200)
+
+    @app.get("/metrics")
+    async def metrics():
+        return PlainTextResponse(central_agent.metrics.to_prometheus(), media_type="text/plain; version=0.0.4")
+
+    return app
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve CentralAgent over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--routing-config", help="JSON/TOML routing config (default: agents A and B)")
+    parser.add_argument("--request-timeout", type=float, help="Default per-request deadline in seconds")
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    parser.add_argument("--max-batch-size", type=int, default=1000)
+    parser.add_argument("--drain-timeout", type=float, default=30.0)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    import uvicorn
+
+    args = parse_args(argv)
+    central_agent = CentralAgent(routing_config=args.routing_config, request_timeout=args.request_timeout)
+    app = create_app(
+        central_agent,
+        max_in_flight=args.max_in_flight,
+        max_batch_size=args.max_batch_size,
+        drain_timeout=args.drain_timeout,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, timeout_graceful_shutdown=int(args.drain_timeout) + 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import atexit
+import itertools
+import logging
+import logging.handlers
+import queue
+import sys
+
+# Agents log through the standard library under the "agents" namespace with %-style
+# arguments, so nothing is formatted unless a record is actually emitted. Success-path
+# messages are DEBUG; the default production level (WARNING) therefore costs one
+# cached level check per call site.
+DEFAULT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+_listener: logging.handlers.QueueListener | None = None
+_handler: logging.Handler | None = None
+_module_loggers: list[str] = []
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    # Enqueues records without formatting them; the listener thread does the
+    # formatting and the stream I/O. When the bounded queue is full the record is
+    # dropped (and counted) rather than blocking the request path.
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Capture the stack trace text now, while the exception is still live, but
+        # leave msg % args to the listener.
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class DebugSampler(logging.Filter):
+    # Lets through one in every `every` DEBUG records; other levels always pass.
+    def __init__(self, every: int):
+        super().__init__()
+        if every < 1:
+            raise ValueError("every must be at least 1")
+        self.every = every
+        self._counter = itertools.count()
+
+    def filter(self, record):
+        if record.levelno != logging.DEBUG:
+            return True
+        return next(self._counter) % self.every == 0
+
+
+def configure_logging(
+    level: int | str = logging.WARNING,
+    module_levels: dict[str, int | str] | None = None,
+    debug_sample_every: int | None = None,
+    stream=None,
+    fmt: str = DEFAULT_FORMAT,
+    queue_size: int = 10000,
+) -> NonBlockingQueueHandler:
+    # Route the "agents" and "mcp_stubs" loggers through a bounded queue drained by a
+    # background thread. module_levels overrides the level of individual modules,
+    # e.g. {"agents.agent_squad": "DEBUG"}. debug_sample_every=N keeps 1 in N DEBUG
+    # records so debug output can stay on under load. Calling again reconfigures.
+    global _listener, _handler, _module_loggers
+    shutdown_logging()
+
+    output = logging.StreamHandler(stream if stream is not None else sys.stderr)
+    output.setFormatter(logging.Formatter(fmt))
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    if debug_sample_every is not None:
+        handler.addFilter(DebugSampler(debug_sample_every))
+
+    for name in ("agents", "mcp_stubs"):
+        package_logger = logging.getLogger(name)
+        package_logger.setLevel(level)
+        package_logger.addHandler(handler)
+        package_logger.propagate = False
+    for name, module_level in (module_levels or {}).items():
+        logging.getLogger(name).setLevel(module_level)
+    _module_loggers = list(module_levels or {})
+
+    _listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    _handler = handler
+    return handler
+
+
+def shutdown_logging():
+    # Flush queued records and detach the handler installed by configure_logging.
+    global _listener, _handler, _module_loggers
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _handler is not None:
+        for name in ("agents", "mcp_stubs"):
+            logging.getLogger(name).removeHandler(_handler)
+            logging.getLogger(name).propagate = True
+            logging.getLogger(name).setLevel(logging.NOTSET)
+        _handler = None
+    for name in _module_loggers:
+        logging.getLogger(name).setLevel(logging.NOTSET)
+    _module_loggers = []
+
+
+atexit.register(shutdown_logging)
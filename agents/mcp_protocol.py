@@ -0,0 +1,37 @@
+from typing import Any, AsyncIterator, Iterator, Protocol, runtime_checkable
+
+
+@runtime_checkable
+class MCPServer(Protocol):
+    # Blocking client surface used by the sync request path.
+    server_name: str
+
+    def solve(self, task_data: Any) -> dict: ...
+
+    def enrich_and_solve(self, partial_data: Any) -> dict: ...
+
+    def solve_many(self, task_datas: list) -> list[dict]: ...
+
+    def enrich_and_solve_many(self, partial_datas: list) -> list[dict]: ...
+
+
+@runtime_checkable
+class AsyncMCPServer(Protocol):
+    # Awaitable client surface used by the asyncio request path. Network-bound
+    # MCP sessions implement this natively; the stub servers implement both.
+    server_name: str
+
+    async def solve_async(self, task_data: Any) -> dict: ...
+
+    async def enrich_and_solve_async(self, partial_data: Any) -> dict: ...
+
+
+@runtime_checkable
+class StreamingMCPServer(Protocol):
+    # Chunked enrichment used by AgentSquad.enrich_and_solve_stream(_async). Each event is
+    # {"success": True, "chunk": str}; a failure is a single {"success": False, "error": str}.
+    server_name: str
+
+    def enrich_and_solve_stream(self, partial_data: Any) -> Iterator[dict]: ...
+
+    def enrich_and_solve_stream_async(self, partial_data: Any) -> AsyncIterator[dict]: ...
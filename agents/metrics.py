@@ -0,0 +1,211 @@
+import json
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable
+
+# Upper bounds (seconds) of the latency histogram buckets; the implicit last bucket is +Inf.
+DEFAULT_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class _Histogram:
+    __slots__ = ("counts", "total_ns")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.total_ns = 0
+
+
+class _Shard:
+    # One thread's accumulators. Only the owning thread writes to it, so recording
+    # needs no lock; readers merge every shard and may see a sample half-recorded
+    # (bucket counted, sum not yet), which is harmless for monitoring.
+    __slots__ = ("histograms", "counters")
+
+    def __init__(self):
+        self.histograms: dict[tuple, _Histogram] = {}
+        self.counters: dict[tuple, int] = {}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_bound(bound: float) -> str:
+    return repr(float(bound))
+
+
+class MetricsRegistry:
+    # Per-stage latency histograms and outcome counters, cheap enough to leave on.
+    # Every thread records into its own shard; snapshot() and the exporters merge the
+    # shards on demand. The only lock guards the shard list and is taken once per
+    # thread, when that thread records its first sample.
+    #
+    # Histograms are keyed by (stage, server) and timed with a monotonic nanosecond
+    # clock:  start = metrics.clock(); ...; metrics.observe(stage, server, start)
+    # Counters are keyed by (name, server, outcome).
+    # Gauges (queue depths and the like) are not recorded but read on demand from the
+    # callbacks given to register_gauge().
+    def __init__(
+        self,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+        clock: Callable[[], int] = time.perf_counter_ns,
+        namespace: str = "agents",
+    ):
+        if list(buckets) != sorted(buckets):
+            raise ValueError("buckets must be sorted")
+        self.buckets = tuple(buckets)
+        self._bounds_ns = [int(bound * 1e9) for bound in self.buckets]
+        self.clock = clock
+        self.namespace = namespace
+        self._local = threading.local()
+        self._shards: list[_Shard] = []
+        self._shards_lock = threading.Lock()
+        self._gauges: dict[str, tuple[str, Callable[[], dict]]] = {}
+
+    def _shard(self) -> _Shard:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = _Shard()
+            with self._shards_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+
+    def observe(self, stage: str, server: str, start_ns: int):
+        # Records clock() - start_ns as one sample of the (stage, server) histogram.
+        # Same as observe_ns, inlined because it runs several times per request.
+        duration_ns = self.clock() - start_ns
+        try:
+            histograms = self._local.shard.histograms
+        except AttributeError:
+            histograms = self._shard().histograms
+        histogram = histograms.get((stage, server))
+        if histogram is None:
+            histogram = histograms[(stage, server)] = _Histogram(len(self._bounds_ns) + 1)
+        histogram.counts[bisect_left(self._bounds_ns, duration_ns)] += 1
+        histogram.total_ns += duration_ns
+
+    def observe_ns(self, stage: str, server: str, duration_ns: int):
+        histograms = self._shard().histograms
+        histogram = histograms.get((stage, server))
+        if histogram is None:
+            histogram = histograms[(stage, server)] = _Histogram(len(self._bounds_ns) + 1)
+        histogram.counts[bisect_left(self._bounds_ns, duration_ns)] += 1
+        histogram.total_ns += duration_ns
+
+    def increment(self, name: str, server: str, outcome: str, amount: int = 1):
+        counters = self._shard().counters
+        key = (name, server, outcome)
+        counters[key] = counters.get(key, 0) + amount
+
+    def register_gauge(self, name: str, read: Callable[[], dict], label: str = "kind"):
+        # read() returns {server: {label_value: number}}; it is called on every snapshot
+        self._gauges[name] = (label, read)
+
+    def unregister_gauge(self, name: str):
+        self._gauges.pop(name, None)
+
+    def _read_gauges(self) -> dict:
+        return {name: read() for name, (_, read) in list(self._gauges.items())}
+
+    def snapshot(self) -> dict:
+        # Merged view: {"histograms": {stage: {server: {...}}}, "counters": {name: {server: {outcome: n}}},
+        #               "gauges": {name: {server: {label_value: n}}}}
+        with self._shards_lock:
+            shards = list(self._shards)
+        merged_histograms: dict[tuple, list] = {}
+        merged_counters: dict[tuple, int] = {}
+        for shard in shards:
+            for key, histogram in list(shard.histograms.items()):
+                counts = list(histogram.counts)
+                merged = merged_histograms.setdefault(key, [[0] * len(counts), 0])
+                merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                merged[1] += histogram.total_ns
+            for key, value in list(shard.counters.items()):
+                merged_counters[key] = merged_counters.get(key, 0) + value
+
+        histograms: dict = {}
+        for (stage, server), (counts, total_ns) in sorted(merged_histograms.items()):
+            cumulative = []
+            running = 0
+            for count in counts:
+                running += count
+                cumulative.append(running)
+            histograms.setdefault(stage, {})[server] = {
+                "count": running,
+                "sum_seconds": total_ns / 1e9,
+                "buckets": dict(zip([_format_bound(bound) for bound in self.buckets] + ["+Inf"], cumulative)),
+            }
+        counters: dict = {}
+        for (name, server, outcome), value in sorted(merged_counters.items()):
+            counters.setdefault(name, {}).setdefault(server, {})[outcome] = value
+        return {"histograms": histograms, "counters": counters, "gauges": self._read_gauges()}
+
+    def quantile(self, stage: str, server: str, fraction: float) -> float | None:
+        # Upper bound of the bucket holding the requested quantile, or None without samples.
+        histogram = self.snapshot()["histograms"].get(stage, {}).get(server)
+        if not histogram or not histogram["count"]:
+            return None
+        rank = fraction * histogram["count"]
+        for bound, cumulative in histogram["buckets"].items():
+            if cumulative >= rank:
+                return float(bound)
+        return float("inf")
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), sort_keys=True)
+
+    def to_prometheus(self) -> str:
+        # Prometheus text exposition format (version 0.0.4).
+        snapshot = self.snapshot()
+        lines = []
+        if snapshot["histograms"]:
+            metric = f"{self.namespace}_stage_duration_seconds"
+            lines.append(f"# HELP {metric} Time spent in each request stage.")
+            lines.append(f"# TYPE {metric} histogram")
+            for stage, servers in snapshot["histograms"].items():
+                for server, histogram in servers.items():
+                    labels = f'stage="{_escape(stage)}",server="{_escape(server)}"'
+                    for bound, cumulative in histogram["buckets"].items():
+                        lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                    lines.append(f"{metric}_sum{{{labels}}} {histogram['sum_seconds']!r}")
+                    lines.append(f"{metric}_count{{{labels}}} {histogram['count']}")
+        for name, servers in snapshot["counters"].items():
+            metric = f"{self.namespace}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for server, outcomes in servers.items():
+                for outcome, value in outcomes.items():
+                    lines.append(f'{metric}{{server="{_escape(server)}",outcome="{_escape(outcome)}"}} {value}')
+        for name, servers in snapshot["gauges"].items():
+            label = self._gauges[name][0] if name in self._gauges else "kind"
+            metric = f"{self.namespace}_{name}"
+            lines.append(f"# TYPE {metric} gauge")
+            for server, values in servers.items():
+                for label_value, value in values.items():
+                    lines.append(f'{metric}{{server="{_escape(server)}",{label}="{_escape(str(label_value))}"}} {value}')
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def reset(self):
+        # Drops every recorded sample. Threads keep their shards and start from zero.
+        with self._shards_lock:
+            for shard in self._shards:
+                shard.histograms.clear()
+                shard.counters.clear()
+
+
+UNROUTED = "unrouted"
+
+
+def server_label(mcp_server, routing=None) -> str:
+    # Metric label for a request's mcp_server; anything but a string is reported as "".
+    # Clients choose mcp_server, so with a routing engine (see routing.RoutingEngine.label)
+    # only routed names become labels: a name routed by a pattern reports the pattern
+    # ("search-*", "*") and any other name UNROUTED, which keeps label cardinality bounded.
+    if not isinstance(mcp_server, str):
+        return ""
+    return mcp_server if routing is None else routing.label(mcp_server)
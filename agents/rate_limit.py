@@ -0,0 +1,288 @@
+import asyncio
+import contextlib
+import itertools
+import os
+import threading
+import time
+from typing import Callable
+
+from .routing import PatternTable
+from .server_pool import ServerPoolError
+
+# error_code of responses refused by a limiter, so callers can tell "slow down" apart
+# from a failed request
+RATE_LIMITED = "rate_limited"
+
+LIMIT_SETTINGS = ("rate", "burst", "max_concurrency", "max_queue", "queue_timeout", "shards")
+
+
+class RateLimitedError(ServerPoolError):
+    # An MCP call refused by its server's limiter before any session was checked out.
+    code = RATE_LIMITED
+
+    def __init__(self, name: str, reason: str):
+        super().__init__(f"{name} is over its {reason} limit")
+        self.name = name
+        self.reason = reason
+
+
+class _BucketShard:
+    __slots__ = ("lock", "tokens", "updated")
+
+    def __init__(self, tokens: float, now: float):
+        self.lock = threading.Lock()
+        self.tokens = tokens
+        self.updated = now
+
+
+class TokenBucket:
+    # `rate` tokens per second up to `burst`, split evenly over shards that each have
+    # their own lock. A thread draws from its home shard and only when that is empty
+    # tries the others, without blocking on their locks, so concurrent callers seldom
+    # meet on the same lock and the total never exceeds rate/burst. A shard holds at
+    # least one token, so there are at most `burst` shards.
+    def __init__(
+        self,
+        rate: float,
+        burst: float | None = None,
+        shards: int | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        burst = max(1.0, rate) if burst is None else burst
+        if burst < 1:
+            raise ValueError("burst must be at least 1")
+        shards = min(shards or os.cpu_count() or 1, int(burst))
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self._shard_rate = rate / shards
+        self._shard_burst = burst / shards
+        now = clock()
+        self._shards = [_BucketShard(self._shard_burst, now) for _ in range(shards)]
+        self._next_home = itertools.count()
+        self._local = threading.local()
+
+    def _home(self) -> int:
+        try:
+            return self._local.home
+        except AttributeError:
+            home = self._local.home = next(self._next_home) % len(self._shards)
+            return home
+
+    def _take_locked(self, shard: _BucketShard, now: float) -> bool:
+        shard.tokens = min(self._shard_burst, shard.tokens + (now - shard.updated) * self._shard_rate)
+        shard.updated = now
+        if shard.tokens >= 1:
+            shard.tokens -= 1
+            return True
+        return False
+
+    def try_acquire(self) -> bool:
+        now = self.clock()
+        home = self._home()
+        shard = self._shards[home]
+        with shard.lock:
+            if self._take_locked(shard, now):
+                return True
+        for offset in range(1, len(self._shards)):
+            other = self._shards[(home + offset) % len(self._shards)]
+            if other.lock.acquire(blocking=False):
+                try:
+                    if self._take_locked(other, now):
+                        return True
+                finally:
+                    other.lock.release()
+        return False
+
+    def tokens(self) -> float:
+        # Approximate: shards are read one at a time
+        now = self.clock()
+        return sum(min(self._shard_burst, shard.tokens + (now - shard.updated) * self._shard_rate) for shard in self._shards)
+
+
+class ServerLimiter:
+    # Admission control for one MCP server: a TokenBucket of `rate` calls per second
+    # (bursts up to `burst`) and at most `max_concurrency` calls in flight; either may be
+    # None for no limit. A call over a limit waits, polling with a short backoff, if
+    # fewer than `max_queue` calls are already waiting, for at most `queue_timeout`
+    # seconds (and the caller's timeout). Otherwise, or when the wait runs out, it
+    # raises RateLimitedError.
+    def __init__(
+        self,
+        name: str,
+        rate: float | None = None,
+        burst: float | None = None,
+        max_concurrency: int | None = None,
+        max_queue: int = 0,
+        queue_timeout: float = 0.0,
+        shards: int | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if max_queue < 0 or queue_timeout < 0:
+            raise ValueError("max_queue and queue_timeout must not be negative")
+        self.name = name
+        self.settings = {
+            "rate": rate, "burst": burst, "max_concurrency": max_concurrency,
+            "max_queue": max_queue, "queue_timeout": queue_timeout, "shards": shards,
+        }
+        self.bucket = TokenBucket(rate, burst, shards, clock) if rate is not None else None
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = {"rate": 0, "concurrency": 0, "queue": 0}
+
+    def _try_admit(self) -> str | None:
+        # None when admitted, otherwise the limit that refused the call. The concurrency
+        # slot is taken first so no token is spent on a call that cannot run.
+        if self.max_concurrency is not None:
+            with self._lock:
+                if self.in_flight >= self.max_concurrency:
+                    return "concurrency"
+                self.in_flight += 1
+        if self.bucket is not None and not self.bucket.try_acquire():
+            if self.max_concurrency is not None:
+                with self._lock:
+                    self.in_flight -= 1
+            return "rate"
+        return None
+
+    def _reject(self, reason: str):
+        with self._lock:
+            self.rejected[reason] += 1
+        raise RateLimitedError(self.name, reason)
+
+    def _start_waiting(self, reason: str, timeout: float | None) -> float:
+        # Returns how long this call may wait, having joined the waiters, or rejects it
+        budget = self.queue_timeout if timeout is None else min(self.queue_timeout, timeout)
+        with self._lock:
+            if budget > 0 and self.waiting < self.max_queue:
+                self.waiting += 1
+                return budget
+            if budget > 0:
+                reason = "queue"
+        self._reject(reason)
+
+    def acquire(self, timeout: float | None = None):
+        reason = self._try_admit()
+        if reason is None:
+            return
+        deadline = self.clock() + self._start_waiting(reason, timeout)
+        backoff = 0.0005
+        try:
+            while True:
+                time.sleep(min(backoff, max(0.0, deadline - self.clock())))
+                reason = self._try_admit()
+                if reason is None:
+                    return
+                if self.clock() >= deadline:
+                    self._reject(reason)
+                backoff = min(backoff * 2, 0.01)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+    async def acquire_async(self, timeout: float | None = None):
+        reason = self._try_admit()
+        if reason is None:
+            return
+        deadline = self.clock() + self._start_waiting(reason, timeout)
+        backoff = 0.0005
+        try:
+            while True:
+                await asyncio.sleep(min(backoff, max(0.0, deadline - self.clock())))
+                reason = self._try_admit()
+                if reason is None:
+                    return
+                if self.clock() >= deadline:
+                    self._reject(reason)
+                backoff = min(backoff * 2, 0.01)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+    def release(self):
+        if self.max_concurrency is not None:
+            with self._lock:
+                self.in_flight -= 1
+
+    @contextlib.contextmanager
+    def slot(self, timeout: float | None = None):
+        self.acquire(timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @contextlib.asynccontextmanager
+    async def slot_async(self, timeout: float | None = None):
+        await self.acquire_async(timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self.settings,
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "tokens": self.bucket.tokens() if self.bucket is not None else None,
+                "rejected": dict(self.rejected),
+            }
+
+
+class LimiterRegistry:
+    # ServerLimiters by MCP server name, configured by server pattern (exact, "prefix*"
+    # or "*"), normally from the "limits" section of the routing config:
+    #   {"limits": {"MCPStubServerC": {"rate": 200, "burst": 50, "max_concurrency": 8,
+    #                                  "max_queue": 32, "queue_timeout": 0.05}}}
+    # Every session checkout from a ServerPoolRegistry built with this registry goes
+    # through its server's limiter. get() does not lock once a name has been seen.
+    # `defaults` apply to patterns that the loaded limits leave out.
+    def __init__(self, defaults: dict[str, dict] | None = None):
+        self.defaults = dict(defaults or {})
+        self._settings = PatternTable()
+        self._limiters: dict[str, ServerLimiter | None] = {}
+        self._lock = threading.Lock()
+        self.load({})
+
+    def load(self, limits: dict[str, dict]):
+        # Replaces every loaded setting. Invalid settings raise before anything changes,
+        # and limiters whose settings are unchanged keep their state.
+        settings = PatternTable()
+        for pattern, pattern_settings in {**self.defaults, **limits}.items():
+            unknown = set(pattern_settings) - set(LIMIT_SETTINGS)
+            if unknown:
+                raise ValueError(f"Unknown limit settings for {pattern!r}: {sorted(unknown)}")
+            ServerLimiter(pattern, **pattern_settings)
+            settings[pattern] = dict(pattern_settings)
+        with self._lock:
+            limiters = {}
+            for name, limiter in self._limiters.items():
+                if limiter is not None and limiter.settings == ServerLimiter(name, **settings.get(name, {})).settings:
+                    limiters[name] = limiter
+            self._settings = settings
+            self._limiters = limiters
+
+    def get(self, name: str) -> ServerLimiter | None:
+        try:
+            return self._limiters[name]
+        except KeyError:
+            pass
+        with self._lock:
+            if name not in self._limiters:
+                settings = self._settings.get(name)
+                self._limiters[name] = ServerLimiter(name, **settings) if settings is not None else None
+            return self._limiters[name]
+
+    def stats(self) -> dict:
+        return {name: limiter.stats() for name, limiter in list(self._limiters.items()) if limiter is not None}
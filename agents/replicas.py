@@ -0,0 +1,213 @@
+import asyncio
+import contextlib
+import random
+import threading
+import time
+from typing import Callable
+
+STRATEGIES = ("p2c", "least_outstanding", "ewma", "random")
+
+
+class Replica:
+    __slots__ = ("index", "pool", "outstanding", "ewma", "calls", "failures", "consecutive_failures", "ejected_until")
+
+    def __init__(self, index: int, pool):
+        self.index = index
+        self.pool = pool
+        self.outstanding = 0
+        self.ewma: float | None = None  # seconds; None until the first completed call
+        self.calls = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+
+
+class ReplicaSet:
+    # Several replicas of one MCP server, each with its own ServerPool, behind the
+    # ServerPool interface so agents and call_server use it unchanged: every session()
+    # picks a replica, checks a session out of that replica's pool and feeds the call's
+    # latency and outcome back.
+    #
+    # Strategies:
+    #   p2c                two random healthy replicas, the one with fewer outstanding calls
+    #   least_outstanding  the healthy replica with the fewest outstanding calls
+    #   ewma               the healthy replica with the lowest ewma_latency * (outstanding + 1);
+    #                      replicas without samples go first
+    #   random             uniform choice (baseline)
+    #
+    # A call that raises, or whose response report() marks as failed, is a failure;
+    # `max_failures` consecutive failures eject the
+    # replica for `ejection_duration` seconds. If every replica is ejected, all of them
+    # are eligible again. Cancelled calls (e.g. the losing hedge) only release their slot.
+    def __init__(
+        self,
+        name: str,
+        pools: list,
+        strategy: str = "p2c",
+        ewma_alpha: float = 0.3,
+        max_failures: int = 5,
+        ejection_duration: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+        rng: random.Random | None = None,
+        limiters=None,
+    ):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown balancing strategy {strategy!r}; expected one of {STRATEGIES}")
+        if not pools:
+            raise ValueError("A replica set needs at least one replica")
+        self.name = name
+        self.replicas = [Replica(index, pool) for index, pool in enumerate(pools)]
+        self.strategy = strategy
+        self.ewma_alpha = ewma_alpha
+        self.max_failures = max_failures
+        self.ejection_duration = ejection_duration
+        self.clock = clock
+        self._rng = rng or random.Random()
+        self.limiters = limiters  # LimiterRegistry; the set shares one limiter, taken before a replica is picked
+        self._lock = threading.Lock()
+        self._failed_sessions: set[int] = set()  # ids of checked-out sessions reported as failed
+        self._choose = getattr(self, f"_choose_{strategy}")
+
+    @property
+    def acquire_timeout(self) -> float:
+        return self.replicas[0].pool.acquire_timeout
+
+    def _healthy_locked(self, now: float) -> list[Replica]:
+        healthy = [replica for replica in self.replicas if replica.ejected_until <= now]
+        return healthy or self.replicas
+
+    def _choose_p2c(self, candidates: list[Replica]) -> Replica:
+        if len(candidates) == 1:
+            return candidates[0]
+        first, second = self._rng.sample(candidates, 2)
+        return first if first.outstanding <= second.outstanding else second
+
+    def _choose_least_outstanding(self, candidates: list[Replica]) -> Replica:
+        fewest = min(replica.outstanding for replica in candidates)
+        return self._rng.choice([replica for replica in candidates if replica.outstanding == fewest])
+
+    def _choose_ewma(self, candidates: list[Replica]) -> Replica:
+        unsampled = [replica for replica in candidates if replica.ewma is None]
+        if unsampled:
+            return min(unsampled, key=lambda replica: replica.outstanding)
+        return min(candidates, key=lambda replica: replica.ewma * (replica.outstanding + 1))
+
+    def _choose_random(self, candidates: list[Replica]) -> Replica:
+        return self._rng.choice(candidates)
+
+    def pick(self) -> Replica:
+        # Chooses a replica and counts the call as outstanding on it; pair with record().
+        with self._lock:
+            replica = self._choose(self._healthy_locked(self.clock()))
+            replica.outstanding += 1
+            return replica
+
+    def record(self, replica: Replica, latency: float, success: bool | None):
+        # success None: the call was cancelled and says nothing about the replica
+        with self._lock:
+            replica.outstanding -= 1
+            if success is None:
+                return
+            replica.calls += 1
+            replica.ewma = latency if replica.ewma is None else (
+                self.ewma_alpha * latency + (1 - self.ewma_alpha) * replica.ewma
+            )
+            if success:
+                replica.consecutive_failures = 0
+                return
+            replica.failures += 1
+            replica.consecutive_failures += 1
+            if replica.consecutive_failures >= self.max_failures:
+                replica.ejected_until = self.clock() + self.ejection_duration
+                replica.consecutive_failures = 0
+
+    def report(self, session, success: bool):
+        # Outcome of a call made on a session that is still checked out from this set,
+        # e.g. an MCP error response, which does not raise
+        if not success:
+            with self._lock:
+                self._failed_sessions.add(id(session))
+
+    def _session_succeeded(self, session) -> bool:
+        with self._lock:
+            if id(session) in self._failed_sessions:
+                self._failed_sessions.discard(id(session))
+                return False
+            return True
+
+    def _limiter(self):
+        return self.limiters.get(self.name) if self.limiters is not None else None
+
+    @contextlib.contextmanager
+    def session(self, timeout: float | None = None):
+        # A call refused by the limiter never reaches a replica, so it is not a replica failure
+        limiter = self._limiter()
+        with limiter.slot(timeout) if limiter is not None else contextlib.nullcontext():
+            replica = self.pick()
+            start = self.clock()
+            success = False
+            try:
+                with replica.pool.session(timeout=timeout) as session:
+                    try:
+                        yield session
+                    finally:
+                        success = self._session_succeeded(session)
+            except GeneratorExit:
+                success = None
+                raise
+            except BaseException:
+                success = False
+                raise
+            finally:
+                self.record(replica, self.clock() - start, success)
+
+    @contextlib.asynccontextmanager
+    async def session_async(self, timeout: float | None = None):
+        limiter = self._limiter()
+        async with limiter.slot_async(timeout) if limiter is not None else contextlib.nullcontext():
+            replica = self.pick()
+            start = self.clock()
+            success = False
+            try:
+                async with replica.pool.session_async(timeout=timeout) as session:
+                    try:
+                        yield session
+                    finally:
+                        success = self._session_succeeded(session)
+            except (asyncio.CancelledError, GeneratorExit):
+                success = None
+                raise
+            except BaseException:
+                success = False
+                raise
+            finally:
+                self.record(replica, self.clock() - start, success)
+
+    def reconfigure(self, **settings):
+        for replica in self.replicas:
+            replica.pool.reconfigure(**settings)
+
+    def evict_idle(self) -> int:
+        return sum(replica.pool.evict_idle() for replica in self.replicas)
+
+    def close(self):
+        for replica in self.replicas:
+            replica.pool.close()
+
+    def stats(self) -> dict:
+        now = self.clock()
+        with self._lock:
+            replicas = [
+                {
+                    "outstanding": replica.outstanding,
+                    "ewma_seconds": replica.ewma,
+                    "calls": replica.calls,
+                    "failures": replica.failures,
+                    "ejected": replica.ejected_until > now,
+                }
+                for replica in self.replicas
+            ]
+        for replica_stats, replica in zip(replicas, self.replicas):
+            replica_stats["pool"] = replica.pool.stats()
+        return {"strategy": self.strategy, "replicas": replicas}
+
@@ -0,0 +1,108 @@
+from typing import Any, Iterable
+
+from pydantic_core import CoreSchema, SchemaValidator, ValidationError, core_schema
+
+from .routing import PatternTable
+
+
+# Envelope-only validator for requests arriving as bytes: parses JSON straight into the
+# request dict (no json.loads pass first) and checks the envelope in the same pass.
+_ENVELOPE = core_schema.typed_dict_schema(
+    {
+        "mcp_server": core_schema.typed_dict_field(core_schema.str_schema(strict=True)),
+        "data": core_schema.typed_dict_field(core_schema.any_schema()),
+    },
+    extra_behavior="allow",
+)
+
+
+def _format_envelope_errors(error: ValidationError) -> str:
+    item = error.errors(include_url=False)[0]
+    if item["type"] == "json_invalid":
+        return item["msg"]
+    if item["type"] == "missing":
+        return f"Missing '{item['loc'][0]}' key in request."
+    if item["loc"] == ("mcp_server",):
+        return "'mcp_server' must be a string."
+    return "Request must be a JSON object."
+
+
+def _format_errors(mcp_server: str, error: ValidationError) -> str:
+    details = []
+    for item in error.errors(include_url=False):
+        location = item["loc"]
+        if location and location[0] == "data":
+            location = location[1:]
+        if item["type"] == "missing" and len(item["loc"]) == 1:
+            return f"Missing '{item['loc'][0]}' key in request."
+        path = ".".join(str(part) for part in location)
+        details.append(f"{path}: {item['msg']}" if path else item["msg"])
+    return f"Invalid 'data' for {mcp_server}: " + "; ".join(details)
+
+
+class RequestValidator:
+    # Validates client requests at the edge. Every request must be a dict with a string
+    # 'mcp_server' and a 'data' key; servers with a payload schema (a pydantic-core
+    # CoreSchema, keyed by server name or pattern as in routing) additionally get their
+    # 'data' validated and coerced. Each server's schema is compiled once, together with
+    # the request envelope, so a request is checked and coerced in a single pass.
+    # Servers without a schema take a pure-Python fast path that returns the request
+    # object itself.
+    def __init__(self, payload_schemas: dict[str, CoreSchema] | None = None):
+        self._validators = PatternTable(
+            (pattern, self._compile(schema)) for pattern, schema in (payload_schemas or {}).items()
+        )
+        self._envelope = SchemaValidator(_ENVELOPE)
+
+    @staticmethod
+    def _compile(payload_schema: CoreSchema) -> SchemaValidator:
+        return SchemaValidator(core_schema.typed_dict_schema(
+            {
+                "mcp_server": core_schema.typed_dict_field(core_schema.str_schema()),
+                "data": core_schema.typed_dict_field(payload_schema),
+            },
+            extra_behavior="allow",
+        ))
+
+    def validate(self, request: Any) -> tuple[dict | None, str | None]:
+        # Returns (request, None) with coerced data for a valid request, (None, error) otherwise.
+        if not isinstance(request, dict):
+            return None, "Request must be a JSON object."
+        if 'mcp_server' not in request:
+            return None, "Missing 'mcp_server' key in request."
+        if 'data' not in request:
+            return None, "Missing 'data' key in request."
+        mcp_server = request['mcp_server']
+        if not isinstance(mcp_server, str):
+            return None, "'mcp_server' must be a string."
+
+        validator = self._validators.get(mcp_server)
+        if validator is None:
+            return request, None
+        try:
+            return validator.validate_python(request), None
+        except ValidationError as error:
+            return None, _format_errors(mcp_server, error)
+
+    def validate_json(self, body: bytes | str) -> tuple[dict | None, str | None]:
+        # validate() for a raw JSON body. The envelope is parsed and checked in one pass by
+        # pydantic-core; only servers with a payload schema take a second pass over 'data'.
+        try:
+            request = self._envelope.validate_json(body)
+        except ValidationError as error:
+            return None, _format_envelope_errors(error)
+        validator = self._validators.get(request['mcp_server'])
+        if validator is None:
+            return request, None
+        try:
+            return validator.validate_python(request), None
+        except ValidationError as error:
+            return None, _format_errors(request['mcp_server'], error)
+
+    def validate_many(self, requests: Iterable[Any]) -> list[tuple[dict | None, str | None]]:
+        # Batch entry point: one (request, error) pair per input, in order, so a single
+        # bad item does not reject the rest of the batch.
+        return [self.validate(request) for request in requests]
+
+    def has_schema(self, mcp_server: str) -> bool:
+        return self._validators.get(mcp_server) is not None
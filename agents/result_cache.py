@@ -0,0 +1,285 @@
+import collections
+import hashlib
+import struct
+import sys
+import threading
+import time
+from typing import Any, Callable
+
+# Returned by ResultCache.get() when there is no usable entry (None is a valid cached value).
+MISS = object()
+
+
+def _encode(value, out: list):
+    # Type-tagged, order-independent encoding: dicts are sorted by the encoding of
+    # their keys, so {"a": 1, "b": 2} and {"b": 2, "a": 1} hash the same while
+    # 1, 1.0, "1" and True all hash differently.
+    if value is None:
+        out.append(b"N")
+    elif value is True:
+        out.append(b"T")
+    elif value is False:
+        out.append(b"F")
+    elif isinstance(value, int):
+        encoded = str(value).encode()
+        out.append(b"i" + struct.pack(">I", len(encoded)) + encoded)
+    elif isinstance(value, float):
+        out.append(b"f" + struct.pack(">d", value))
+    elif isinstance(value, str):
+        encoded = value.encode("utf-8", "surrogatepass")
+        out.append(b"s" + struct.pack(">I", len(encoded)) + encoded)
+    elif isinstance(value, bytes):
+        out.append(b"b" + struct.pack(">I", len(value)) + value)
+    elif isinstance(value, dict):
+        items = []
+        for key, item in value.items():
+            key_parts = []
+            _encode(key, key_parts)
+            item_parts = []
+            _encode(item, item_parts)
+            items.append((b"".join(key_parts), b"".join(item_parts)))
+        items.sort()
+        out.append(b"d" + struct.pack(">I", len(items)))
+        for key_bytes, item_bytes in items:
+            out.append(key_bytes)
+            out.append(item_bytes)
+    elif isinstance(value, (list, tuple)):
+        out.append((b"l" if isinstance(value, list) else b"t") + struct.pack(">I", len(value)))
+        for item in value:
+            _encode(item, out)
+    elif isinstance(value, (set, frozenset)):
+        members = []
+        for item in value:
+            parts = []
+            _encode(item, parts)
+            members.append(b"".join(parts))
+        members.sort()
+        out.append(b"S" + struct.pack(">I", len(members)))
+        out.extend(members)
+    else:
+        raise TypeError(f"Cannot build a cache key for {type(value).__name__}")
+
+
+def canonical_key(payload: Any) -> str:
+    # Stable digest of a nested dict/list payload, identical across processes and runs.
+    parts = []
+    _encode(payload, parts)
+    return hashlib.blake2b(b"".join(parts), digest_size=16).hexdigest()
+
+
+def approximate_size(value: Any) -> int:
+    # Rough retained size in bytes of a JSON-like value, used for the byte-size cap.
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(approximate_size(k) + approximate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(approximate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    # LRU cache of MCP server responses with optional TTL, byte budget and negative
+    # caching. Successful responses live for `ttl` seconds (None = until evicted);
+    # failures are only cached when negative_ttl > 0, and only for that long.
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float | None = None,
+        max_bytes: int | None = None,
+        negative_ttl: float = 0.0,
+        size_of: Callable[[Any], int] = approximate_size,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.negative_ttl = negative_ttl
+        self.size_of = size_of
+        self.clock = clock
+
+        self._entries: collections.OrderedDict = collections.OrderedDict()  # key -> (value, expires_at, size, negative)
+        # Pre-serialized client responses for some entries; they live and die with the entry
+        self._encoded: dict[str, bytes] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _remove_locked(self, key):
+        _, _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+        encoded = self._encoded.pop(key, None)
+        if encoded is not None and self.max_bytes is not None:
+            self._bytes -= len(encoded)
+
+    def _live_entry_locked(self, key):
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] is not None and self.clock() >= entry[1]:
+            self._remove_locked(key)
+            self.expirations += 1
+            return None
+        return entry
+
+    def get(self, key: str, default=MISS):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at, _, negative = entry
+            if expires_at is not None and self.clock() >= expires_at:
+                self._remove_locked(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            if negative:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return value
+
+    def peek(self, key: str, default=MISS):
+        # get() without touching the LRU order or the hit/miss counters
+        with self._lock:
+            entry = self._live_entry_locked(key)
+            return default if entry is None else entry[0]
+
+    def get_encoded(self, key: str) -> bytes | None:
+        # The bytes attached to a live entry with attach_encoded(), counted as a hit
+        with self._lock:
+            encoded = self._encoded.get(key)
+            if encoded is None or self._live_entry_locked(key) is None:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return encoded
+
+    def attach_encoded(self, key: str, encoded: bytes, value) -> bool:
+        # Attach a serialized form of `value` to its entry, provided `value` is still
+        # the object cached under key. Counts toward max_bytes.
+        with self._lock:
+            entry = self._live_entry_locked(key)
+            if entry is None or entry[0] is not value or key in self._encoded:
+                return False
+            if self.max_bytes is not None:
+                if self._bytes + len(encoded) > self.max_bytes:
+                    return False
+                self._bytes += len(encoded)
+            self._encoded[key] = encoded
+            return True
+
+    def put(self, key: str, value, negative: bool = False):
+        ttl = self.negative_ttl if negative else self.ttl
+        if negative and not ttl:
+            return
+        size = self.size_of(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        expires_at = None if ttl is None else self.clock() + ttl
+        with self._lock:
+            if key in self._entries:
+                self._remove_locked(key)
+            self._entries[key] = (value, expires_at, size, negative)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                oldest = next(iter(self._entries))
+                self._remove_locked(oldest)
+                self.evictions += 1
+
+    def invalidate(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._remove_locked(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._encoded.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "encoded": len(self._encoded),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class ResultCacheRegistry:
+    # Per-MCP-server caches. Servers without a configured cache are not cached at all,
+    # so only idempotent servers should be configured. A server can also have a
+    # persistent store (result_store.ResultStore) behind its cache: lookups that miss the
+    # cache fall through to the store, and successful responses are written to both.
+    def __init__(self):
+        self._caches: dict[str, ResultCache] = {}
+        self._stores: dict[str, Any] = {}
+
+    def configure(self, name: str, **settings) -> ResultCache:
+        cache = ResultCache(**settings)
+        self._caches[name] = cache
+        return cache
+
+    def disable(self, name: str):
+        self._caches.pop(name, None)
+
+    def get(self, name: str) -> ResultCache | None:
+        return self._caches.get(name)
+
+    def attach_store(self, name: str, store):
+        self._stores[name] = store
+
+    def lookup(self, name: str, payload) -> tuple[str | None, Any]:
+        # Returns (key, cached_response). key is None when name is not cached or the
+        # payload cannot be keyed; cached_response is MISS when nothing usable is stored.
+        cache = self._caches.get(name)
+        store = self._stores.get(name)
+        if cache is None and store is None:
+            return None, MISS
+        try:
+            key = canonical_key(payload)
+        except TypeError:
+            return None, MISS
+        server_response = MISS if cache is None else cache.get(key)
+        if server_response is MISS and store is not None:
+            server_response = store.get(key)
+            if server_response is not MISS and cache is not None:
+                cache.put(key, server_response)
+        return key, server_response
+
+    def store(self, name: str, key: str | None, server_response: dict):
+        if key is None:
+            return
+        cache = self._caches.get(name)
+        if cache is not None:
+            cache.put(key, server_response, negative=not server_response.get("success"))
+        store = self._stores.get(name)
+        if store is not None and server_response.get("success"):
+            store.put(key, server_response)
+
+    def stats(self) -> dict:
+        return {name: cache.stats() for name, cache in list(self._caches.items())}
+
+    def store_stats(self) -> dict:
+        return {name: store.stats() for name, store in list(self._stores.items())}
+
+    def close(self):
+        # Closes the attached stores
+        for store in list(self._stores.values()):
+            store.close()
@@ -0,0 +1,426 @@
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Callable
+
+from .result_cache import MISS, ResultCache
+from .serialization import JSONCodec, get_codec
+
+logger = logging.getLogger(__name__)
+
+# Record: header (value length, crc32 of everything after the header, kind, key length,
+# expiry as wall-clock seconds or 0 for never), then the key and the JSON value. PUT
+# records store a value, DELETE records (no value) drop a key.
+_HEADER = struct.Struct("<IIcHd")
+PUT = b"P"
+DELETE = b"D"
+SEGMENT_SUFFIX = ".seg"
+HOT_KEYS_FILE = "hot-keys.json"
+
+
+def _crc(kind: bytes, key: bytes, expires_at: float, value: bytes) -> int:
+    return zlib.crc32(value, zlib.crc32(kind + struct.pack("<d", expires_at) + key))
+
+
+def _record(kind: bytes, key: bytes, expires_at: float, value: bytes) -> bytes:
+    header = _HEADER.pack(len(value), _crc(kind, key, expires_at, value), kind, len(key), expires_at)
+    return header + key + value
+
+
+def read_segment(data) -> Any:
+    # Yields (offset, kind, key, expires_at, value_offset, value_length) up to the end of
+    # `data` or the first torn or corrupt record (a crash mid-write), whichever comes first.
+    offset = 0
+    while offset + _HEADER.size <= len(data):
+        length, crc, kind, key_length, expires_at = _HEADER.unpack_from(data, offset)
+        key_start = offset + _HEADER.size
+        value_start = key_start + key_length
+        end = value_start + length
+        if end > len(data) or kind not in (PUT, DELETE):
+            return
+        key = bytes(data[key_start:value_start])
+        if _crc(kind, key, expires_at, data[value_start:end]) != crc:
+            return
+        yield offset, kind, key, expires_at, value_start, length
+        offset = end
+
+
+class ResultStore:
+    # Disk-backed key -> JSON value store for expensive results (AgentSquad's
+    # MCPStubServerC answers), so a restart does not begin with a cold cache. Values are
+    # appended to numbered segment files in `directory`; an in-memory hash index maps each
+    # key to its latest record. Closed segments are read through mmap, the open one with
+    # pread. Entries live for `ttl` seconds (None = until evicted).
+    #
+    # Compaction rewrites the live entries into fresh segments and deletes the old ones,
+    # dropping expired and overwritten records. It is needed when the segments outgrow
+    # `max_bytes` (keeping the most-read entries, up to half the budget) and at most every
+    # `compact_interval` seconds; put only signals a background compactor thread, which
+    # copies the records without holding the store's lock. compact() runs one directly.
+    #
+    # Reads go through a small LRU front cache of `front_entries` decoded values. Read
+    # counts are saved to hot-keys.json on close and compaction; warm_up() loads the most
+    # read keys of the previous run into the front cache. One process per directory.
+    def __init__(
+        self,
+        directory: str,
+        ttl: float | None = None,
+        max_bytes: int = 256 << 20,
+        segment_bytes: int = 16 << 20,
+        front_entries: int = 1024,
+        compact_interval: float | None = 600.0,
+        hot_keys: int = 4096,
+        fsync: bool = True,
+        codec: JSONCodec | str | None = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        if max_bytes < 1 or segment_bytes < 1:
+            raise ValueError("max_bytes and segment_bytes must be at least 1")
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self.compact_interval = compact_interval
+        self.hot_keys = hot_keys
+        self.fsync = fsync
+        self.codec = get_codec(codec)
+        self.clock = clock
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._compaction_lock = threading.Lock()  # one compaction at a time
+        self._compaction_needed = threading.Event()
+        self._closed = False
+        self._index: dict[str, tuple[int, int, int, float]] = {}  # key -> (segment, value offset, length, expires_at)
+        self._sizes: dict[str, int] = {}  # key -> record size
+        self._reads: dict[str, int] = {}  # key -> read count, for warm_up and compaction
+        self._segments: dict[int, mmap.mmap | None] = {}  # closed segment -> its mapping (None if empty)
+        self._disk_bytes = 0
+        self._live_bytes = 0
+        # (expires_at, value) of recently read entries
+        self._front = ResultCache(max_entries=max(1, front_entries))
+        self._last_compaction = clock()
+
+        self.front_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.compactions = 0
+
+        self._recover()
+        self._segment_number = max(self._segments, default=0) + 1
+        self._open_segment()
+        self._compactor = threading.Thread(target=self._compact_loop, name="result-store-compactor", daemon=True)
+        self._compactor.start()
+
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self.directory, f"{number:012d}{SEGMENT_SUFFIX}")
+
+    def _segment_numbers(self) -> list[int]:
+        numbers = []
+        for name in os.listdir(self.directory):
+            stem, suffix = os.path.splitext(name)
+            if suffix == SEGMENT_SUFFIX and stem.isdigit():
+                numbers.append(int(stem))
+        return sorted(numbers)
+
+    def _map(self, number: int) -> mmap.mmap | None:
+        with open(self._segment_path(number), "rb") as segment:
+            if os.fstat(segment.fileno()).st_size == 0:
+                return None
+            return mmap.mmap(segment.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _recover(self):
+        now = self.clock()
+        for number in self._segment_numbers():
+            data = self._segments[number] = self._map(number)
+            self._disk_bytes += 0 if data is None else len(data)
+            for offset, kind, key, expires_at, value_start, length in read_segment(data or b""):
+                key = key.decode("utf-8")
+                self._drop_locked(key)
+                if kind == PUT and (not expires_at or expires_at > now):
+                    self._index[key] = (number, value_start, length, expires_at)
+                    self._sizes[key] = value_start + length - offset
+                    self._live_bytes += self._sizes[key]
+        try:
+            with open(os.path.join(self.directory, HOT_KEYS_FILE), "rb") as hot:
+                reads = self.codec.loads(hot.read())
+        except FileNotFoundError:
+            reads = []
+        except ValueError:
+            logger.warning("Ignoring unreadable %s in %s", HOT_KEYS_FILE, self.directory)
+            reads = []
+        self._reads = {key: count for key, count in reads if key in self._index}
+        if self._index:
+            logger.info("Opened result store %s with %d entries", self.directory, len(self._index))
+
+    def _open_segment(self):
+        self._fd = os.open(self._segment_path(self._segment_number), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self._read_fd = os.open(self._segment_path(self._segment_number), os.O_RDONLY)
+        self._file_size = 0
+
+    def _seal_locked(self, skip: int = 0):
+        # Closes the open segment (mapping it for reads) and starts the next one, `skip`
+        # numbers later
+        if self.fsync:
+            os.fsync(self._fd)
+        os.close(self._fd)
+        os.close(self._read_fd)
+        self._segments[self._segment_number] = self._map(self._segment_number)
+        self._segment_number += 1 + skip
+        self._open_segment()
+
+    def _append_locked(self, record: bytes) -> int:
+        # Offset of the record in the open segment
+        if self._file_size and self._file_size + len(record) > self.segment_bytes:
+            self._seal_locked()
+        offset = self._file_size
+        os.write(self._fd, record)
+        self._file_size += len(record)
+        self._disk_bytes += len(record)
+        return offset
+
+    def _read_locked(self, number: int, offset: int, length: int) -> bytes:
+        if number == self._segment_number:
+            return os.pread(self._read_fd, length, offset)
+        return self._segments[number][offset:offset + length]
+
+    def _drop_locked(self, key: str):
+        if self._index.pop(key, None) is not None:
+            self._live_bytes -= self._sizes.pop(key)
+            self._reads.pop(key, None)
+
+    def get(self, key: str, default=MISS):
+        cached = self._front.get(key)
+        if cached is not MISS and (not cached[0] or cached[0] > self.clock()):
+            self.front_hits += 1
+            # Unlocked, so concurrent readers may lose a count; it only ranks keys
+            self._reads[key] = self._reads.get(key, 0) + 1
+            return cached[1]
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None or self._closed:
+                self.misses += 1
+                return default
+            number, offset, length, expires_at = entry
+            if expires_at and expires_at <= self.clock():
+                self._drop_locked(key)
+                self._front.invalidate(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            value = self._read_locked(number, offset, length)
+            self.disk_hits += 1
+            self._reads[key] = self._reads.get(key, 0) + 1
+        value = self.codec.loads(value)
+        self._front.put(key, (expires_at, value))
+        return value
+
+    def put(self, key: str, value):
+        encoded_key = key.encode("utf-8")
+        expires_at = 0.0 if self.ttl is None else self.clock() + self.ttl
+        record = _record(PUT, encoded_key, expires_at, self.codec.dumps(value))
+        if len(record) > self.max_bytes // 2:
+            return
+        with self._lock:
+            if self._closed:
+                return
+            offset = self._append_locked(record)
+            reads = self._reads.get(key)
+            self._drop_locked(key)
+            self._index[key] = (self._segment_number, offset + _HEADER.size + len(encoded_key),
+                                len(record) - _HEADER.size - len(encoded_key), expires_at)
+            self._sizes[key] = len(record)
+            self._live_bytes += len(record)
+            if reads:
+                self._reads[key] = reads
+            self._front.invalidate(key)
+            if self._disk_bytes > self.max_bytes or (
+                self.compact_interval is not None and self.clock() - self._last_compaction >= self.compact_interval
+            ):
+                self._compaction_needed.set()
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._front.invalidate(key)
+            if self._closed or key not in self._index:
+                return
+            self._drop_locked(key)
+            self._append_locked(_record(DELETE, key.encode("utf-8"), 0.0, b""))
+
+    def _compact_loop(self):
+        while True:
+            self._compaction_needed.wait()
+            if self._closed:
+                return
+            self._compaction_needed.clear()
+            try:
+                self.compact()
+            except Exception:
+                logger.exception("Compacting result store %s failed", self.directory)
+
+    def compact(self):
+        with self._compaction_lock:
+            with self._lock:
+                if self._closed:
+                    return
+                plan, reads, first_number = self._begin_compaction_locked()
+            # The old segments are sealed, so their records are copied without the lock
+            # while gets and puts carry on; a put lands in the new open segment, which
+            # sorts after the compacted ones on recovery.
+            compacted = self._write_compacted(plan)
+            with self._lock:
+                old_segments = self._finish_compaction_locked(plan, compacted, first_number)
+                hot = self._hot_keys_locked(reads)
+            for mapping in old_segments.values():
+                if mapping is not None:
+                    mapping.close()
+            for number in old_segments:
+                os.unlink(self._segment_path(number))
+            self._write_hot_keys(hot)
+            logger.debug("Compacted result store %s to %d entries", self.directory, len(plan))
+
+    def _begin_compaction_locked(self) -> tuple[list, dict, int]:
+        # Drops expired entries and, over budget, the coldest ones, lays the live entries
+        # out over new segments and seals the open segment, leaving their numbers free
+        # before the next open one. Returns (plan, a copy of the read counts, the first
+        # compacted segment's number); the plan holds (key, old entry, new entry) in
+        # write order.
+        now = self.clock()
+        self._last_compaction = now
+        for key, (_, _, _, expires_at) in list(self._index.items()):
+            if expires_at and expires_at <= now:
+                self._drop_locked(key)
+                self._front.invalidate(key)
+                self.expirations += 1
+        if self._live_bytes > self.max_bytes // 2:
+            # Least read first, then oldest write first
+            coldest = sorted(self._index, key=lambda key: (self._reads.get(key, 0), self._index[key][:2]))
+            for key in coldest:
+                if self._live_bytes <= self.max_bytes // 2:
+                    break
+                self._drop_locked(key)
+                self._front.invalidate(key)
+                self.evictions += 1
+
+        first_number = number = self._segment_number + 1
+        size = 0
+        plan = []
+        for key, entry in sorted(self._index.items(), key=lambda item: item[1][:2]):
+            record_size = self._sizes[key]
+            if size and size + record_size > self.segment_bytes:
+                number, size = number + 1, 0
+            plan.append((key, entry, (number, size + record_size - entry[2], entry[2], entry[3])))
+            size += record_size
+        self._seal_locked(skip=number - first_number + 1)
+        return plan, dict(self._reads), first_number
+
+    def _write_compacted(self, plan: list) -> dict[int, mmap.mmap | None]:
+        # Writes the records as planned; returns the new segments, mapped for reads
+        compacted = {}
+        fd = number = None
+        try:
+            for key, (old_number, offset, length, expires_at), (new_number, _, _, _) in plan:
+                if new_number != number:
+                    if fd is not None:
+                        compacted[number] = self._close_compacted(fd, number)
+                    number = new_number
+                    fd = os.open(self._segment_path(number), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+                value = self._segments[old_number][offset:offset + length]
+                os.write(fd, _record(PUT, key.encode("utf-8"), expires_at, value))
+        finally:
+            if fd is not None:
+                compacted[number] = self._close_compacted(fd, number)
+        return compacted
+
+    def _close_compacted(self, fd: int, number: int) -> mmap.mmap | None:
+        if self.fsync:
+            os.fsync(fd)
+        os.close(fd)
+        return self._map(number)
+
+    def _finish_compaction_locked(self, plan: list, compacted: dict, first_number: int) -> dict:
+        # Points every entry that did not change meanwhile at its copy and swaps the
+        # compacted segments in; returns the old segments, for the caller to unmap
+        old_segments = {number: self._segments.pop(number) for number in list(self._segments) if number < first_number}
+        self._segments.update(compacted)
+        for key, old_entry, new_entry in plan:
+            if self._index.get(key) == old_entry:
+                self._index[key] = new_entry
+        self._disk_bytes += sum(0 if mapping is None else len(mapping) for mapping in compacted.values())
+        self._disk_bytes -= sum(0 if mapping is None else len(mapping) for mapping in old_segments.values())
+        self.compactions += 1
+        return old_segments
+
+    def _hot_keys_locked(self, reads: dict) -> list:
+        hot = sorted(reads.items(), key=lambda item: item[1], reverse=True)[:self.hot_keys]
+        return [[key, count] for key, count in hot if key in self._index]
+
+    def _write_hot_keys(self, hot: list):
+        path = os.path.join(self.directory, HOT_KEYS_FILE)
+        with open(path + ".tmp", "wb") as hot_file:
+            hot_file.write(self.codec.dumps(hot))
+        os.replace(path + ".tmp", path)
+
+    def warm_up(self, count: int | None = None) -> int:
+        # Loads the `count` most read keys (default: as many as the front cache holds)
+        # into the front cache; returns how many were loaded.
+        count = self._front.max_entries if count is None else count
+        with self._lock:
+            hottest = [key for key, _ in sorted(list(self._reads.items()), key=lambda item: item[1], reverse=True)[:count]]
+        loaded = 0
+        # Coldest first, so the hottest end up most recently used
+        for key in reversed(hottest):
+            with self._lock:
+                entry = self._index.get(key)
+                if entry is None or self._closed:
+                    continue
+                number, offset, length, expires_at = entry
+                value = self._read_locked(number, offset, length)
+            self._front.put(key, (expires_at, self.codec.loads(value)))
+            loaded += 1
+        return loaded
+
+    def close(self):
+        # Waits for a running compaction
+        with self._compaction_lock, self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._compaction_needed.set()
+            self._write_hot_keys(self._hot_keys_locked(dict(self._reads)))
+            if self.fsync:
+                os.fsync(self._fd)
+            os.close(self._fd)
+            os.close(self._read_fd)
+            if not self._file_size:
+                os.unlink(self._segment_path(self._segment_number))
+            for mapping in self._segments.values():
+                if mapping is not None:
+                    mapping.close()
+            self._segments.clear()
+        self._front.clear()
+
+    def __len__(self):
+        return len(self._index)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._index),
+                "front_entries": len(self._front),
+                "segments": len(self._segments) + 1,
+                "disk_bytes": self._disk_bytes,
+                "live_bytes": self._live_bytes,
+                "front_hits": self.front_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "compactions": self.compactions,
+            }
@@ -0,0 +1,385 @@
+import importlib
+import importlib.metadata
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Iterable
+
+from .metrics import UNROUTED
+
+logger = logging.getLogger(__name__)
+
+# Entry point group scanned by RoutingEngine.from_entry_points(); each entry point
+# resolves to a routing config dict (or a zero-argument callable returning one).
+ENTRY_POINT_GROUP = "trendagent.routing"
+
+DEFAULT_AGENT_CLASS = "agents.specialized_agents:ConfiguredAgent"
+
+# What CentralAgent used to hardcode: one agent per stub server.
+DEFAULT_ROUTING_CONFIG = {
+    "agents": {
+        "SpecializedAgentA": {
+            "class": "agents.specialized_agents:SpecializedAgentA",
+            "mcp_servers": ["MCPStubServerA"],
+            "target_mcp_routing": ["MCPStubServerA"],  # MCPs this agent is primarily responsible for
+            "max_concurrency": 16,  # Concurrent requests per routed MCP when dispatched through a Dispatcher
+        },
+        "SpecializedAgentB": {
+            "class": "agents.specialized_agents:SpecializedAgentB",
+            "mcp_servers": ["MCPStubServerB"],
+            "target_mcp_routing": ["MCPStubServerB"],
+            "max_concurrency": 16,
+        },
+    },
+    "routes": [],
+}
+
+
+class RoutingConfigError(ValueError):
+    pass
+
+
+class PatternTable:
+    # Maps server-name patterns to values. A pattern is an exact name, a prefix ending
+    # in "*" ("search-*") or "*" alone. get() tries the exact name (one dict lookup),
+    # then the longest matching prefix (one dict lookup per distinct prefix length) and
+    # finally "*".
+    def __init__(self, items: Iterable[tuple[str, Any]] = ()):
+        self.exact: dict[str, Any] = {}
+        self.prefixes: dict[str, Any] = {}
+        self.fallback: Any = None
+        self._lengths: list[int] = []
+        for pattern, value in items:
+            self[pattern] = value
+
+    def __setitem__(self, pattern: str, value):
+        if not isinstance(pattern, str) or not pattern:
+            raise RoutingConfigError(f"Invalid server pattern: {pattern!r}")
+        if pattern == "*":
+            self.fallback = value
+        elif pattern.endswith("*"):
+            if "*" in pattern[:-1]:
+                raise RoutingConfigError(f"Only a trailing '*' is supported: {pattern!r}")
+            self.prefixes[pattern[:-1]] = value
+        else:
+            self.exact[pattern] = value
+        self._lengths = sorted({len(prefix) for prefix in self.prefixes}, reverse=True)
+
+    def setdefault(self, pattern: str, factory: Callable[[], Any]):
+        existing = self.lookup_pattern(pattern)
+        if existing is None:
+            existing = factory()
+            self[pattern] = existing
+        return existing
+
+    def lookup_pattern(self, pattern: str):
+        if pattern == "*":
+            return self.fallback
+        if pattern.endswith("*"):
+            return self.prefixes.get(pattern[:-1])
+        return self.exact.get(pattern)
+
+    def get(self, name, default=None):
+        value = self.exact.get(name)
+        if value is not None:
+            return value
+        if self.prefixes and isinstance(name, str):
+            for length in self._lengths:
+                value = self.prefixes.get(name[:length])
+                if value is not None:
+                    return value
+        return self.fallback if self.fallback is not None else default
+
+    def match(self, name) -> str | None:
+        # The pattern get(name) resolves through: the name itself, "prefix*" or "*"
+        if self.exact.get(name) is not None:
+            return name
+        if self.prefixes and isinstance(name, str):
+            for length in self._lengths:
+                if self.prefixes.get(name[:length]) is not None:
+                    return name[:length] + "*"
+        return "*" if self.fallback is not None else None
+
+    def __contains__(self, name) -> bool:
+        return self.get(name) is not None
+
+
+class _ServerRoute:
+    # Everything routed under one server pattern: payload rules in declaration order,
+    # then the pattern's default agent.
+    __slots__ = ("agent", "max_concurrency", "payload_keys", "by_value", "by_key")
+
+    def __init__(self):
+        self.agent = None
+        self.max_concurrency: int | None = None
+        self.payload_keys: list = []
+        self.by_value: dict[tuple, Any] = {}
+        self.by_key: dict[Any, Any] = {}
+
+    def resolve(self, data):
+        if self.payload_keys and isinstance(data, dict):
+            for key in self.payload_keys:
+                if key in data:
+                    try:
+                        agent = self.by_value.get((key, data[key]))
+                    except TypeError:  # unhashable payload value
+                        agent = None
+                    if agent is None:
+                        agent = self.by_key.get(key)
+                    if agent is not None:
+                        return agent
+        return self.agent
+
+
+class RoutingTable:
+    # Immutable compiled form of a routing config. Built off to the side and published
+    # by RoutingEngine with a single attribute assignment.
+    def __init__(self, servers: PatternTable, agents: dict[str, Any], limits: dict[str, dict] | None = None):
+        self.servers = servers
+        self.agents = agents
+        self.limits = limits or {}  # server pattern -> rate_limit.ServerLimiter settings
+
+    def resolve(self, mcp_server, data=None):
+        try:
+            route = self.servers.get(mcp_server)
+        except TypeError:  # unhashable mcp_server
+            return None
+        return route.resolve(data) if route is not None else None
+
+    def label(self, mcp_server: str) -> str:
+        # Metric label: the routed name or the pattern it matched, else "unrouted"
+        try:
+            pattern = self.servers.match(mcp_server)
+        except TypeError:
+            pattern = None
+        return UNROUTED if pattern is None else pattern
+
+    def concurrency_limit(self, mcp_server) -> int | None:
+        try:
+            route = self.servers.get(mcp_server)
+        except TypeError:
+            return None
+        return route.max_concurrency if route is not None else None
+
+
+def import_object(path: str):
+    # "package.module:attribute" -> the attribute
+    module_name, _, attribute = path.partition(":")
+    if not module_name or not attribute:
+        raise RoutingConfigError(f"Expected 'module:attribute', got {path!r}")
+    target = importlib.import_module(module_name)
+    for part in attribute.split("."):
+        target = getattr(target, part)
+    return target
+
+
+def load_routing_config(path: str) -> dict:
+    # .toml files are parsed with tomllib (or tomli before Python 3.11), anything else as JSON.
+    if path.endswith(".toml"):
+        try:
+            import tomllib
+        except ImportError:
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise RoutingConfigError("TOML routing configs need Python 3.11+ or the tomli package") from None
+        with open(path, "rb") as config_file:
+            return tomllib.load(config_file)
+    with open(path) as config_file:
+        return json.load(config_file)
+
+
+def merge_routing_configs(configs: Iterable[dict]) -> dict:
+    merged = {"agents": {}, "routes": [], "limits": {}}
+    for config in configs:
+        for name, agent_config in config.get("agents", {}).items():
+            if name in merged["agents"]:
+                raise RoutingConfigError(f"Agent {name!r} is defined more than once")
+            merged["agents"][name] = agent_config
+        merged["routes"].extend(config.get("routes", []))
+        for pattern, limit_config in config.get("limits", {}).items():
+            if pattern in merged["limits"]:
+                raise RoutingConfigError(f"Limits for {pattern!r} are defined more than once")
+            merged["limits"][pattern] = limit_config
+    return merged
+
+
+def entry_point_configs(group: str = ENTRY_POINT_GROUP) -> list[dict]:
+    configs = []
+    for entry_point in sorted(importlib.metadata.entry_points(group=group), key=lambda ep: ep.name):
+        config = entry_point.load()
+        configs.append(config() if callable(config) else config)
+    return configs
+
+
+class RoutingEngine:
+    # Table-driven routing from mcp_server (and optionally payload keys) to specialized
+    # agents. A config looks like
+    #
+    #   {"agents": {"SearchAgent": {"mcp_servers": ["search-*"],
+    #                               "server_factory": "search_pkg.servers:SearchServer",
+    #                               "target_mcp_routing": ["search-*"], "max_concurrency": 8},
+    #               "ImageAgent": {"class": "image_pkg.agents:ImageAgent", "mcp_servers": ["*"]}},
+    #    "routes": [{"mcp_server": "search-*", "payload": {"kind": "image"}, "agent": "ImageAgent"},
+    #               {"mcp_server": "MCPStubServerB", "payload_key": "image", "agent": "ImageAgent"}],
+    #    "limits": {"search-*": {"rate": 100, "burst": 20, "max_concurrency": 8}}}
+    #
+    # Agents without a "class" are ConfiguredAgents built from their server factory, so a
+    # new MCP target needs a config entry rather than a new class. Lookups go to the most
+    # specific server pattern (exact, longest prefix, "*"); within it, payload routes are
+    # tried in declaration order before the pattern's default agent.
+    #
+    # Readers never lock: resolve() reads self.table once, and reload() compiles a new
+    # table before swapping it in. Agents whose config is unchanged survive a reload.
+    # "limits" are loaded into `limiters` (a rate_limit.LimiterRegistry), if given, on
+    # every compile-and-swap.
+    def __init__(
+        self,
+        config: dict | None = None,
+        agent_kwargs: dict | None = None,
+        path: str | None = None,
+        entry_point_group: str | None = None,
+        limiters=None,
+    ):
+        self.agent_kwargs = agent_kwargs or {}
+        self.limiters = limiters
+        self.path = path
+        self.entry_point_group = entry_point_group
+        self._reload_lock = threading.Lock()
+        self._agent_cache: dict[str, tuple[str, Any]] = {}
+        self._mtime_ns: int | None = None
+        table = self.compile(config if config is not None else self._read_source())
+        self._load_limits(table)
+        self.table = table
+
+    @classmethod
+    def from_file(cls, path: str, agent_kwargs: dict | None = None, limiters=None) -> "RoutingEngine":
+        return cls(agent_kwargs=agent_kwargs, path=path, limiters=limiters)
+
+    @classmethod
+    def from_entry_points(
+        cls, group: str = ENTRY_POINT_GROUP, agent_kwargs: dict | None = None, limiters=None
+    ) -> "RoutingEngine":
+        return cls(agent_kwargs=agent_kwargs, entry_point_group=group, limiters=limiters)
+
+    def _read_source(self) -> dict:
+        if self.path is not None:
+            self._mtime_ns = os.stat(self.path).st_mtime_ns
+            return load_routing_config(self.path)
+        if self.entry_point_group is not None:
+            return merge_routing_configs(entry_point_configs(self.entry_point_group))
+        return DEFAULT_ROUTING_CONFIG
+
+    def _build_agent(self, name: str, agent_config: dict):
+        fingerprint = json.dumps(agent_config, sort_keys=True, default=repr)
+        cached = self._agent_cache.get(name)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+
+        settings = {
+            key: value for key, value in agent_config.items()
+            if key not in ("class", "mcp_servers", "target_mcp_routing", "max_concurrency")
+        }
+        allowed_mcp_servers = list(agent_config.get("mcp_servers", agent_config.get("target_mcp_routing", [])))
+        if "class" in agent_config:
+            agent_class = import_object(agent_config["class"])
+            agent = agent_class(allowed_mcp_servers=allowed_mcp_servers, **settings, **self.agent_kwargs)
+        else:
+            agent_class = import_object(DEFAULT_AGENT_CLASS)
+            agent = agent_class(agent_name=name, allowed_mcp_servers=allowed_mcp_servers, **settings, **self.agent_kwargs)
+        self._agent_cache[name] = (fingerprint, agent)
+        return agent
+
+    def compile(self, config: dict) -> RoutingTable:
+        agent_configs = config.get("agents", {})
+        agents = {name: self._build_agent(name, agent_config) for name, agent_config in agent_configs.items()}
+        servers = PatternTable()
+
+        def agent_named(name):
+            if name not in agents:
+                raise RoutingConfigError(f"Route refers to unknown agent {name!r}")
+            return agents[name]
+
+        for name, agent_config in agent_configs.items():
+            for pattern in agent_config.get("target_mcp_routing", []):
+                route = servers.setdefault(pattern, _ServerRoute)
+                if route.agent is not None and route.agent is not agents[name]:
+                    raise RoutingConfigError(f"{pattern!r} is routed to more than one agent")
+                route.agent = agents[name]
+                route.max_concurrency = agent_config.get("max_concurrency")
+
+        for route_config in config.get("routes", []):
+            pattern = route_config.get("mcp_server")
+            agent = agent_named(route_config.get("agent"))
+            route = servers.setdefault(pattern, _ServerRoute)
+            payload = route_config.get("payload")
+            payload_key = route_config.get("payload_key")
+            if payload is not None and payload_key is not None:
+                raise RoutingConfigError("A route takes either 'payload' or 'payload_key', not both")
+            if payload is not None:
+                if not isinstance(payload, dict) or len(payload) != 1:
+                    raise RoutingConfigError(f"'payload' must hold exactly one key: {payload!r}")
+                (key, value), = payload.items()
+                route.by_value.setdefault((key, value), agent)
+            elif payload_key is not None:
+                key = payload_key
+                route.by_key.setdefault(key, agent)
+            else:
+                if route.agent is not None and route.agent is not agent:
+                    raise RoutingConfigError(f"{pattern!r} is routed to more than one agent")
+                route.agent = agent
+                if "max_concurrency" in route_config:
+                    route.max_concurrency = route_config["max_concurrency"]
+                continue
+            if key not in route.payload_keys:
+                route.payload_keys.append(key)
+
+        limits = config.get("limits", {})
+        if not isinstance(limits, dict) or not all(isinstance(value, dict) for value in limits.values()):
+            raise RoutingConfigError(f"'limits' must map server patterns to limit settings: {limits!r}")
+
+        for name in list(self._agent_cache):
+            if name not in agents:
+                del self._agent_cache[name]
+        return RoutingTable(servers, agents, limits)
+
+    def _load_limits(self, table: RoutingTable):
+        if self.limiters is not None:
+            self.limiters.load(table.limits)
+
+    def resolve(self, mcp_server, data=None):
+        return self.table.resolve(mcp_server, data)
+
+    def agent(self, name: str):
+        return self.table.agents.get(name)
+
+    def label(self, mcp_server: str) -> str:
+        return self.table.label(mcp_server)
+
+    def concurrency_limit(self, mcp_server) -> int | None:
+        return self.table.concurrency_limit(mcp_server)
+
+    def reload(self, config: dict | None = None) -> RoutingTable:
+        # Recompile from config (or re-read the file/entry points) and swap the table in.
+        # On error the current table stays in place and the exception propagates.
+        with self._reload_lock:
+            table = self.compile(config if config is not None else self._read_source())
+            self._load_limits(table)
+            self.table = table
+        logger.info("Routing table reloaded: %d agents", len(table.agents))
+        return table
+
+    def reload_if_changed(self) -> bool:
+        # For file-backed engines: reload when the file's mtime changed. Cheap enough to
+        # call periodically from a background thread or between batches.
+        if self.path is None:
+            return False
+        try:
+            mtime_ns = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return False
+        if mtime_ns == self._mtime_ns:
+            return False
+        self.reload()
+        return True
@@ -0,0 +1,128 @@
+import collections
+import heapq
+import itertools
+from typing import Any, Callable, Hashable
+
+# Priority classes, most urgent first. A queued request of a higher class always goes
+# before any request of a lower one.
+HIGH = "high"
+NORMAL = "normal"
+LOW = "low"
+PRIORITIES = (HIGH, NORMAL, LOW)
+
+
+class _PriorityClass:
+    __slots__ = ("heads", "flows", "finish", "idle", "virtual_time")
+
+    def __init__(self):
+        self.heads: list = []  # (start_tag, seq, flow), one entry per flow with queued items
+        self.flows: dict[Hashable, collections.deque] = {}  # flow -> deque of (start_tag, item)
+        self.finish: dict[Hashable, float] = {}  # flow -> finish tag of its last queued item
+        self.idle: list = []  # (finish_tag, seq, flow) for flows whose queue ran empty
+        self.virtual_time = 0.0
+
+
+class FairQueue:
+    # Strict priority between PRIORITIES and weighted fair queuing between flows within a
+    # class (start-time fair queuing: an item's start tag is max(virtual time, finish tag
+    # of its flow's previous item), its finish tag start + cost / weight, and the smallest
+    # start tag goes first). A flow with twice the weight gets twice the share while both
+    # are backlogged, and a flow that floods the queue only delays itself. Not
+    # thread-safe; Dispatcher guards it with its own lock.
+    def __init__(self, weight: Callable[[Hashable], float] | None = None):
+        self._weight = weight or (lambda flow: 1.0)
+        self._classes = {priority: _PriorityClass() for priority in PRIORITIES}
+        self._seq = itertools.count()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def push(self, item: Any, flow: Hashable, priority: str = NORMAL, cost: float = 1.0):
+        try:
+            queue_class = self._classes[priority]
+        except KeyError:
+            raise ValueError(f"Unknown priority {priority!r}; expected one of {PRIORITIES}") from None
+        weight = self._weight(flow)
+        if weight <= 0:
+            raise ValueError(f"Flow weights must be positive, got {weight!r} for {flow!r}")
+        start = max(queue_class.virtual_time, queue_class.finish.get(flow, 0.0))
+        queue_class.finish[flow] = start + cost / weight
+        items = queue_class.flows.get(flow)
+        if items is None:
+            items = queue_class.flows[flow] = collections.deque()
+            heapq.heappush(queue_class.heads, (start, next(self._seq), flow))
+        items.append((start, item))
+        self._size += 1
+
+    def pop(self, eligible: Callable[[Hashable], bool] | None = None):
+        # Next item, or None if nothing is queued. Flows for which eligible(flow) is false
+        # (e.g. their server is at its concurrency limit) are passed over, keeping their place.
+        for queue_class in self._classes.values():
+            skipped = []
+            head = None
+            while queue_class.heads:
+                candidate = heapq.heappop(queue_class.heads)
+                if eligible is None or eligible(candidate[2]):
+                    head = candidate
+                    break
+                skipped.append(candidate)
+            for candidate in skipped:
+                heapq.heappush(queue_class.heads, candidate)
+            if head is not None:
+                return self._take(queue_class, head)
+        return None
+
+    def _take(self, queue_class: _PriorityClass, head: tuple):
+        start, _, flow = head
+        items = queue_class.flows[flow]
+        _, item = items.popleft()
+        self._size -= 1
+        queue_class.virtual_time = max(queue_class.virtual_time, start)
+        if items:
+            heapq.heappush(queue_class.heads, (items[0][0], next(self._seq), flow))
+        else:
+            del queue_class.flows[flow]
+            if not queue_class.flows:
+                # Idle class: restart virtual time so tags do not grow without bound
+                queue_class.virtual_time = 0.0
+                queue_class.finish.clear()
+                queue_class.idle.clear()
+                return item
+            heapq.heappush(queue_class.idle, (queue_class.finish[flow], next(self._seq), flow))
+        self._forget_idle_flows(queue_class)
+        return item
+
+    @staticmethod
+    def _forget_idle_flows(queue_class: _PriorityClass):
+        # An idle flow whose finish tag the virtual time has passed would start its next
+        # item at the virtual time anyway, so its tag is dropped. Keeps finish bounded by
+        # the active flows even when the class never goes idle (many short-lived flows).
+        idle = queue_class.idle
+        while idle and idle[0][0] <= queue_class.virtual_time:
+            finish, _, flow = heapq.heappop(idle)
+            # Skip entries of flows that have queued items again since
+            if flow not in queue_class.flows and queue_class.finish.get(flow) == finish:
+                del queue_class.finish[flow]
+
+    def drain(self) -> list:
+        # Removes and returns every queued item
+        items = []
+        for queue_class in self._classes.values():
+            for flow_items in queue_class.flows.values():
+                items.extend(item for _, item in flow_items)
+            queue_class.heads.clear()
+            queue_class.flows.clear()
+            queue_class.finish.clear()
+            queue_class.idle.clear()
+            queue_class.virtual_time = 0.0
+        self._size = 0
+        return items
+
+    def depths(self) -> dict[str, dict[Hashable, int]]:
+        # {priority: {flow: queued items}} for the non-empty flows
+        return {
+            priority: {flow: len(items) for flow, items in queue_class.flows.items()}
+            for priority, queue_class in self._classes.items()
+            if queue_class.flows
+        }
@@ -0,0 +1,67 @@
+import abc
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the stdlib codec
+    orjson = None
+
+
+class JSONCodec(abc.ABC):
+    # bytes in, bytes out. Values the codec cannot represent natively are written with str().
+    name = "abstract"
+
+    @abc.abstractmethod
+    def dumps(self, value: Any) -> bytes:
+        pass
+
+    @abc.abstractmethod
+    def loads(self, data: bytes | str) -> Any:
+        pass
+
+
+class StdlibJSONCodec(JSONCodec):
+    name = "json"
+
+    def __init__(self):
+        self._encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, default=str)
+        self._decoder = json.JSONDecoder()
+
+    def dumps(self, value: Any) -> bytes:
+        return self._encoder.encode(value).encode("utf-8")
+
+    def loads(self, data: bytes | str) -> Any:
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            data = bytes(data).decode("utf-8")
+        return self._decoder.decode(data)
+
+
+class OrjsonCodec(JSONCodec):
+    name = "orjson"
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("orjson is not installed")
+
+    def dumps(self, value: Any) -> bytes:
+        return orjson.dumps(value, default=str)
+
+    def loads(self, data: bytes | str) -> Any:
+        return orjson.loads(data)
+
+
+CODECS = {"json": StdlibJSONCodec, "orjson": OrjsonCodec}
+
+
+def get_codec(codec: JSONCodec | str | None = None) -> JSONCodec:
+    # None or "auto" picks orjson when it is installed and the stdlib otherwise; a name
+    # from CODECS forces that codec; a JSONCodec instance is used as is.
+    if isinstance(codec, JSONCodec):
+        return codec
+    if codec is None or codec == "auto":
+        return OrjsonCodec() if orjson is not None else StdlibJSONCodec()
+    try:
+        return CODECS[codec]()
+    except KeyError:
+        raise ValueError(f"Unknown JSON codec {codec!r}; expected one of {sorted(CODECS)}") from None
@@ -0,0 +1,370 @@
+import asyncio
+import collections
+import contextlib
+import threading
+import time
+from typing import Any, Callable
+
+from .replicas import ReplicaSet
+
+
+# error_code of responses that failed on the local pool, not at the MCP server: the
+# server's circuit breaker records neither a success nor a failure for them
+POOL_EXHAUSTED = "pool_exhausted"
+POOL_CLOSED = "pool_closed"
+
+
+class ServerPoolError(Exception):
+    pass
+
+
+class PoolExhaustedError(ServerPoolError):
+    # Raised when no session could be checked out within the acquire timeout.
+    code = POOL_EXHAUSTED
+
+
+class PoolClosedError(ServerPoolError):
+    # Raised by a checkout from a closed pool, e.g. while the agent shuts down.
+    code = POOL_CLOSED
+
+
+class ServerPool:
+    # Bounded pool of warm MCP server sessions. Idle sessions are reused LIFO so the
+    # most recently used (warmest) one goes out first, while sessions idle for longer
+    # than idle_timeout are closed lazily on the next checkout/checkin.
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        max_size: int = 16,
+        idle_timeout: float = 300.0,
+        acquire_timeout: float = 5.0,
+        health_check: Callable[[Any], bool] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        limiters=None,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.name = name
+        self.factory = factory
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self.health_check = health_check
+        self.clock = clock
+        self.limiters = limiters  # LimiterRegistry, consulted on every session()
+
+        self._condition = threading.Condition()
+        self._idle = collections.deque()  # (session, last_returned_at), oldest on the left
+        self._size = 0  # idle + checked out
+        self._closed = False
+
+        self.created = 0
+        self.reused = 0
+        self.closed_idle = 0
+        self.failed_health_checks = 0
+        self.checkouts = 0
+        self.acquire_timeouts = 0
+        self.acquire_waits = 0
+        self.acquire_wait_total = 0.0
+        self.acquire_wait_max = 0.0
+
+    def _close_session(self, session):
+        close = getattr(session, "close", None)
+        if callable(close):
+            close()
+
+    def _evict_idle_locked(self, now: float) -> list:
+        evicted = []
+        while self._idle and now - self._idle[0][1] >= self.idle_timeout:
+            evicted.append(self._idle.popleft()[0])
+        self._size -= len(evicted)
+        self.closed_idle += len(evicted)
+        if evicted:
+            self._condition.notify(len(evicted))
+        return evicted
+
+    def _try_checkout_locked(self):
+        # Returns (session, needs_create, discarded); discarded sessions failed their
+        # health check, or report themselves closed (e.g. a channel on a broken
+        # multiplexed connection), and must be closed once the lock is released.
+        discarded = []
+        while self._idle:
+            session, _ = self._idle.pop()
+            if getattr(session, "closed", False) is not True and (
+                    self.health_check is None or self.health_check(session)):
+                self.reused += 1
+                return session, False, discarded
+            self._size -= 1
+            self.failed_health_checks += 1
+            discarded.append(session)
+        if self._size < self.max_size:
+            self._size += 1
+            return None, True, discarded
+        return None, False, discarded
+
+    def _create(self):
+        try:
+            session = self.factory()
+        except BaseException:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        if session is None:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise ServerPoolError(f"No server session available for {self.name}")
+        with self._condition:
+            self.created += 1
+        return session
+
+    def _record_wait(self, waited: float):
+        self.acquire_waits += 1
+        self.acquire_wait_total += waited
+        if waited > self.acquire_wait_max:
+            self.acquire_wait_max = waited
+
+    def _try_checkout(self, now: float):
+        with self._condition:
+            if self._closed:
+                raise PoolClosedError(f"Pool for {self.name} is closed")
+            evicted = self._evict_idle_locked(now)
+            session, needs_create, discarded = self._try_checkout_locked()
+        for stale in evicted + discarded:
+            self._close_session(stale)
+        return session, needs_create
+
+    def checkout(self, timeout: float | None = None):
+        timeout = self.acquire_timeout if timeout is None else timeout
+        start = self.clock()
+        session, needs_create = self._try_checkout(start)
+        if session is None and not needs_create:
+            deadline = start + timeout
+            discarded = []
+            with self._condition:
+                while session is None and not needs_create:
+                    remaining = deadline - self.clock()
+                    if remaining <= 0:
+                        self.acquire_timeouts += 1
+                        raise PoolExhaustedError(
+                            f"Timed out after {timeout}s waiting for a {self.name} session"
+                        )
+                    self._condition.wait(remaining)
+                    if self._closed:
+                        raise PoolClosedError(f"Pool for {self.name} is closed")
+                    session, needs_create, failed = self._try_checkout_locked()
+                    discarded.extend(failed)
+                self._record_wait(self.clock() - start)
+            for stale in discarded:
+                self._close_session(stale)
+        if needs_create:
+            session = self._create()
+        with self._condition:
+            self.checkouts += 1
+        return session
+
+    async def checkout_async(self, timeout: float | None = None):
+        # Never blocks the event loop: retry a non-blocking checkout with a short,
+        # growing backoff until the acquire timeout elapses.
+        timeout = self.acquire_timeout if timeout is None else timeout
+        start = self.clock()
+        backoff = 0.0005
+        waited = False
+        while True:
+            session, needs_create = self._try_checkout(self.clock())
+            if session is not None or needs_create:
+                break
+            waited = True
+            if self.clock() - start >= timeout:
+                with self._condition:
+                    self.acquire_timeouts += 1
+                raise PoolExhaustedError(f"Timed out after {timeout}s waiting for a {self.name} session")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 0.01)
+        if waited:
+            with self._condition:
+                self._record_wait(self.clock() - start)
+        if needs_create:
+            session = self._create()
+        with self._condition:
+            self.checkouts += 1
+        return session
+
+    def checkin(self, session, healthy: bool = True):
+        # Return a session to the pool; unhealthy sessions (e.g. after a transport
+        # error) are closed instead so the next checkout builds a fresh one.
+        with self._condition:
+            if self._closed or not healthy:
+                self._size -= 1
+                self._condition.notify()
+                discard = True
+            else:
+                now = self.clock()
+                self._idle.append((session, now))
+                evicted = self._evict_idle_locked(now)
+                self._condition.notify()
+                discard = False
+        if discard:
+            self._close_session(session)
+        else:
+            for stale in evicted:
+                self._close_session(stale)
+
+    def _limiter(self):
+        return self.limiters.get(self.name) if self.limiters is not None else None
+
+    @contextlib.contextmanager
+    def session(self, timeout: float | None = None):
+        # The limiter (see rate_limit.LimiterRegistry) raises RateLimitedError, a
+        # ServerPoolError, when it refuses the call
+        limiter = self._limiter()
+        with limiter.slot(timeout) if limiter is not None else contextlib.nullcontext():
+            session = self.checkout(timeout)
+            healthy = True
+            try:
+                yield session
+            except BaseException:
+                healthy = False
+                raise
+            finally:
+                self.checkin(session, healthy=healthy)
+
+    @contextlib.asynccontextmanager
+    async def session_async(self, timeout: float | None = None):
+        limiter = self._limiter()
+        async with limiter.slot_async(timeout) if limiter is not None else contextlib.nullcontext():
+            session = await self.checkout_async(timeout)
+            healthy = True
+            try:
+                yield session
+            except BaseException:
+                healthy = False
+                raise
+            finally:
+                if healthy:
+                    self.checkin(session)
+                else:
+                    # Closing a broken session can block (e.g. on its socket or process),
+                    # so it happens off the event loop
+                    await asyncio.to_thread(self.checkin, session, healthy=False)
+
+    def report(self, session, success: bool):
+        # Call outcomes only matter to ReplicaSet, which balances on them
+        pass
+
+    def reconfigure(self, **settings):
+        with self._condition:
+            for key, value in settings.items():
+                if key not in ("max_size", "idle_timeout", "acquire_timeout", "health_check"):
+                    raise TypeError(f"Unknown pool setting: {key}")
+                setattr(self, key, value)
+            # A larger max_size may unblock waiters
+            self._condition.notify_all()
+
+    def evict_idle(self) -> int:
+        with self._condition:
+            evicted = self._evict_idle_locked(self.clock())
+        for stale in evicted:
+            self._close_session(stale)
+        return len(evicted)
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            idle = [session for session, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for session in idle:
+            self._close_session(session)
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "created": self.created,
+                "reused": self.reused,
+                "closed_idle": self.closed_idle,
+                "failed_health_checks": self.failed_health_checks,
+                "checkouts": self.checkouts,
+                "acquire_timeouts": self.acquire_timeouts,
+                "acquire_waits": self.acquire_waits,
+                "acquire_wait_total": self.acquire_wait_total,
+                "acquire_wait_max": self.acquire_wait_max,
+            }
+
+
+class ServerPoolRegistry:
+    # One ServerPool per MCP server name, shared by every agent handed the same registry.
+    # Servers given replicas with configure_replicas() get a ReplicaSet instead. With a
+    # LimiterRegistry, every session of a server first takes a slot from its limiter.
+    def __init__(self, limiters=None, **default_settings):
+        self.limiters = limiters
+        self.default_settings = default_settings
+        self._settings: dict[str, dict] = {}
+        self._replicas: dict[str, dict] = {}
+        self._pools: dict[str, ServerPool | ReplicaSet] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, name: str, **settings):
+        # Per-server overrides (max_size, idle_timeout, ...); applied to the live pool if it already exists.
+        with self._lock:
+            self._settings.setdefault(name, {}).update(settings)
+            pool = self._pools.get(name)
+        if pool is not None:
+            pool.reconfigure(**settings)
+
+    def configure_replicas(self, name: str, replicas: list[dict] | int, **balancer_settings):
+        # Serve name from several replicas: a count, or one dict per replica of keyword
+        # arguments for the session factory, e.g. [{"latency": 0.001}, {"latency": 0.02}]
+        # for the stub servers. balancer_settings go to ReplicaSet (strategy, ...). Must be
+        # called before the server's pool is first used.
+        replica_options = [{} for _ in range(replicas)] if isinstance(replicas, int) else list(replicas)
+        if not replica_options:
+            raise ValueError("A replica set needs at least one replica")
+        with self._lock:
+            if name in self._pools:
+                raise ServerPoolError(f"Pool for {name} already exists")
+            self._replicas[name] = {"replicas": replica_options, **balancer_settings}
+
+    def get(self, name: str) -> ServerPool | ReplicaSet | None:
+        return self._pools.get(name)
+
+    def _build(self, name: str, factory: Callable[..., Any]) -> ServerPool | ReplicaSet:
+        settings = {**self.default_settings, **self._settings.get(name, {})}
+        replica_settings = self._replicas.get(name)
+        if replica_settings is None:
+            return ServerPool(name, factory, limiters=self.limiters, **settings)
+        balancer_settings = dict(replica_settings)
+        pools = [
+            ServerPool(f"{name}#{index}", lambda options=options: factory(**options), **settings)
+            for index, options in enumerate(balancer_settings.pop("replicas"))
+        ]
+        return ReplicaSet(name, pools, limiters=self.limiters, **balancer_settings)
+
+    def pool(self, name: str, factory: Callable[..., Any]) -> ServerPool | ReplicaSet:
+        # factory() builds a session; for replicated servers it is called with the
+        # replica's keyword arguments
+        pool = self._pools.get(name)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.get(name)
+                if pool is None:
+                    pool = self._build(name, factory)
+                    self._pools[name] = pool
+        return pool
+
+    def evict_idle(self) -> int:
+        return sum(pool.evict_idle() for pool in list(self._pools.values()))
+
+    def close(self):
+        for pool in list(self._pools.values()):
+            pool.close()
+
+    def stats(self) -> dict:
+        return {name: pool.stats() for name, pool in list(self._pools.items())}
@@ -0,0 +1,95 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Hashable
+
+from .deadline import DeadlineExceeded
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    # Coalesces concurrent calls that share a key: the first caller (the leader) runs
+    # the computation and every caller that arrives while it is in flight waits for
+    # and shares its outcome. Nothing is remembered once the call completes, so this
+    # is deduplication of in-flight work, not caching.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        self._tasks: dict[tuple, asyncio.Task] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: float | None = None) -> tuple[Any, bool]:
+        # Returns (result, shared); shared is True for callers that did not run fn. A
+        # caller that waits for another's call gives up after timeout seconds (its own
+        # deadline, which may be shorter than the leader's) with DeadlineExceeded.
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise DeadlineExceeded("Deadline exceeded waiting for a coalesced call")
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    async def do_async(
+        self, key: Hashable, fn: Callable[[], Awaitable[Any]], timeout: float | None = None
+    ) -> tuple[Any, bool]:
+        # The computation runs as its own task, so cancelling the leader's await (or a
+        # caller's timeout expiring) does not cancel the result the other callers are
+        # waiting for. Calls are only coalesced within one event loop.
+        loop = asyncio.get_running_loop()
+        task_key = (loop, key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            if task is not None:
+                self.coalesced += 1
+                shared = True
+            else:
+                task = loop.create_task(fn())
+                self._tasks[task_key] = task
+                task.add_done_callback(lambda _: self._forget(task_key))
+                self.executed += 1
+                shared = False
+        if not shared:
+            # The leader's computation is bounded by its own deadline
+            return await asyncio.shield(task), shared
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout), shared
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded("Deadline exceeded waiting for a coalesced call") from None
+
+    def _forget(self, task_key: tuple):
+        with self._lock:
+            self._tasks.pop(task_key, None)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls) + len(self._tasks)
@@ -1,10 +1,220 @@
 import abc
+import logging
+
+from .deadline import Deadline, DeadlineExceeded, HedgePolicy, call_server, call_server_async
+from .mcp_protocol import MCPServer
+from .metrics import MetricsRegistry
+from .rate_limit import RATE_LIMITED, RateLimitedError
+from .result_cache import MISS, ResultCacheRegistry
+from .replicas import ReplicaSet
+from .routing import PatternTable
+from .server_pool import PoolClosedError, PoolExhaustedError, ServerPool, ServerPoolError, ServerPoolRegistry
+from .transport import MCPTransportError, TransportRegistry
+
+logger = logging.getLogger(__name__)
 
 class SpecializedAgentBase(abc.ABC):
-    def __init__(self, agent_name: str, allowed_mcp_servers: list[str]):
+    def __init__(
+        self,
+        agent_name: str,
+        allowed_mcp_servers: list[str],
+        server_pools: ServerPoolRegistry | None = None,
+        result_caches: ResultCacheRegistry | None = None,
+        metrics: MetricsRegistry | None = None,
+        hedge_policies: dict[str, HedgePolicy] | None = None,
+        transports: TransportRegistry | None = None,
+    ):
         self.agent_name = agent_name
         self.allowed_mcp_servers = allowed_mcp_servers
+        # Entries may be exact names, "prefix*" or "*"; see routing.PatternTable
+        self._allowed = PatternTable((pattern, True) for pattern in allowed_mcp_servers)
+        # Sessions are pooled and responses cached per MCP server; CentralAgent hands every
+        # agent the same registries.
+        self.server_pools = server_pools if server_pools is not None else ServerPoolRegistry()
+        self.result_caches = result_caches if result_caches is not None else ResultCacheRegistry()
+        self.metrics = metrics if metrics is not None else MetricsRegistry()
+        # Only servers listed here (idempotent ones) get hedged calls
+        self.hedge_policies = hedge_policies if hedge_policies is not None else {}
+        # How create_server reaches each server: in-process unless configured otherwise
+        self.transports = transports if transports is not None else TransportRegistry()
 
     @abc.abstractmethod
-    def perform_task(self, task_details: dict) -> dict:
+    def create_server(self, target_mcp_server: str, **server_options) -> MCPServer | None:
+        # Return a new server session for target_mcp_server, or None if this agent has no server for it.
+        # Called by the session pool only when no warm session is available; server_options
+        # are the replica's settings when the server is replicated (see configure_replicas).
         pass
+
+    def server_pool(self, target_mcp_server: str) -> ServerPool | ReplicaSet:
+        return self.server_pools.pool(
+            target_mcp_server, lambda **server_options: self.create_server(target_mcp_server, **server_options)
+        )
+
+    def allows(self, target_mcp_server) -> bool:
+        try:
+            return target_mcp_server in self._allowed
+        except TypeError:
+            return False
+
+    def _access_failure(self, task_details: dict) -> dict | None:
+        logger.debug("%s: Received task for %s", self.agent_name, task_details.get('mcp_server'))
+        target_mcp_server = task_details.get('mcp_server')
+
+        if not self.allows(target_mcp_server):
+            logger.warning("%s: Access denied to %s", self.agent_name, target_mcp_server)
+            return {"solved": False, "error": f"{self.agent_name} cannot access {target_mcp_server}.", "partial_data": task_details}
+        return None
+
+    def _configuration_failure(self, task_details: dict) -> dict:
+        # This case should ideally not be reached
+        logger.error("%s: Incorrect server configuration for %s", self.agent_name, task_details.get('mcp_server'))
+        return {"solved": False, "error": f"Incorrect server configuration for {self.agent_name}.", "partial_data": task_details}
+
+    def _session_failure(self, task_details: dict, error: ServerPoolError) -> dict:
+        if isinstance(error, RateLimitedError):
+            # Refused before reaching the server: tagged so CentralAgent fails fast instead of escalating
+            logger.info("%s: %s", self.agent_name, error)
+            self.metrics.increment("mcp_calls", task_details.get('mcp_server'), "rate_limited")
+            return {"solved": False, "error": str(error), "error_code": RATE_LIMITED, "partial_data": task_details}
+        if isinstance(error, (PoolExhaustedError, PoolClosedError)):
+            # The local pool is saturated or shut down; the server itself was never called
+            logger.warning("%s: %s", self.agent_name, error)
+            self.metrics.increment("mcp_calls", task_details.get('mcp_server'), error.code)
+            return {"solved": False, "error": str(error), "error_code": error.code, "partial_data": task_details}
+        if isinstance(error, MCPTransportError):
+            logger.warning("%s: %s", self.agent_name, error)
+            self.metrics.increment("mcp_calls", task_details.get('mcp_server'), "transport_error")
+            return {"solved": False, "error": str(error), "partial_data": task_details}
+        return self._configuration_failure(task_details)
+
+    def _record_call(self, stage: str, target_mcp_server: str, start: int, server_response: dict):
+        self.metrics.observe(stage, target_mcp_server, start)
+        self.metrics.increment("mcp_calls", target_mcp_server, "success" if server_response.get("success") else "error")
+
+    def _task_result(self, task_details: dict, server_response: dict) -> dict:
+        target_mcp_server = task_details.get('mcp_server')
+        if server_response.get("success"):
+            logger.debug("%s: Task solved successfully by %s", self.agent_name, target_mcp_server)
+            return {"solved": True, "result": server_response['data']}
+        else:
+            logger.info("%s: MCP interaction failed for %s", self.agent_name, target_mcp_server)
+            return {"solved": False, "error": server_response.get('error'), "partial_data": task_details}
+
+    def _deadline_failure(self, task_details: dict) -> dict:
+        target_mcp_server = task_details.get('mcp_server')
+        logger.warning("%s: %s did not answer before the deadline", self.agent_name, target_mcp_server)
+        self.metrics.increment("mcp_calls", target_mcp_server, "timeout")
+        return {"solved": False, "error": f"{target_mcp_server} did not answer before the deadline.", "partial_data": task_details}
+
+    def _hedging(self, target_mcp_server: str) -> dict:
+        policy = self.hedge_policies.get(target_mcp_server)
+        if policy is None:
+            return {}
+        return {
+            "hedge_delay": policy.delay(self.metrics, "mcp_solve", target_mcp_server),
+            "on_hedge": lambda: self.metrics.increment("hedges", target_mcp_server, "sent"),
+        }
+
+    def perform_task(self, task_details: dict, deadline: Deadline | None = None) -> dict:
+        # deadline bounds the pool checkout and the MCP call; when it passes, the task
+        # fails (and can still be escalated) instead of waiting on the server.
+        failure = self._access_failure(task_details)
+        if failure is not None:
+            return failure
+
+        target_mcp_server = task_details.get('mcp_server')
+        logger.debug("%s: Attempting to solve with %s", self.agent_name, target_mcp_server)
+        cache_key, server_response = self.result_caches.lookup(target_mcp_server, task_details.get('data'))
+        if server_response is MISS:
+            start = self.metrics.clock()
+            try:
+                server_response = call_server(
+                    self.server_pool(target_mcp_server),
+                    lambda server_instance: server_instance.solve(task_details.get('data')),
+                    deadline,
+                    **self._hedging(target_mcp_server),
+                )
+            except ServerPoolError as error:
+                return self._session_failure(task_details, error)
+            except DeadlineExceeded:
+                return self._deadline_failure(task_details)
+            self._record_call("mcp_solve", target_mcp_server, start, server_response)
+            self.result_caches.store(target_mcp_server, cache_key, server_response)
+        return self._task_result(task_details, server_response)
+
+    async def perform_task_async(self, task_details: dict, deadline: Deadline | None = None) -> dict:
+        failure = self._access_failure(task_details)
+        if failure is not None:
+            return failure
+
+        target_mcp_server = task_details.get('mcp_server')
+        logger.debug("%s: Attempting to solve with %s", self.agent_name, target_mcp_server)
+        cache_key, server_response = self.result_caches.lookup(target_mcp_server, task_details.get('data'))
+        if server_response is MISS:
+            start = self.metrics.clock()
+            try:
+                server_response = await call_server_async(
+                    self.server_pool(target_mcp_server),
+                    lambda server_instance: server_instance.solve_async(task_details.get('data')),
+                    deadline,
+                    **self._hedging(target_mcp_server),
+                )
+            except ServerPoolError as error:
+                return self._session_failure(task_details, error)
+            except DeadlineExceeded:
+                return self._deadline_failure(task_details)
+            self._record_call("mcp_solve", target_mcp_server, start, server_response)
+            self.result_caches.store(target_mcp_server, cache_key, server_response)
+        return self._task_result(task_details, server_response)
+
+    def perform_tasks(self, tasks: list[dict], deadline: Deadline | None = None) -> list[dict]:
+        # Batched perform_task: tasks targeting the same MCP server share one pooled
+        # session and a single solve_many round trip, bounded by the deadline like a
+        # single call. Results keep the input order.
+        results: list[dict | None] = [None] * len(tasks)
+        batches: dict = {}
+        for index, task_details in enumerate(tasks):
+            failure = self._access_failure(task_details)
+            if failure is not None:
+                results[index] = failure
+            else:
+                batches.setdefault(task_details.get('mcp_server'), []).append(index)
+
+        for target_mcp_server, indexes in batches.items():
+            # Serve what we can from the cache; only the misses go to the server
+            misses = []
+            cache_keys = {}
+            for index in indexes:
+                cache_key, server_response = self.result_caches.lookup(target_mcp_server, tasks[index].get('data'))
+                if server_response is MISS:
+                    misses.append(index)
+                    cache_keys[index] = cache_key
+                else:
+                    results[index] = self._task_result(tasks[index], server_response)
+            if not misses:
+                continue
+
+            logger.debug("%s: Attempting to solve %d tasks with %s", self.agent_name, len(misses), target_mcp_server)
+            datas = [tasks[index].get('data') for index in misses]
+            start = self.metrics.clock()
+            try:
+                # Item failures are counted per item below, not as a failed call
+                server_responses = call_server(
+                    self.server_pool(target_mcp_server),
+                    lambda server_instance: {"success": True, "results": server_instance.solve_many(datas)},
+                    deadline,
+                )["results"]
+            except ServerPoolError as error:
+                for index in misses:
+                    results[index] = self._session_failure(tasks[index], error)
+                continue
+            except DeadlineExceeded:
+                for index in misses:
+                    results[index] = self._deadline_failure(tasks[index])
+                continue
+            self.metrics.observe("mcp_solve_many", target_mcp_server, start)
+            for index, server_response in zip(misses, server_responses):
+                self.metrics.increment("mcp_calls", target_mcp_server, "success" if server_response.get("success") else "error")
+                self.result_caches.store(target_mcp_server, cache_keys[index], server_response)
+                results[index] = self._task_result(tasks[index], server_response)
+        return results
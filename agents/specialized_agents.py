@@ -1,60 +1,110 @@
+import functools
+from typing import Any, Callable
+
 from .specialized_agent_base import SpecializedAgentBase
+from .deadline import HedgePolicy
+from .metrics import MetricsRegistry
+from .result_cache import ResultCacheRegistry
+from .routing import PatternTable, import_object
+from .server_pool import ServerPoolRegistry
+from .transport import TransportRegistry
 from mcp_stubs.stub_servers import MCPStubServerA, MCPStubServerB, MCPStubServerC
 
 class SpecializedAgentA(SpecializedAgentBase):
-    def __init__(self, allowed_mcp_servers: list[str]):
-        super().__init__(agent_name="SpecializedAgentA", allowed_mcp_servers=allowed_mcp_servers)
-
-    def perform_task(self, task_details: dict) -> dict:
-        print(f"{self.agent_name}: Received task for {task_details.get('mcp_server')}")
-        target_mcp_server = task_details.get('mcp_server')
+    def __init__(
+        self,
+        allowed_mcp_servers: list[str],
+        server_pools: ServerPoolRegistry | None = None,
+        result_caches: ResultCacheRegistry | None = None,
+        metrics: MetricsRegistry | None = None,
+        hedge_policies: dict[str, HedgePolicy] | None = None,
+        transports: TransportRegistry | None = None,
+    ):
+        super().__init__(
+            agent_name="SpecializedAgentA",
+            allowed_mcp_servers=allowed_mcp_servers,
+            server_pools=server_pools,
+            result_caches=result_caches,
+            metrics=metrics,
+            hedge_policies=hedge_policies,
+            transports=transports,
+        )
 
-        if target_mcp_server not in self.allowed_mcp_servers:
-            print(f"{self.agent_name}: Access denied to {target_mcp_server}")
-            return {"solved": False, "error": f"{self.agent_name} cannot access {target_mcp_server}.", "partial_data": task_details}
-
-        print(f"{self.agent_name}: Attempting to solve with {target_mcp_server}")
+    def create_server(self, target_mcp_server: str, **server_options):
         if target_mcp_server == "MCPStubServerA":
-            server_instance = MCPStubServerA(target_mcp_server)
-        else:
-            # This case should ideally not be reached
-            print(f"{self.agent_name}: Incorrect server configuration for {target_mcp_server}")
-            return {"solved": False, "error": f"Incorrect server configuration for {self.agent_name}.", "partial_data": task_details}
-
-        server_response = server_instance.solve(task_details.get('data'))
-
-        if server_response.get("success"):
-            print(f"{self.agent_name}: Task solved successfully by {target_mcp_server}")
-            return {"solved": True, "result": server_response['data']}
-        else:
-            print(f"{self.agent_name}: MCP interaction failed for {target_mcp_server}")
-            return {"solved": False, "error": server_response.get('error'), "partial_data": task_details}
+            return self.transports.connect(target_mcp_server, functools.partial(MCPStubServerA, target_mcp_server), **server_options)
+        return None
 
 class SpecializedAgentB(SpecializedAgentBase):
-    def __init__(self, allowed_mcp_servers: list[str]):
-        super().__init__(agent_name="SpecializedAgentB", allowed_mcp_servers=allowed_mcp_servers)
+    def __init__(
+        self,
+        allowed_mcp_servers: list[str],
+        server_pools: ServerPoolRegistry | None = None,
+        result_caches: ResultCacheRegistry | None = None,
+        metrics: MetricsRegistry | None = None,
+        hedge_policies: dict[str, HedgePolicy] | None = None,
+        transports: TransportRegistry | None = None,
+    ):
+        super().__init__(
+            agent_name="SpecializedAgentB",
+            allowed_mcp_servers=allowed_mcp_servers,
+            server_pools=server_pools,
+            result_caches=result_caches,
+            metrics=metrics,
+            hedge_policies=hedge_policies,
+            transports=transports,
+        )
+
+    def create_server(self, target_mcp_server: str, **server_options):
+        if target_mcp_server == "MCPStubServerB":
+            return self.transports.connect(target_mcp_server, functools.partial(MCPStubServerB, target_mcp_server), **server_options)
+        return None
 
-    def perform_task(self, task_details: dict) -> dict:
-        print(f"{self.agent_name}: Received task for {task_details.get('mcp_server')}")
-        target_mcp_server = task_details.get('mcp_server')
+class ConfiguredAgent(SpecializedAgentBase):
+    # A specialized agent defined entirely by routing config, so new MCP targets need a
+    # config entry instead of a new class. server_factory ("module:attribute" or a
+    # callable taking the server name) serves every allowed server; server_factories
+    # maps server patterns to their own factories. server_options are passed to the
+    # factory as keyword arguments, e.g. {"latency": 0.01} for the stub servers.
+    def __init__(
+        self,
+        agent_name: str,
+        allowed_mcp_servers: list[str],
+        server_factory: str | Callable[..., Any] | None = None,
+        server_factories: dict[str, str | Callable[..., Any]] | None = None,
+        server_options: dict | None = None,
+        server_pools: ServerPoolRegistry | None = None,
+        result_caches: ResultCacheRegistry | None = None,
+        metrics: MetricsRegistry | None = None,
+        hedge_policies: dict[str, HedgePolicy] | None = None,
+        transports: TransportRegistry | None = None,
+    ):
+        super().__init__(
+            agent_name=agent_name,
+            allowed_mcp_servers=allowed_mcp_servers,
+            server_pools=server_pools,
+            result_caches=result_caches,
+            metrics=metrics,
+            hedge_policies=hedge_policies,
+            transports=transports,
+        )
+        self.server_options = server_options or {}
+        self._server_factories = PatternTable()
+        if server_factory is not None:
+            for pattern in allowed_mcp_servers:
+                self._server_factories[pattern] = self._factory(server_factory)
+        for pattern, factory in (server_factories or {}).items():
+            self._server_factories[pattern] = self._factory(factory)
 
-        if target_mcp_server not in self.allowed_mcp_servers:
-            print(f"{self.agent_name}: Access denied to {target_mcp_server}")
-            return {"solved": False, "error": f"{self.agent_name} cannot access {target_mcp_server}.", "partial_data": task_details}
+    @staticmethod
+    def _factory(factory):
+        return import_object(factory) if isinstance(factory, str) else factory
 
-        print(f"{self.agent_name}: Attempting to solve with {target_mcp_server}")
-        if target_mcp_server == "MCPStubServerB":
-            server_instance = MCPStubServerB(target_mcp_server)
-        else:
-            # This case should ideally not be reached
-            print(f"{self.agent_name}: Incorrect server configuration for {target_mcp_server}")
-            return {"solved": False, "error": f"Incorrect server configuration for {self.agent_name}.", "partial_data": task_details}
-
-        server_response = server_instance.solve(task_details.get('data'))
-
-        if server_response.get("success"):
-            print(f"{self.agent_name}: Task solved successfully by {target_mcp_server}")
-            return {"solved": True, "result": server_response['data']}
-        else:
-            print(f"{self.agent_name}: MCP interaction failed for {target_mcp_server}")
-            return {"solved": False, "error": server_response.get('error'), "partial_data": task_details}
+    def create_server(self, target_mcp_server: str, **server_options):
+        factory = self._server_factories.get(target_mcp_server)
+        if factory is None:
+            return None
+        # Replica settings override the agent-wide server_options
+        return self.transports.connect(
+            target_mcp_server, functools.partial(factory, target_mcp_server), **{**self.server_options, **server_options}
+        )
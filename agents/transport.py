@@ -0,0 +1,654 @@
+import abc
+import asyncio
+import collections
+import concurrent.futures
+import itertools
+import logging
+import os
+import queue
+import socket
+import subprocess
+import threading
+from typing import Any, AsyncIterator, Callable, Iterator
+
+from mcp_stubs.server import PROTOCOL_VERSION, server_command, server_env
+from .routing import PatternTable
+from .serialization import JSONCodec, get_codec
+from .server_pool import ServerPoolError
+
+logger = logging.getLogger(__name__)
+
+INITIALIZE_PARAMS = {
+    "protocolVersion": PROTOCOL_VERSION,
+    "capabilities": {},
+    "clientInfo": {"name": "trendagent", "version": "1"},
+}
+
+
+class MCPTransportError(ServerPoolError):
+    # The connection to an MCP server failed or the server answered with a JSON-RPC
+    # error. Raised inside a pooled session, so the pool discards that session.
+    pass
+
+
+def _tool_response(result: dict) -> dict:
+    response = result.get("structuredContent")
+    if response is None:
+        text = "".join(part.get("text", "") for part in result.get("content", []))
+        response = {"success": False, "error": text} if result.get("isError") else {"success": True, "data": text}
+    return response
+
+
+class MCPClient(abc.ABC):
+    # The stub servers' surface (see mcp_protocol) as MCP tools/call requests, on top of
+    # a subclass's call_tool and enrich_and_solve_stream. The async methods run the
+    # blocking ones on a thread unless a subclass can do better.
+    server_name: str
+
+    @abc.abstractmethod
+    def call_tool(self, name: str, arguments: dict) -> dict:
+        pass
+
+    @abc.abstractmethod
+    def enrich_and_solve_stream(self, partial_data: Any) -> Iterator[dict]:
+        pass
+
+    async def call_tool_async(self, name: str, arguments: dict) -> dict:
+        return await asyncio.to_thread(self.call_tool, name, arguments)
+
+    def solve(self, task_data: Any) -> dict:
+        return self.call_tool("solve", {"data": task_data})
+
+    def enrich_and_solve(self, partial_data: Any) -> dict:
+        return self.call_tool("enrich_and_solve", {"data": partial_data})
+
+    def solve_many(self, task_datas: list) -> list[dict]:
+        return self.call_tool("solve_many", {"datas": task_datas})["results"]
+
+    def enrich_and_solve_many(self, partial_datas: list) -> list[dict]:
+        return self.call_tool("enrich_and_solve_many", {"datas": partial_datas})["results"]
+
+    async def solve_async(self, task_data: Any) -> dict:
+        return await self.call_tool_async("solve", {"data": task_data})
+
+    async def enrich_and_solve_async(self, partial_data: Any) -> dict:
+        return await self.call_tool_async("enrich_and_solve", {"data": partial_data})
+
+    async def enrich_and_solve_stream_async(self, partial_data: Any) -> AsyncIterator[dict]:
+        events = self.enrich_and_solve_stream(partial_data)
+        done = object()
+        while True:
+            event = await asyncio.to_thread(next, events, done)
+            if event is done:
+                return
+            yield event
+
+
+class JSONRPCSession(MCPClient):
+    # Client side of one MCP session: JSON-RPC 2.0 messages, one per line, over a pair
+    # of binary streams (MCP's stdio framing, also used for Unix sockets). The session
+    # is initialized on creation and then sends one request at a time. Streamed
+    # enrichment arrives as progress notifications, one chunk per notification.
+    #
+    # One caller at a time, which the session pool guarantees; the async methods run the
+    # blocking calls on a thread. Any I/O or protocol failure raises MCPTransportError.
+    def __init__(self, server_name: str, reader, writer, codec: JSONCodec | str | None = None,
+                 on_close: Callable[[], None] | None = None):
+        self.server_name = server_name
+        self._reader = reader
+        self._writer = writer
+        self.codec = get_codec(codec)
+        self._on_close = on_close
+        self._ids = itertools.count(1)
+        self.closed = False
+        initialized = self._request("initialize", INITIALIZE_PARAMS)
+        self.server_info = initialized.get("serverInfo", {})
+        self._send({"jsonrpc": "2.0", "method": "notifications/initialized"})
+
+    def _send(self, message: dict):
+        try:
+            self._writer.write(self.codec.dumps(message) + b"\n")
+            self._writer.flush()
+        except (OSError, ValueError) as error:
+            raise MCPTransportError(f"Sending to {self.server_name} failed: {error}") from error
+
+    def _receive(self) -> dict:
+        try:
+            line = self._reader.readline()
+        except (OSError, ValueError) as error:
+            raise MCPTransportError(f"Reading from {self.server_name} failed: {error}") from error
+        if not line:
+            raise MCPTransportError(f"{self.server_name} closed the connection")
+        try:
+            return self.codec.loads(line)
+        except ValueError as error:
+            raise MCPTransportError(f"Malformed message from {self.server_name}: {error}") from error
+
+    def _exchange(self, method: str, params: dict) -> Iterator[dict]:
+        # Sends a request and yields the notifications that arrive before its result,
+        # then the result itself.
+        if self.closed:
+            raise MCPTransportError(f"Session with {self.server_name} is closed")
+        request_id = next(self._ids)
+        self._send({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+        while True:
+            message = self._receive()
+            if "id" not in message:
+                yield message
+                continue
+            if message["id"] != request_id:
+                raise MCPTransportError(f"{self.server_name} answered request {message['id']}, expected {request_id}")
+            if "error" in message:
+                raise MCPTransportError(f"{self.server_name}: {message['error'].get('message')}")
+            yield message["result"]
+            return
+
+    def _request(self, method: str, params: dict) -> dict:
+        for message in self._exchange(method, params):
+            if "method" not in message:
+                return message
+
+    def call_tool(self, name: str, arguments: dict) -> dict:
+        return _tool_response(self._request("tools/call", {"name": name, "arguments": arguments}))
+
+    def list_tools(self) -> list[dict]:
+        return self._request("tools/list", {})["tools"]
+
+    def enrich_and_solve_stream(self, partial_data: Any) -> Iterator[dict]:
+        params = {"name": "enrich_and_solve_stream", "arguments": {"data": partial_data}, "_meta": {"progressToken": 1}}
+        for message in self._exchange("tools/call", params):
+            if message.get("method") == "notifications/progress":
+                yield {"success": True, "chunk": message["params"]["message"]}
+            elif "method" not in message:
+                response = _tool_response(message)
+                if not response.get("success"):
+                    yield response
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        # on_close first: it wakes a thread still blocked in readline (an abandoned async
+        # call), which would otherwise hold the reader's lock until the server answered
+        if self._on_close is not None:
+            self._on_close()
+        for stream in (self._writer, self._reader):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+
+class MultiplexedConnection:
+    # One MCP connection shared by many callers. Every request gets its own id and up to
+    # `window` of them are outstanding at once; a reader thread matches the responses, in
+    # whatever order the server sends them, to their callers by id, and routes progress
+    # notifications by their progressToken (the request's id). Callers beyond the window
+    # wait for a slot, so a slow server pushes back on its clients instead of letting
+    # requests pile up in its socket buffer.
+    #
+    # request() and request_async() return a concurrent.futures.Future; when the
+    # connection breaks every outstanding request fails with MCPTransportError.
+    def __init__(self, server_name: str, reader, writer, window: int = 32, codec: JSONCodec | str | None = None,
+                 on_close: Callable[[], None] | None = None):
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.server_name = server_name
+        self.window = window
+        self.codec = get_codec(codec)
+        self._reader = reader
+        self._writer = writer
+        self._on_close = on_close
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        # request id -> (future, progress callback)
+        self._pending: dict[int, tuple[concurrent.futures.Future, Callable[[dict], None] | None]] = {}
+        self._waiters: collections.deque[concurrent.futures.Future] = collections.deque()
+        self._outstanding = 0
+        self._channels = 0
+        self._requests = 0
+        self._max_outstanding = 0
+        self._window_waits = 0
+        self.closed = False
+        self._reader_thread = threading.Thread(target=self._read_loop, name=f"mcp-{server_name}", daemon=True)
+        self._reader_thread.start()
+        try:
+            initialized = self.request("initialize", INITIALIZE_PARAMS).result()
+            self.server_info = initialized.get("serverInfo", {})
+            self._write({"jsonrpc": "2.0", "method": "notifications/initialized"})
+        except MCPTransportError:
+            self._shutdown()
+            raise
+
+    def _closed_error(self) -> MCPTransportError:
+        return MCPTransportError(f"Connection to {self.server_name} is closed")
+
+    def _slot(self) -> concurrent.futures.Future:
+        # Resolves once one of the window's slots is ours
+        slot = concurrent.futures.Future()
+        with self._lock:
+            if self.closed:
+                slot.set_exception(self._closed_error())
+            elif self._outstanding < self.window:
+                self._outstanding += 1
+                slot.set_result(None)
+            else:
+                self._waiters.append(slot)
+                self._window_waits += 1
+        return slot
+
+    def _release(self):
+        # Hands the slot to the next waiter still waiting for one (a cancelled async
+        # caller is skipped), or returns it to the window
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if waiter.set_running_or_notify_cancel():
+                    break
+            else:
+                self._outstanding -= 1
+                return
+        waiter.set_result(None)
+
+    def _write(self, message: dict):
+        data = self.codec.dumps(message) + b"\n"
+        try:
+            with self._write_lock:
+                self._writer.write(data)
+                self._writer.flush()
+        except (OSError, ValueError) as error:
+            failure = MCPTransportError(f"Sending to {self.server_name} failed: {error}")
+            self._fail(failure)
+            raise failure from error
+
+    def _send(self, method: str, params: dict, on_progress: Callable[[dict], None] | None) -> concurrent.futures.Future:
+        # Called holding a slot, which the response (or the connection failing) gives back
+        future = concurrent.futures.Future()
+        # Running futures cannot be cancelled: an abandoned request still gets its
+        # response, which frees its slot
+        future.set_running_or_notify_cancel()
+        with self._lock:
+            if self.closed:
+                future.set_exception(self._closed_error())
+                return future
+            request_id = next(self._ids)
+            self._pending[request_id] = (future, on_progress)
+            self._requests += 1
+            self._max_outstanding = max(self._max_outstanding, len(self._pending))
+        if on_progress is not None:
+            params = {**params, "_meta": {"progressToken": request_id}}
+        try:
+            self._write({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+        except MCPTransportError:
+            pass  # _fail has failed the future
+        return future
+
+    def request(self, method: str, params: dict,
+                on_progress: Callable[[dict], None] | None = None) -> concurrent.futures.Future:
+        # Blocks while the window is full; on_progress gets the params of each progress
+        # notification, on the reader thread
+        self._slot().result()
+        return self._send(method, params, on_progress)
+
+    async def request_async(self, method: str, params: dict,
+                            on_progress: Callable[[dict], None] | None = None) -> concurrent.futures.Future:
+        await asyncio.wrap_future(self._slot())
+        return self._send(method, params, on_progress)
+
+    def _read_loop(self):
+        error = MCPTransportError(f"{self.server_name} closed the connection")
+        try:
+            for line in iter(self._reader.readline, b""):
+                self._dispatch(self.codec.loads(line))
+        except (OSError, ValueError) as read_error:
+            error = MCPTransportError(f"Reading from {self.server_name} failed: {read_error}")
+        self._fail(error)
+        with self._write_lock:
+            for stream in (self._writer, self._reader):
+                try:
+                    stream.close()
+                except OSError:
+                    pass
+        self._stop()
+
+    def _dispatch(self, message: dict):
+        if "method" in message:
+            if message["method"] == "notifications/progress":
+                params = message.get("params") or {}
+                with self._lock:
+                    _, on_progress = self._pending.get(params.get("progressToken"), (None, None))
+                if on_progress is not None:
+                    on_progress(params)
+            return
+        with self._lock:
+            future, _ = self._pending.pop(message.get("id"), (None, None))
+        if future is None:
+            logger.debug("%s answered unknown request %r", self.server_name, message.get("id"))
+            return
+        self._release()
+        if "error" in message:
+            future.set_exception(MCPTransportError(f"{self.server_name}: {message['error'].get('message')}"))
+        else:
+            future.set_result(message.get("result") or {})
+
+    def _fail(self, error: MCPTransportError):
+        with self._lock:
+            self.closed = True
+            pending, self._pending = self._pending, {}
+            waiters, self._waiters = self._waiters, collections.deque()
+        for future, _ in pending.values():
+            future.set_exception(error)
+        for waiter in waiters:
+            if waiter.set_running_or_notify_cancel():
+                waiter.set_exception(error)
+
+    def attach(self) -> bool:
+        # Counts a channel on this connection; False once it is closed
+        with self._lock:
+            if self.closed:
+                return False
+            self._channels += 1
+            return True
+
+    def detach(self):
+        # The connection closes with its last channel
+        with self._lock:
+            self._channels -= 1
+            if self._channels > 0 or self.closed:
+                return
+            self.closed = True
+        self._shutdown()
+
+    def close(self):
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+        self._shutdown()
+
+    def _shutdown(self):
+        # on_close wakes the reader thread (which closes the streams) by shutting the
+        # socket down or stopping the server process
+        self._stop()
+        self._fail(self._closed_error())
+
+    def _stop(self):
+        # Runs on_close once, whether we close first or the reader sees the server go
+        with self._lock:
+            on_close, self._on_close = self._on_close, None
+        if on_close is not None:
+            on_close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "window": self.window,
+                "outstanding": len(self._pending),
+                "max_outstanding": self._max_outstanding,
+                "window_waits": self._window_waits,
+                "requests": self._requests,
+                "channels": self._channels,
+                "closed": self.closed,
+            }
+
+
+class MultiplexedChannel(MCPClient):
+    # A pooled session on a MultiplexedConnection. Channels are cheap, so the pool can
+    # hand out as many as it has callers while they all share one connection; closing a
+    # channel leaves the connection to the others. The async methods wait on the
+    # connection's futures directly, without a thread per call.
+    def __init__(self, connection: MultiplexedConnection):
+        self.connection = connection
+        self.server_name = connection.server_name
+        self.server_info = connection.server_info
+        self._closed = False
+
+    @property
+    def closed(self) -> bool:
+        return self._closed or self.connection.closed
+
+    def _params(self, name: str, arguments: dict) -> dict:
+        if self.closed:
+            raise MCPTransportError(f"Session with {self.server_name} is closed")
+        return {"name": name, "arguments": arguments}
+
+    def call_tool(self, name: str, arguments: dict) -> dict:
+        return _tool_response(self.connection.request("tools/call", self._params(name, arguments)).result())
+
+    async def call_tool_async(self, name: str, arguments: dict) -> dict:
+        future = await self.connection.request_async("tools/call", self._params(name, arguments))
+        return _tool_response(await asyncio.wrap_future(future))
+
+    def list_tools(self) -> list[dict]:
+        return self.connection.request("tools/list", {}).result()["tools"]
+
+    def enrich_and_solve_stream(self, partial_data: Any) -> Iterator[dict]:
+        events = queue.SimpleQueue()
+        params = self._params("enrich_and_solve_stream", {"data": partial_data})
+        future = self.connection.request("tools/call", params, lambda progress: events.put(progress["message"]))
+        # Progress and the result are dispatched in order by the reader thread, so
+        # every chunk is queued before the future resolves
+        future.add_done_callback(events.put)
+        while (event := events.get()) is not future:
+            yield {"success": True, "chunk": event}
+        response = _tool_response(future.result())
+        if not response.get("success"):
+            yield response
+
+    async def enrich_and_solve_stream_async(self, partial_data: Any) -> AsyncIterator[dict]:
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+
+        def put(event):
+            try:
+                loop.call_soon_threadsafe(events.put_nowait, event)
+            except RuntimeError:
+                pass  # the caller's loop is gone
+
+        params = self._params("enrich_and_solve_stream", {"data": partial_data})
+        future = await self.connection.request_async("tools/call", params, lambda progress: put(progress["message"]))
+        future.add_done_callback(put)
+        while (event := await events.get()) is not future:
+            yield {"success": True, "chunk": event}
+        response = _tool_response(future.result())
+        if not response.get("success"):
+            yield response
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self.connection.detach()
+
+
+class InProcessTransport:
+    # Calls the stub server object directly: no serialization, no I/O
+    name = "inprocess"
+
+    def connect(self, server_name: str, factory: Callable[..., Any], **server_options):
+        return factory(**server_options)
+
+
+class _StreamTransport(abc.ABC):
+    # A transport that speaks JSON-RPC over a byte stream, opened by the subclass's
+    # _open. By default every session opens its own connection and sends one request at
+    # a time. With multiplex=True the sessions of a server (per _key) are
+    # MultiplexedChannels on one shared connection, with up to `window` requests in
+    # flight; a broken connection is replaced by the next connect.
+    def __init__(self, codec: JSONCodec | str | None = None, multiplex: bool = False, window: int = 32):
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.codec = codec
+        self.multiplex = multiplex
+        self.window = window
+        self.connections_opened = 0
+        self._connections: dict[Any, MultiplexedConnection] = {}
+        self._lock = threading.Lock()
+
+    @abc.abstractmethod
+    def _open(self, server_name: str, **server_options):
+        # -> (reader, writer, close)
+        pass
+
+    @abc.abstractmethod
+    def _key(self, server_name: str, **server_options):
+        pass
+
+    def connect(self, server_name: str, factory: Callable[..., Any], **server_options):
+        if not self.multiplex:
+            reader, writer, close = self._open(server_name, **server_options)
+            self.connections_opened += 1
+            try:
+                return JSONRPCSession(server_name, reader, writer, self.codec, close)
+            except MCPTransportError:
+                close()
+                raise
+        key = self._key(server_name, **server_options)
+        with self._lock:
+            connection = self._connections.get(key)
+            if connection is None or not connection.attach():
+                reader, writer, close = self._open(server_name, **server_options)
+                self.connections_opened += 1
+                connection = MultiplexedConnection(server_name, reader, writer, self.window, self.codec, close)
+                connection.attach()
+                self._connections[key] = connection
+        return MultiplexedChannel(connection)
+
+    def stats(self) -> dict:
+        with self._lock:
+            connections = [connection.stats() for connection in self._connections.values() if not connection.closed]
+        return {"connections_opened": self.connections_opened, "multiplexed": connections}
+
+    def close(self):
+        # Closes the shared multiplexed connections; per-session connections close
+        # with their sessions
+        with self._lock:
+            connections, self._connections = list(self._connections.values()), {}
+        for connection in connections:
+            connection.close()
+
+
+class UnixSocketTransport(_StreamTransport):
+    # Connects to an MCP server listening on a Unix socket, e.g. a stub server started
+    # with `python -m mcp_stubs.server MCPStubServerA --socket PATH`. A replica's
+    # server_options may name its own `path`; other options belong to the server process.
+    name = "unix"
+
+    def __init__(self, path: str, connect_timeout: float = 5.0, codec: JSONCodec | str | None = None,
+                 multiplex: bool = False, window: int = 32):
+        super().__init__(codec, multiplex, window)
+        self.path = path
+        self.connect_timeout = connect_timeout
+
+    def _key(self, server_name: str, path: str | None = None, **server_options):
+        return path or self.path
+
+    def _open(self, server_name: str, path: str | None = None, **server_options):
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            connection.settimeout(self.connect_timeout)
+            connection.connect(path or self.path)
+            connection.settimeout(None)
+        except OSError as error:
+            connection.close()
+            raise MCPTransportError(f"Cannot connect to {server_name} at {path or self.path}: {error}") from error
+
+        def shutdown():
+            # Wakes a thread still blocked reading (an abandoned async call, or a
+            # multiplexed connection's reader)
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            connection.close()
+
+        return connection.makefile("rb"), connection.makefile("wb"), shutdown
+
+
+class StdioTransport(_StreamTransport):
+    # Starts an MCP server process per connection and talks to it over its stdin and
+    # stdout. By default the process is the stub server for `server_class` (default: the
+    # server's name), with server_options passed as command-line flags, e.g.
+    # {"latency": 0.01} -> --latency 0.01; a custom `command` gets no flags.
+    name = "stdio"
+
+    def __init__(
+        self,
+        command: list[str] | None = None,
+        server_class: str | None = None,
+        env: dict[str, str] | None = None,
+        codec: JSONCodec | str | None = None,
+        multiplex: bool = False,
+        window: int = 32,
+    ):
+        super().__init__(codec, multiplex, window)
+        self.command = command
+        self.server_class = server_class
+        self.env = env
+
+    def _command(self, server_name: str, **server_options) -> list[str]:
+        if self.command is not None:
+            return list(self.command)
+        return server_command(self.server_class or server_name, name=server_name, **server_options)
+
+    def _key(self, server_name: str, **server_options):
+        return tuple(self._command(server_name, **server_options))
+
+    def _open(self, server_name: str, **server_options):
+        command = self._command(server_name, **server_options)
+        if self.command is not None:
+            env = None if self.env is None else {**os.environ, **self.env}
+        else:
+            env = server_env(self.env)
+        try:
+            process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env)
+        except OSError as error:
+            raise MCPTransportError(f"Cannot start {server_name}: {error}") from error
+
+        def stop():
+            process.kill()
+            process.wait()
+
+        return process.stdout, process.stdin, stop
+
+
+TRANSPORTS = {"inprocess": InProcessTransport, "unix": UnixSocketTransport, "stdio": StdioTransport}
+
+
+class TransportRegistry:
+    # How each MCP server is reached, by server name or pattern (see routing.PatternTable),
+    # e.g. {"MCPStubServerA": {"transport": "unix", "path": "/run/mcp/a.sock"},
+    # "MCPStubServerC": {"transport": "stdio"}}; the remaining settings go to the
+    # transport class in TRANSPORTS, e.g. "multiplex": True, "window": 64 to share one
+    # connection per server. Servers not listed are called in-process.
+    def __init__(self, settings: dict[str, dict] | None = None):
+        self._default = InProcessTransport()
+        self._transports = PatternTable()
+        self._configured: dict[str, Any] = {}
+        for pattern, transport_settings in (settings or {}).items():
+            self.configure(pattern, **transport_settings)
+
+    def configure(self, pattern: str, transport: str = "inprocess", **settings):
+        try:
+            transport_class = TRANSPORTS[transport]
+        except KeyError:
+            raise ValueError(f"Unknown transport {transport!r}; expected one of {sorted(TRANSPORTS)}") from None
+        self._transports[pattern] = self._configured[pattern] = transport_class(**settings)
+
+    def get(self, server_name: str):
+        return self._transports.get(server_name, self._default)
+
+    def connect(self, server_name: str, factory: Callable[..., Any], **server_options):
+        # A new session with server_name; factory(**server_options) builds the in-process server
+        return self.get(server_name).connect(server_name, factory, **server_options)
+
+    def stats(self) -> dict:
+        # Connections opened per configured pattern, and the live multiplexed ones
+        return {pattern: transport.stats() for pattern, transport in self._configured.items()
+                if isinstance(transport, _StreamTransport)}
+
+    def close(self):
+        for transport in self._configured.values():
+            if isinstance(transport, _StreamTransport):
+                transport.close()
@@ -0,0 +1,139 @@
+"""Compares one in-process CentralAgent with a multi-process Cluster on the stub servers.
+
+Usage:
+    python -m benchmarks.bench_cluster
+    python -m benchmarks.bench_cluster --workers 4 --requests 20000 --concurrency 64 \\
+        --payload-bytes 8192 --distinct-keys 500 --output cluster.json
+
+Requests for MCPStubServerA carry a --payload-bytes payload drawn from --distinct-keys
+distinct values, and MCPStubServerA is result-cached, so repeated keys are served
+from cache. Validation, canonical cache keys and JSON encoding are CPU work that one
+interpreter cannot parallelize. "single" runs every request through one CentralAgent
+from --concurrency threads. "cluster" sends the same requests to a Cluster of
+--workers processes, where consistent hashing keeps each key on one worker and its
+cache. Reported per mode: throughput, p50/p99 latency, success rate and, for the
+cluster, each worker's share of the requests.
+"""
+import argparse
+import concurrent.futures
+import functools
+import json
+import sys
+import time
+
+from agents.central_agent import CentralAgent
+from agents.cluster import Cluster
+from benchmarks.bench_pipeline import percentile
+
+MODES = ("single", "cluster")
+
+
+def build_requests(requests: int, payload_bytes: int, distinct_keys: int) -> list[dict]:
+    filler = "x" * payload_bytes
+    return [
+        {"mcp_server": "MCPStubServerA", "data": {"key": index % distinct_keys, "payload": filler}}
+        for index in range(requests)
+    ]
+
+
+def agent_factory(latency: float):
+    return functools.partial(
+        CentralAgent,
+        result_cache_settings={"MCPStubServerA": {"ttl": 300, "max_entries": 100_000}},
+        routing_config={
+            "agents": {
+                "StubAgentA": {
+                    "server_factory": "mcp_stubs.stub_servers:MCPStubServerA",
+                    "mcp_servers": ["MCPStubServerA"],
+                    "target_mcp_routing": ["MCPStubServerA"],
+                    "server_options": {"latency": latency},
+                },
+            },
+        } if latency else None,
+    )
+
+
+def _timed(handle, client_request):
+    start = time.perf_counter()
+    response = handle(client_request)
+    return time.perf_counter() - start, response["success"]
+
+
+def bench_mode(mode: str, client_requests: list[dict], workers: int, concurrency: int, latency: float) -> dict:
+    factory = agent_factory(latency)
+    cluster = None
+    if mode == "cluster":
+        cluster = Cluster(workers=workers, agent_factory=factory, threads=max(1, concurrency // workers))
+    handle = cluster.handle_client_request if cluster is not None else factory().handle_client_request
+    try:
+        start = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(functools.partial(_timed, handle), client_requests))
+        elapsed = time.perf_counter() - start
+        stats = cluster.stats() if cluster is not None else None
+    finally:
+        if cluster is not None:
+            cluster.shutdown()
+
+    durations = sorted(duration for duration, _ in results)
+    result = {
+        "mode": mode,
+        "throughput_rps": round(len(client_requests) / elapsed, 1),
+        "p50_ms": round(percentile(durations, 0.5) * 1000, 3),
+        "p99_ms": round(percentile(durations, 0.99) * 1000, 3),
+        "success_rate": round(sum(1 for _, success in results if success) / len(client_requests), 4),
+    }
+    if stats is not None:
+        submitted = [worker["submitted"] for worker in stats["workers"]]
+        result["worker_share"] = [round(count / max(1, sum(submitted)), 3) for count in submitted]
+    return result
+
+
+def run(modes: list[str], workers: int = 4, requests: int = 5000, concurrency: int = 32, payload_bytes: int = 4096,
+        distinct_keys: int = 500, latency: float = 0.0) -> dict:
+    client_requests = build_requests(requests, payload_bytes, distinct_keys)
+    return {
+        "workers": workers,
+        "requests": requests,
+        "concurrency": concurrency,
+        "payload_bytes": payload_bytes,
+        "distinct_keys": distinct_keys,
+        "results": [bench_mode(mode, client_requests, workers, concurrency, latency) for mode in modes],
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", action="append", choices=MODES, help="Mode to run (repeatable; default both)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--payload-bytes", type=int, default=4096)
+    parser.add_argument("--distinct-keys", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.0, help="MCPStubServerA latency in seconds")
+    parser.add_argument("--output", help="Write JSON results to this file (default: stdout)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    results = run(
+        args.mode or list(MODES),
+        workers=args.workers,
+        requests=args.requests,
+        concurrency=args.concurrency,
+        payload_bytes=args.payload_bytes,
+        distinct_keys=args.distinct_keys,
+        latency=args.latency,
+    )
+    encoded = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(encoded + "\n")
+    else:
+        print(encoded)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""Compares one call per MCP session with many calls multiplexed over one session.
+
+Usage:
+    python -m benchmarks.bench_multiplex
+    python -m benchmarks.bench_multiplex --requests 5000 --concurrency 64 --latency 0.005 \\
+        --connections 4 --connections 64 --window 16 --window 64 --output multiplex.json
+
+One stub server process (python -m mcp_stubs.server MCPStubServerA) listens on a
+Unix socket with --latency per call and enough workers to serve every request at
+once, so the backend is saturated only if the client keeps enough calls in flight.
+--concurrency threads send unique requests through CentralAgent.handle_client_request.
+
+- "per-session": the default unix transport, one request at a time per connection,
+  with the session pool capped at N connections (one run per --connections value).
+- "multiplexed": multiplex=True, so every pooled session is a channel on a single
+  connection with up to W requests in flight (one run per --window value).
+
+Reported per run: throughput, p50/p99 latency, success rate, failed MCP calls (which
+are escalated), connections opened and the most requests that were in flight on one
+multiplexed connection.
+"""
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+import tempfile
+import time
+
+from agents.central_agent import CentralAgent
+from benchmarks.bench_pipeline import percentile
+from benchmarks.bench_transport import build_requests
+from mcp_stubs.server import start_server_process
+
+
+def build_agent(path: str, multiplex: bool, window: int, pool_size: int) -> CentralAgent:
+    central_agent = CentralAgent(
+        coalesce_requests=False,
+        transports={"MCPStubServerA": {"transport": "unix", "path": path, "multiplex": multiplex, "window": window}},
+    )
+    # Each in-flight call holds a pooled session: a connection, or a channel when
+    # multiplexed. Callers queue for one rather than time out and escalate in-process.
+    central_agent.server_pools.configure("MCPStubServerA", max_size=pool_size, acquire_timeout=60.0)
+    return central_agent
+
+
+def _timed(central_agent: CentralAgent, client_request: dict):
+    start = time.perf_counter()
+    response = central_agent.handle_client_request(client_request)
+    return time.perf_counter() - start, response["success"]
+
+
+def bench_mode(path: str, mode: str, limit: int, client_requests: list[dict], concurrency: int) -> dict:
+    if mode == "multiplexed":
+        central_agent = build_agent(path, multiplex=True, window=limit, pool_size=concurrency)
+    else:
+        central_agent = build_agent(path, multiplex=False, window=1, pool_size=limit)
+    try:
+        # Opens the pooled sessions before timing
+        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(lambda r: _timed(central_agent, r), client_requests[:concurrency * 2]))
+        start = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(lambda r: _timed(central_agent, r), client_requests))
+        elapsed = time.perf_counter() - start
+        stats = central_agent.transports.stats()["MCPStubServerA"]
+        counters = central_agent.metrics.snapshot()["counters"].get("mcp_calls", {}).get("MCPStubServerA", {})
+    finally:
+        central_agent.close()
+
+    durations = sorted(duration for duration, _ in results)
+    return {
+        "mode": mode,
+        "connections" if mode == "per-session" else "window": limit,
+        "throughput_rps": round(len(client_requests) / elapsed, 1),
+        "p50_ms": round(percentile(durations, 0.5) * 1000, 3),
+        "p99_ms": round(percentile(durations, 0.99) * 1000, 3),
+        "success_rate": round(sum(1 for _, success in results if success) / len(client_requests), 4),
+        "failed_mcp_calls": sum(count for outcome, count in counters.items() if outcome != "success"),
+        "connections_opened": stats["connections_opened"],
+        "max_in_flight": max((connection["max_outstanding"] for connection in stats["multiplexed"]), default=1),
+    }
+
+
+def run(requests: int = 2000, concurrency: int = 64, latency: float = 0.005, connections: list[int] = (1, 8, 64),
+        windows: list[int] = (8, 64), payload_bytes: int = 0, request_bytes: int = 64) -> dict:
+    client_requests = build_requests(requests, request_bytes)
+    runs = [("per-session", limit) for limit in connections] + [("multiplexed", limit) for limit in windows]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "mcp.sock")
+        process = start_server_process("MCPStubServerA", path, latency=latency, payload_bytes=payload_bytes,
+                                       workers=max(concurrency, 8))
+        try:
+            results = [bench_mode(path, mode, limit, client_requests, concurrency) for mode, limit in runs]
+        finally:
+            process.terminate()
+            process.wait()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "latency": latency,
+        "payload_bytes": payload_bytes,
+        "request_bytes": request_bytes,
+        "results": results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.005, help="Stub server latency in seconds")
+    parser.add_argument("--connections", type=int, action="append",
+                        help="Pool size for a per-session run (repeatable; default 1, 8 and 64)")
+    parser.add_argument("--window", type=int, action="append",
+                        help="Window for a multiplexed run (repeatable; default 8 and 64)")
+    parser.add_argument("--payload-bytes", type=int, default=0, help="Size of each successful answer")
+    parser.add_argument("--request-bytes", type=int, default=64, help="Size of each request payload")
+    parser.add_argument("--output", help="Write JSON results to this file (default: stdout)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    results = run(
+        requests=args.requests,
+        concurrency=args.concurrency,
+        latency=args.latency,
+        connections=args.connections or [1, 8, 64],
+        windows=args.window or [8, 64],
+        payload_bytes=args.payload_bytes,
+        request_bytes=args.request_bytes,
+    )
+    encoded = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(encoded + "\n")
+    else:
+        print(encoded)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+"""Throughput/latency benchmark for CentralAgent -> SpecializedAgent -> AgentSquad.
+
+Usage:
+    python -m benchmarks.bench_pipeline --output bench.json
+    python -m benchmarks.bench_pipeline --workload escalation_heavy --requests 5000 --baseline bench.json
+    python -m benchmarks.bench_pipeline --success 0.5 --escalation 0.3 --unroutable 0.2 \\
+        --payload-bytes 4096 --latency-a exp:0.002 --latency-c uniform:0.005,0.02 --concurrency 32
+
+Exits with status 1 when --baseline is given and any workload regressed by more
+than --tolerance (relative drop in throughput or rise in p50/p99 latency).
+"""
+import argparse
+import concurrent.futures
+import json
+import math
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+
+from agents.central_agent import CentralAgent
+from mcp_stubs.stub_servers import MCPStubServerA, MCPStubServerB, MCPStubServerC
+
+
+@dataclass
+class Workload:
+    name: str
+    requests: int = 2000
+    success: float = 1.0  # routed to A/B and solved there
+    escalation: float = 0.0  # routed to A/B, fails, escalated to the squad
+    unroutable: float = 0.0  # no specialized agent, straight to the squad
+    payload_bytes: int = 64
+    latency_a: str = "none"
+    latency_b: str = "none"
+    latency_c: str = "none"
+    concurrency: int = 1
+    seed: int = 1234
+    extra: dict = field(default_factory=dict)
+
+
+WORKLOADS = {
+    "success_only": Workload("success_only"),
+    "mixed": Workload("mixed", success=0.7, escalation=0.2, unroutable=0.1),
+    "escalation_heavy": Workload("escalation_heavy", success=0.1, escalation=0.8, unroutable=0.1),
+    "large_payloads": Workload("large_payloads", requests=500, success=0.8, escalation=0.2, payload_bytes=64 * 1024),
+    "slow_backends": Workload(
+        "slow_backends", requests=400, success=0.7, escalation=0.2, unroutable=0.1,
+        latency_a="exp:0.001", latency_b="uniform:0.0005,0.002", latency_c="lognormal:-6.5,0.5", concurrency=32,
+    ),
+}
+
+
+def latency_sampler(spec: str, rng: random.Random):
+    # "none" | "fixed:S" | "exp:MEAN" | "uniform:LOW,HIGH" | "lognormal:MU,SIGMA" (seconds)
+    kind, _, args = spec.partition(":")
+    values = [float(value) for value in args.split(",")] if args else []
+    if kind == "none":
+        return 0.0
+    if kind == "fixed":
+        return values[0]
+    if kind == "exp":
+        mean = values[0]
+        return lambda: rng.expovariate(1.0 / mean)
+    if kind == "uniform":
+        low, high = values
+        return lambda: rng.uniform(low, high)
+    if kind == "lognormal":
+        mu, sigma = values
+        return lambda: rng.lognormvariate(mu, sigma)
+    raise ValueError(f"Unknown latency distribution: {spec!r}")
+
+
+def build_agent(workload: Workload) -> CentralAgent:
+    rng = random.Random(workload.seed + 1)
+    latency_a = latency_sampler(workload.latency_a, rng)
+    latency_b = latency_sampler(workload.latency_b, rng)
+    latency_c = latency_sampler(workload.latency_c, rng)
+    central_agent = CentralAgent()
+    central_agent.specialized_agent_a_instance.create_server = lambda target: MCPStubServerA(target, latency=latency_a)
+    central_agent.specialized_agent_b_instance.create_server = lambda target: MCPStubServerB(target, latency=latency_b)
+    central_agent.agent_squad.create_server = lambda: MCPStubServerC("MCPStubServerC", latency=latency_c)
+    return central_agent
+
+
+def build_requests(workload: Workload) -> list[dict]:
+    total = workload.success + workload.escalation + workload.unroutable
+    if total <= 0:
+        raise ValueError("Workload mix must have a positive total")
+    rng = random.Random(workload.seed)
+    padding = "x" * workload.payload_bytes
+    client_requests = []
+    for index in range(workload.requests):
+        # Every payload is unique, so neither request coalescing nor caching kicks in
+        draw = rng.random() * total
+        mcp_server = "MCPStubServerA" if index % 2 == 0 else "MCPStubServerB"
+        if draw < workload.success:
+            data = {"id": index, "payload": padding}
+        elif draw < workload.success + workload.escalation:
+            data = {"id": index, "payload": padding, "error": True}
+        else:
+            mcp_server = "MCPStubServerUnknown"
+            data = {"id": index, "payload": padding}
+        client_requests.append({"mcp_server": mcp_server, "data": data})
+    return client_requests
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+
+def _timed_call(central_agent: CentralAgent, client_request: dict) -> tuple[int, bool]:
+    start = time.perf_counter_ns()
+    response = central_agent.handle_client_request(client_request)
+    return time.perf_counter_ns() - start, response["success"]
+
+
+def measure_memory(central_agent: CentralAgent, client_requests: list[dict]) -> dict:
+    # Separate pass because tracemalloc slows everything down: peak traced memory
+    # while serving one request, and blocks still allocated per request afterwards.
+    peaks = []
+    tracemalloc.start()
+    try:
+        blocks_before = sys.getallocatedblocks()
+        for client_request in client_requests:
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            central_agent.handle_client_request(client_request)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - baseline)
+        retained_blocks = sys.getallocatedblocks() - blocks_before
+    finally:
+        tracemalloc.stop()
+    return {
+        "peak_bytes_per_request_p50": statistics.median(peaks) if peaks else 0,
+        "peak_bytes_per_request_max": max(peaks, default=0),
+        "retained_blocks_per_request": retained_blocks / max(len(client_requests), 1),
+    }
+
+
+def run_workload(workload: Workload, warmup: int = 100, memory_sample: int = 200) -> dict:
+    central_agent = build_agent(workload)
+    client_requests = build_requests(workload)
+    for client_request in client_requests[:warmup]:
+        central_agent.handle_client_request(client_request)
+
+    start = time.perf_counter()
+    if workload.concurrency <= 1:
+        outcomes = [_timed_call(central_agent, client_request) for client_request in client_requests]
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workload.concurrency) as executor:
+            outcomes = list(executor.map(lambda r: _timed_call(central_agent, r), client_requests))
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = sorted(duration / 1e6 for duration, _ in outcomes)
+    results = {
+        "workload": asdict(workload),
+        "requests": len(outcomes),
+        "succeeded": sum(1 for _, success in outcomes if success),
+        "elapsed_s": elapsed,
+        "throughput_rps": len(outcomes) / elapsed if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "mean": statistics.fmean(latencies_ms) if latencies_ms else 0.0,
+            "p50": percentile(latencies_ms, 0.50),
+            "p90": percentile(latencies_ms, 0.90),
+            "p99": percentile(latencies_ms, 0.99),
+            "max": latencies_ms[-1] if latencies_ms else 0.0,
+        },
+    }
+    if memory_sample:
+        results["memory"] = measure_memory(central_agent, client_requests[:memory_sample])
+    return results
+
+
+def compare_to_baseline(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    # Returns human-readable regressions; workloads missing from either side are skipped.
+    regressions = []
+    for name, result in current["workloads"].items():
+        previous = baseline.get("workloads", {}).get(name)
+        if previous is None:
+            continue
+        if result["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {result['throughput_rps']:.1f} rps < baseline {previous['throughput_rps']:.1f} rps"
+            )
+        for metric in ("p50", "p99"):
+            now, before = result["latency_ms"][metric], previous["latency_ms"][metric]
+            if now > before * (1 + tolerance):
+                regressions.append(f"{name}: {metric} {now:.3f} ms > baseline {before:.3f} ms")
+    return regressions
+
+
+def run(workloads: list[Workload], warmup: int = 100, memory_sample: int = 200) -> dict:
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "workloads": {workload.name: run_workload(workload, warmup, memory_sample) for workload in workloads},
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workload", action="append", choices=sorted(WORKLOADS),
+                        help="Named workload to run (repeatable); defaults to all presets")
+    parser.add_argument("--requests", type=int, help="Override the number of requests per workload")
+    parser.add_argument("--success", type=float, help="Custom workload: fraction of requests solved by A/B")
+    parser.add_argument("--escalation", type=float, default=0.0, help="Custom workload: fraction escalated after failing")
+    parser.add_argument("--unroutable", type=float, default=0.0, help="Custom workload: fraction with no specialized agent")
+    parser.add_argument("--payload-bytes", type=int, default=64)
+    parser.add_argument("--latency-a", default="none")
+    parser.add_argument("--latency-b", default="none")
+    parser.add_argument("--latency-c", default="none")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--memory-sample", type=int, default=200, help="Requests traced for memory (0 disables)")
+    parser.add_argument("--output", help="Write JSON results to this file (default: stdout)")
+    parser.add_argument("--baseline", help="Compare against a previously written JSON result")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative regression (default 0.10)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.success is not None:
+        workloads = [Workload(
+            "custom", requests=args.requests or 2000, success=args.success, escalation=args.escalation,
+            unroutable=args.unroutable, payload_bytes=args.payload_bytes, latency_a=args.latency_a,
+            latency_b=args.latency_b, latency_c=args.latency_c, concurrency=args.concurrency,
+        )]
+    else:
+        workloads = [WORKLOADS[name] for name in (args.workload or sorted(WORKLOADS))]
+        if args.requests:
+            workloads = [Workload(**{**asdict(workload), "requests": args.requests}) for workload in workloads]
+
+    results = run(workloads, warmup=args.warmup, memory_sample=args.memory_sample)
+    encoded = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(encoded + "\n")
+    else:
+        print(encoded)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare_to_baseline(results, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""Compares ReplicaSet balancing strategies on replicas of MCPStubServerA with uneven latency.
+
+Usage:
+    python -m benchmarks.bench_replicas
+    python -m benchmarks.bench_replicas --replica-latency 0.001 --replica-latency 0.001 --replica-latency 0.02 \\
+        --requests 2000 --concurrency 16 --output replicas.json
+    python -m benchmarks.bench_replicas --failure-rate 0,0,0.5 --strategy p2c --strategy ewma
+
+Every request goes through CentralAgent.handle_client_request with a unique payload
+(no coalescing or caching), from --concurrency threads. Reported per strategy:
+throughput, p50/p99 latency, success rate, the share of calls each replica served and
+the number of failed MCP calls (those requests were escalated to AgentSquad).
+"""
+import argparse
+import concurrent.futures
+import json
+import random
+import sys
+import time
+
+from agents.central_agent import CentralAgent
+from agents.replicas import STRATEGIES
+from benchmarks.bench_pipeline import percentile
+
+DEFAULT_LATENCIES = [0.001, 0.002, 0.02]
+
+
+def build_agent(strategy: str, latencies: list[float], failure_rates: list[float], seed: int) -> CentralAgent:
+    replicas = [
+        {"latency": latency, "failure_rate": failure_rate} for latency, failure_rate in zip(latencies, failure_rates)
+    ]
+    central_agent = CentralAgent(
+        coalesce_requests=False,
+        replica_settings={
+            "MCPStubServerA": {
+                "replicas": replicas,
+                "strategy": strategy,
+                "max_failures": 3,
+                "ejection_duration": 0.5,
+                "rng": random.Random(seed),
+            }
+        },
+    )
+    # Replica failures are the balancer's business here, not the breaker's
+    central_agent.circuit_breakers.disable("MCPStubServerA")
+    return central_agent
+
+
+def bench_strategy(strategy: str, latencies: list[float], failure_rates: list[float], requests: int,
+                   concurrency: int, seed: int) -> dict:
+    central_agent = build_agent(strategy, latencies, failure_rates, seed)
+    client_requests = [{"mcp_server": "MCPStubServerA", "data": {"id": index}} for index in range(requests)]
+
+    def timed(client_request):
+        start = time.perf_counter()
+        response = central_agent.handle_client_request(client_request)
+        return time.perf_counter() - start, response["success"]
+
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed, client_requests))
+    elapsed = time.perf_counter() - start
+
+    durations = sorted(duration for duration, _ in results)
+    replica_set = central_agent.server_pools.get("MCPStubServerA")
+    replicas = replica_set.stats()["replicas"]
+    calls = [replica["calls"] for replica in replicas]
+    return {
+        "strategy": strategy,
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(durations, 0.5) * 1000, 3),
+        "p99_ms": round(percentile(durations, 0.99) * 1000, 3),
+        "success_rate": round(sum(1 for _, success in results if success) / requests, 4),
+        "replica_share": [round(count / max(1, sum(calls)), 3) for count in calls],
+        "replica_failures": sum(replica["failures"] for replica in replicas),
+    }
+
+
+def run(strategies: list[str], latencies: list[float], failure_rates: list[float] | None = None,
+        requests: int = 1000, concurrency: int = 16, seed: int = 1234) -> dict:
+    failure_rates = failure_rates or [0.0] * len(latencies)
+    if len(failure_rates) != len(latencies):
+        raise ValueError("Give one failure rate per replica")
+    return {
+        "replica_latencies": latencies,
+        "replica_failure_rates": failure_rates,
+        "requests": requests,
+        "concurrency": concurrency,
+        "results": [
+            bench_strategy(strategy, latencies, failure_rates, requests, concurrency, seed) for strategy in strategies
+        ],
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--strategy", action="append", choices=STRATEGIES, help="Strategy to run (repeatable)")
+    parser.add_argument("--replica-latency", action="append", type=float,
+                        help=f"Latency of one replica in seconds (repeatable; default {DEFAULT_LATENCIES})")
+    parser.add_argument("--failure-rate", help="Comma-separated failure rate per replica (default: all 0)")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="Write JSON results to this file (default: stdout)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    failure_rates = [float(rate) for rate in args.failure_rate.split(",")] if args.failure_rate else None
+    results = run(
+        args.strategy or list(STRATEGIES),
+        args.replica_latency or DEFAULT_LATENCIES,
+        failure_rates,
+        requests=args.requests,
+        concurrency=args.concurrency,
+        seed=args.seed,
+    )
+    encoded = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(encoded + "\n")
+    else:
+        print(encoded)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
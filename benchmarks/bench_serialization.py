@@ -0,0 +1,112 @@
+"""Micro-benchmark of the JSON request/response path against plain stdlib json.
+
+Usage:
+    python -m benchmarks.bench_serialization
+    python -m benchmarks.bench_serialization --iterations 20000 --output serialization.json
+
+For each payload it times:
+  decode   json.loads + RequestValidator.validate  vs  RequestValidator.validate_json (bytes)
+  encode   json.dumps(...).encode()  vs  every available JSONCodec
+  cached   handle_client_request + json.dumps  vs  handle_request_bytes on a result-cache hit
+"""
+import argparse
+import json
+import sys
+import time
+
+from agents.central_agent import CentralAgent
+from agents.request_validation import RequestValidator
+from agents.serialization import CODECS, StdlibJSONCodec, get_codec
+
+PAYLOADS = {
+    "small": {"info": "task for A", "id": 7},
+    "4kb": {"id": 1, "text": "x" * 4000},
+    "nested": {"id": 2, "items": [{"name": f"item-{i}", "score": i / 3, "tags": ["a", "b", "c"]} for i in range(100)]},
+}
+
+
+def _per_call_us(function, iterations: int) -> float:
+    for _ in range(min(iterations, 1000)):
+        function()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def _codecs() -> list:
+    codecs = []
+    for name in sorted(CODECS):
+        try:
+            codecs.append(get_codec(name))
+        except ImportError:
+            continue
+    return codecs
+
+
+def bench_payload(name: str, data, iterations: int) -> dict:
+    client_request = {"mcp_server": "MCPStubServerA", "data": data}
+    body = json.dumps(client_request).encode()
+    validator = RequestValidator()
+    results = {
+        "payload": name,
+        "request_bytes": len(body),
+        "decode_us": {
+            "stdlib": _per_call_us(lambda: validator.validate(json.loads(body)), iterations),
+            "validate_json": _per_call_us(lambda: validator.validate_json(body), iterations),
+        },
+    }
+
+    response = {"success": True, "data": f"Processed data from MCPStubServerA: {data}"}
+    encode = {"stdlib": _per_call_us(lambda: json.dumps(response).encode(), iterations)}
+    for codec in _codecs():
+        encode[codec.name] = _per_call_us(lambda codec=codec: codec.dumps(response), iterations)
+    results["encode_us"] = encode
+
+    central_agent = CentralAgent(result_cache_settings={"MCPStubServerA": {}}, json_codec=StdlibJSONCodec())
+    fast_agent = CentralAgent(result_cache_settings={"MCPStubServerA": {}})
+    central_agent.handle_client_request(client_request)
+    fast_agent.handle_request_bytes(body)
+    results["cached_us"] = {
+        "stdlib": _per_call_us(
+            lambda: json.dumps(central_agent.handle_client_request(json.loads(body))).encode(), iterations
+        ),
+        "handle_request_bytes": _per_call_us(lambda: fast_agent.handle_request_bytes(body), iterations),
+    }
+    for section in ("decode_us", "encode_us", "cached_us"):
+        timings = results[section]
+        best = min(value for key, value in timings.items() if key != "stdlib")
+        results[section.replace("_us", "_speedup")] = round(timings["stdlib"] / best, 2)
+    return results
+
+
+def run(iterations: int, payloads: list[str]) -> dict:
+    return {
+        "default_codec": get_codec().name,
+        "iterations": iterations,
+        "results": [bench_payload(name, PAYLOADS[name], iterations) for name in payloads],
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--payload", action="append", choices=sorted(PAYLOADS), help="Payload to run (repeatable)")
+    parser.add_argument("--output", help="Write JSON results to this file (default: stdout)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    results = run(args.iterations, args.payload or list(PAYLOADS))
+    encoded = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(encoded + "\n")
+    else:
+        print(encoded)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
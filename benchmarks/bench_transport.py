@@ -0,0 +1,146 @@
+"""Compares the MCP transports (in-process, Unix socket, stdio) on MCPStubServerA.
+
+Usage:
+    python -m benchmarks.bench_transport
+    python -m benchmarks.bench_transport --transport unix --transport stdio --requests 5000 \\
+        --concurrency 16 --latency 0.001 --error-rate 0.05 --payload-bytes 16384 --output transport.json
+
+Every request goes through CentralAgent.handle_client_request with a unique payload
+(no coalescing or caching), from --concurrency threads. "inprocess" calls the stub
+object directly; "unix" and "stdio" run the stub as a separate process (python -m
+mcp_stubs.server) and speak JSON-RPC to it, so serialization, framing and the
+round trip are part of every call. Failed calls are escalated to AgentSquad
+in-process. Reported per transport: throughput, p50/p99 latency, success rate and
+the number of failed MCP calls.
+"""
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+import tempfile
+import time
+
+from agents.central_agent import CentralAgent
+from agents.transport import TRANSPORTS
+from benchmarks.bench_pipeline import percentile
+from mcp_stubs.server import start_server_process
+
+
+def build_requests(requests: int, request_bytes: int) -> list[dict]:
+    filler = "x" * request_bytes
+    return [{"mcp_server": "MCPStubServerA", "data": {"id": index, "payload": filler}} for index in range(requests)]
+
+
+def build_agent(transport: str, server_options: dict, path: str | None) -> CentralAgent:
+    transports = {
+        "inprocess": None,
+        "unix": {"MCPStubServerA": {"transport": "unix", "path": path}},
+        "stdio": {"MCPStubServerA": {"transport": "stdio"}},
+    }[transport]
+    return CentralAgent(
+        coalesce_requests=False,
+        transports=transports,
+        routing_config={
+            "agents": {
+                "StubAgentA": {
+                    "server_factory": "mcp_stubs.stub_servers:MCPStubServerA",
+                    "mcp_servers": ["MCPStubServerA"],
+                    "target_mcp_routing": ["MCPStubServerA"],
+                    # In-process and stdio servers take these directly; the unix one is started with them
+                    "server_options": server_options,
+                },
+            },
+        },
+    )
+
+
+def _timed(central_agent: CentralAgent, client_request: dict):
+    start = time.perf_counter()
+    response = central_agent.handle_client_request(client_request)
+    return time.perf_counter() - start, response["success"]
+
+
+def bench_transport(transport: str, client_requests: list[dict], concurrency: int, server_options: dict) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        process = None
+        path = None
+        if transport == "unix":
+            path = os.path.join(directory, "mcp.sock")
+            process = start_server_process("MCPStubServerA", path, **server_options)
+        central_agent = build_agent(transport, server_options, path)
+        try:
+            # Opens the pooled sessions (and stdio processes) before timing
+            with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+                list(executor.map(lambda r: _timed(central_agent, r), client_requests[:concurrency * 2]))
+            start = time.perf_counter()
+            with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+                results = list(executor.map(lambda r: _timed(central_agent, r), client_requests))
+            elapsed = time.perf_counter() - start
+            counters = central_agent.metrics.snapshot()["counters"].get("mcp_calls", {}).get("MCPStubServerA", {})
+        finally:
+            central_agent.close()
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    durations = sorted(duration for duration, _ in results)
+    return {
+        "transport": transport,
+        "throughput_rps": round(len(client_requests) / elapsed, 1),
+        "p50_ms": round(percentile(durations, 0.5) * 1000, 3),
+        "p99_ms": round(percentile(durations, 0.99) * 1000, 3),
+        "success_rate": round(sum(1 for _, success in results if success) / len(client_requests), 4),
+        "failed_mcp_calls": counters.get("error", 0) + counters.get("transport_error", 0),
+    }
+
+
+def run(transports: list[str], requests: int = 2000, concurrency: int = 8, latency: float = 0.0,
+        error_rate: float = 0.0, payload_bytes: int = 0, request_bytes: int = 64) -> dict:
+    client_requests = build_requests(requests, request_bytes)
+    server_options = {"latency": latency, "failure_rate": error_rate, "payload_bytes": payload_bytes}
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "server_options": server_options,
+        "request_bytes": request_bytes,
+        "results": [bench_transport(transport, client_requests, concurrency, server_options) for transport in transports],
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transport", action="append", choices=sorted(TRANSPORTS),
+                        help="Transport to run (repeatable; default all)")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub server latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability that a stub call fails")
+    parser.add_argument("--payload-bytes", type=int, default=0, help="Size of each successful answer")
+    parser.add_argument("--request-bytes", type=int, default=64, help="Size of each request payload")
+    parser.add_argument("--output", help="Write JSON results to this file (default: stdout)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    results = run(
+        args.transport or ["inprocess", "unix", "stdio"],
+        requests=args.requests,
+        concurrency=args.concurrency,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        payload_bytes=args.payload_bytes,
+        request_bytes=args.request_bytes,
+    )
+    encoded = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(encoded + "\n")
+    else:
+        print(encoded)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
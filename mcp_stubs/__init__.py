@@ -1,6 +1,7 @@
-from .stub_servers import MCPStubServerA, MCPStubServerB, MCPStubServerC
+from .stub_servers import MCPStubServerBase, MCPStubServerA, MCPStubServerB, MCPStubServerC
 
 __all__ = [
+    "MCPStubServerBase",
     "MCPStubServerA",
     "MCPStubServerB",
     "MCPStubServerC",
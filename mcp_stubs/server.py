@@ -0,0 +1,254 @@
+import argparse
+import concurrent.futures
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+
+from mcp_stubs import stub_servers
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the stdlib json module
+    orjson = None
+
+logger = logging.getLogger("mcp_stubs.server")
+
+PROTOCOL_VERSION = "2025-03-26"
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+_DATA_SCHEMA = {"type": "object", "properties": {"data": {}}, "required": ["data"]}
+_DATAS_SCHEMA = {"type": "object", "properties": {"datas": {"type": "array"}}, "required": ["datas"]}
+TOOLS = [
+    {"name": "solve", "description": "Solve a task", "inputSchema": _DATA_SCHEMA},
+    {"name": "enrich_and_solve", "description": "Enrich partial data and solve it", "inputSchema": _DATA_SCHEMA},
+    {"name": "enrich_and_solve_stream", "description": "enrich_and_solve, streamed as progress notifications",
+     "inputSchema": _DATA_SCHEMA},
+    {"name": "solve_many", "description": "Solve a batch of tasks", "inputSchema": _DATAS_SCHEMA},
+    {"name": "enrich_and_solve_many", "description": "Enrich and solve a batch", "inputSchema": _DATAS_SCHEMA},
+]
+
+
+def _dumps(message: dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(message, default=str)
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+
+def _loads(line: bytes):
+    return orjson.loads(line) if orjson is not None else json.loads(line)
+
+
+class MethodNotFound(Exception):
+    pass
+
+
+def _tool_result(response: dict) -> dict:
+    return {
+        "content": [{"type": "text", "text": str(response.get("data", response.get("error", "")))}],
+        "structuredContent": response,
+        "isError": not response.get("success"),
+    }
+
+
+class StubMCPServer:
+    # Serves one stub server (mcp_stubs.stub_servers) as an MCP server: JSON-RPC 2.0,
+    # one message per line, with initialize, ping, tools/list and tools/call. Requests on
+    # a connection run concurrently on `workers` threads and are answered as they finish,
+    # matched by id. enrich_and_solve_stream sends each chunk as a notifications/progress
+    # message before its result.
+    def __init__(self, server: stub_servers.MCPStubServerBase, workers: int = 8):
+        self.server = server
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mcp-stub")
+
+    def serve(self, reader, writer):
+        # Serves one connection until the client closes it
+        write_lock = threading.Lock()
+
+        def send(message: dict):
+            data = _dumps(message) + b"\n"
+            with write_lock:
+                try:
+                    writer.write(data)
+                    writer.flush()
+                except (OSError, ValueError):
+                    pass  # the client went away
+
+        for line in iter(reader.readline, b""):
+            if not line.strip():
+                continue
+            try:
+                message = _loads(line)
+            except ValueError as error:
+                send({"jsonrpc": "2.0", "id": None, "error": {"code": PARSE_ERROR, "message": str(error)}})
+                continue
+            if not isinstance(message, dict) or "method" not in message:
+                send({"jsonrpc": "2.0", "id": None, "error": {"code": INVALID_REQUEST, "message": "Invalid request"}})
+            elif "id" in message:
+                self.executor.submit(self._answer, message, send)
+
+    def _answer(self, message: dict, send):
+        request_id = message["id"]
+        try:
+            result = self.handle(message["method"], message.get("params") or {}, send)
+        except MethodNotFound as error:
+            code, text = METHOD_NOT_FOUND, str(error)
+        except (KeyError, TypeError) as error:
+            code, text = INVALID_PARAMS, f"Invalid params: {error}"
+        except Exception as error:
+            logger.exception("Stub server %s failed a request", self.server.server_name)
+            code, text = INTERNAL_ERROR, str(error)
+        else:
+            send({"jsonrpc": "2.0", "id": request_id, "result": result})
+            return
+        send({"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": text}})
+
+    def handle(self, method: str, params: dict, send) -> dict:
+        if method == "initialize":
+            return {
+                "protocolVersion": PROTOCOL_VERSION,
+                "capabilities": {"tools": {}},
+                "serverInfo": {"name": self.server.server_name, "version": "1"},
+            }
+        if method == "ping":
+            return {}
+        if method == "tools/list":
+            return {"tools": TOOLS}
+        if method != "tools/call":
+            raise MethodNotFound(f"Unknown method {method}")
+
+        name = params.get("name")
+        arguments = params.get("arguments") or {}
+        if name in ("solve", "enrich_and_solve"):
+            return _tool_result(getattr(self.server, name)(arguments["data"]))
+        if name in ("solve_many", "enrich_and_solve_many"):
+            return _tool_result({"success": True, "results": getattr(self.server, name)(arguments["datas"])})
+        if name == "enrich_and_solve_stream":
+            token = (params.get("_meta") or {}).get("progressToken")
+            for index, event in enumerate(self.server.enrich_and_solve_stream(arguments["data"])):
+                if not event.get("success"):
+                    return _tool_result(event)
+                if token is not None:
+                    send({"jsonrpc": "2.0", "method": "notifications/progress",
+                          "params": {"progressToken": token, "progress": index + 1, "message": event["chunk"]}})
+            return _tool_result({"success": True})
+        raise MethodNotFound(f"Unknown tool {name}")
+
+
+def serve_unix(server: StubMCPServer, path: str):
+    # Serves connections on a Unix socket, one thread per connection, until interrupted
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            server.serve(self.rfile, self.wfile)
+
+    class Listener(socketserver.ThreadingUnixStreamServer):
+        # socketserver's default backlog of 5 refuses bursts of Unix socket connects
+        request_queue_size = 128
+
+    if os.path.exists(path):
+        os.unlink(path)
+    with Listener(path, Handler) as listener:
+        listener.daemon_threads = True
+        try:
+            listener.serve_forever()
+        finally:
+            os.unlink(path)
+
+
+def server_command(server_class: str, **server_options) -> list[str]:
+    # The command line running this module for server_class, e.g. {"latency": 0.01} -> --latency 0.01
+    command = [sys.executable, "-m", "mcp_stubs.server", server_class]
+    for option, value in server_options.items():
+        if callable(value):
+            raise ValueError(f"{option} must be a number for a stub server process")
+        command += [f"--{option.replace('_', '-')}", str(value)]
+    return command
+
+
+def server_env(env: dict[str, str] | None = None) -> dict[str, str]:
+    # os.environ plus env, with this package importable from any working directory
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    merged = {**os.environ, **(env or {})}
+    merged["PYTHONPATH"] = os.pathsep.join(filter(None, [root, merged.get("PYTHONPATH")]))
+    return merged
+
+
+def start_server_process(server_class: str, path: str, timeout: float = 10.0, **server_options) -> subprocess.Popen:
+    # Starts `python -m mcp_stubs.server` on a Unix socket and returns once it accepts connections
+    process = subprocess.Popen(server_command(server_class, socket=path, **server_options), env=server_env())
+    deadline = time.monotonic() + timeout
+    while True:
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+            return process
+        except OSError:
+            if process.poll() is not None or time.monotonic() >= deadline:
+                process.kill()
+                raise RuntimeError(f"Stub server {server_class} did not start on {path}")
+            time.sleep(0.01)
+        finally:
+            probe.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run a stub MCP server over stdio (default) or a Unix socket.",
+    )
+    parser.add_argument("server_class", help="Stub class from mcp_stubs.stub_servers, e.g. MCPStubServerA")
+    parser.add_argument("--name", help="Server name (default: the class name)")
+    parser.add_argument("--socket", help="Listen on this Unix socket path instead of stdio")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every call")
+    parser.add_argument("--failure-rate", "--error-rate", dest="failure_rate", type=float, default=0.0,
+                        help="Probability that a call fails")
+    parser.add_argument("--payload-bytes", type=int, default=0, help="Pad successful answers to this many characters")
+    parser.add_argument("--chunk-size", type=int, default=64)
+    parser.add_argument("--chunk-latency", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=8, help="Requests served at once per server")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+    server_class = getattr(stub_servers, args.server_class, None)
+    if not isinstance(server_class, type) or not issubclass(server_class, stub_servers.MCPStubServerBase):
+        print(f"Unknown stub server {args.server_class}", file=sys.stderr)
+        return 2
+    server = StubMCPServer(
+        server_class(
+            args.name or args.server_class,
+            latency=args.latency,
+            chunk_size=args.chunk_size,
+            chunk_latency=args.chunk_latency,
+            failure_rate=args.failure_rate,
+            payload_bytes=args.payload_bytes,
+        ),
+        workers=args.workers,
+    )
+    # Stopped with SIGTERM, a socket server still removes its socket file
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        if args.socket:
+            serve_unix(server, args.socket)
+        else:
+            # stdout carries the protocol; logs go to stderr
+            server.serve(sys.stdin.buffer, sys.stdout.buffer)
+    except KeyboardInterrupt:
+        pass
+    server.executor.shutdown(wait=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
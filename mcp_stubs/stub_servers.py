@@ -1,37 +1,141 @@
-class MCPStubServerA:
-    def __init__(self, server_name):
+import asyncio
+import random
+import time
+
+
+def _latency_seconds(latency) -> float:
+    # latency is either a fixed number of seconds or a zero-argument callable
+    # that draws one sample from a distribution (e.g. lambda: random.expovariate(50))
+    return latency() if callable(latency) else latency
+
+
+class MCPStubServerBase:
+    # chunk_size and chunk_latency drive the chunked (streaming) mode: a successful
+    # enrichment is produced chunk_size characters at a time, the first chunk after
+    # `latency` and every further one after `chunk_latency`. The non-streaming calls
+    # pay the same generation time before returning the whole answer.
+    # failure_rate is the probability that a solve/enrich_and_solve call (each item of a
+    # *_many batch, or a whole stream) fails regardless of its payload, e.g. to simulate
+    # one unhealthy replica behind a ReplicaSet.
+    # payload_bytes pads successful answers to at least that many characters.
+    def __init__(self, server_name, latency=0.0, chunk_size=64, chunk_latency=0.0, failure_rate=0.0, payload_bytes=0):
         self.server_name = server_name
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.chunk_latency = chunk_latency
+        self.failure_rate = failure_rate
+        self.payload_bytes = payload_bytes
+
+    def _simulated_failure(self):
+        if self.failure_rate and random.random() < self.failure_rate:
+            return {"success": False, "error": f"Simulated replica failure in {self.server_name}"}
+        return None
+
+    def _padded(self, response):
+        if not self.payload_bytes or not response.get("success"):
+            return response
+        return {**response, "data": str(response["data"]).ljust(self.payload_bytes, ".")}
+
+    def _simulate_latency(self):
+        delay = _latency_seconds(self.latency)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def _simulate_latency_async(self):
+        delay = _latency_seconds(self.latency)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _chunks(self, response):
+        # {"success": True, "chunk": ...} events for a successful response, or the failed response itself
+        if not response.get("success"):
+            return [response]
+        text = str(response["data"])
+        return [{"success": True, "chunk": text[start:start + self.chunk_size]} for start in range(0, len(text), self.chunk_size)]
+
+    def _generation_delay(self, response) -> float:
+        if not self.chunk_latency or not response.get("success"):
+            return 0.0
+        return self.chunk_latency * max(0, len(self._chunks(response)) - 1)
+
+    def _solve(self, task_data):
+        raise NotImplementedError(f"{self.server_name} does not implement solve")
+
+    def _enrich_and_solve(self, partial_data):
+        raise NotImplementedError(f"{self.server_name} does not implement enrich_and_solve")
 
     def solve(self, task_data):
+        self._simulate_latency()
+        return self._simulated_failure() or self._padded(self._solve(task_data))
+
+    def enrich_and_solve(self, partial_data):
+        self._simulate_latency()
+        response = self._simulated_failure() or self._padded(self._enrich_and_solve(partial_data))
+        delay = self._generation_delay(response)
+        if delay > 0:
+            time.sleep(delay)
+        return response
+
+    def enrich_and_solve_stream(self, partial_data):
+        self._simulate_latency()
+        response = self._simulated_failure() or self._padded(self._enrich_and_solve(partial_data))
+        for index, event in enumerate(self._chunks(response)):
+            if index and self.chunk_latency > 0:
+                time.sleep(self.chunk_latency)
+            yield event
+
+    def solve_many(self, task_datas):
+        # One simulated round trip for the whole batch
+        self._simulate_latency()
+        return [self._simulated_failure() or self._padded(self._solve(task_data)) for task_data in task_datas]
+
+    def enrich_and_solve_many(self, partial_datas):
+        self._simulate_latency()
+        return [
+            self._simulated_failure() or self._padded(self._enrich_and_solve(partial_data))
+            for partial_data in partial_datas
+        ]
+
+    async def solve_async(self, task_data):
+        await self._simulate_latency_async()
+        return self._simulated_failure() or self._padded(self._solve(task_data))
+
+    async def enrich_and_solve_async(self, partial_data):
+        await self._simulate_latency_async()
+        response = self._simulated_failure() or self._padded(self._enrich_and_solve(partial_data))
+        delay = self._generation_delay(response)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return response
+
+    async def enrich_and_solve_stream_async(self, partial_data):
+        await self._simulate_latency_async()
+        response = self._simulated_failure() or self._padded(self._enrich_and_solve(partial_data))
+        for index, event in enumerate(self._chunks(response)):
+            if index and self.chunk_latency > 0:
+                await asyncio.sleep(self.chunk_latency)
+            yield event
+
+
+class MCPStubServerA(MCPStubServerBase):
+    def _solve(self, task_data):
         # task_data is the actual data payload, e.g. {"info": "some_info"} or {"payload": "...", "error": True}
         if isinstance(task_data, dict) and task_data.get("error"):
             return {"success": False, "error": f"Simulated processing error in {self.server_name}"}
         return {"success": True, "data": f"Processed data from {self.server_name}: {task_data}"}
 
-    def enrich_and_solve(self, partial_data):
-        raise NotImplementedError(f"{self.server_name} does not implement enrich_and_solve")
-
-class MCPStubServerB:
-    def __init__(self, server_name):
-        self.server_name = server_name
-
-    def solve(self, task_data):
+class MCPStubServerB(MCPStubServerBase):
+    def _solve(self, task_data):
         # task_data is the actual data payload
         if isinstance(task_data, dict) and task_data.get("error"):
             return {"success": False, "error": f"Simulated processing error in {self.server_name}"}
         return {"success": True, "data": f"Processed data from {self.server_name}: {task_data}"}
 
-    def enrich_and_solve(self, partial_data):
-        raise NotImplementedError(f"{self.server_name} does not implement enrich_and_solve")
-
-class MCPStubServerC:
-    def __init__(self, server_name):
-        self.server_name = server_name
-
-    def solve(self, task_data):
+class MCPStubServerC(MCPStubServerBase):
+    def _solve(self, task_data):
         if task_data.get("enrichment_needed"):
             return {"success": True, "data": f"Enriched data by {self.server_name}: {task_data.get('partial_data')} with new details"}
         return {"success": False, "error": f"{self.server_name} requires enrichment_needed to be true."}
 
-    def enrich_and_solve(self, partial_data):
+    def _enrich_and_solve(self, partial_data):
         return {"success": True, "data": f"Enriched and solved by {self.server_name}: {partial_data} with comprehensive analysis"}
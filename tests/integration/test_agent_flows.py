@@ -1,3 +1,5 @@
+import asyncio
+import time
 import unittest
 from agents.central_agent import CentralAgent
 # We use the real stub servers for integration tests
@@ -101,7 +103,7 @@ class TestAgentFlows(unittest.TestCase):
 
     def test_scenario_4b_server_c_direct_to_squad(self):
         # This is similar to UnknownServer, but explicitly targeting MCPStubServerC
-        # which also isn't in specialized_agent_routing
+        # which also isn't in the routing table
         client_request = {
             "mcp_server": "MCPStubServerC",
             "data": {"info": "direct task for Server C via squad"}
@@ -133,5 +135,54 @@ class TestAgentFlows(unittest.TestCase):
         }
         self.assertEqual(response, expected_response)
 
+class TestAgentFlowsBatch(unittest.TestCase):
+
+    def test_batch_matches_individual_requests(self):
+        central_agent = CentralAgent()
+        client_requests = [
+            {"mcp_server": "MCPStubServerA", "data": {"info": "task for A"}},
+            {"mcp_server": "MCPStubServerB", "data": {"info": "task for B"}},
+            {"mcp_server": "MCPStubServerA", "data": {"payload": "complex task for A", "error": True}},
+            {"mcp_server": "MCPStubServerUnknown", "data": {"info": "direct task for squad"}},
+            {"mcp_server": "MCPStubServerA"},
+            {"mcp_server": "MCPStubServerC", "data": {"info": "direct task for Server C via squad"}},
+        ]
+        expected = [central_agent.handle_client_request(client_request) for client_request in client_requests]
+        self.assertEqual(central_agent.handle_client_requests(client_requests), expected)
+
+class TestAgentFlowsAsync(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.central_agent = CentralAgent()
+
+    async def test_async_flows_match_sync_flows(self):
+        client_requests = [
+            {"mcp_server": "MCPStubServerA", "data": {"info": "task for A"}},
+            {"mcp_server": "MCPStubServerB", "data": {"info": "task for B"}},
+            {"mcp_server": "MCPStubServerA", "data": {"payload": "complex task for A", "error": True}},
+            {"mcp_server": "MCPStubServerUnknown", "data": {"info": "direct task for squad"}},
+            {"mcp_server": "MCPStubServerA"},
+        ]
+        for client_request in client_requests:
+            with self.subTest(client_request=client_request):
+                expected = self.central_agent.handle_client_request(client_request)
+                response = await self.central_agent.handle_client_request_async(client_request)
+                self.assertEqual(response, expected)
+
+    async def test_slow_backends_do_not_serialize_requests(self):
+        # Every MCP call sleeps 50ms; 100 requests (half of them escalating) must overlap on one loop
+        self.central_agent.specialized_agent_a_instance.create_server = lambda target: MCPStubServerA(target, latency=0.05)
+        self.central_agent.agent_squad.create_server = lambda: MCPStubServerC("MCPStubServerC", latency=0.05)
+        self.central_agent.server_pools.configure("MCPStubServerA", max_size=100)
+        self.central_agent.server_pools.configure("MCPStubServerC", max_size=100)
+        client_requests = [
+            {"mcp_server": "MCPStubServerA", "data": {"n": i, "error": i % 2 == 0}} for i in range(100)
+        ]
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(self.central_agent.handle_client_request_async(r) for r in client_requests))
+        elapsed = time.perf_counter() - start
+        self.assertTrue(all(response["success"] for response in responses))
+        self.assertLess(elapsed, 1.0)
+
 if __name__ == '__main__':
     unittest.main()
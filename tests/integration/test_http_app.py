@@ -0,0 +1,141 @@
+import asyncio
+import json
+import time
+import unittest
+from fastapi.testclient import TestClient
+from agents.central_agent import CentralAgent
+from agents.http_app import InFlightLimiter, create_app
+from mcp_stubs.stub_servers import MCPStubServerA
+
+
+class TestHttpApp(unittest.TestCase):
+
+    def setUp(self):
+        self.central_agent = CentralAgent()
+        self.app = create_app(self.central_agent, max_in_flight=2, max_batch_size=3)
+        self.client = TestClient(self.app)
+
+    def test_single_request(self):
+        response = self.client.post("/v1/requests", json={"mcp_server": "MCPStubServerA", "data": {"info": "x"}})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"success": True, "data": "Processed data from MCPStubServerA: {'info': 'x'}"})
+
+    def test_escalated_and_invalid_requests_carry_their_response(self):
+        escalated = self.client.post("/v1/requests", json={"mcp_server": "MCPStubServerA", "data": {"error": True}})
+        self.assertTrue(escalated.json()["success"])
+        self.assertIn("Enriched and solved by MCPStubServerC", escalated.json()["data"])
+        invalid = self.client.post("/v1/requests", json={"data": 1})
+        self.assertEqual(invalid.json(), {"success": False, "error": "Invalid request: Missing 'mcp_server' key in request."})
+
+    def test_malformed_json_is_an_invalid_request(self):
+        response = self.client.post("/v1/requests", content=b"{not json")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["error"].startswith("Invalid request: Invalid JSON"))
+        self.assertEqual(self.app.state.limiter.in_flight, 0)
+        self.assertEqual(self.client.post("/v1/requests/batch", content=b"[{").status_code, 400)
+        self.assertEqual(self.client.post("/v1/requests/stream", content=b"{").status_code, 400)
+
+    def test_batch(self):
+        response = self.client.post("/v1/requests/batch", json=[
+            {"mcp_server": "MCPStubServerA", "data": 1},
+            {"mcp_server": "MCPStubServerB", "data": 2},
+            {"data": 3},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["success"] for item in response.json()], [True, True, False])
+
+    def test_batch_is_bounded_by_the_request_timeout(self):
+        central_agent = CentralAgent(request_timeout=0.1, min_escalation_budget=0.05)
+        central_agent.specialized_agent_a_instance.create_server = lambda target: MCPStubServerA(target, latency=1.0)
+        client = TestClient(create_app(central_agent))
+        start = time.monotonic()
+        response = client.post("/v1/requests/batch", json=[{"mcp_server": "MCPStubServerA", "data": 1}])
+        self.assertLess(time.monotonic() - start, 0.6)
+        self.assertEqual(response.json(), [{"success": False, "error": "Deadline exceeded before escalation to AgentSquad."}])
+
+    def test_batch_shape_and_size_are_checked(self):
+        self.assertEqual(self.client.post("/v1/requests/batch", json={"mcp_server": "A"}).status_code, 400)
+        self.assertEqual(self.client.post("/v1/requests/batch", json=[{}] * 4).status_code, 413)
+
+    def test_stream(self):
+        response = self.client.post("/v1/requests/stream", json={"mcp_server": "UnknownServer", "data": "d"})
+        self.assertEqual(response.headers["content-type"], "application/x-ndjson")
+        events = [json.loads(line) for line in response.text.splitlines()]
+        self.assertTrue(all(event["success"] for event in events))
+        expected = CentralAgent().handle_client_request({"mcp_server": "UnknownServer", "data": "d"})
+        self.assertEqual("".join(event["chunk"] for event in events), expected["data"])
+        self.assertEqual(self.app.state.limiter.in_flight, 0)
+
+    def test_saturation_returns_429(self):
+        limiter = self.app.state.limiter
+        self.assertTrue(limiter.try_acquire())
+        self.assertTrue(limiter.try_acquire())
+        try:
+            response = self.client.post("/v1/requests", json={"mcp_server": "MCPStubServerA", "data": 1})
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response.headers["retry-after"], "1")
+            self.assertEqual(self.client.post("/v1/requests/batch", json=[]).status_code, 429)
+        finally:
+            limiter.release()
+            limiter.release()
+        self.assertEqual(limiter.stats()["rejected"], 2)
+        self.assertEqual(self.client.post("/v1/requests", json={"mcp_server": "MCPStubServerA", "data": 1}).status_code, 200)
+
+    def test_draining_returns_503_and_is_not_ready(self):
+        self.app.state.limiter.draining = True
+        self.assertEqual(self.client.post("/v1/requests", json={"mcp_server": "MCPStubServerA", "data": 1}).status_code, 503)
+        readiness = self.client.get("/readyz")
+        self.assertEqual(readiness.status_code, 503)
+        self.assertFalse(readiness.json()["ready"])
+        self.assertEqual(self.client.get("/healthz").json(), {"status": "ok"})
+
+    def test_readiness_reports_pools_and_breakers(self):
+        self.central_agent.circuit_breakers.configure("MCPStubServerA", min_calls=1, window_size=1)
+        self.client.post("/v1/requests", json={"mcp_server": "MCPStubServerA", "data": {"error": True}})
+        body = self.client.get("/readyz").json()
+        self.assertTrue(body["ready"])
+        self.assertEqual(body["open_circuits"], ["MCPStubServerA"])
+        self.assertEqual(body["circuit_breakers"]["MCPStubServerA"]["state"], "open")
+        self.assertEqual(body["server_pools"]["MCPStubServerA"]["in_use"], 0)
+        self.assertIn("MCPStubServerC", body["server_pools"])
+
+    def test_metrics(self):
+        self.client.post("/v1/requests", json={"mcp_server": "MCPStubServerB", "data": 1})
+        response = self.client.get("/metrics")
+        self.assertIn('agents_requests_total{server="MCPStubServerB",outcome="solved"} 1', response.text)
+
+    def test_shutdown_closes_the_pools(self):
+        with TestClient(self.app) as client:
+            client.post("/v1/requests", json={"mcp_server": "MCPStubServerA", "data": 1})
+            self.assertEqual(self.central_agent.server_pools.stats()["MCPStubServerA"]["idle"], 1)
+        self.assertEqual(self.central_agent.server_pools.stats()["MCPStubServerA"]["size"], 0)
+
+    def test_shutdown_closes_the_agent_when_the_drain_times_out(self):
+        app = create_app(self.central_agent, drain_timeout=0.01)
+        with TestClient(app) as client:
+            client.post("/v1/requests", json={"mcp_server": "MCPStubServerA", "data": 1})
+            self.assertTrue(app.state.limiter.try_acquire())  # a request that never finishes
+        self.assertEqual(app.state.limiter.in_flight, 1)
+        self.assertEqual(self.central_agent.server_pools.stats()["MCPStubServerA"]["size"], 0)
+
+
+class TestInFlightLimiterDrain(unittest.IsolatedAsyncioTestCase):
+
+    async def test_drain_waits_for_in_flight_requests(self):
+        limiter = InFlightLimiter(4)
+        self.assertTrue(limiter.try_acquire())
+        drain = asyncio.ensure_future(limiter.drain(1.0))
+        await asyncio.sleep(0.01)
+        self.assertFalse(drain.done())
+        self.assertFalse(limiter.try_acquire())
+        limiter.release()
+        self.assertTrue(await drain)
+
+    async def test_drain_gives_up_after_the_timeout(self):
+        limiter = InFlightLimiter(4)
+        limiter.try_acquire()
+        self.assertFalse(await limiter.drain(0.01))
+
+
+if __name__ == '__main__':
+    unittest.main()
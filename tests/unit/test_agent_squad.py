@@ -1,5 +1,5 @@
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from agents.agent_squad import AgentSquad
 from mcp_stubs.stub_servers import MCPStubServerC # Used by AgentSquad
 
@@ -8,8 +8,9 @@ class TestAgentSquad(unittest.TestCase):
     def test_agent_squad_init(self):
         squad = AgentSquad(squad_name="TestSquad")
         self.assertEqual(squad.squad_name, "TestSquad")
-        self.assertIsInstance(squad.mcp_server_c, MCPStubServerC)
-        self.assertEqual(squad.mcp_server_c.server_name, "MCPStubServerC")
+        with squad.mcp_server_c.session() as server:
+            self.assertIsInstance(server, MCPStubServerC)
+            self.assertEqual(server.server_name, "MCPStubServerC")
 
     @patch('agents.agent_squad.MCPStubServerC')
     def test_enrich_and_solve_success(self, MockMCPStubServerC):
@@ -20,10 +21,9 @@ class TestAgentSquad(unittest.TestCase):
             "data": "Squad successfully enriched and solved"
         }
 
-        # Instantiate AgentSquad (which will use the mocked MCPStubServerC)
-        # We need to re-patch the instance used by AgentSquad or pass the mock
+        # Instantiate AgentSquad; its MCPStubServerC session pool builds sessions from the
+        # patched class, so the pooled session is our mock instance
         squad = AgentSquad(squad_name="TestSquad")
-        squad.mcp_server_c = mock_server_c_instance # Ensure squad uses our mock
 
         escalation_details = {
             "original_request": {"data": "Original task data"},
@@ -57,7 +57,6 @@ class TestAgentSquad(unittest.TestCase):
             "data": "Squad used original_request data"
         }
         squad = AgentSquad(squad_name="TestSquad")
-        squad.mcp_server_c = mock_server_c_instance
 
         escalation_details = {
             "original_request": {"data": "Data from original request"},
@@ -77,7 +76,6 @@ class TestAgentSquad(unittest.TestCase):
             "data": "Squad used nested partial data"
         }
         squad = AgentSquad(squad_name="TestSquad")
-        squad.mcp_server_c = mock_server_c_instance
 
         escalation_details = {
             "original_request": {"data": "Original"},
@@ -99,7 +97,6 @@ class TestAgentSquad(unittest.TestCase):
             "data": "Squad used fallback partial_data_dict"
         }
         squad = AgentSquad(squad_name="TestSquad")
-        squad.mcp_server_c = mock_server_c_instance
 
         # Neither partial_data['data'], original_request['data'], nor partial_data['data']['data'] are present/valid
         escalation_details = {
@@ -124,7 +121,6 @@ class TestAgentSquad(unittest.TestCase):
         }
 
         squad = AgentSquad(squad_name="TestSquad")
-        squad.mcp_server_c = mock_server_c_instance
 
         escalation_details = {
              "original_request": {"data": "Original task data"},
@@ -137,5 +133,64 @@ class TestAgentSquad(unittest.TestCase):
         self.assertFalse(response["solved"])
         self.assertEqual(response["error"], "MCPStubServerC enrichment failed")
 
+class TestAgentSquadBatch(unittest.TestCase):
+
+    def test_enrich_and_solve_many_single_round_trip(self):
+        squad = AgentSquad(squad_name="TestSquad")
+        server_c = MagicMock()
+        squad.create_server = lambda: server_c
+        server_c.enrich_and_solve_many.return_value = [
+            {"success": True, "data": "one"},
+            {"success": False, "error": "two failed"},
+        ]
+
+        responses = squad.enrich_and_solve_many([
+            {"original_request": {"data": "a"}, "partial_data": {"data": {"data": "nested a"}}},
+            {"original_request": {"data": "b"}, "partial_data": {"data": None}},
+        ])
+
+        server_c.enrich_and_solve_many.assert_called_once_with(["nested a", "b"])
+        server_c.enrich_and_solve.assert_not_called()
+        self.assertEqual(responses, [
+            {"solved": True, "result": "one"},
+            {"solved": False, "error": "two failed"},
+        ])
+
+    def test_enrich_and_solve_many_empty(self):
+        squad = AgentSquad(squad_name="TestSquad")
+        server_c = MagicMock()
+        squad.create_server = lambda: server_c
+        self.assertEqual(squad.enrich_and_solve_many([]), [])
+        server_c.enrich_and_solve_many.assert_not_called()
+
+class TestAgentSquadAsync(unittest.IsolatedAsyncioTestCase):
+
+    async def test_enrich_and_solve_async_success(self):
+        squad = AgentSquad(squad_name="TestSquad")
+        server_c = MagicMock()
+        squad.create_server = lambda: server_c
+        server_c.enrich_and_solve_async = AsyncMock(return_value={"success": True, "data": "Async squad result"})
+
+        escalation_details = {
+            "original_request": {"data": "Original task data"},
+            "partial_data": {"error": "Specialized failed", "data": {"info": "Some info"}}
+        }
+        response = await squad.enrich_and_solve_async(escalation_details)
+
+        server_c.enrich_and_solve_async.assert_awaited_once_with({"info": "Some info"})
+        self.assertTrue(response["solved"])
+        self.assertEqual(response["result"], "Async squad result")
+
+    async def test_enrich_and_solve_async_mcp_failure_uses_default_error(self):
+        squad = AgentSquad(squad_name="TestSquad")
+        server_c = MagicMock()
+        squad.create_server = lambda: server_c
+        server_c.enrich_and_solve_async = AsyncMock(return_value={"success": False})
+
+        response = await squad.enrich_and_solve_async({"partial_data": {"data": "x"}})
+
+        self.assertFalse(response["solved"])
+        self.assertEqual(response["error"], "TestSquad failed to enrich and solve")
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,22 @@
+import unittest
+from benchmarks.bench_cluster import build_requests, run
+
+
+class TestBenchCluster(unittest.TestCase):
+
+    def test_build_requests_cycles_through_keys(self):
+        requests = build_requests(10, 8, 3)
+        self.assertEqual([request["data"]["key"] for request in requests[:4]], [0, 1, 2, 0])
+        self.assertEqual(len(requests[0]["data"]["payload"]), 8)
+
+    def test_run_reports_both_modes(self):
+        results = run(["single", "cluster"], workers=2, requests=60, concurrency=4, payload_bytes=64,
+                      distinct_keys=10, latency=0.0005)
+        self.assertEqual([result["mode"] for result in results["results"]], ["single", "cluster"])
+        for result in results["results"]:
+            self.assertEqual(result["success_rate"], 1.0)
+        self.assertAlmostEqual(sum(results["results"][1]["worker_share"]), 1.0, places=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
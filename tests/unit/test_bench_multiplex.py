@@ -0,0 +1,22 @@
+import unittest
+from benchmarks.bench_multiplex import run
+
+
+class TestBenchMultiplex(unittest.TestCase):
+
+    def test_run_reports_both_modes(self):
+        results = run(requests=60, concurrency=8, latency=0.002, connections=[2], windows=[4], payload_bytes=64)
+        per_session, multiplexed = results["results"]
+        self.assertEqual((per_session["mode"], per_session["connections"]), ("per-session", 2))
+        self.assertEqual((multiplexed["mode"], multiplexed["window"]), ("multiplexed", 4))
+        for result in results["results"]:
+            self.assertEqual(result["success_rate"], 1.0)
+            self.assertEqual(result["failed_mcp_calls"], 0)
+            self.assertGreater(result["throughput_rps"], 0)
+        self.assertEqual(per_session["connections_opened"], 2)
+        self.assertEqual(multiplexed["connections_opened"], 1)
+        self.assertEqual(multiplexed["max_in_flight"], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import json
+import os
+import tempfile
+import unittest
+from benchmarks.bench_pipeline import Workload, build_requests, compare_to_baseline, latency_sampler, main, run_workload
+
+
+class TestBenchPipeline(unittest.TestCase):
+
+    def test_request_mix(self):
+        client_requests = build_requests(Workload("mix", requests=1000, success=0.5, escalation=0.3, unroutable=0.2))
+        unroutable = sum(1 for r in client_requests if r["mcp_server"] == "MCPStubServerUnknown")
+        failing = sum(1 for r in client_requests if r["data"].get("error"))
+        self.assertAlmostEqual(unroutable / 1000, 0.2, delta=0.05)
+        self.assertAlmostEqual(failing / 1000, 0.3, delta=0.05)
+        self.assertEqual(len({r["data"]["id"] for r in client_requests}), 1000)
+
+    def test_latency_specs(self):
+        import random
+        rng = random.Random(0)
+        self.assertEqual(latency_sampler("none", rng), 0.0)
+        self.assertEqual(latency_sampler("fixed:0.5", rng), 0.5)
+        sample = latency_sampler("uniform:0.1,0.2", rng)
+        self.assertTrue(0.1 <= sample() <= 0.2)
+        with self.assertRaises(ValueError):
+            latency_sampler("gamma:1", rng)
+
+    def test_run_workload_reports_metrics(self):
+        workload = Workload("tiny", requests=50, success=0.6, escalation=0.2, unroutable=0.2,
+                            latency_c="fixed:0.0005", concurrency=4)
+        result = run_workload(workload, warmup=5, memory_sample=10)
+        self.assertEqual(result["requests"], 50)
+        self.assertEqual(result["succeeded"], 50)
+        self.assertGreater(result["throughput_rps"], 0)
+        self.assertLessEqual(result["latency_ms"]["p50"], result["latency_ms"]["p99"])
+        self.assertIn("peak_bytes_per_request_p50", result["memory"])
+
+    def test_compare_to_baseline(self):
+        baseline = {"workloads": {"w": {"throughput_rps": 1000.0, "latency_ms": {"p50": 1.0, "p99": 2.0}}}}
+        steady = {"workloads": {"w": {"throughput_rps": 950.0, "latency_ms": {"p50": 1.05, "p99": 2.1}}}}
+        slower = {"workloads": {"w": {"throughput_rps": 700.0, "latency_ms": {"p50": 1.0, "p99": 3.0}}}}
+        self.assertEqual(compare_to_baseline(steady, baseline, 0.10), [])
+        self.assertEqual(len(compare_to_baseline(slower, baseline, 0.10)), 2)
+
+    def test_cli_writes_json_and_checks_baseline(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "bench.json")
+            args = ["--success", "1", "--requests", "20", "--warmup", "0", "--memory-sample", "0", "--output", output]
+            self.assertEqual(main(args), 0)
+            with open(output) as result_file:
+                self.assertIn("custom", json.load(result_file)["workloads"])
+            # Against itself with a generous tolerance nothing regresses
+            self.assertEqual(main(args + ["--baseline", output, "--tolerance", "100"]), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,21 @@
+import unittest
+from benchmarks.bench_replicas import run
+
+
+class TestBenchReplicas(unittest.TestCase):
+
+    def test_run_reports_every_strategy(self):
+        results = run(["p2c", "ewma"], [0.0, 0.001], [0.0, 0.5], requests=40, concurrency=4)
+        self.assertEqual([result["strategy"] for result in results["results"]], ["p2c", "ewma"])
+        for result in results["results"]:
+            self.assertEqual(len(result["replica_share"]), 2)
+            self.assertAlmostEqual(sum(result["replica_share"]), 1.0, places=2)
+            self.assertEqual(result["success_rate"], 1.0)
+
+    def test_failure_rates_must_match_replicas(self):
+        with self.assertRaises(ValueError):
+            run(["p2c"], [0.0, 0.001], [0.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
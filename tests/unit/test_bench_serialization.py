@@ -0,0 +1,19 @@
+import unittest
+from benchmarks.bench_serialization import run
+
+
+class TestBenchSerialization(unittest.TestCase):
+
+    def test_run_reports_every_section(self):
+        results = run(iterations=20, payloads=["small"])
+        (result,) = results["results"]
+        self.assertEqual(result["payload"], "small")
+        self.assertEqual(set(result["decode_us"]), {"stdlib", "validate_json"})
+        self.assertIn("json", result["encode_us"])
+        self.assertEqual(set(result["cached_us"]), {"stdlib", "handle_request_bytes"})
+        for section in ("decode_speedup", "encode_speedup", "cached_speedup"):
+            self.assertGreater(result[section], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
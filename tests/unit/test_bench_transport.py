@@ -0,0 +1,22 @@
+import unittest
+from benchmarks.bench_transport import build_requests, run
+
+
+class TestBenchTransport(unittest.TestCase):
+
+    def test_build_requests_are_unique(self):
+        requests = build_requests(5, 16)
+        self.assertEqual(len({request["data"]["id"] for request in requests}), 5)
+        self.assertEqual(len(requests[0]["data"]["payload"]), 16)
+
+    def test_run_reports_every_transport(self):
+        results = run(["inprocess", "unix", "stdio"], requests=40, concurrency=2, payload_bytes=256, error_rate=0.2)
+        self.assertEqual([result["transport"] for result in results["results"]], ["inprocess", "unix", "stdio"])
+        for result in results["results"]:
+            # Failed calls are escalated, so every request still succeeds
+            self.assertEqual(result["success_rate"], 1.0)
+            self.assertGreater(result["throughput_rps"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
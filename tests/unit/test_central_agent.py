@@ -1,24 +1,44 @@
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from agents.central_agent import CentralAgent
 from agents.specialized_agents import SpecializedAgentA, SpecializedAgentB
 from agents.agent_squad import AgentSquad
+from agents.escalation import AGENT_FAILED, NO_AGENT, Escalation
+
+
+def assert_escalated(test, mock_squad_call, client_request, cause, error):
+    # The squad gets one Escalation that refers to (not copies) the client request
+    (escalation,), kwargs = mock_squad_call.call_args
+    test.assertEqual(kwargs, {"deadline": None})
+    test.assertIsInstance(escalation, Escalation)
+    test.assertIs(escalation.original_request, client_request)
+    test.assertEqual((escalation.cause, escalation.error), (cause, error))
 
 class TestCentralAgent(unittest.TestCase):
 
-    @patch('agents.central_agent.SpecializedAgentA')
-    @patch('agents.central_agent.SpecializedAgentB')
+    @patch('agents.specialized_agents.SpecializedAgentA')
+    @patch('agents.specialized_agents.SpecializedAgentB')
     @patch('agents.central_agent.AgentSquad')
     def test_central_agent_init(self, MockAgentSquad, MockSpecializedAgentB, MockSpecializedAgentA):
         central_agent = CentralAgent()
-        MockSpecializedAgentA.assert_called_once_with(allowed_mcp_servers=["MCPStubServerA"])
-        MockSpecializedAgentB.assert_called_once_with(allowed_mcp_servers=["MCPStubServerB"])
-        MockAgentSquad.assert_called_once_with()
+        MockSpecializedAgentA.assert_called_once_with(
+            allowed_mcp_servers=["MCPStubServerA"], server_pools=central_agent.server_pools, result_caches=central_agent.result_caches,
+            metrics=central_agent.metrics, hedge_policies=central_agent.hedge_policies,
+            transports=central_agent.transports)
+        MockSpecializedAgentB.assert_called_once_with(
+            allowed_mcp_servers=["MCPStubServerB"], server_pools=central_agent.server_pools, result_caches=central_agent.result_caches,
+            metrics=central_agent.metrics, hedge_policies=central_agent.hedge_policies,
+            transports=central_agent.transports)
+        MockAgentSquad.assert_called_once_with(
+            server_pools=central_agent.server_pools, result_caches=central_agent.result_caches, metrics=central_agent.metrics,
+            hedge_policies=central_agent.hedge_policies, transports=central_agent.transports)
         # self.assertIsInstance(central_agent.specialized_agent_a_instance, MockSpecializedAgentA) # Causes TypeError
         # self.assertIsInstance(central_agent.specialized_agent_b_instance, MockSpecializedAgentB) # Causes TypeError
         # self.assertIsInstance(central_agent.agent_squad, MockAgentSquad) # Causes TypeError
-        self.assertEqual(central_agent.specialized_agent_routing["MCPStubServerA"], central_agent.specialized_agent_a_instance)
-        self.assertEqual(central_agent.specialized_agent_routing["MCPStubServerB"], central_agent.specialized_agent_b_instance)
+        self.assertEqual(central_agent.specialized_agent_a_instance, MockSpecializedAgentA.return_value)
+        self.assertEqual(central_agent.specialized_agent_b_instance, MockSpecializedAgentB.return_value)
+        self.assertEqual(central_agent.routing.resolve("MCPStubServerA"), central_agent.specialized_agent_a_instance)
+        self.assertEqual(central_agent.routing.resolve("MCPStubServerB"), central_agent.specialized_agent_b_instance)
 
     def test_validate_request_valid(self):
         central_agent = CentralAgent()
@@ -47,16 +67,16 @@ class TestCentralAgent(unittest.TestCase):
         self.assertEqual(central_agent.identify_specialized_agent({"mcp_server": "MCPStubServerB"}), central_agent.specialized_agent_b_instance)
         self.assertIsNone(central_agent.identify_specialized_agent({"mcp_server": "UnknownServer"}))
 
-    @patch.object(CentralAgent, 'validate_request')
+    @patch.object(CentralAgent, 'validate_and_coerce')
     def test_handle_client_request_invalid_request(self, mock_validate_request):
-        mock_validate_request.return_value = (False, "Test validation error")
+        mock_validate_request.return_value = (None, "Test validation error")
         central_agent = CentralAgent()
         response = central_agent.handle_client_request({})
         self.assertFalse(response["success"])
         self.assertEqual(response["error"], "Invalid request: Test validation error")
         mock_validate_request.assert_called_once_with({})
 
-    @patch.object(CentralAgent, 'validate_request', return_value=(True, None))
+    @patch.object(CentralAgent, 'validate_and_coerce', side_effect=lambda request: (request, None))
     @patch.object(CentralAgent, 'identify_specialized_agent')
     def test_handle_client_request_specialized_agent_solves(self, mock_identify_agent, mock_validate_request):
         mock_specialized_agent = MagicMock()
@@ -71,9 +91,9 @@ class TestCentralAgent(unittest.TestCase):
         self.assertEqual(response["data"], "Specialized success")
         mock_validate_request.assert_called_once_with(client_request)
         mock_identify_agent.assert_called_once_with(client_request)
-        mock_specialized_agent.perform_task.assert_called_once_with(client_request)
+        mock_specialized_agent.perform_task.assert_called_once_with(client_request, deadline=None)
 
-    @patch.object(CentralAgent, 'validate_request', return_value=(True, None))
+    @patch.object(CentralAgent, 'validate_and_coerce', side_effect=lambda request: (request, None))
     @patch.object(CentralAgent, 'identify_specialized_agent')
     @patch.object(AgentSquad, 'enrich_and_solve') # Patching the class method
     def test_handle_client_request_specialized_fails_squad_solves(self, mock_squad_solve, mock_identify_agent, mock_validate_request):
@@ -95,13 +115,11 @@ class TestCentralAgent(unittest.TestCase):
         self.assertEqual(response["data"], "Squad success")
         mock_validate_request.assert_called_once_with(client_request)
         mock_identify_agent.assert_called_once_with(client_request)
-        mock_specialized_agent.perform_task.assert_called_once_with(client_request)
-        mock_squad_solve.assert_called_once_with({
-            "original_request": client_request,
-            "partial_data": specialized_failure_response
-        })
+        mock_specialized_agent.perform_task.assert_called_once_with(client_request, deadline=None)
+        mock_squad_solve.assert_called_once()
+        assert_escalated(self, mock_squad_solve, client_request, AGENT_FAILED, "Specialized failed")
 
-    @patch.object(CentralAgent, 'validate_request', return_value=(True, None))
+    @patch.object(CentralAgent, 'validate_and_coerce', side_effect=lambda request: (request, None))
     @patch.object(CentralAgent, 'identify_specialized_agent')
     @patch.object(AgentSquad, 'enrich_and_solve')
     def test_handle_client_request_specialized_fails_squad_fails(self, mock_squad_solve, mock_identify_agent, mock_validate_request):
@@ -120,12 +138,10 @@ class TestCentralAgent(unittest.TestCase):
 
         self.assertFalse(response["success"])
         self.assertEqual(response["error"], "Squad failed")
-        mock_squad_solve.assert_called_once_with({
-            "original_request": client_request,
-            "partial_data": specialized_failure_response
-        })
+        mock_squad_solve.assert_called_once()
+        assert_escalated(self, mock_squad_solve, client_request, AGENT_FAILED, "Specialized failed")
 
-    @patch.object(CentralAgent, 'validate_request', return_value=(True, None))
+    @patch.object(CentralAgent, 'validate_and_coerce', side_effect=lambda request: (request, None))
     @patch.object(CentralAgent, 'identify_specialized_agent', return_value=None) # No specialized agent
     @patch.object(AgentSquad, 'enrich_and_solve')
     def test_handle_client_request_no_specialized_agent_squad_solves(self, mock_squad_solve, mock_identify_agent, mock_validate_request):
@@ -141,12 +157,10 @@ class TestCentralAgent(unittest.TestCase):
         self.assertEqual(response["data"], "Squad direct success")
         mock_identify_agent.assert_called_once_with(client_request)
         # Check the structure passed to squad_solve for direct escalation
-        mock_squad_solve.assert_called_once_with({
-            "original_request": client_request,
-            "partial_data": {"error": "No specialized agent for this MCP.", "data": client_request.get('data')}
-        })
+        mock_squad_solve.assert_called_once()
+        assert_escalated(self, mock_squad_solve, client_request, NO_AGENT, "No specialized agent for this MCP.")
 
-    @patch.object(CentralAgent, 'validate_request', return_value=(True, None))
+    @patch.object(CentralAgent, 'validate_and_coerce', side_effect=lambda request: (request, None))
     @patch.object(CentralAgent, 'identify_specialized_agent', return_value=None) # No specialized agent
     @patch.object(AgentSquad, 'enrich_and_solve')
     def test_handle_client_request_no_specialized_agent_squad_fails(self, mock_squad_solve, mock_identify_agent, mock_validate_request):
@@ -160,11 +174,136 @@ class TestCentralAgent(unittest.TestCase):
 
         self.assertFalse(response["success"])
         self.assertEqual(response["error"], "Squad direct fail")
-        mock_squad_solve.assert_called_once_with({
-            "original_request": client_request,
-            "partial_data": {"error": "No specialized agent for this MCP.", "data": client_request.get('data')}
-        })
+        mock_squad_solve.assert_called_once()
+        assert_escalated(self, mock_squad_solve, client_request, NO_AGENT, "No specialized agent for this MCP.")
+
+
+class TestCentralAgentClose(unittest.TestCase):
+
+    def test_close_shuts_down_in_dependency_order(self):
+        central_agent = CentralAgent()
+        shutdown = MagicMock()
+        central_agent.escalation_queue = shutdown.escalation_queue
+        central_agent.result_caches = shutdown.result_caches
+        central_agent.transports = shutdown.transports
+        central_agent.server_pools = shutdown.server_pools
+        central_agent.close()
+        self.assertEqual([name for name, _, _ in shutdown.mock_calls], [
+            "escalation_queue.close", "result_caches.close", "transports.close", "server_pools.close",
+        ])
+
+    def test_close_twice(self):
+        central_agent = CentralAgent()
+        central_agent.handle_client_request({"mcp_server": "MCPStubServerA", "data": 1})
+        central_agent.close()
+        central_agent.close()
+        self.assertEqual(central_agent.server_pools.stats()["MCPStubServerA"]["size"], 0)
+
+
+class TestCentralAgentBatch(unittest.TestCase):
+
+    def test_handle_client_requests_groups_and_escalates_once(self):
+        central_agent = CentralAgent()
+        agent_a = MagicMock()
+        agent_a.perform_tasks.return_value = [
+            {"solved": True, "result": "A1"},
+            {"solved": False, "error": "A failed", "partial_data": "pA"},
+        ]
+        agent_b = MagicMock()
+        agent_b.perform_tasks.return_value = [{"solved": True, "result": "B1"}]
+        central_agent.routing.reload({"agents": {}, "routes": []})
+        central_agent.identify_specialized_agent = lambda r: {"MCPStubServerA": agent_a, "MCPStubServerB": agent_b}.get(r['mcp_server'])
+        central_agent.agent_squad.enrich_and_solve_many = MagicMock(return_value=[
+            {"solved": True, "result": "Squad fixed A"},
+            {"solved": False},
+        ])
+
+        client_requests = [
+            {"mcp_server": "MCPStubServerA", "data": 1},
+            {"mcp_server": "MCPStubServerB", "data": 2},
+            {"data": "missing server"},
+            {"mcp_server": "UnknownServer", "data": 4},
+            {"mcp_server": "MCPStubServerA", "data": 5},
+        ]
+        responses = central_agent.handle_client_requests(iter(client_requests))
+
+        agent_a.perform_tasks.assert_called_once_with([client_requests[0], client_requests[4]], deadline=None)
+        agent_b.perform_tasks.assert_called_once_with([client_requests[1]], deadline=None)
+        central_agent.agent_squad.enrich_and_solve_many.assert_called_once()
+        (escalations,), kwargs = central_agent.agent_squad.enrich_and_solve_many.call_args
+        self.assertEqual(kwargs, {"deadline": None})
+        self.assertEqual(
+            [(e.original_request, e.cause, e.error) for e in escalations],
+            [(client_requests[4], AGENT_FAILED, "A failed"), (client_requests[3], NO_AGENT, "No specialized agent for this MCP.")],
+        )
+        self.assertEqual([stage for stage, _ in escalations[0].stage_timings], ["perform_tasks"])
+        self.assertEqual(responses, [
+            {"success": True, "data": "A1"},
+            {"success": True, "data": "B1"},
+            {"success": False, "error": "Invalid request: Missing 'mcp_server' key in request."},
+            {"success": False, "error": "Task could not be resolved by AgentSquad after direct escalation"},
+            {"success": True, "data": "Squad fixed A"},
+        ])
+
+    def test_handle_client_requests_without_failures_skips_squad(self):
+        central_agent = CentralAgent()
+        central_agent.agent_squad.enrich_and_solve_many = MagicMock()
+        responses = central_agent.handle_client_requests([{"mcp_server": "MCPStubServerB", "data": {"info": "x"}}])
+        self.assertTrue(responses[0]["success"])
+        central_agent.agent_squad.enrich_and_solve_many.assert_not_called()
+
+    def test_handle_client_requests_empty(self):
+        self.assertEqual(CentralAgent().handle_client_requests([]), [])
+
+class TestCentralAgentAsync(unittest.IsolatedAsyncioTestCase):
+
+    async def test_handle_client_request_async_invalid_request(self):
+        central_agent = CentralAgent()
+        response = await central_agent.handle_client_request_async({"data": "TaskData"})
+        self.assertFalse(response["success"])
+        self.assertEqual(response["error"], "Invalid request: Missing 'mcp_server' key in request.")
+
+    @patch.object(CentralAgent, 'identify_specialized_agent')
+    async def test_handle_client_request_async_specialized_agent_solves(self, mock_identify_agent):
+        mock_specialized_agent = MagicMock()
+        mock_specialized_agent.perform_task_async = AsyncMock(return_value={"solved": True, "result": "Specialized success"})
+        mock_identify_agent.return_value = mock_specialized_agent
+
+        central_agent = CentralAgent()
+        client_request = {"mcp_server": "MCPStubServerA", "data": "some data"}
+        response = await central_agent.handle_client_request_async(client_request)
+
+        self.assertEqual(response, {"success": True, "data": "Specialized success"})
+        mock_specialized_agent.perform_task_async.assert_awaited_once_with(client_request, deadline=None)
+        mock_specialized_agent.perform_task.assert_not_called()
+
+    @patch.object(CentralAgent, 'identify_specialized_agent')
+    async def test_handle_client_request_async_specialized_fails_squad_solves(self, mock_identify_agent):
+        mock_specialized_agent = MagicMock()
+        specialized_failure_response = {"solved": False, "error": "Specialized failed", "partial_data": "partial"}
+        mock_specialized_agent.perform_task_async = AsyncMock(return_value=specialized_failure_response)
+        mock_identify_agent.return_value = mock_specialized_agent
+
+        central_agent = CentralAgent()
+        central_agent.agent_squad.enrich_and_solve_async = AsyncMock(return_value={"solved": True, "result": "Squad success"})
+
+        client_request = {"mcp_server": "MCPStubServerA", "data": "some data"}
+        response = await central_agent.handle_client_request_async(client_request)
+
+        self.assertEqual(response, {"success": True, "data": "Squad success"})
+        central_agent.agent_squad.enrich_and_solve_async.assert_awaited_once()
+        assert_escalated(self, central_agent.agent_squad.enrich_and_solve_async, client_request, AGENT_FAILED, "Specialized failed")
 
+    @patch.object(CentralAgent, 'identify_specialized_agent', return_value=None)
+    async def test_handle_client_request_async_no_specialized_agent_squad_fails(self, mock_identify_agent):
+        central_agent = CentralAgent()
+        central_agent.agent_squad.enrich_and_solve_async = AsyncMock(return_value={"solved": False})
+
+        client_request = {"mcp_server": "UnknownServer", "data": "some data"}
+        response = await central_agent.handle_client_request_async(client_request)
+
+        self.assertFalse(response["success"])
+        self.assertEqual(response["error"], "Task could not be resolved by AgentSquad after direct escalation")
 
 if __name__ == '__main__':
     unittest.main()
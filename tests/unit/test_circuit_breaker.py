@@ -0,0 +1,173 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+from agents.central_agent import CentralAgent
+from agents.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakerRegistry
+from agents.specialized_agents import SpecializedAgentA
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(
+            "MCPStubServerA", failure_threshold=0.5, window_size=4, min_calls=4, open_duration=10, clock=self.clock
+        )
+
+    def trip(self):
+        for _ in range(4):
+            self.assertTrue(self.breaker.allow())
+            self.breaker.record(False)
+
+    def test_opens_at_failure_rate_once_window_has_enough_calls(self):
+        self.breaker.record(False)
+        self.breaker.record(False)
+        self.breaker.record(False)
+        self.assertEqual(self.breaker.state, CLOSED)  # 3 calls < min_calls
+        self.breaker.record(True)
+        self.assertEqual(self.breaker.state, OPEN)  # 3/4 failures
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.stats()["rejected"], 1)
+        self.assertEqual(self.breaker.stats()["times_opened"], 1)
+
+    def test_window_slides(self):
+        for success in (False, True, True, True, False, True, True, True):
+            self.breaker.record(success)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.breaker.stats()["window_failures"], 1)
+
+    def test_half_open_probe_closes_on_success(self):
+        self.trip()
+        self.clock.now = 10
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())  # only one probe at a time
+        self.breaker.record(True)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertTrue(self.breaker.allow())
+
+    def test_half_open_probe_failure_reopens(self):
+        self.trip()
+        self.clock.now = 10
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record(False)
+        self.assertEqual(self.breaker.state, OPEN)
+        self.clock.now = 15
+        self.assertFalse(self.breaker.allow())
+        self.clock.now = 20
+        self.assertTrue(self.breaker.allow())
+
+    def test_lost_probe_releases_its_slot(self):
+        self.trip()
+        self.clock.now = 10
+        self.assertTrue(self.breaker.allow())  # outcome never recorded
+        self.clock.now = 19
+        self.assertFalse(self.breaker.allow())
+        self.clock.now = 20
+        self.assertTrue(self.breaker.allow())
+
+    def test_released_probe_frees_its_slot_without_an_outcome(self):
+        self.trip()
+        self.clock.now = 10
+        self.assertTrue(self.breaker.allow())
+        self.breaker.release()  # e.g. the call was rate limited
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record(True)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.breaker.release()
+        self.assertEqual(self.breaker.stats()["window_calls"], 0)
+
+    def test_invalid_settings(self):
+        with self.assertRaises(ValueError):
+            CircuitBreaker("x", failure_threshold=0)
+        with self.assertRaises(ValueError):
+            CircuitBreaker("x", window_size=0)
+
+
+class TestCircuitBreakerRegistry(unittest.TestCase):
+
+    def test_defaults_overrides_and_disable(self):
+        registry = CircuitBreakerRegistry(window_size=8)
+        registry.configure("MCPStubServerA", min_calls=2)
+        self.assertEqual(registry.get("MCPStubServerA").window_size, 8)
+        self.assertEqual(registry.get("MCPStubServerA").min_calls, 2)
+        self.assertEqual(registry.get("MCPStubServerB").min_calls, 8)  # capped at window_size
+        registry.disable("MCPStubServerA")
+        self.assertIsNone(registry.get("MCPStubServerA"))
+        for _ in range(10):
+            registry.record("MCPStubServerA", False)
+        self.assertTrue(registry.allow("MCPStubServerA"))
+        self.assertEqual(set(registry.stats()), {"MCPStubServerB"})
+
+
+class TestCentralAgentCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.central_agent = CentralAgent(
+            circuit_breaker_settings={"MCPStubServerA": {"window_size": 3, "min_calls": 3, "open_duration": 60}},
+            coalesce_requests=False,
+        )
+        for index in range(3):
+            self.central_agent.handle_client_request({"mcp_server": "MCPStubServerA", "data": {"error": index}})
+
+    def test_open_circuit_skips_specialized_agent(self):
+        self.assertEqual(self.central_agent.circuit_breakers.get("MCPStubServerA").state, OPEN)
+        with patch.object(SpecializedAgentA, 'perform_task') as mock_perform_task:
+            response = self.central_agent.handle_client_request({"mcp_server": "MCPStubServerA", "data": "info"})
+        mock_perform_task.assert_not_called()
+        self.assertTrue(response["success"])
+        self.assertEqual(response["data"], "Enriched and solved by MCPStubServerC: info with comprehensive analysis")
+        self.assertEqual(self.central_agent.metrics.snapshot()["counters"]["circuit_breaker"]["MCPStubServerA"]["rejected"], 1)
+
+    def test_other_servers_unaffected(self):
+        response = self.central_agent.handle_client_request({"mcp_server": "MCPStubServerB", "data": "info"})
+        self.assertEqual(response["data"], "Processed data from MCPStubServerB: info")
+
+    def test_async_and_batch_paths_respect_open_circuit(self):
+        with patch.object(SpecializedAgentA, 'perform_task_async') as mock_perform_task_async, \
+                patch.object(SpecializedAgentA, 'perform_tasks') as mock_perform_tasks:
+            response = asyncio.run(self.central_agent.handle_client_request_async({"mcp_server": "MCPStubServerA", "data": "x"}))
+            responses = self.central_agent.handle_client_requests([{"mcp_server": "MCPStubServerA", "data": "y"}])
+        mock_perform_task_async.assert_not_called()
+        mock_perform_tasks.assert_not_called()
+        self.assertTrue(response["success"])
+        self.assertTrue(responses[0]["success"])
+
+    def test_probe_closes_circuit_after_recovery(self):
+        breaker = self.central_agent.circuit_breakers.get("MCPStubServerA")
+        breaker.clock = lambda: breaker._opened_at + 60
+        response = self.central_agent.handle_client_request({"mcp_server": "MCPStubServerA", "data": "ok"})
+        self.assertEqual(response["data"], "Processed data from MCPStubServerA: ok")
+        self.assertEqual(breaker.state, CLOSED)
+
+
+class TestPoolFailuresAndTheBreaker(unittest.TestCase):
+
+    def test_local_pool_failures_escalate_without_counting_against_the_server(self):
+        central_agent = CentralAgent(
+            circuit_breaker_settings={"MCPStubServerA": {"window_size": 3, "min_calls": 3}},
+            coalesce_requests=False,
+        )
+        central_agent.server_pools.configure("MCPStubServerA", max_size=1, acquire_timeout=0.01)
+        pool = central_agent.specialized_agent_a_instance.server_pool("MCPStubServerA")
+        pool.checkout()  # saturates the pool
+        request = {"mcp_server": "MCPStubServerA", "data": "x"}
+        for _ in range(3):
+            self.assertIn("Enriched and solved", central_agent.handle_client_request(request)["data"])
+        self.assertIn("Enriched and solved", central_agent.handle_client_requests([request])[0]["data"])
+        breaker = central_agent.circuit_breakers.get("MCPStubServerA")
+        self.assertEqual((breaker.state, breaker.stats()["window_calls"]), (CLOSED, 0))
+        self.assertEqual(central_agent.metrics.snapshot()["counters"]["mcp_calls"]["MCPStubServerA"], {"pool_exhausted": 4})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import functools
+import os
+import signal
+import threading
+import unittest
+from agents.central_agent import CentralAgent
+from agents.cluster import Cluster, ClusterError, ClusterFullError, HashRing, ShmRing
+
+
+class TestHashRing(unittest.TestCase):
+
+    def test_keys_spread_over_every_node(self):
+        ring = HashRing(range(4))
+        owners = [ring.node_for(f"key-{n}") for n in range(2000)]
+        for node in range(4):
+            self.assertGreater(owners.count(node), 250)
+
+    def test_removing_a_node_only_moves_its_keys(self):
+        ring = HashRing(range(4))
+        keys = [f"key-{n}" for n in range(1000)]
+        before = {key: ring.node_for(key) for key in keys}
+        ring.remove(2)
+        self.assertEqual(ring.nodes, {0, 1, 3})
+        for key in keys:
+            if before[key] != 2:
+                self.assertEqual(ring.node_for(key), before[key])
+
+    def test_empty_ring(self):
+        with self.assertRaises(ClusterError):
+            HashRing().node_for("key")
+
+
+class TestShmRing(unittest.TestCase):
+
+    def setUp(self):
+        self.ring = ShmRing(64)
+        self.addCleanup(self.ring.close)
+
+    def test_messages_wrap_around(self):
+        for n in range(50):
+            message = bytes([n]) * (n % 20 + 1)
+            self.ring.put(message)
+            self.assertEqual(self.ring.get(timeout=1), message)
+        self.assertIsNone(self.ring.get(timeout=0.01))
+
+    def test_full_ring_times_out(self):
+        self.ring.put(b"x" * 40)
+        with self.assertRaises(ClusterFullError):
+            self.ring.put(b"y" * 40, timeout=0.02)
+        with self.assertRaises(ValueError):
+            self.ring.put(b"z" * 100)
+
+    def test_producer_waits_for_the_consumer(self):
+        received = []
+
+        def consume():
+            for _ in range(100):
+                received.append(self.ring.get(timeout=5))
+
+        consumer = threading.Thread(target=consume)
+        consumer.start()
+        for n in range(100):
+            self.ring.put(str(n).encode() * 5, timeout=5)
+        consumer.join()
+        self.assertEqual(received, [str(n).encode() * 5 for n in range(100)])
+
+
+class TestCluster(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        factory = functools.partial(CentralAgent, result_cache_settings={"MCPStubServerA": {"ttl": 60}})
+        cls.cluster = Cluster(workers=2, agent_factory=factory, threads=4, ring_bytes=1 << 16)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.cluster.shutdown()
+
+    def test_requests_are_answered_by_worker_processes(self):
+        requests = [{"mcp_server": "MCPStubServerA", "data": {"id": n}} for n in range(40)]
+        responses = self.cluster.map(requests)
+        self.assertEqual(responses[7], {"success": True, "data": "Processed data from MCPStubServerA: {'id': 7}"})
+        self.assertTrue(all(response["success"] for response in responses))
+        invalid = self.cluster.handle_client_request({"mcp_server": "MCPStubServerA"})
+        self.assertFalse(invalid["success"])
+        self.assertTrue(self.cluster.handle_client_request({"mcp_server": "UnknownServer", "data": "x"})["success"])
+        pids = {worker["pid"] for worker in self.cluster.stats()["workers"]}
+        self.assertEqual(len(pids), 2)
+        self.assertNotIn(os.getpid(), pids)
+
+    def test_identical_requests_reach_the_same_worker(self):
+        first = {"mcp_server": "MCPStubServerA", "data": {"a": 1, "b": 2}}
+        reordered = {"mcp_server": "MCPStubServerA", "data": {"b": 2, "a": 1}}
+        self.assertEqual(self.cluster.worker_for(first), self.cluster.worker_for(reordered))
+        owners = {self.cluster.worker_for({"mcp_server": "MCPStubServerA", "data": n}) for n in range(50)}
+        self.assertEqual(owners, {0, 1})
+
+    def test_oversized_request_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.cluster.submit({"mcp_server": "MCPStubServerA", "data": "x" * (1 << 17)})
+        self.assertTrue(all(worker["pending"] == 0 for worker in self.cluster.stats()["workers"]))
+
+
+class TestClusterWorkerFailure(unittest.TestCase):
+
+    def test_dead_worker_leaves_the_ring(self):
+        cluster = Cluster(workers=2, threads=2, ring_bytes=1 << 16)
+        self.addCleanup(cluster.shutdown)
+        self.assertTrue(cluster.handle_client_request({"mcp_server": "MCPStubServerB", "data": 1})["success"])
+        victim = cluster.workers[0].process
+        os.kill(victim.pid, signal.SIGKILL)
+        victim.join(5)
+        cluster.workers[0].collector.join(5)
+        self.assertEqual(cluster.ring.nodes, {1})
+        self.assertFalse(cluster.stats()["workers"][0]["alive"])
+        responses = cluster.map([{"mcp_server": "MCPStubServerB", "data": n} for n in range(10)])
+        self.assertTrue(all(response["success"] for response in responses))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,207 @@
+import asyncio
+import itertools
+import time
+import unittest
+from agents.agent_squad import AgentSquad
+from agents.central_agent import CentralAgent
+from agents.deadline import Deadline, DeadlineExceeded, HedgePolicy, call_server, call_server_async
+from agents.metrics import MetricsRegistry
+from agents.server_pool import ServerPool
+from agents.specialized_agents import SpecializedAgentA
+from mcp_stubs.stub_servers import MCPStubServerA, MCPStubServerC
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def first_call_slow(slow=0.5):
+    # Latency for a stub shared by all sessions: the first call hangs, later ones are instant
+    calls = itertools.count()
+    return lambda: slow if next(calls) == 0 else 0.0
+
+
+class TestDeadline(unittest.TestCase):
+
+    def test_remaining_and_expired(self):
+        clock = FakeClock()
+        deadline = Deadline(2.0, clock=clock)
+        self.assertEqual(deadline.remaining(), 2.0)
+        clock.now = 1.5
+        self.assertAlmostEqual(deadline.remaining(), 0.5)
+        self.assertFalse(deadline.expired())
+        clock.now = 3.0
+        self.assertEqual(deadline.remaining(), 0.0)
+        self.assertTrue(deadline.expired())
+
+
+class TestHedgePolicy(unittest.TestCase):
+
+    def test_delay_follows_quantile_and_is_clamped(self):
+        clock = FakeClock()
+        metrics = MetricsRegistry(buckets=(0.001, 0.01, 0.1, 10.0))
+        policy = HedgePolicy(quantile=0.95, min_delay=0.002, max_delay=1.0, refresh_interval=5, clock=clock)
+        self.assertEqual(policy.delay(metrics, "mcp_solve", "MCPStubServerA"), 0.002)  # no samples yet
+
+        for _ in range(100):
+            metrics.observe_ns("mcp_solve", "MCPStubServerA", 50_000_000)
+        self.assertEqual(policy.delay(metrics, "mcp_solve", "MCPStubServerA"), 0.002)  # cached
+        clock.now = 5
+        self.assertEqual(policy.delay(metrics, "mcp_solve", "MCPStubServerA"), 0.1)
+
+        for _ in range(1000):
+            metrics.observe_ns("mcp_solve", "MCPStubServerA", 5_000_000_000)
+        clock.now = 10
+        self.assertEqual(policy.delay(metrics, "mcp_solve", "MCPStubServerA"), 1.0)
+
+
+class TestCallServer(unittest.TestCase):
+
+    def test_without_deadline_calls_directly(self):
+        pool = ServerPool("MCPStubServerA", lambda: MCPStubServerA("MCPStubServerA"))
+        response = call_server(pool, lambda server: server.solve("x"))
+        self.assertEqual(response["data"], "Processed data from MCPStubServerA: x")
+
+    def test_deadline_bounds_a_hung_call(self):
+        pool = ServerPool("MCPStubServerA", lambda: MCPStubServerA("MCPStubServerA", latency=0.5))
+        start = time.monotonic()
+        with self.assertRaises(DeadlineExceeded):
+            call_server(pool, lambda server: server.solve("x"), Deadline(0.05))
+        self.assertLess(time.monotonic() - start, 0.3)
+
+    def test_expired_deadline_skips_the_call(self):
+        pool = ServerPool("MCPStubServerA", lambda: self.fail("no session should be created"))
+        with self.assertRaises(DeadlineExceeded):
+            call_server(pool, lambda server: server.solve("x"), Deadline(0))
+
+    def test_server_errors_propagate(self):
+        pool = ServerPool("MCPStubServerA", lambda: MCPStubServerA("MCPStubServerA"))
+
+        def invoke(server):
+            raise ValueError("transport error")
+
+        with self.assertRaises(ValueError):
+            call_server(pool, invoke, Deadline(1))
+
+    def test_hedge_answers_when_first_call_is_slow(self):
+        server = MCPStubServerA("MCPStubServerA", latency=first_call_slow())
+        pool = ServerPool("MCPStubServerA", lambda: server)
+        hedges = []
+        start = time.monotonic()
+        response = call_server(pool, lambda session: session.solve("x"), Deadline(2), hedge_delay=0.02,
+                               on_hedge=lambda: hedges.append(1))
+        self.assertLess(time.monotonic() - start, 0.3)
+        self.assertTrue(response["success"])
+        self.assertEqual(hedges, [1])
+
+    def test_no_hedge_when_first_call_is_fast(self):
+        pool = ServerPool("MCPStubServerA", lambda: MCPStubServerA("MCPStubServerA"))
+        hedges = []
+        call_server(pool, lambda session: session.solve("x"), None, hedge_delay=0.5, on_hedge=lambda: hedges.append(1))
+        self.assertEqual(hedges, [])
+
+
+class TestCallServerAsync(unittest.IsolatedAsyncioTestCase):
+
+    async def test_deadline_bounds_a_hung_call(self):
+        pool = ServerPool("MCPStubServerA", lambda: MCPStubServerA("MCPStubServerA", latency=0.5))
+        start = time.monotonic()
+        with self.assertRaises(DeadlineExceeded):
+            await call_server_async(pool, lambda server: server.solve_async("x"), Deadline(0.05))
+        self.assertLess(time.monotonic() - start, 0.3)
+        self.assertEqual(pool.stats()["in_use"], 0)  # the cancelled call released its session
+
+    async def test_hedge_answers_and_loser_is_cancelled(self):
+        server = MCPStubServerA("MCPStubServerA", latency=first_call_slow())
+        pool = ServerPool("MCPStubServerA", lambda: server)
+        hedges = []
+        response = await call_server_async(pool, lambda session: session.solve_async("x"), Deadline(2),
+                                           hedge_delay=0.02, on_hedge=lambda: hedges.append(1))
+        self.assertTrue(response["success"])
+        self.assertEqual(hedges, [1])
+        self.assertEqual(pool.stats()["in_use"], 0)
+
+
+class TestDeadlinePropagation(unittest.TestCase):
+
+    def test_specialized_agent_times_out(self):
+        agent = SpecializedAgentA(allowed_mcp_servers=["MCPStubServerA"])
+        agent.create_server = lambda target: MCPStubServerA(target, latency=0.5)
+        response = agent.perform_task({"mcp_server": "MCPStubServerA", "data": "x"}, deadline=Deadline(0.05))
+        self.assertFalse(response["solved"])
+        self.assertEqual(response["error"], "MCPStubServerA did not answer before the deadline.")
+        self.assertEqual(agent.metrics.snapshot()["counters"]["mcp_calls"]["MCPStubServerA"], {"timeout": 1})
+
+    def test_squad_times_out(self):
+        squad = AgentSquad()
+        squad.create_server = lambda: MCPStubServerC("MCPStubServerC", latency=0.5)
+        response = squad.enrich_and_solve({"partial_data": {"data": "x"}}, deadline=Deadline(0.05))
+        self.assertEqual(response, {"solved": False, "error": "AgentSquad did not finish before the deadline."})
+
+    def test_request_is_bounded_by_its_deadline(self):
+        central_agent = CentralAgent(request_timeout=5.0)
+        central_agent.specialized_agent_a_instance.create_server = lambda target: MCPStubServerA(target, latency=0.5)
+        start = time.monotonic()
+        response = central_agent.handle_client_request({"mcp_server": "MCPStubServerA", "data": "x"}, timeout=0.1)
+        self.assertLess(time.monotonic() - start, 0.4)
+        self.assertFalse(response["success"])
+
+    def test_deadline_reaches_the_squad(self):
+        central_agent = CentralAgent(request_timeout=0.1)
+        central_agent.agent_squad.create_server = lambda: MCPStubServerC("MCPStubServerC", latency=0.5)
+        response = central_agent.handle_client_request({"mcp_server": "MCPStubServerA", "data": {"error": "boom"}})
+        self.assertEqual(response, {"success": False, "error": "AgentSquad did not finish before the deadline."})
+
+    def test_escalation_skipped_when_budget_is_low(self):
+        central_agent = CentralAgent(request_timeout=0.1, min_escalation_budget=0.08)
+        central_agent.specialized_agent_a_instance.create_server = lambda target: MCPStubServerA(target, latency=0.5)
+        central_agent.agent_squad.enrich_and_solve = lambda *args, **kwargs: self.fail("escalation should be skipped")
+        response = central_agent.handle_client_request({"mcp_server": "MCPStubServerA", "data": "x"})
+        self.assertEqual(response, {"success": False, "error": "Deadline exceeded before escalation to AgentSquad."})
+        counters = central_agent.metrics.snapshot()["counters"]
+        self.assertEqual(counters["deadline"]["MCPStubServerA"], {"escalation_skipped": 1})
+        self.assertEqual(counters["requests"]["MCPStubServerA"], {"failed": 1})
+
+    def test_async_request_deadline(self):
+        central_agent = CentralAgent(min_escalation_budget=0.08)
+        central_agent.specialized_agent_a_instance.create_server = lambda target: MCPStubServerA(target, latency=0.5)
+        response = asyncio.run(central_agent.handle_client_request_async({"mcp_server": "MCPStubServerA", "data": "x"}, timeout=0.1))
+        self.assertEqual(response["error"], "Deadline exceeded before escalation to AgentSquad.")
+
+    def test_batch_request_deadline(self):
+        central_agent = CentralAgent(request_timeout=0.1, min_escalation_budget=0.08)
+        central_agent.specialized_agent_a_instance.create_server = lambda target: MCPStubServerA(target, latency=0.5)
+        central_agent.agent_squad.enrich_and_solve_many = lambda *args, **kwargs: self.fail("escalation should be skipped")
+        start = time.monotonic()
+        responses = central_agent.handle_client_requests([{"mcp_server": "MCPStubServerA", "data": i} for i in range(3)])
+        self.assertLess(time.monotonic() - start, 0.4)
+        self.assertEqual(responses, [{"success": False, "error": "Deadline exceeded before escalation to AgentSquad."}] * 3)
+        counters = central_agent.metrics.snapshot()["counters"]
+        self.assertEqual(counters["mcp_calls"]["MCPStubServerA"], {"timeout": 3})
+
+    def test_batch_deadline_reaches_the_squad(self):
+        central_agent = CentralAgent()
+        central_agent.agent_squad.create_server = lambda: MCPStubServerC("MCPStubServerC", latency=0.5)
+        start = time.monotonic()
+        responses = central_agent.handle_client_requests(
+            [{"mcp_server": "MCPStubServerA", "data": {"error": True}}, {"mcp_server": "Unknown", "data": "x"}],
+            timeout=0.1,
+        )
+        self.assertLess(time.monotonic() - start, 0.4)
+        self.assertEqual(responses, [{"success": False, "error": "AgentSquad did not finish before the deadline."}] * 2)
+
+    def test_hedged_server_through_central_agent(self):
+        central_agent = CentralAgent(hedge_settings={"MCPStubServerA": {"min_delay": 0.02}})
+        server = MCPStubServerA("MCPStubServerA", latency=first_call_slow())
+        central_agent.specialized_agent_a_instance.create_server = lambda target: server
+        response = central_agent.handle_client_request({"mcp_server": "MCPStubServerA", "data": "x"}, timeout=2)
+        self.assertEqual(response, {"success": True, "data": "Processed data from MCPStubServerA: x"})
+        self.assertEqual(central_agent.metrics.snapshot()["counters"]["hedges"]["MCPStubServerA"], {"sent": 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
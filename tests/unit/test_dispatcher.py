@@ -0,0 +1,207 @@
+import threading
+import time
+import unittest
+from agents import dispatcher as dispatcher_module
+from agents.central_agent import CentralAgent
+from agents.dispatcher import Dispatcher, DispatcherFullError
+from agents.scheduler import HIGH, LOW
+from mcp_stubs.stub_servers import MCPStubServerA, MCPStubServerC
+
+
+class ConcurrencyTrackingServerA(MCPStubServerA):
+    lock = threading.Lock()
+    active = 0
+    peak = 0
+
+    def solve(self, task_data):
+        cls = ConcurrencyTrackingServerA
+        with cls.lock:
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        try:
+            return super().solve(task_data)
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+
+def slow_agent_factory():
+    central_agent = CentralAgent(coalesce_requests=False)
+    central_agent.specialized_agent_a_instance.create_server = (
+        lambda target: ConcurrencyTrackingServerA(target, latency=0.02)
+    )
+    return central_agent
+
+
+def slow_squad_factory():
+    central_agent = CentralAgent(coalesce_requests=False)
+    central_agent.agent_squad.create_server = lambda: MCPStubServerC("MCPStubServerC", latency=0.1)
+    return central_agent
+
+
+CLIENT_REQUESTS = [
+    {"mcp_server": "MCPStubServerA", "data": {"info": "task for A"}},
+    {"mcp_server": "MCPStubServerB", "data": {"info": "task for B"}},
+    {"mcp_server": "MCPStubServerA", "data": {"payload": "complex task for A", "error": True}},
+    {"mcp_server": "MCPStubServerUnknown", "data": {"info": "direct task for squad"}},
+    {"mcp_server": "MCPStubServerA"},
+]
+
+
+class TestDispatcher(unittest.TestCase):
+
+    def setUp(self):
+        ConcurrencyTrackingServerA.active = 0
+        ConcurrencyTrackingServerA.peak = 0
+        self.expected = [CentralAgent().handle_client_request(r) for r in CLIENT_REQUESTS]
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            Dispatcher(mode="fibers")
+
+    def test_inline_mode(self):
+        with Dispatcher(mode="inline") as dispatcher:
+            future = dispatcher.submit(CLIENT_REQUESTS[0])
+            self.assertTrue(future.done())
+            self.assertEqual(dispatcher.map(CLIENT_REQUESTS), self.expected)
+
+    def test_thread_mode(self):
+        with Dispatcher(mode="thread", max_workers=4) as dispatcher:
+            self.assertEqual(dispatcher.map(CLIENT_REQUESTS), self.expected)
+
+    def test_process_mode(self):
+        with Dispatcher(mode="process", max_workers=2) as dispatcher:
+            self.assertEqual(dispatcher.map(CLIENT_REQUESTS), self.expected)
+
+    def test_worker_agent_is_built_once(self):
+        calls = []
+        dispatcher_module._init_worker(lambda: calls.append(1) or CentralAgent())
+        try:
+            for client_request in CLIENT_REQUESTS:
+                dispatcher_module._handle_in_worker(client_request)
+            self.assertEqual(len(calls), 1)
+        finally:
+            dispatcher_module._worker_agent = None
+
+    def test_limits_come_from_routing_table(self):
+        with Dispatcher(mode="inline") as dispatcher:
+            self.assertEqual(dispatcher.server_concurrency_limits, {"MCPStubServerA": 16, "MCPStubServerB": 16})
+
+    def test_per_server_concurrency_limit(self):
+        with Dispatcher(mode="thread", max_workers=16, agent_factory=slow_agent_factory,
+                        server_concurrency_limits={"MCPStubServerA": 2}) as dispatcher:
+            slow = [dispatcher.submit({"mcp_server": "MCPStubServerA", "data": {"n": i}}) for i in range(10)]
+            self.assertGreater(dispatcher.stats()["waiting"].get("MCPStubServerA", 0), 0)
+            # Requests for other servers are not stuck behind the saturated one
+            start = time.perf_counter()
+            fast = dispatcher.submit({"mcp_server": "MCPStubServerB", "data": {"info": "x"}})
+            self.assertTrue(fast.result(timeout=1)["success"])
+            self.assertLess(time.perf_counter() - start, 0.05)
+            self.assertTrue(all(future.result(timeout=2)["success"] for future in slow))
+        self.assertEqual(ConcurrencyTrackingServerA.peak, 2)
+
+    def test_bounded_queue_fails_fast(self):
+        with Dispatcher(mode="thread", max_workers=1, max_queue=2, agent_factory=slow_agent_factory) as dispatcher:
+            first = dispatcher.submit({"mcp_server": "MCPStubServerA", "data": {"n": 1}})
+            second = dispatcher.submit({"mcp_server": "MCPStubServerA", "data": {"n": 2}})
+            with self.assertRaises(DispatcherFullError):
+                dispatcher.submit({"mcp_server": "MCPStubServerA", "data": {"n": 3}})
+            first.result(timeout=1)
+            second.result(timeout=1)
+            # Slots are released once requests complete
+            self.assertTrue(dispatcher.submit({"mcp_server": "MCPStubServerB", "data": "x"}).result(timeout=1)["success"])
+
+
+class TestDispatcherScheduling(unittest.TestCase):
+
+    def run_in_order(self, dispatcher, submissions):
+        # Occupies the only worker, queues every submission behind it and returns the
+        # completion order of the queued ones
+        order = []
+        blocker = dispatcher.submit({"mcp_server": "MCPStubServerA", "data": {"n": "blocker"}})
+        futures = []
+        for label, kwargs in submissions:
+            future = dispatcher.submit({"mcp_server": "MCPStubServerB", "data": {"label": label}}, **kwargs)
+            future.add_done_callback(lambda _, label=label: order.append(label))
+            futures.append(future)
+        blocker.result(timeout=2)
+        for future in futures:
+            future.result(timeout=2)
+        return order
+
+    def test_priority_classes(self):
+        with Dispatcher(mode="thread", max_workers=1, agent_factory=slow_agent_factory) as dispatcher:
+            order = self.run_in_order(dispatcher, [
+                ("low", {"priority": LOW}), ("normal", {}), ("high", {"priority": HIGH}),
+            ])
+        self.assertEqual(order, ["high", "normal", "low"])
+
+    def test_unknown_priority(self):
+        with Dispatcher(mode="inline") as dispatcher:
+            with self.assertRaises(ValueError):
+                dispatcher.submit(CLIENT_REQUESTS[0], priority="urgent")
+
+    def test_flooding_tenant_does_not_delay_others(self):
+        with Dispatcher(mode="thread", max_workers=1, agent_factory=slow_agent_factory) as dispatcher:
+            flood = [(f"flood-{index}", {"tenant": "noisy"}) for index in range(6)]
+            order = self.run_in_order(dispatcher, flood + [("quiet", {"tenant": "quiet"})])
+        self.assertLess(order.index("quiet"), 2)
+
+    def test_queue_wait_and_depth_metrics(self):
+        with Dispatcher(mode="thread", max_workers=1, agent_factory=slow_agent_factory) as dispatcher:
+            futures = [dispatcher.submit({"mcp_server": "MCPStubServerA", "data": {"n": i}}) for i in range(3)]
+            gauges = dispatcher.metrics.snapshot()["gauges"]
+            self.assertEqual(gauges["scheduler_queue_depth"], {"MCPStubServerA": {"normal": 2}})
+            self.assertEqual(dispatcher.stats()["queued"], {"normal": 2})
+            self.assertIn('agents_scheduler_queue_depth{server="MCPStubServerA",lane="normal"} 2',
+                          dispatcher.metrics.to_prometheus())
+            for future in futures:
+                future.result(timeout=2)
+            histograms = dispatcher.metrics.snapshot()["histograms"]
+            self.assertEqual(histograms["queue_wait"]["MCPStubServerA"]["count"], 3)
+        self.assertNotIn("scheduler_queue_depth", dispatcher.metrics.snapshot()["gauges"])
+
+    def test_escalation_lane_keeps_primary_workers_free(self):
+        with Dispatcher(mode="thread", max_workers=2, agent_factory=slow_squad_factory, max_escalations=1) as dispatcher:
+            escalated = [
+                dispatcher.submit({"mcp_server": "MCPStubServerUnknown", "data": {"n": i}}) for i in range(3)
+            ]
+            time.sleep(0.02)
+            start = time.perf_counter()
+            primary = dispatcher.submit({"mcp_server": "MCPStubServerA", "data": {"info": "x"}})
+            self.assertTrue(primary.result(timeout=1)["success"])
+            self.assertLess(time.perf_counter() - start, 0.05)
+            self.assertEqual(dispatcher.stats()["escalations"]["running"], 1)
+            self.assertTrue(all(future.result(timeout=2)["success"] for future in escalated))
+            waits = dispatcher.metrics.snapshot()["histograms"]["escalation_queue_wait"]
+            self.assertEqual(waits["unrouted"]["count"], 3)
+
+    def test_full_escalation_lane_fails_fast(self):
+        with Dispatcher(mode="thread", max_workers=4, agent_factory=slow_squad_factory,
+                        max_escalations=1, max_escalation_queue=1) as dispatcher:
+            futures = [dispatcher.submit({"mcp_server": "MCPStubServerUnknown", "data": {"n": i}}) for i in range(4)]
+            responses = [future.result(timeout=2) for future in futures]
+        rejected = [response for response in responses if not response["success"]]
+        self.assertEqual(len(rejected), 2)
+        self.assertEqual(rejected[0]["error"], "Escalation lane is full.")
+        self.assertEqual(dispatcher.stats()["escalations"]["rejected"], 2)
+        counters = dispatcher.metrics.snapshot()["counters"]
+        self.assertEqual(counters["scheduler"]["unrouted"]["escalation_rejected"], 2)
+
+    def test_escalation_lane_matches_direct_handling(self):
+        expected = [CentralAgent().handle_client_request(r) for r in CLIENT_REQUESTS]
+        for mode in ("thread", "process"):
+            with self.subTest(mode=mode):
+                with Dispatcher(mode=mode, max_workers=2, max_escalations=2) as dispatcher:
+                    self.assertEqual(dispatcher.map(CLIENT_REQUESTS), expected)
+
+    def test_shutdown_finishes_running_escalations(self):
+        dispatcher = Dispatcher(mode="thread", max_workers=2, agent_factory=slow_squad_factory, max_escalations=1)
+        futures = [dispatcher.submit({"mcp_server": "MCPStubServerUnknown", "data": {"n": i}}) for i in range(2)]
+        time.sleep(0.02)
+        dispatcher.shutdown()
+        self.assertTrue(all(future.result(timeout=0)["success"] for future in futures))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import pickle
+import unittest
+from unittest.mock import MagicMock, patch
+from agents.agent_squad import AgentSquad
+from agents.central_agent import CentralAgent
+from agents.escalation import AGENT_FAILED, CIRCUIT_OPEN, Escalation
+
+
+class TestEscalation(unittest.TestCase):
+
+    def test_refers_to_the_original_request(self):
+        client_request = {"mcp_server": "MCPStubServerA", "data": {"blob": "x" * 1000}}
+        escalation = Escalation(client_request, AGENT_FAILED, "boom", (("perform_task", 1500),))
+        self.assertIs(escalation.original_request, client_request)
+        self.assertIs(escalation.data, client_request["data"])
+        self.assertEqual(escalation.mcp_server, "MCPStubServerA")
+        self.assertEqual(escalation.stage_time_ns("perform_task"), 1500)
+        self.assertIsNone(escalation.stage_time_ns("validate"))
+
+    def test_is_immutable_and_compact(self):
+        escalation = Escalation({"mcp_server": "A", "data": 1}, AGENT_FAILED)
+        with self.assertRaises(AttributeError):
+            escalation.cause = CIRCUIT_OPEN
+        self.assertFalse(hasattr(escalation, "__dict__"))
+
+    def test_pickles_by_value(self):
+        escalation = Escalation({"mcp_server": "MCPStubServerA", "data": 1}, AGENT_FAILED, "boom", (("perform_task", 5),))
+        copy = pickle.loads(pickle.dumps(escalation))
+        self.assertEqual(copy.to_dict(), escalation.to_dict())
+
+    def test_to_dict(self):
+        escalation = Escalation({"mcp_server": "A", "data": 1}, AGENT_FAILED, "boom", (("perform_task", 7),))
+        self.assertEqual(escalation.to_dict(), {
+            "original_request": {"mcp_server": "A", "data": 1},
+            "cause": AGENT_FAILED,
+            "error": "boom",
+            "stage_timings": {"perform_task": 7},
+        })
+
+
+class TestSquadReadsEscalation(unittest.TestCase):
+
+    @patch('agents.agent_squad.MCPStubServerC')
+    def test_payload_is_passed_through_as_is(self, MockMCPStubServerC):
+        mock_server_c_instance = MockMCPStubServerC.return_value
+        mock_server_c_instance.enrich_and_solve.return_value = {"success": True, "data": "ok"}
+        squad = AgentSquad(squad_name="TestSquad")
+
+        # A payload with its own 'data' key is no longer mistaken for a nesting level
+        data = {"data": "inner", "other": 1}
+        response = squad.enrich_and_solve(Escalation({"mcp_server": "X", "data": data}, AGENT_FAILED, "boom"))
+
+        self.assertEqual(response, {"solved": True, "result": "ok"})
+        mock_server_c_instance.enrich_and_solve.assert_called_once_with(data)
+
+    def test_central_agent_records_cause_and_timings(self):
+        central_agent = CentralAgent(circuit_breaker_settings={"MCPStubServerA": {"min_calls": 1, "window_size": 1}})
+        central_agent.agent_squad.enrich_and_solve = MagicMock(return_value={"solved": True, "result": "squad"})
+        failing_agent = MagicMock()
+        failing_agent.perform_task.return_value = {"solved": False, "error": "A failed"}
+        central_agent.identify_specialized_agent = lambda request: failing_agent
+        client_request = {"mcp_server": "MCPStubServerA", "data": "d"}
+
+        central_agent.handle_client_request(client_request)
+        escalation = central_agent.agent_squad.enrich_and_solve.call_args.args[0]
+        self.assertEqual(escalation.cause, AGENT_FAILED)
+        self.assertGreaterEqual(escalation.stage_time_ns("perform_task"), 0)
+
+        # The failure opened the circuit, so the next request skips the agent
+        central_agent.handle_client_request(client_request)
+        escalation = central_agent.agent_squad.enrich_and_solve.call_args.args[0]
+        self.assertEqual((escalation.cause, escalation.error), (CIRCUIT_OPEN, "Circuit open for MCPStubServerA."))
+        self.assertEqual(escalation.stage_timings, ())
+        failing_agent.perform_task.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+from agents.central_agent import CentralAgent
+from agents.escalation import AGENT_FAILED, NO_AGENT, Escalation
+from agents.escalation_log import SEGMENT_SUFFIX, EscalationLog, EscalationLogError
+from agents.escalation_queue import EscalationQueue
+
+
+class LogTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self._directory.cleanup)
+        self.directory = self._directory.name
+
+    def open_log(self, **settings):
+        log = EscalationLog(self.directory, **settings)
+        self.addCleanup(log.close)
+        return log
+
+    def segments(self):
+        return sorted(name for name in os.listdir(self.directory) if name.endswith(SEGMENT_SUFFIX))
+
+
+class TestEscalationLog(LogTestCase):
+
+    def test_unacked_entries_are_recovered_in_order(self):
+        log = self.open_log()
+        ids = [log.append({"n": n}) for n in range(5)]
+        log.ack(ids[1])
+        log.ack(ids[3])
+        log.close()
+        reopened = self.open_log()
+        self.assertEqual(reopened.pending(), [(ids[0], {"n": 0}), (ids[2], {"n": 2}), (ids[4], {"n": 4})])
+        self.assertEqual(reopened.pending(), [])
+        # Ids keep increasing across restarts
+        self.assertGreater(reopened.append({"n": 5}), ids[-1])
+
+    def test_torn_tail_is_ignored(self):
+        log = self.open_log()
+        log.append({"n": 1})
+        log.append({"n": 2})
+        log.close()
+        (segment,) = self.segments()
+        path = os.path.join(self.directory, segment)
+        with open(path, "r+b") as segment_file:
+            segment_file.truncate(os.path.getsize(path) - 3)
+        self.assertEqual([record for _, record in self.open_log().pending()], [{"n": 1}])
+
+    def test_segments_rotate_and_are_removed_oldest_first(self):
+        log = self.open_log(segment_bytes=64)
+        ids = [log.append({"payload": "x" * 40}) for _ in range(4)]
+        self.assertGreaterEqual(len(self.segments()), 4)
+        # The newer segments are fully acknowledged, but the oldest still holds an entry
+        for entry_id in ids[1:]:
+            log.ack(entry_id)
+        self.assertEqual(log.stats()["segments_removed"], 0)
+        log.ack(ids[0])
+        self.assertEqual(log.stats()["unacked"], 0)
+        self.assertEqual(len(self.segments()), 1)
+        log.close()
+        self.assertEqual(self.open_log().pending(), [])
+
+    def test_concurrent_appends_share_fsyncs(self):
+        log = self.open_log(sync_interval=0.005)
+        ids = []
+
+        def append():
+            for n in range(20):
+                ids.append(log.append({"n": n}))
+
+        threads = [threading.Thread(target=append) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = log.stats()
+        self.assertEqual(len(set(ids)), 160)
+        self.assertEqual(stats["appended"], 160)
+        self.assertLess(stats["syncs"], 160)
+
+    def test_closed_log_rejects_appends(self):
+        log = self.open_log()
+        log.close()
+        with self.assertRaises(EscalationLogError):
+            log.append({"n": 1})
+
+
+class TestEscalationQueue(LogTestCase):
+
+    def test_results_by_callback_and_poll(self):
+        delivered = {}
+        done = threading.Event()
+
+        def on_result(escalation_id, response):
+            delivered[escalation_id] = response
+            done.set()
+
+        queue = EscalationQueue(lambda escalation: {"success": True, "data": escalation.data}, self.open_log(),
+                                workers=2, on_result=on_result)
+        escalation_id = queue.submit(Escalation({"mcp_server": "MCPStubServerA", "data": "x"}, AGENT_FAILED))
+        self.assertEqual(queue.result(escalation_id, timeout=5), {"success": True, "data": "x"})
+        self.assertTrue(done.wait(5))
+        self.assertEqual(delivered[escalation_id], {"success": True, "data": "x"})
+        self.assertEqual(queue.poll(escalation_id), {"success": True, "data": "x"})
+        with self.assertRaises(KeyError):
+            queue.poll(escalation_id + 1)
+        queue.close()
+        self.assertEqual(queue.stats()["log"]["unacked"], 0)
+
+    def test_handler_errors_become_failed_responses(self):
+        def handler(escalation):
+            raise RuntimeError("squad down")
+
+        queue = EscalationQueue(handler, self.open_log())
+        escalation_id = queue.submit(Escalation({"mcp_server": "x", "data": 1}, NO_AGENT))
+        response = queue.result(escalation_id, timeout=5)
+        self.assertFalse(response["success"])
+        self.assertIn("squad down", response["error"])
+        queue.close()
+
+    def test_completed_results_are_bounded(self):
+        queue = EscalationQueue(lambda escalation: {"success": True}, self.open_log(), workers=1, max_completed=2)
+        ids = [queue.submit(Escalation({"mcp_server": "x", "data": n}, NO_AGENT)) for n in range(4)]
+        queue.close()
+        with self.assertRaises(KeyError):
+            queue.poll(ids[0])
+        self.assertEqual(queue.poll(ids[3]), {"success": True})
+
+
+class TestCentralAgentEscalationLog(LogTestCase):
+
+    def test_escalations_are_queued_and_answered_later(self):
+        central_agent = CentralAgent(escalation_log=self.directory)
+        self.addCleanup(central_agent.close)
+        response = central_agent.handle_client_request({"mcp_server": "UnknownServer", "data": "x"})
+        self.assertFalse(response["success"])
+        self.assertTrue(response["pending"])
+        result = central_agent.escalation_result(response["escalation_id"], timeout=5)
+        self.assertEqual(result["data"], "Enriched and solved by MCPStubServerC: x with comprehensive analysis")
+        counters = central_agent.metrics.snapshot()["counters"]["requests"]["unrouted"]
+        self.assertEqual(counters, {"queued": 1, "escalated": 1})
+        # Requests the specialized agent solves are not affected
+        self.assertTrue(central_agent.handle_client_request({"mcp_server": "MCPStubServerA", "data": "y"})["success"])
+
+    def test_async_stream_and_batch_paths_queue_too(self):
+        central_agent = CentralAgent(escalation_log=self.directory)
+        self.addCleanup(central_agent.close)
+        request = {"mcp_server": "UnknownServer", "data": "x"}
+        responses = [
+            asyncio.run(central_agent.handle_client_request_async(request)),
+            *central_agent.handle_client_request_stream(request),
+            *central_agent.handle_client_requests([request]),
+            central_agent.begin_client_request(request)[0],
+        ]
+        self.assertTrue(all(response["pending"] for response in responses))
+        self.assertEqual(len({response["escalation_id"] for response in responses}), 4)
+
+    def test_unacknowledged_escalations_are_replayed_on_start(self):
+        log = EscalationLog(self.directory)
+        escalation = Escalation({"mcp_server": "UnknownServer", "data": "lost"}, NO_AGENT, "No specialized agent")
+        escalation_id = log.append(escalation.to_dict())
+        log.close()  # the process died before AgentSquad answered
+
+        delivered = {}
+        done = threading.Event()
+
+        def on_result(replayed_id, response):
+            delivered[replayed_id] = response
+            done.set()
+
+        central_agent = CentralAgent(escalation_log=self.directory, on_escalation_result=on_result)
+        self.addCleanup(central_agent.close)
+        self.assertTrue(done.wait(5))
+        self.assertEqual(delivered[escalation_id]["data"], "Enriched and solved by MCPStubServerC: lost with comprehensive analysis")
+        self.assertEqual(central_agent.escalation_queue.stats()["replayed"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import io
+import logging
+import queue
+import unittest
+from agents.central_agent import CentralAgent
+from agents.logging_config import DebugSampler, NonBlockingQueueHandler, configure_logging, shutdown_logging
+
+
+class CountingRepr:
+    # Records every time the logging machinery (or anything else) formats it
+    def __init__(self):
+        self.formatted = 0
+
+    def __repr__(self):
+        self.formatted += 1
+        return "CountingRepr()"
+
+    __str__ = __repr__
+
+
+class TestLoggingConfig(unittest.TestCase):
+
+    def tearDown(self):
+        shutdown_logging()
+
+    def test_default_level_does_no_formatting_on_success_path(self):
+        payload = CountingRepr()
+        central_agent = CentralAgent()
+        # MCPStubServerA formats the payload into its result once; logging must add nothing
+        response = central_agent.handle_client_request({"mcp_server": "MCPStubServerA", "data": payload})
+        self.assertTrue(response["success"])
+        self.assertEqual(payload.formatted, 1)
+
+        configure_logging(stream=io.StringIO())
+        central_agent.handle_client_request({"mcp_server": "MCPStubServerA", "data": payload})
+        self.assertEqual(payload.formatted, 2)
+
+    def test_records_are_formatted_by_listener(self):
+        stream = io.StringIO()
+        configure_logging(level=logging.DEBUG, stream=stream, fmt="%(levelname)s %(name)s %(message)s")
+        CentralAgent().handle_client_request({"mcp_server": "MCPStubServerB", "data": {"info": "x"}})
+        shutdown_logging()
+        output = stream.getvalue()
+        self.assertIn("DEBUG agents.central_agent Validated request for MCPStubServerB", output)
+        self.assertIn("SpecializedAgentB: Task solved successfully by MCPStubServerB", output)
+
+    def test_module_levels_override_package_level(self):
+        stream = io.StringIO()
+        configure_logging(level=logging.WARNING, module_levels={"agents.agent_squad": "DEBUG"},
+                          stream=stream, fmt="%(name)s %(message)s")
+        CentralAgent().handle_client_request({"mcp_server": "UnknownServer", "data": {"info": "x"}})
+        shutdown_logging()
+        output = stream.getvalue()
+        self.assertIn("agents.agent_squad Enrichment successful.", output)
+        self.assertNotIn("agents.central_agent", output)
+        self.assertEqual(logging.getLogger("agents.agent_squad").level, logging.NOTSET)
+
+    def test_non_blocking_handler_counts_drops(self):
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+        handler.handle(logging.makeLogRecord({"msg": "kept %s", "args": ("a",)}))
+        handler.handle(logging.makeLogRecord({"msg": "dropped"}))
+        self.assertEqual(handler.dropped, 1)
+        record = handler.queue.get_nowait()
+        # Formatting is deferred to the listener
+        self.assertEqual(record.msg, "kept %s")
+        self.assertEqual(record.args, ("a",))
+
+
+class TestDebugSampler(unittest.TestCase):
+
+    def test_samples_debug_only(self):
+        sampler = DebugSampler(every=4)
+        debug = [sampler.filter(logging.makeLogRecord({"levelno": logging.DEBUG})) for _ in range(8)]
+        self.assertEqual(debug.count(True), 2)
+        self.assertTrue(all(sampler.filter(logging.makeLogRecord({"levelno": logging.WARNING})) for _ in range(3)))
+
+    def test_rejects_invalid_rate(self):
+        with self.assertRaises(ValueError):
+            DebugSampler(every=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
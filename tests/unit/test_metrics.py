@@ -0,0 +1,181 @@
+import asyncio
+import json
+import threading
+import unittest
+from agents.central_agent import CentralAgent
+from agents.metrics import MetricsRegistry, server_label
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class TestMetricsRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.metrics = MetricsRegistry(buckets=(0.001, 0.01), clock=self.clock)
+
+    def test_histogram_buckets_are_cumulative(self):
+        for duration_ns in (500_000, 2_000_000, 5_000_000, 50_000_000):
+            self.metrics.observe_ns("mcp_solve", "MCPStubServerA", duration_ns)
+        histogram = self.metrics.snapshot()["histograms"]["mcp_solve"]["MCPStubServerA"]
+        self.assertEqual(histogram["count"], 4)
+        self.assertAlmostEqual(histogram["sum_seconds"], 0.0575)
+        self.assertEqual(histogram["buckets"], {"0.001": 1, "0.01": 3, "+Inf": 4})
+
+    def test_observe_uses_clock(self):
+        start = self.clock()
+        self.clock.now += 3_000_000
+        self.metrics.observe("validate", "MCPStubServerA", start)
+        histogram = self.metrics.snapshot()["histograms"]["validate"]["MCPStubServerA"]
+        self.assertEqual(histogram["buckets"]["0.01"], 1)
+        self.assertEqual(histogram["buckets"]["0.001"], 0)
+
+    def test_counters(self):
+        self.metrics.increment("requests", "MCPStubServerA", "solved")
+        self.metrics.increment("requests", "MCPStubServerA", "solved", amount=2)
+        self.metrics.increment("requests", "MCPStubServerB", "failed")
+        self.assertEqual(self.metrics.snapshot()["counters"]["requests"], {
+            "MCPStubServerA": {"solved": 3},
+            "MCPStubServerB": {"failed": 1},
+        })
+
+    def test_per_thread_shards_are_merged(self):
+        def record():
+            for _ in range(1000):
+                self.metrics.increment("requests", "MCPStubServerA", "solved")
+                self.metrics.observe_ns("request", "MCPStubServerA", 1)
+
+        threads = [threading.Thread(target=record) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot["counters"]["requests"]["MCPStubServerA"]["solved"], 8000)
+        self.assertEqual(snapshot["histograms"]["request"]["MCPStubServerA"]["count"], 8000)
+        self.assertEqual(len(self.metrics._shards), 8)
+
+    def test_quantile(self):
+        self.assertIsNone(self.metrics.quantile("mcp_solve", "MCPStubServerA", 0.95))
+        for _ in range(96):
+            self.metrics.observe_ns("mcp_solve", "MCPStubServerA", 100)
+        for _ in range(4):
+            self.metrics.observe_ns("mcp_solve", "MCPStubServerA", 5_000_000)
+        self.assertEqual(self.metrics.quantile("mcp_solve", "MCPStubServerA", 0.95), 0.001)
+        self.assertEqual(self.metrics.quantile("mcp_solve", "MCPStubServerA", 0.99), 0.01)
+
+    def test_prometheus_export(self):
+        self.metrics.observe_ns("mcp_solve", 'Server"A', 500_000)
+        self.metrics.increment("requests", "MCPStubServerA", "escalated")
+        text = self.metrics.to_prometheus()
+        self.assertIn("# TYPE agents_stage_duration_seconds histogram", text)
+        self.assertIn('agents_stage_duration_seconds_bucket{stage="mcp_solve",server="Server\\"A",le="0.001"} 1', text)
+        self.assertIn('agents_stage_duration_seconds_bucket{stage="mcp_solve",server="Server\\"A",le="+Inf"} 1', text)
+        self.assertIn('agents_stage_duration_seconds_count{stage="mcp_solve",server="Server\\"A"} 1', text)
+        self.assertIn("# TYPE agents_requests_total counter", text)
+        self.assertIn('agents_requests_total{server="MCPStubServerA",outcome="escalated"} 1', text)
+        self.assertTrue(text.endswith("\n"))
+        self.assertEqual(MetricsRegistry().to_prometheus(), "")
+
+    def test_gauges_are_read_on_demand(self):
+        depth = {"MCPStubServerA": {"normal": 2}}
+        self.metrics.register_gauge("queue_depth", lambda: depth, label="lane")
+        self.assertEqual(self.metrics.snapshot()["gauges"], {"queue_depth": {"MCPStubServerA": {"normal": 2}}})
+        depth["MCPStubServerA"]["normal"] = 5
+        text = self.metrics.to_prometheus()
+        self.assertIn("# TYPE agents_queue_depth gauge", text)
+        self.assertIn('agents_queue_depth{server="MCPStubServerA",lane="normal"} 5', text)
+        self.metrics.unregister_gauge("queue_depth")
+        self.assertEqual(self.metrics.snapshot()["gauges"], {})
+
+    def test_json_export_and_reset(self):
+        self.metrics.increment("requests", "MCPStubServerA", "solved")
+        self.assertEqual(json.loads(self.metrics.to_json())["counters"]["requests"]["MCPStubServerA"]["solved"], 1)
+        self.metrics.reset()
+        self.assertEqual(self.metrics.snapshot(), {"histograms": {}, "counters": {}, "gauges": {}})
+
+    def test_unsorted_buckets_rejected(self):
+        with self.assertRaises(ValueError):
+            MetricsRegistry(buckets=(0.1, 0.01))
+
+    def test_server_label(self):
+        self.assertEqual(server_label("MCPStubServerA"), "MCPStubServerA")
+        self.assertEqual(server_label(None), "")
+        self.assertEqual(server_label(["unhashable"]), "")
+        routing = CentralAgent().routing
+        self.assertEqual(server_label("MCPStubServerA", routing), "MCPStubServerA")
+        self.assertEqual(server_label("client-chosen-7f3a", routing), "unrouted")
+        self.assertEqual(server_label(None, routing), "")
+
+
+class TestCentralAgentMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.central_agent = CentralAgent()
+        self.metrics = self.central_agent.metrics
+
+    def test_stages_and_outcomes_are_recorded(self):
+        self.central_agent.handle_client_request({"mcp_server": "MCPStubServerA", "data": "ok"})
+        self.central_agent.handle_client_request({"mcp_server": "MCPStubServerB", "data": {"error": "boom"}})
+        self.central_agent.handle_client_request({"mcp_server": "MCPStubServerX", "data": "direct"})
+        self.central_agent.handle_client_request({"data": "no server"})
+        snapshot = self.metrics.snapshot()
+
+        self.assertEqual(snapshot["counters"]["requests"], {
+            "": {"failed": 1},
+            "MCPStubServerA": {"solved": 1},
+            "MCPStubServerB": {"escalated": 1},
+            "unrouted": {"escalated": 1},
+        })
+        self.assertEqual(snapshot["counters"]["mcp_calls"], {
+            "MCPStubServerA": {"success": 1},
+            "MCPStubServerB": {"error": 1},
+            "MCPStubServerC": {"success": 2},
+        })
+        histograms = snapshot["histograms"]
+        self.assertEqual(set(histograms["validate"]), {"", "MCPStubServerA", "MCPStubServerB", "unrouted"})
+        self.assertEqual(set(histograms["identify_agent"]), {"MCPStubServerA", "MCPStubServerB", "unrouted"})
+        self.assertEqual(set(histograms["perform_task"]), {"MCPStubServerA", "MCPStubServerB"})
+        self.assertEqual(set(histograms["mcp_solve"]), {"MCPStubServerA", "MCPStubServerB"})
+        self.assertEqual(set(histograms["squad_enrich_and_solve"]), {"MCPStubServerB", "unrouted"})
+        self.assertEqual(histograms["mcp_enrich_and_solve"]["MCPStubServerC"]["count"], 2)
+        self.assertEqual(histograms["request"]["MCPStubServerA"]["count"], 1)
+
+    def test_async_path_records_the_same_stages(self):
+        asyncio.run(self.central_agent.handle_client_request_async({"mcp_server": "MCPStubServerB", "data": {"error": "boom"}}))
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot["counters"]["requests"], {"MCPStubServerB": {"escalated": 1}})
+        for stage in ("validate", "identify_agent", "perform_task", "mcp_solve", "squad_enrich_and_solve", "request"):
+            self.assertEqual(snapshot["histograms"][stage]["MCPStubServerB"]["count"], 1, stage)
+
+    def test_batch_path_counts_every_request(self):
+        self.central_agent.handle_client_requests([
+            {"mcp_server": "MCPStubServerA", "data": "one"},
+            {"mcp_server": "MCPStubServerA", "data": {"error": "boom"}},
+            {"mcp_server": "MCPStubServerX", "data": "direct"},
+            {"data": "invalid"},
+        ])
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot["counters"]["requests"], {
+            "": {"failed": 1},
+            "MCPStubServerA": {"solved": 1, "escalated": 1},
+            "unrouted": {"escalated": 1},
+        })
+        self.assertEqual(snapshot["histograms"]["mcp_solve_many"]["MCPStubServerA"]["count"], 1)
+        self.assertEqual(snapshot["histograms"]["squad_enrich_and_solve_many"][""]["count"], 1)
+
+    def test_shared_registry(self):
+        metrics = MetricsRegistry()
+        central_agent = CentralAgent(metrics=metrics)
+        self.assertIs(central_agent.specialized_agent_a_instance.metrics, metrics)
+        self.assertIs(central_agent.agent_squad.metrics, metrics)
+
+
+if __name__ == '__main__':
+    unittest.main()
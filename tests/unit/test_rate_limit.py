@@ -0,0 +1,270 @@
+import asyncio
+import threading
+import time
+import unittest
+from agents.central_agent import CentralAgent
+from agents.circuit_breaker import CLOSED, HALF_OPEN
+from agents.rate_limit import RATE_LIMITED, LimiterRegistry, RateLimitedError, ServerLimiter, TokenBucket
+from agents.routing import RoutingConfigError, RoutingEngine, merge_routing_configs
+from agents.server_pool import ServerPool, ServerPoolError, ServerPoolRegistry
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_burst_then_refill(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, burst=4, shards=2, clock=clock)
+        self.assertEqual(sum(bucket.try_acquire() for _ in range(10)), 4)
+        clock.now = 0.2  # 2 tokens refilled
+        self.assertEqual(sum(bucket.try_acquire() for _ in range(10)), 2)
+        clock.now = 100
+        self.assertAlmostEqual(bucket.tokens(), 4)
+
+    def test_shards_never_exceed_burst(self):
+        bucket = TokenBucket(rate=3, burst=3, shards=8, clock=FakeClock())
+        self.assertEqual(len(bucket._shards), 3)
+
+    def test_concurrent_takers_share_the_burst_exactly(self):
+        bucket = TokenBucket(rate=1, burst=400, shards=4, clock=FakeClock())
+        taken = []
+
+        def take():
+            taken.append(sum(bucket.try_acquire() for _ in range(200)))
+
+        threads = [threading.Thread(target=take) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sum(taken), 400)
+
+    def test_rejects_invalid_settings(self):
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=0)
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=1, burst=0.5)
+
+
+class TestServerLimiter(unittest.TestCase):
+
+    def test_concurrency_limit_fails_fast_without_queue(self):
+        limiter = ServerLimiter("MCPStubServerA", max_concurrency=1)
+        with limiter.slot():
+            with self.assertRaises(RateLimitedError) as raised:
+                limiter.acquire()
+        self.assertEqual(raised.exception.reason, "concurrency")
+        self.assertEqual(raised.exception.code, RATE_LIMITED)
+        self.assertIsInstance(raised.exception, ServerPoolError)
+        with limiter.slot():
+            pass
+        stats = limiter.stats()
+        self.assertEqual((stats["in_flight"], stats["rejected"]["concurrency"]), (0, 1))
+
+    def test_rate_limit_does_not_hold_a_concurrency_slot(self):
+        limiter = ServerLimiter("MCPStubServerA", rate=1, burst=1, max_concurrency=5, clock=FakeClock())
+        limiter.acquire()
+        with self.assertRaises(RateLimitedError) as raised:
+            limiter.acquire()
+        self.assertEqual(raised.exception.reason, "rate")
+        self.assertEqual(limiter.stats()["in_flight"], 1)
+
+    def test_queued_call_gets_the_released_slot(self):
+        limiter = ServerLimiter("MCPStubServerA", max_concurrency=1, max_queue=1, queue_timeout=2.0)
+        limiter.acquire()
+        threading.Timer(0.02, limiter.release).start()
+        start = time.monotonic()
+        limiter.acquire()
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(limiter.stats()["waiting"], 0)
+
+    def test_queue_is_bounded_and_waits_time_out(self):
+        limiter = ServerLimiter("MCPStubServerA", max_concurrency=1, max_queue=1, queue_timeout=0.2)
+        limiter.acquire()
+        waiter = threading.Thread(target=lambda: self.assertRaises(RateLimitedError, limiter.acquire))
+        waiter.start()
+        time.sleep(0.02)
+        with self.assertRaises(RateLimitedError) as raised:
+            limiter.acquire()
+        self.assertEqual(raised.exception.reason, "queue")
+        waiter.join()
+        self.assertEqual(limiter.stats()["rejected"], {"rate": 0, "concurrency": 1, "queue": 1})
+
+    def test_caller_timeout_caps_the_queue_wait(self):
+        limiter = ServerLimiter("MCPStubServerA", max_concurrency=1, max_queue=4, queue_timeout=5.0)
+        limiter.acquire()
+        start = time.monotonic()
+        with self.assertRaises(RateLimitedError):
+            limiter.acquire(timeout=0.05)
+        self.assertLess(time.monotonic() - start, 1.0)
+
+    def test_async_wait(self):
+        limiter = ServerLimiter("MCPStubServerA", max_concurrency=1, max_queue=1, queue_timeout=2.0)
+
+        async def run():
+            await limiter.acquire_async()
+            asyncio.get_running_loop().call_later(0.02, limiter.release)
+            async with limiter.slot_async():
+                return limiter.stats()["in_flight"]
+
+        self.assertEqual(asyncio.run(run()), 1)
+        self.assertEqual(limiter.stats()["in_flight"], 0)
+
+
+class TestLimiterRegistry(unittest.TestCase):
+
+    def test_patterns_and_unlimited_servers(self):
+        registry = LimiterRegistry({"MCPStub*": {"max_concurrency": 2}, "MCPStubServerC": {"rate": 5}})
+        self.assertEqual(registry.get("MCPStubServerA").max_concurrency, 2)
+        self.assertIsNone(registry.get("MCPStubServerC").max_concurrency)
+        self.assertIsNone(registry.get("other"))
+        self.assertIs(registry.get("MCPStubServerA"), registry.get("MCPStubServerA"))
+
+    def test_load_keeps_unchanged_limiters_and_validates_first(self):
+        registry = LimiterRegistry()
+        registry.load({"MCPStubServerA": {"max_concurrency": 2}, "MCPStubServerB": {"max_concurrency": 2}})
+        kept, replaced = registry.get("MCPStubServerA"), registry.get("MCPStubServerB")
+        registry.load({"MCPStubServerA": {"max_concurrency": 2}, "MCPStubServerB": {"max_concurrency": 3}})
+        self.assertIs(registry.get("MCPStubServerA"), kept)
+        self.assertIsNot(registry.get("MCPStubServerB"), replaced)
+        with self.assertRaises(ValueError):
+            registry.load({"MCPStubServerA": {"max_concurency": 1}})
+        with self.assertRaises(ValueError):
+            registry.load({"MCPStubServerA": {"max_concurrency": 0}})
+        self.assertIs(registry.get("MCPStubServerA"), kept)
+
+    def test_loaded_limits_override_defaults(self):
+        registry = LimiterRegistry({"MCPStubServerA": {"max_concurrency": 1}, "MCPStubServerB": {"max_concurrency": 1}})
+        registry.load({"MCPStubServerA": {"max_concurrency": 4}})
+        self.assertEqual(registry.get("MCPStubServerA").max_concurrency, 4)
+        self.assertEqual(registry.get("MCPStubServerB").max_concurrency, 1)
+
+    def test_pool_sessions_take_a_slot(self):
+        limiters = LimiterRegistry({"MCPStubServerA": {"max_concurrency": 1}})
+        pools = ServerPoolRegistry(limiters=limiters)
+        pool = pools.pool("MCPStubServerA", object)
+        self.assertIsInstance(pool, ServerPool)
+        with pool.session():
+            with self.assertRaises(RateLimitedError):
+                with pool.session():
+                    pass
+            # The refused call never checked a session out
+            self.assertEqual(pool.stats()["checkouts"], 1)
+        self.assertEqual(limiters.stats()["MCPStubServerA"]["in_flight"], 0)
+
+    def test_replica_set_shares_one_limiter(self):
+        limiters = LimiterRegistry({"MCPStubServerA": {"max_concurrency": 1}})
+        pools = ServerPoolRegistry(limiters=limiters)
+        pools.configure_replicas("MCPStubServerA", 2)
+        replicas = pools.pool("MCPStubServerA", lambda: object())
+        with replicas.session():
+            with self.assertRaises(RateLimitedError):
+                with replicas.session():
+                    pass
+        self.assertEqual(sum(replica["failures"] for replica in replicas.stats()["replicas"]), 0)
+
+
+class TestRoutingLimits(unittest.TestCase):
+
+    def test_limits_are_loaded_on_compile_and_reload(self):
+        limiters = LimiterRegistry()
+        engine = RoutingEngine({"agents": {}, "limits": {"MCPStubServerC": {"rate": 5}}}, limiters=limiters)
+        self.assertEqual(engine.table.limits, {"MCPStubServerC": {"rate": 5}})
+        self.assertEqual(limiters.get("MCPStubServerC").bucket.rate, 5)
+        engine.reload({"agents": {}})
+        self.assertIsNone(limiters.get("MCPStubServerC"))
+
+    def test_invalid_limits_keep_the_current_table(self):
+        limiters = LimiterRegistry()
+        engine = RoutingEngine({"agents": {}, "limits": {"MCPStubServerC": {"rate": 5}}}, limiters=limiters)
+        table = engine.table
+        with self.assertRaises(RoutingConfigError):
+            engine.reload({"agents": {}, "limits": {"MCPStubServerC": 5}})
+        with self.assertRaises(ValueError):
+            engine.reload({"agents": {}, "limits": {"MCPStubServerC": {"rate": -1}}})
+        self.assertIs(engine.table, table)
+        self.assertEqual(limiters.get("MCPStubServerC").bucket.rate, 5)
+
+    def test_merge_rejects_duplicate_limits(self):
+        merged = merge_routing_configs([{"limits": {"a": {"rate": 1}}}, {"limits": {"b": {"rate": 2}}}])
+        self.assertEqual(set(merged["limits"]), {"a", "b"})
+        with self.assertRaises(RoutingConfigError):
+            merge_routing_configs([{"limits": {"a": {"rate": 1}}}, {"limits": {"a": {"rate": 2}}}])
+
+
+class TestCentralAgentRateLimits(unittest.TestCase):
+
+    def exhaust(self, central_agent, mcp_server):
+        # Use up the single token of the server's bucket
+        central_agent.limiters.get(mcp_server).acquire()
+
+    def test_rate_limited_request_fails_fast_without_escalation(self):
+        central_agent = CentralAgent(limits={"MCPStubServerA": {"rate": 0.001, "burst": 1}})
+        self.exhaust(central_agent, "MCPStubServerA")
+        response = central_agent.handle_client_request({"mcp_server": "MCPStubServerA", "data": "x"})
+        self.assertFalse(response["success"])
+        self.assertEqual(response["error_code"], RATE_LIMITED)
+        counters = central_agent.metrics.snapshot()["counters"]
+        self.assertEqual(counters["requests"]["MCPStubServerA"], {"rate_limited": 1})
+        self.assertEqual(counters["mcp_calls"]["MCPStubServerA"], {"rate_limited": 1})
+        self.assertEqual(central_agent.server_pools.stats()["MCPStubServerC"]["checkouts"], 0)
+        self.assertEqual(central_agent.circuit_breakers.get("MCPStubServerA").stats()["window_calls"], 0)
+
+    def test_async_stream_and_batch_paths(self):
+        central_agent = CentralAgent(limits={"MCPStubServerB": {"rate": 0.001, "burst": 1}})
+        self.exhaust(central_agent, "MCPStubServerB")
+        request = {"mcp_server": "MCPStubServerB", "data": "x"}
+        response = asyncio.run(central_agent.handle_client_request_async(request))
+        self.assertEqual(response["error_code"], RATE_LIMITED)
+        (event,) = list(central_agent.handle_client_request_stream(request))
+        self.assertEqual(event["error_code"], RATE_LIMITED)
+        responses = central_agent.handle_client_requests([request, {"mcp_server": "MCPStubServerA", "data": "y"}])
+        self.assertEqual(responses[0]["error_code"], RATE_LIMITED)
+        self.assertTrue(responses[1]["success"])
+
+    def test_rate_limited_probe_does_not_keep_the_circuit_half_open(self):
+        clock = FakeClock()
+        central_agent = CentralAgent(
+            limits={"MCPStubServerA": {"rate": 0.001, "burst": 1}},
+            circuit_breaker_settings={"MCPStubServerA": {"min_calls": 1, "open_duration": 10.0, "clock": clock}},
+        )
+        breaker = central_agent.circuit_breakers.get("MCPStubServerA")
+        request = {"mcp_server": "MCPStubServerA", "data": "x"}
+        self.exhaust(central_agent, "MCPStubServerA")
+        for handle in (central_agent.handle_client_request, lambda r: central_agent.handle_client_requests([r])[0]):
+            breaker.record(False)
+            clock.now += 10.0
+            self.assertEqual(breaker.state, HALF_OPEN)
+            self.assertEqual(handle(request)["error_code"], RATE_LIMITED)
+            self.assertTrue(breaker.allow())  # the probe slot was given back
+            breaker.record(True)
+            self.assertEqual(breaker.state, CLOSED)
+
+    def test_limited_squad_server_is_reported(self):
+        central_agent = CentralAgent(limits={"MCPStubServerC": {"rate": 0.001, "burst": 1}})
+        self.exhaust(central_agent, "MCPStubServerC")
+        response = central_agent.handle_client_request({"mcp_server": "UnknownServer", "data": "x"})
+        self.assertFalse(response["success"])
+        self.assertEqual(response["error_code"], RATE_LIMITED)
+
+    def test_routing_config_limits(self):
+        central_agent = CentralAgent(
+            routing_config={
+                "agents": {"SpecializedAgentA": {"class": "agents.specialized_agents:SpecializedAgentA",
+                                                 "mcp_servers": ["MCPStubServerA"], "target_mcp_routing": ["MCPStubServerA"]}},
+                "limits": {"MCPStubServerA": {"max_concurrency": 3}},
+            },
+        )
+        self.assertEqual(central_agent.limiters.get("MCPStubServerA").max_concurrency, 3)
+        self.assertTrue(central_agent.handle_client_request({"mcp_server": "MCPStubServerA", "data": "x"})["success"])
+
+
+if __name__ == '__main__':
+    unittest.main()
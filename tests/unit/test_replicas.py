@@ -0,0 +1,197 @@
+import asyncio
+import random
+import threading
+import unittest
+from unittest.mock import MagicMock
+from agents.central_agent import CentralAgent
+from agents.deadline import call_server, call_server_async
+from agents.replicas import ReplicaSet
+from agents.server_pool import ServerPool, ServerPoolError, ServerPoolRegistry
+from mcp_stubs.stub_servers import MCPStubServerA
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def replica_set(count=3, **settings):
+    pools = [ServerPool(f"MCPStubServerA#{index}", object) for index in range(count)]
+    return ReplicaSet("MCPStubServerA", pools, rng=random.Random(7), **settings)
+
+
+class TestReplicaSet(unittest.TestCase):
+
+    def test_rejects_unknown_strategy_and_empty_set(self):
+        with self.assertRaises(ValueError):
+            replica_set(strategy="round_robin")
+        with self.assertRaises(ValueError):
+            ReplicaSet("MCPStubServerA", [])
+
+    def test_least_outstanding_avoids_busy_replicas(self):
+        replicas = replica_set(strategy="least_outstanding")
+        busy = [replicas.pick(), replicas.pick()]
+        self.assertEqual(len({replica.index for replica in busy}), 2)
+        idle = replicas.pick()
+        self.assertNotIn(idle.index, {replica.index for replica in busy})
+
+    def test_p2c_never_picks_the_busiest_of_two(self):
+        replicas = replica_set(count=2, strategy="p2c")
+        replicas.replicas[0].outstanding = 5
+        for _ in range(20):
+            replica = replicas.pick()
+            self.assertEqual(replica.index, 1)
+            replicas.record(replica, 0.001, True)
+
+    def test_ewma_prefers_the_fastest_replica(self):
+        clock = FakeClock()
+        replicas = replica_set(strategy="ewma", clock=clock)
+        # Every replica is sampled once before latency decides
+        self.assertEqual({replicas.pick().index for _ in range(3)}, {0, 1, 2})
+        for replica, latency in zip(replicas.replicas, (0.05, 0.001, 0.02)):
+            replicas.record(replica, latency, True)
+        self.assertEqual(replicas.pick().index, 1)
+
+    def test_ewma_weighs_outstanding_calls(self):
+        replicas = replica_set(count=2, strategy="ewma")
+        replicas.replicas[0].ewma = 0.001
+        replicas.replicas[1].ewma = 0.003
+        replicas.replicas[0].outstanding = 3
+        self.assertEqual(replicas.pick().index, 1)
+
+    def test_consecutive_failures_eject_a_replica(self):
+        clock = FakeClock()
+        replicas = replica_set(count=2, strategy="least_outstanding", max_failures=2, ejection_duration=5, clock=clock)
+        bad = replicas.replicas[0]
+        for _ in range(2):
+            bad.outstanding += 1
+            replicas.record(bad, 0.001, False)
+        self.assertTrue(replicas.stats()["replicas"][0]["ejected"])
+        self.assertEqual({replicas.pick().index for _ in range(4)}, {1})
+        clock.now = 5
+        self.assertFalse(replicas.stats()["replicas"][0]["ejected"])
+
+    def test_success_resets_the_failure_streak(self):
+        replicas = replica_set(count=1, max_failures=2)
+        replica = replicas.replicas[0]
+        for success in (False, True, False):
+            replica.outstanding += 1
+            replicas.record(replica, 0.001, success)
+        self.assertFalse(replicas.stats()["replicas"][0]["ejected"])
+        self.assertEqual(replica.failures, 2)
+
+    def test_all_ejected_falls_back_to_every_replica(self):
+        replicas = replica_set(count=2, max_failures=1)
+        for replica in replicas.replicas:
+            replica.outstanding += 1
+            replicas.record(replica, 0.001, False)
+        self.assertIn(replicas.pick().index, {0, 1})
+
+    def test_session_feeds_outcomes_back(self):
+        replicas = replica_set(count=1)
+        with replicas.session() as session:
+            pass
+        with replicas.session() as session:
+            replicas.report(session, False)
+        with self.assertRaises(RuntimeError):
+            with replicas.session():
+                raise RuntimeError("transport error")
+        (stats,) = replicas.stats()["replicas"]
+        self.assertEqual(stats["calls"], 3)
+        self.assertEqual(stats["failures"], 2)
+        self.assertEqual(stats["outstanding"], 0)
+        # A reported failure still hands the session back healthy; the raising call discards it
+        self.assertEqual(stats["pool"]["reused"], 2)
+        self.assertEqual(stats["pool"]["idle"], 0)
+
+    def test_cancelled_async_session_is_neutral(self):
+        replicas = replica_set(count=1)
+
+        async def hold():
+            async with replicas.session_async():
+                await asyncio.sleep(1)
+
+        async def cancel():
+            task = asyncio.ensure_future(hold())
+            await asyncio.sleep(0.01)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        asyncio.run(cancel())
+        (stats,) = replicas.stats()["replicas"]
+        self.assertEqual((stats["calls"], stats["failures"], stats["outstanding"]), (0, 0, 0))
+
+    def test_call_server_reports_error_responses(self):
+        replicas = ReplicaSet("MCPStubServerA", [ServerPool("MCPStubServerA#0", lambda: MCPStubServerA("MCPStubServerA"))])
+        call_server(replicas, lambda server: server.solve({"error": True}))
+        asyncio.run(call_server_async(replicas, lambda server: server.solve_async({"error": True})))
+        call_server(replicas, lambda server: server.solve("x"))
+        (stats,) = replicas.stats()["replicas"]
+        self.assertEqual((stats["calls"], stats["failures"]), (3, 2))
+
+    def test_concurrent_picks_keep_counts_consistent(self):
+        replicas = replica_set(strategy="p2c")
+
+        def work():
+            for _ in range(200):
+                with replicas.session():
+                    pass
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = replicas.stats()["replicas"]
+        self.assertEqual(sum(replica["calls"] for replica in stats), 1600)
+        self.assertTrue(all(replica["outstanding"] == 0 for replica in stats))
+
+
+class TestReplicaRegistry(unittest.TestCase):
+
+    def test_replicas_get_their_own_factory_options(self):
+        registry = ServerPoolRegistry(max_size=4)
+        registry.configure_replicas("MCPStubServerA", [{"latency": 0.0}, {"latency": 0.5}], strategy="ewma")
+        factory = MagicMock(side_effect=lambda **options: options)
+        replicas = registry.pool("MCPStubServerA", factory)
+        self.assertIsInstance(replicas, ReplicaSet)
+        self.assertEqual(replicas.strategy, "ewma")
+        self.assertEqual([replica.pool.name for replica in replicas.replicas], ["MCPStubServerA#0", "MCPStubServerA#1"])
+        self.assertEqual(replicas.replicas[1].pool.max_size, 4)
+        self.assertEqual(replicas.replicas[1].pool.checkout(), {"latency": 0.5})
+        self.assertIn("replicas", registry.stats()["MCPStubServerA"])
+
+    def test_replica_count(self):
+        registry = ServerPoolRegistry()
+        registry.configure_replicas("MCPStubServerA", 3)
+        self.assertEqual(len(registry.pool("MCPStubServerA", object).replicas), 3)
+
+    def test_cannot_replicate_a_live_pool(self):
+        registry = ServerPoolRegistry()
+        registry.pool("MCPStubServerA", object)
+        with self.assertRaises(ServerPoolError):
+            registry.configure_replicas("MCPStubServerA", 2)
+
+    def test_central_agent_balances_across_stub_replicas(self):
+        central_agent = CentralAgent(
+            replica_settings={
+                "MCPStubServerA": {"replicas": [{"latency": 0.0}, {"failure_rate": 1.0}], "max_failures": 1},
+            },
+        )
+        central_agent.circuit_breakers.disable("MCPStubServerA")
+        responses = [
+            central_agent.handle_client_request({"mcp_server": "MCPStubServerA", "data": {"id": index}})
+            for index in range(10)
+        ]
+        self.assertTrue(all(response["success"] for response in responses))
+        replicas = central_agent.server_pools.get("MCPStubServerA").stats()["replicas"]
+        self.assertEqual(replicas[1]["failures"], 1)
+        self.assertTrue(replicas[1]["ejected"])
+        self.assertEqual(replicas[0]["calls"] + replicas[1]["calls"], 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
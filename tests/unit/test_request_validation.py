@@ -0,0 +1,90 @@
+import unittest
+from unittest.mock import patch
+from pydantic_core import core_schema
+from agents.central_agent import CentralAgent
+from agents.request_validation import RequestValidator
+from agents.specialized_agents import SpecializedAgentA
+
+QUERY_SCHEMA = core_schema.typed_dict_schema({
+    "query": core_schema.typed_dict_field(core_schema.str_schema(min_length=1)),
+    "limit": core_schema.typed_dict_field(core_schema.int_schema(ge=1), required=False),
+})
+
+
+class TestRequestValidator(unittest.TestCase):
+
+    def setUp(self):
+        self.validator = RequestValidator({"MCPStubServerA": QUERY_SCHEMA, "search-*": QUERY_SCHEMA})
+
+    def test_request_without_schema_is_returned_as_is(self):
+        request = {"mcp_server": "MCPStubServerB", "data": "anything"}
+        validated, error = self.validator.validate(request)
+        self.assertIs(validated, request)
+        self.assertIsNone(error)
+        self.assertFalse(self.validator.has_schema("MCPStubServerB"))
+
+    def test_envelope_errors_keep_their_messages(self):
+        self.assertEqual(self.validator.validate({"data": {}}), (None, "Missing 'mcp_server' key in request."))
+        self.assertEqual(self.validator.validate({"mcp_server": "MCPStubServerA"}), (None, "Missing 'data' key in request."))
+        self.assertEqual(self.validator.validate({"mcp_server": 1, "data": {}}), (None, "'mcp_server' must be a string."))
+        self.assertEqual(self.validator.validate(["not", "a", "dict"]), (None, "Request must be a JSON object."))
+
+    def test_schema_coerces_data(self):
+        validated, error = self.validator.validate({"mcp_server": "search-web", "data": {"query": "q", "limit": "5"}, "trace": "t1"})
+        self.assertIsNone(error)
+        self.assertEqual(validated, {"mcp_server": "search-web", "data": {"query": "q", "limit": 5}, "trace": "t1"})
+
+    def test_schema_errors_name_the_field(self):
+        validated, error = self.validator.validate({"mcp_server": "MCPStubServerA", "data": {"query": "", "limit": 0}})
+        self.assertIsNone(validated)
+        self.assertTrue(error.startswith("Invalid 'data' for MCPStubServerA: "))
+        self.assertIn("query: ", error)
+        self.assertIn("limit: ", error)
+
+    def test_validate_many_reports_errors_per_item(self):
+        results = self.validator.validate_many([
+            {"mcp_server": "MCPStubServerA", "data": {"query": "ok"}},
+            {"mcp_server": "MCPStubServerA", "data": {"limit": 2}},
+            {"data": {}},
+        ])
+        self.assertEqual(results[0], ({"mcp_server": "MCPStubServerA", "data": {"query": "ok"}}, None))
+        self.assertIsNone(results[1][0])
+        self.assertIn("query: Field required", results[1][1])
+        self.assertEqual(results[2], (None, "Missing 'mcp_server' key in request."))
+
+
+class TestCentralAgentValidation(unittest.TestCase):
+
+    def setUp(self):
+        self.central_agent = CentralAgent(payload_schemas={"MCPStubServerA": QUERY_SCHEMA})
+
+    def test_invalid_payload_is_rejected_before_any_mcp_call(self):
+        with patch.object(SpecializedAgentA, "perform_task") as mock_perform_task:
+            result = self.central_agent.handle_client_request({"mcp_server": "MCPStubServerA", "data": {"limit": 3}})
+        self.assertFalse(result["success"])
+        self.assertTrue(result["error"].startswith("Invalid request: Invalid 'data' for MCPStubServerA"))
+        mock_perform_task.assert_not_called()
+        self.assertEqual(self.central_agent.metrics.snapshot()["counters"]["requests"]["MCPStubServerA"], {"failed": 1})
+
+    def test_agent_receives_coerced_request(self):
+        with patch.object(SpecializedAgentA, "perform_task", return_value={"success": True, "result": "ok"}) as mock_perform_task:
+            self.central_agent.handle_client_request({"mcp_server": "MCPStubServerA", "data": {"query": "q", "limit": "2"}})
+        mock_perform_task.assert_called_once_with({"mcp_server": "MCPStubServerA", "data": {"query": "q", "limit": 2}}, deadline=None)
+
+    def test_batch_rejects_only_the_invalid_items(self):
+        results = self.central_agent.handle_client_requests([
+            {"mcp_server": "MCPStubServerA", "data": {"query": "q"}},
+            {"mcp_server": "MCPStubServerA", "data": {"query": 5}},
+        ])
+        self.assertTrue(results[0]["success"])
+        self.assertFalse(results[1]["success"])
+        self.assertIn("query: Input should be a valid string", results[1]["error"])
+
+    def test_validate_requests_is_the_batch_entry_point(self):
+        results = self.central_agent.validate_requests([{"mcp_server": "MCPStubServerB", "data": 1}, {}])
+        self.assertEqual(results[0], ({"mcp_server": "MCPStubServerB", "data": 1}, None))
+        self.assertEqual(results[1], (None, "Missing 'mcp_server' key in request."))
+
+
+if __name__ == '__main__':
+    unittest.main()
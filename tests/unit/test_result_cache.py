@@ -0,0 +1,146 @@
+import unittest
+from unittest.mock import patch
+from agents.central_agent import CentralAgent
+from agents.result_cache import MISS, ResultCache, ResultCacheRegistry, canonical_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCanonicalKey(unittest.TestCase):
+
+    def test_dict_order_does_not_matter(self):
+        first = {"a": 1, "b": {"x": [1, 2, {"k": "v"}], "y": None}}
+        second = {"b": {"y": None, "x": [1, 2, {"k": "v"}]}, "a": 1}
+        self.assertEqual(canonical_key(first), canonical_key(second))
+
+    def test_types_are_distinguished(self):
+        keys = {canonical_key(value) for value in (1, 1.0, "1", True, [1], (1,), {"1": 1}, None)}
+        self.assertEqual(len(keys), 8)
+
+    def test_list_order_matters_but_set_order_does_not(self):
+        self.assertNotEqual(canonical_key([1, 2]), canonical_key([2, 1]))
+        self.assertEqual(canonical_key({1, 2, 3}), canonical_key({3, 2, 1}))
+
+    def test_stable_digest(self):
+        # Keys must not depend on the process (e.g. hash randomization)
+        self.assertEqual(canonical_key({"info": "x"}), "691d90b33053b12804d63fe2e724091d")
+
+    def test_unsupported_type(self):
+        with self.assertRaises(TypeError):
+            canonical_key({"obj": object()})
+
+
+class TestResultCache(unittest.TestCase):
+
+    def test_hit_and_miss_counters(self):
+        cache = ResultCache()
+        self.assertIs(cache.get("k"), MISS)
+        cache.put("k", {"success": True, "data": "v"})
+        self.assertEqual(cache.get("k"), {"success": True, "data": "v"})
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 1, 1))
+
+    def test_lru_eviction(self):
+        cache = ResultCache(max_entries=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertIs(cache.get("b"), MISS)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_ttl_expiry(self):
+        clock = FakeClock()
+        cache = ResultCache(ttl=10.0, clock=clock)
+        cache.put("k", "v")
+        clock.now = 9.9
+        self.assertEqual(cache.get("k"), "v")
+        clock.now = 10.0
+        self.assertIs(cache.get("k"), MISS)
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_byte_cap(self):
+        cache = ResultCache(max_bytes=100, size_of=len)
+        cache.put("a", "x" * 60)
+        cache.put("b", "y" * 60)
+        self.assertIs(cache.get("a"), MISS)
+        self.assertEqual(cache.stats()["bytes"], 60)
+        # Values larger than the whole budget are never stored
+        cache.put("c", "z" * 101)
+        self.assertIs(cache.get("c"), MISS)
+        self.assertEqual(cache.get("b"), "y" * 60)
+
+    def test_negative_caching(self):
+        clock = FakeClock()
+        disabled = ResultCache(clock=clock)
+        disabled.put("k", {"success": False}, negative=True)
+        self.assertIs(disabled.get("k"), MISS)
+
+        cache = ResultCache(ttl=None, negative_ttl=5.0, clock=clock)
+        cache.put("k", {"success": False}, negative=True)
+        self.assertEqual(cache.get("k"), {"success": False})
+        self.assertEqual(cache.stats()["negative_hits"], 1)
+        clock.now = 5.0
+        self.assertIs(cache.get("k"), MISS)
+
+
+class TestResultCacheIntegration(unittest.TestCase):
+
+    @patch('agents.specialized_agents.MCPStubServerA')
+    def test_cached_server_is_called_once(self, MockMCPStubServerA):
+        MockMCPStubServerA.return_value.solve.return_value = {"success": True, "data": "A result"}
+        central_agent = CentralAgent(result_cache_settings={"MCPStubServerA": {"ttl": 60}})
+        request = {"mcp_server": "MCPStubServerA", "data": {"info": "x", "n": [1, 2]}}
+        reordered = {"mcp_server": "MCPStubServerA", "data": {"n": [1, 2], "info": "x"}}
+        self.assertEqual(central_agent.handle_client_request(request), {"success": True, "data": "A result"})
+        self.assertEqual(central_agent.handle_client_request(reordered), {"success": True, "data": "A result"})
+        MockMCPStubServerA.return_value.solve.assert_called_once()
+        self.assertEqual(central_agent.result_caches.stats()["MCPStubServerA"]["hits"], 1)
+
+    @patch('agents.specialized_agents.MCPStubServerB')
+    def test_uncached_server_bypasses_cache(self, MockMCPStubServerB):
+        MockMCPStubServerB.return_value.solve.return_value = {"success": True, "data": "B result"}
+        central_agent = CentralAgent(result_cache_settings={"MCPStubServerA": {}})
+        for _ in range(3):
+            central_agent.handle_client_request({"mcp_server": "MCPStubServerB", "data": {"info": "x"}})
+        self.assertEqual(MockMCPStubServerB.return_value.solve.call_count, 3)
+        self.assertNotIn("MCPStubServerB", central_agent.result_caches.stats())
+
+    @patch('agents.agent_squad.MCPStubServerC')
+    def test_escalations_are_cached_including_batches(self, MockMCPStubServerC):
+        server_c = MockMCPStubServerC.return_value
+        server_c.enrich_and_solve.return_value = {"success": True, "data": "C result"}
+        server_c.enrich_and_solve_many.side_effect = lambda datas: [{"success": True, "data": f"C {d}"} for d in datas]
+        central_agent = CentralAgent(result_cache_settings={"MCPStubServerC": {"max_entries": 10}})
+        request = {"mcp_server": "UnknownServer", "data": {"info": "x"}}
+        central_agent.handle_client_request(request)
+        responses = central_agent.handle_client_requests([request, {"mcp_server": "UnknownServer", "data": "y"}])
+        server_c.enrich_and_solve.assert_called_once_with({"info": "x"})
+        server_c.enrich_and_solve_many.assert_called_once_with(["y"])
+        self.assertEqual(responses, [{"success": True, "data": "C result"}, {"success": True, "data": "C y"}])
+
+    @patch('agents.specialized_agents.MCPStubServerA')
+    def test_failures_cached_only_with_negative_ttl(self, MockMCPStubServerA):
+        MockMCPStubServerA.return_value.solve.return_value = {"success": False, "error": "down"}
+        central_agent = CentralAgent(result_cache_settings={"MCPStubServerA": {"negative_ttl": 30}})
+        agent = central_agent.specialized_agent_a_instance
+        for _ in range(3):
+            self.assertFalse(agent.perform_task({"mcp_server": "MCPStubServerA", "data": "x"})["solved"])
+        MockMCPStubServerA.return_value.solve.assert_called_once()
+
+    def test_registry_lookup_with_unkeyable_payload(self):
+        registry = ResultCacheRegistry()
+        registry.configure("MCPStubServerA")
+        self.assertEqual(registry.lookup("MCPStubServerA", {"obj": object()}), (None, MISS))
+        self.assertEqual(registry.lookup("MCPStubServerB", "x"), (None, MISS))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from agents.central_agent import CentralAgent
+from agents.result_cache import MISS, ResultCacheRegistry, canonical_key
+from agents.result_store import SEGMENT_SUFFIX, ResultStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class StoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self._directory.cleanup)
+        self.directory = self._directory.name
+        self.clock = FakeClock()
+
+    def open_store(self, **settings):
+        store = ResultStore(self.directory, fsync=False, clock=self.clock, **settings)
+        self.addCleanup(store.close)
+        return store
+
+    def segments(self):
+        return sorted(name for name in os.listdir(self.directory) if name.endswith(SEGMENT_SUFFIX))
+
+    def wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition():
+            self.assertLess(time.monotonic(), deadline, "timed out")
+            time.sleep(0.005)
+
+
+class TestResultStore(StoreTestCase):
+
+    def test_entries_survive_a_restart(self):
+        store = self.open_store()
+        store.put("a", {"success": True, "data": "A"})
+        store.put("b", {"success": True, "data": "B"})
+        store.put("a", {"success": True, "data": "A2"})
+        store.invalidate("b")
+        self.assertEqual(store.get("a"), {"success": True, "data": "A2"})
+        store.close()
+        reopened = self.open_store()
+        self.assertEqual(reopened.get("a"), {"success": True, "data": "A2"})
+        self.assertIs(reopened.get("b"), MISS)
+        self.assertEqual(len(reopened), 1)
+
+    def test_torn_tail_is_ignored(self):
+        store = self.open_store()
+        store.put("a", "first")
+        store.put("b", "second")
+        store.close()
+        (segment,) = self.segments()
+        path = os.path.join(self.directory, segment)
+        with open(path, "r+b") as segment_file:
+            segment_file.truncate(os.path.getsize(path) - 3)
+        reopened = self.open_store()
+        self.assertEqual(reopened.get("a"), "first")
+        self.assertIs(reopened.get("b"), MISS)
+
+    def test_segments_rotate_and_are_read_back(self):
+        store = self.open_store(segment_bytes=100, front_entries=1)
+        for n in range(10):
+            store.put(f"key-{n}", "x" * 40)
+        self.assertGreaterEqual(len(self.segments()), 5)
+        for n in range(10):
+            self.assertEqual(store.get(f"key-{n}"), "x" * 40)
+        self.assertEqual(store.stats()["disk_hits"], 10)
+
+    def test_expired_entries_are_compacted_away(self):
+        store = self.open_store(ttl=10, compact_interval=None)
+        store.put("old", "x" * 100)
+        self.clock.now += 5
+        store.put("new", "y" * 100)
+        self.assertEqual(store.get("old"), "x" * 100)
+        self.clock.now += 6
+        self.assertIs(store.get("old"), MISS)
+        store.compact()
+        stats = store.stats()
+        self.assertEqual(stats["entries"], 1)
+        self.assertEqual(stats["disk_bytes"], stats["live_bytes"])
+        self.assertEqual(store.get("new"), "y" * 100)
+
+    def test_size_budget_keeps_the_most_read_entries(self):
+        store = self.open_store(max_bytes=2000, compact_interval=None, front_entries=1)
+        for n in range(5):
+            store.put(f"hot-{n}", "h" * 100)
+            store.get(f"hot-{n}")
+        for n in range(20):
+            store.put(f"cold-{n}", "c" * 100)
+        # put only signals the background compactor
+        self.wait_for(lambda: store.stats()["compactions"] >= 1 and store.stats()["disk_bytes"] <= 2000)
+        stats = store.stats()
+        self.assertGreater(stats["evictions"], 0)
+        for n in range(5):
+            self.assertEqual(store.get(f"hot-{n}"), "h" * 100)
+
+    def test_writes_during_a_compaction_survive_it(self):
+        store = self.open_store(compact_interval=None, segment_bytes=200)
+        for n in range(10):
+            store.put(f"key-{n}", f"v{n}")
+        write_compacted = store._write_compacted
+
+        def write_while_copying(plan):
+            # Runs while the records are copied: the store's lock must be free
+            writer = threading.Thread(target=lambda: (store.put("key-0", "new"), store.invalidate("key-1"),
+                                                      store.put("added", "a")))
+            writer.start()
+            writer.join(timeout=5)
+            self.assertFalse(writer.is_alive())
+            return write_compacted(plan)
+
+        store._write_compacted = write_while_copying
+        store.compact()
+        expected = {"key-0": "new", "key-1": MISS, "key-2": "v2", "added": "a"}
+        self.assertEqual({key: store.get(key) for key in expected}, expected)
+        self.assertEqual(len(store), 10)
+        store.close()
+        reopened = self.open_store()
+        self.assertEqual({key: reopened.get(key) for key in expected}, expected)
+        self.assertEqual(len(reopened), 10)
+
+    def test_warm_up_loads_the_most_read_keys(self):
+        store = self.open_store()
+        for n in range(5):
+            store.put(f"key-{n}", n)
+        for n in range(5):
+            for _ in range(n):
+                store.get(f"key-{n}")
+        store.close()
+        reopened = self.open_store(front_entries=2)
+        self.assertEqual(reopened.warm_up(), 2)
+        self.assertEqual(reopened.get("key-4"), 4)
+        self.assertEqual(reopened.get("key-3"), 3)
+        self.assertEqual(reopened.get("key-1"), 1)
+        stats = reopened.stats()
+        self.assertEqual((stats["front_hits"], stats["disk_hits"]), (2, 1))
+
+
+class TestResultStoreIntegration(StoreTestCase):
+
+    def test_registry_falls_through_to_the_store(self):
+        registry = ResultCacheRegistry()
+        registry.configure("MCPStubServerC")
+        registry.attach_store("MCPStubServerC", self.open_store())
+        key, response = registry.lookup("MCPStubServerC", {"q": 1})
+        self.assertEqual((key, response), (canonical_key({"q": 1}), MISS))
+        registry.store("MCPStubServerC", key, {"success": True, "data": "C"})
+        registry.store("MCPStubServerC", canonical_key("bad"), {"success": False, "error": "down"})
+        registry.get("MCPStubServerC").clear()
+        self.assertEqual(registry.lookup("MCPStubServerC", {"q": 1})[1], {"success": True, "data": "C"})
+        self.assertEqual(registry.store_stats()["MCPStubServerC"]["entries"], 1)
+
+    @patch('agents.agent_squad.MCPStubServerC')
+    def test_escalation_results_outlive_the_agent(self, MockMCPStubServerC):
+        MockMCPStubServerC.return_value.enrich_and_solve.return_value = {"success": True, "data": "C result"}
+        request = {"mcp_server": "UnknownServer", "data": {"info": "x"}}
+        central_agent = CentralAgent(result_store=self.directory)
+        self.assertEqual(central_agent.handle_client_request(request), {"success": True, "data": "C result"})
+        central_agent.close()
+
+        restarted = CentralAgent(result_store=self.directory)
+        self.addCleanup(restarted.close)
+        self.assertEqual(restarted.handle_client_request(request), {"success": True, "data": "C result"})
+        MockMCPStubServerC.return_value.enrich_and_solve.assert_called_once_with({"info": "x"})
+
+
+if __name__ == '__main__':
+    unittest.main()
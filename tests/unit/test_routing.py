@@ -0,0 +1,208 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from agents.central_agent import CentralAgent
+from agents.routing import DEFAULT_ROUTING_CONFIG, PatternTable, RoutingConfigError, RoutingEngine
+from agents.specialized_agents import ConfiguredAgent, SpecializedAgentA
+
+SEARCH_CONFIG = {
+    "agents": {
+        "SearchAgent": {
+            "mcp_servers": ["search-*"],
+            "target_mcp_routing": ["search-*"],
+            "server_factory": "mcp_stubs.stub_servers:MCPStubServerA",
+            "max_concurrency": 4,
+        },
+        "ImageAgent": {
+            "mcp_servers": ["*"],
+            "server_factory": "mcp_stubs.stub_servers:MCPStubServerB",
+        },
+    },
+    "routes": [
+        {"mcp_server": "search-*", "payload": {"kind": "image"}, "agent": "ImageAgent"},
+        {"mcp_server": "search-images", "agent": "ImageAgent"},
+        {"mcp_server": "MCPStubServerX", "payload_key": "image", "agent": "ImageAgent"},
+    ],
+}
+
+
+class TestPatternTable(unittest.TestCase):
+
+    def test_exact_then_longest_prefix_then_fallback(self):
+        table = PatternTable([("a*", 1), ("ab*", 2), ("abc", 3)])
+        self.assertEqual(table.get("abc"), 3)
+        self.assertEqual(table.get("abd"), 2)
+        self.assertEqual(table.get("ax"), 1)
+        self.assertIsNone(table.get("b"))
+        table["*"] = 4
+        self.assertEqual(table.get("b"), 4)
+        self.assertIn("anything", table)
+
+    def test_invalid_patterns(self):
+        for pattern in ("", "a*b*", None):
+            with self.assertRaises(RoutingConfigError):
+                PatternTable([(pattern, 1)])
+
+
+class TestRoutingEngine(unittest.TestCase):
+
+    def test_default_config_routes_to_agents_a_and_b(self):
+        engine = RoutingEngine()
+        self.assertIsInstance(engine.resolve("MCPStubServerA"), SpecializedAgentA)
+        self.assertEqual(engine.resolve("MCPStubServerB").agent_name, "SpecializedAgentB")
+        self.assertIsNone(engine.resolve("MCPStubServerC"))
+        self.assertIsNone(engine.resolve(["unhashable"]))
+        self.assertEqual(engine.concurrency_limit("MCPStubServerA"), 16)
+
+    def test_wildcard_and_payload_routes(self):
+        engine = RoutingEngine(SEARCH_CONFIG)
+        search, image = engine.agent("SearchAgent"), engine.agent("ImageAgent")
+        self.assertIsInstance(search, ConfiguredAgent)
+        self.assertIs(engine.resolve("search-news", {"q": "x"}), search)
+        self.assertIs(engine.resolve("search-news", {"kind": "image"}), image)
+        self.assertIs(engine.resolve("search-news", {"kind": ["unhashable"]}), search)
+        self.assertIs(engine.resolve("search-images", "x"), image)  # exact beats prefix
+        self.assertIs(engine.resolve("MCPStubServerX", {"image": 1}), image)
+        self.assertIsNone(engine.resolve("MCPStubServerX", {"text": 1}))
+        self.assertEqual(engine.concurrency_limit("search-news"), 4)
+
+    def test_metric_labels_are_bounded_by_the_routing_table(self):
+        engine = RoutingEngine(SEARCH_CONFIG)
+        self.assertEqual(engine.label("search-images"), "search-images")
+        self.assertEqual(engine.label("search-news"), "search-*")
+        self.assertEqual(engine.label("search-" + "x" * 100), "search-*")
+        self.assertEqual(engine.label("MCPStubServerX"), "MCPStubServerX")
+        self.assertEqual(engine.label("random-1234"), "unrouted")
+        self.assertEqual(engine.label(["unhashable"]), "unrouted")
+
+    def test_configured_agent_builds_servers_from_factory(self):
+        engine = RoutingEngine(SEARCH_CONFIG)
+        response = engine.resolve("search-news").perform_task({"mcp_server": "search-news", "data": "x"})
+        self.assertEqual(response, {"solved": True, "result": "Processed data from search-news: x"})
+        denied = engine.agent("SearchAgent").perform_task({"mcp_server": "other", "data": "x"})
+        self.assertEqual(denied["error"], "SearchAgent cannot access other.")
+
+    def test_invalid_configs(self):
+        with self.assertRaises(RoutingConfigError):
+            RoutingEngine({"agents": {}, "routes": [{"mcp_server": "x", "agent": "Missing"}]})
+        with self.assertRaises(RoutingConfigError):
+            RoutingEngine({
+                "agents": {"One": {"target_mcp_routing": ["x"]}, "Two": {"target_mcp_routing": ["x"]}},
+            })
+        with self.assertRaises(RoutingConfigError):
+            RoutingEngine({
+                "agents": {"One": {}},
+                "routes": [{"mcp_server": "x", "agent": "One", "payload": {"a": 1, "b": 2}}],
+            })
+
+    def test_reload_swaps_table_and_keeps_unchanged_agents(self):
+        engine = RoutingEngine()
+        agent_a = engine.agent("SpecializedAgentA")
+        old_table = engine.table
+        config = json.loads(json.dumps(DEFAULT_ROUTING_CONFIG))
+        config["agents"]["SpecializedAgentB"]["target_mcp_routing"].append("MCPStubServerB2")
+        engine.reload(config)
+        self.assertIsNot(engine.table, old_table)
+        self.assertIs(engine.agent("SpecializedAgentA"), agent_a)
+        self.assertIs(engine.resolve("MCPStubServerB2"), engine.agent("SpecializedAgentB"))
+
+        with self.assertRaises(RoutingConfigError):
+            engine.reload({"agents": {}, "routes": [{"mcp_server": "x", "agent": "Missing"}]})
+        self.assertIs(engine.resolve("MCPStubServerB2"), engine.agent("SpecializedAgentB"))
+
+    def test_file_config_and_reload_if_changed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "routing.json")
+            with open(path, "w") as config_file:
+                json.dump(SEARCH_CONFIG, config_file)
+            engine = RoutingEngine.from_file(path)
+            self.assertFalse(engine.reload_if_changed())
+            self.assertIsNotNone(engine.resolve("search-news"))
+
+            with open(path, "w") as config_file:
+                json.dump(DEFAULT_ROUTING_CONFIG, config_file)
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+            self.assertTrue(engine.reload_if_changed())
+            self.assertIsNone(engine.resolve("search-news"))
+            self.assertIsNotNone(engine.resolve("MCPStubServerA"))
+
+    def test_toml_config(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "routing.toml")
+            with open(path, "w") as config_file:
+                config_file.write(
+                    '[agents.SearchAgent]\n'
+                    'mcp_servers = ["search-*"]\n'
+                    'target_mcp_routing = ["search-*"]\n'
+                    'server_factory = "mcp_stubs.stub_servers:MCPStubServerA"\n'
+                )
+            engine = RoutingEngine.from_file(path)
+            self.assertIs(engine.resolve("search-x"), engine.agent("SearchAgent"))
+            # Without tomllib (Python 3.10) or tomli, only TOML configs are unavailable
+            with patch.dict("sys.modules", {"tomllib": None, "tomli": None}):
+                with self.assertRaises(RoutingConfigError):
+                    RoutingEngine.from_file(path)
+
+    def test_entry_points_are_merged(self):
+        first, second = MagicMock(), MagicMock()
+        first.name, second.name = "a", "b"
+        first.load.return_value = {"agents": {"SearchAgent": SEARCH_CONFIG["agents"]["SearchAgent"]}}
+        second.load.return_value = lambda: {"agents": {}, "routes": [{"mcp_server": "exact", "agent": "SearchAgent"}]}
+        with patch("agents.routing.importlib.metadata.entry_points", return_value=[second, first]) as entry_points:
+            engine = RoutingEngine.from_entry_points()
+        entry_points.assert_called_once_with(group="trendagent.routing")
+        self.assertIs(engine.resolve("exact"), engine.agent("SearchAgent"))
+        self.assertIs(engine.resolve("search-1"), engine.agent("SearchAgent"))
+
+    def test_many_targets(self):
+        agents = {
+            f"Agent{index}": {"target_mcp_routing": [f"server-{index}", f"group{index}-*"],
+                              "server_factory": "mcp_stubs.stub_servers:MCPStubServerA"}
+            for index in range(500)
+        }
+        engine = RoutingEngine({"agents": agents})
+        self.assertIs(engine.resolve("server-321"), engine.agent("Agent321"))
+        self.assertIs(engine.resolve("group42-anything"), engine.agent("Agent42"))
+        self.assertIsNone(engine.resolve("server-500"))
+
+
+class TestCentralAgentRouting(unittest.TestCase):
+
+    def test_routes_configured_targets_end_to_end(self):
+        central_agent = CentralAgent(routing_config=SEARCH_CONFIG)
+        self.assertIsNone(central_agent.specialized_agent_a_instance)
+        self.assertEqual(central_agent.handle_client_request({"mcp_server": "search-news", "data": "q"}),
+                         {"success": True, "data": "Processed data from search-news: q"})
+        self.assertEqual(central_agent.handle_client_request({"mcp_server": "search-news", "data": {"kind": "image"}}),
+                         {"success": True, "data": "Processed data from search-news: {'kind': 'image'}"})
+        # Unroutable servers still escalate straight to the squad
+        response = central_agent.handle_client_request({"mcp_server": "MCPStubServerA", "data": "x"})
+        self.assertEqual(response["data"], "Enriched and solved by MCPStubServerC: x with comprehensive analysis")
+        self.assertEqual(central_agent.server_concurrency_limits, {})
+
+    def test_batch_splits_one_server_across_payload_routes(self):
+        central_agent = CentralAgent(routing_config=SEARCH_CONFIG)
+        with patch.object(ConfiguredAgent, "perform_tasks", autospec=True,
+                          side_effect=lambda agent, tasks, deadline=None: [{"solved": True, "result": agent.agent_name}] * len(tasks)):
+            responses = central_agent.handle_client_requests([
+                {"mcp_server": "search-news", "data": {"kind": "image"}},
+                {"mcp_server": "search-news", "data": {"kind": "text"}},
+            ])
+        self.assertEqual([response["data"] for response in responses], ["ImageAgent", "SearchAgent"])
+
+    def test_routing_config_file_and_hot_reload(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "routing.json")
+            with open(path, "w") as config_file:
+                json.dump(DEFAULT_ROUTING_CONFIG, config_file)
+            central_agent = CentralAgent(routing_config=path)
+            self.assertIsNotNone(central_agent.specialized_agent_a_instance)
+            central_agent.routing.reload(SEARCH_CONFIG)
+            self.assertIsNone(central_agent.identify_specialized_agent({"mcp_server": "MCPStubServerA"}))
+
+
+if __name__ == '__main__':
+    unittest.main()
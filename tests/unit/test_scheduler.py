@@ -0,0 +1,106 @@
+import unittest
+from agents.scheduler import HIGH, LOW, NORMAL, FairQueue
+
+
+def drain(queue, eligible=None):
+    items = []
+    while True:
+        item = queue.pop(eligible)
+        if item is None:
+            return items
+        items.append(item)
+
+
+class TestFairQueue(unittest.TestCase):
+
+    def test_empty_queue(self):
+        queue = FairQueue()
+        self.assertEqual(len(queue), 0)
+        self.assertIsNone(queue.pop())
+
+    def test_unknown_priority_rejected(self):
+        with self.assertRaises(ValueError):
+            FairQueue().push("x", "flow", priority="urgent")
+
+    def test_strict_priority_between_classes(self):
+        queue = FairQueue()
+        queue.push("low", "a", LOW)
+        queue.push("normal", "a", NORMAL)
+        queue.push("high", "b", HIGH)
+        self.assertEqual(drain(queue), ["high", "normal", "low"])
+
+    def test_flooding_flow_only_delays_itself(self):
+        queue = FairQueue()
+        for index in range(5):
+            queue.push(f"flood-{index}", "tenant-b")
+        queue.push("a-0", "tenant-a")
+        queue.push("a-1", "tenant-a")
+        order = drain(queue)
+        # tenant-a's requests interleave with the flood instead of waiting behind it
+        self.assertLess(order.index("a-0"), 2)
+        self.assertLess(order.index("a-1"), 4)
+        self.assertEqual([item for item in order if item.startswith("flood")], [f"flood-{index}" for index in range(5)])
+
+    def test_weights_set_the_share(self):
+        queue = FairQueue(weight={"heavy": 2.0, "light": 1.0}.get)
+        for index in range(6):
+            queue.push(("heavy", index), "heavy")
+            queue.push(("light", index), "light")
+        first_six = [flow for flow, _ in drain(queue)[:6]]
+        self.assertEqual(first_six.count("heavy"), 4)
+        self.assertEqual(first_six.count("light"), 2)
+
+    def test_non_positive_weight_rejected(self):
+        with self.assertRaises(ValueError):
+            FairQueue(weight=lambda flow: 0).push("x", "flow")
+
+    def test_ineligible_flows_keep_their_place(self):
+        queue = FairQueue()
+        queue.push("a-0", "a")
+        queue.push("b-0", "b")
+        queue.push("a-1", "a")
+        self.assertEqual(queue.pop(lambda flow: flow != "a"), "b-0")
+        self.assertIsNone(queue.pop(lambda flow: flow != "a"))
+        self.assertEqual(drain(queue), ["a-0", "a-1"])
+
+    def test_new_flow_starts_at_the_current_virtual_time(self):
+        queue = FairQueue()
+        for index in range(10):
+            queue.push(f"a-{index}", "a")
+        for _ in range(5):
+            queue.pop()
+        # b neither waits behind a's backlog nor gets credit for the time it was idle
+        queue.push("b-0", "b")
+        queue.push("b-1", "b")
+        self.assertEqual(drain(queue)[:4], ["b-0", "a-5", "b-1", "a-6"])
+
+    def test_short_lived_flows_are_forgotten_under_steady_load(self):
+        queue = FairQueue()
+        queue.push("busy-0", "busy")
+        for index in range(1000):
+            # The class never goes idle: a long-running flow stays backlogged while a new
+            # tenant comes and goes
+            queue.push(f"busy-{index + 1}", "busy")
+            queue.push(f"tenant-{index}", f"tenant-{index}")
+            queue.pop()
+            queue.pop()
+        state = queue._classes[NORMAL]
+        self.assertLessEqual(len(state.finish), 3)
+        self.assertLessEqual(len(state.idle), 3)
+        # A returning tenant starts at the virtual time, like a new flow
+        queue.push("tenant-0-again", "tenant-0")
+        self.assertEqual(drain(queue), ["tenant-0-again", "busy-1000"])
+
+    def test_depths_and_drain(self):
+        queue = FairQueue()
+        queue.push(1, ("t1", "MCPStubServerA"))
+        queue.push(2, ("t1", "MCPStubServerA"))
+        queue.push(3, ("t2", "MCPStubServerB"), HIGH)
+        self.assertEqual(queue.depths(), {HIGH: {("t2", "MCPStubServerB"): 1}, NORMAL: {("t1", "MCPStubServerA"): 2}})
+        self.assertEqual(sorted(queue.drain()), [1, 2, 3])
+        self.assertEqual(len(queue), 0)
+        self.assertEqual(queue.depths(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import json
+import unittest
+from unittest.mock import patch
+from pydantic_core import core_schema
+from agents import serialization
+from agents.central_agent import CentralAgent
+from agents.request_validation import RequestValidator
+from agents.result_cache import MISS, ResultCache
+from agents.serialization import JSONCodec, OrjsonCodec, StdlibJSONCodec, get_codec
+from agents.specialized_agents import SpecializedAgentA
+
+
+class TestCodecs(unittest.TestCase):
+
+    def codecs(self):
+        codecs = [StdlibJSONCodec()]
+        if serialization.orjson is not None:
+            codecs.append(OrjsonCodec())
+        return codecs
+
+    def test_round_trip_is_compact_utf8(self):
+        value = {"success": True, "data": ["é", 1, 2.5, None, {"k": "v"}]}
+        for codec in self.codecs():
+            with self.subTest(codec=codec.name):
+                encoded = codec.dumps(value)
+                self.assertIsInstance(encoded, bytes)
+                self.assertNotIn(b" ", encoded)
+                self.assertEqual(codec.loads(encoded), value)
+                self.assertEqual(json.loads(encoded), value)
+
+    def test_unsupported_values_are_written_with_str(self):
+        for codec in self.codecs():
+            with self.subTest(codec=codec.name):
+                self.assertEqual(codec.loads(codec.dumps({"v": {1}})), {"v": "{1}"})
+
+    def test_get_codec(self):
+        stdlib = StdlibJSONCodec()
+        self.assertIs(get_codec(stdlib), stdlib)
+        self.assertIsInstance(get_codec("json"), StdlibJSONCodec)
+        with self.assertRaises(ValueError):
+            get_codec("yaml")
+
+    def test_incomplete_codec_cannot_be_created(self):
+        class EncodeOnly(JSONCodec):
+            def dumps(self, value):
+                return b""
+
+        with self.assertRaises(TypeError):
+            EncodeOnly()
+
+    def test_auto_falls_back_to_stdlib_without_orjson(self):
+        with patch.object(serialization, "orjson", None):
+            self.assertIsInstance(get_codec(), StdlibJSONCodec)
+            with self.assertRaises(ImportError):
+                get_codec("orjson")
+
+
+class TestValidateJson(unittest.TestCase):
+
+    def test_envelope_errors(self):
+        validator = RequestValidator()
+        self.assertEqual(validator.validate_json(b'{"mcp_server": "A", "data": [1]}'), ({"mcp_server": "A", "data": [1]}, None))
+        self.assertEqual(validator.validate_json(b'{"data": 1}'), (None, "Missing 'mcp_server' key in request."))
+        self.assertEqual(validator.validate_json(b'{"mcp_server": "A"}'), (None, "Missing 'data' key in request."))
+        self.assertEqual(validator.validate_json(b'{"mcp_server": 5, "data": 1}'), (None, "'mcp_server' must be a string."))
+        self.assertEqual(validator.validate_json(b'[1]'), (None, "Request must be a JSON object."))
+        self.assertTrue(validator.validate_json(b'{nope')[1].startswith("Invalid JSON"))
+
+    def test_schema_is_applied_to_bytes(self):
+        validator = RequestValidator({"A": core_schema.typed_dict_schema({
+            "n": core_schema.typed_dict_field(core_schema.int_schema()),
+        })})
+        self.assertEqual(validator.validate_json(b'{"mcp_server": "A", "data": {"n": "3"}}'), ({"mcp_server": "A", "data": {"n": 3}}, None))
+        self.assertTrue(validator.validate_json(b'{"mcp_server": "A", "data": {"n": "x"}}')[1].startswith("Invalid 'data' for A: n:"))
+
+
+class TestEncodedResultCache(unittest.TestCase):
+
+    def test_encoded_bytes_follow_their_entry(self):
+        cache = ResultCache(max_bytes=10_000)
+        value = {"success": True, "data": "d"}
+        cache.put("k", value)
+        self.assertIs(cache.peek("k"), value)
+        self.assertFalse(cache.attach_encoded("k", b"x", {"success": True, "data": "d"}))
+        self.assertTrue(cache.attach_encoded("k", b"encoded", value))
+        self.assertEqual(cache.get_encoded("k"), b"encoded")
+        cache.put("k", {"success": True, "data": "new"})
+        self.assertIsNone(cache.get_encoded("k"))
+        self.assertEqual(cache.stats()["encoded"], 0)
+        self.assertIs(cache.peek("missing"), MISS)
+
+
+class TestHandleRequestBytes(unittest.TestCase):
+
+    def setUp(self):
+        self.central_agent = CentralAgent(result_cache_settings={"MCPStubServerA": {}})
+        self.body = b'{"mcp_server": "MCPStubServerA", "data": {"info": "x"}}'
+
+    def test_matches_the_dict_api(self):
+        for body in (self.body, b'{"mcp_server": "Unknown", "data": "d"}', b'{"data": 1}', b'{'):
+            with self.subTest(body=body):
+                encoded = self.central_agent.handle_request_bytes(body)
+                try:
+                    expected = CentralAgent().handle_client_request(json.loads(body))
+                except ValueError:
+                    expected = {"success": False, "error": json.loads(encoded)["error"]}
+                    self.assertTrue(expected["error"].startswith("Invalid request: Invalid JSON"))
+                self.assertEqual(json.loads(encoded), expected)
+
+    def test_cached_answers_are_served_pre_serialized(self):
+        first = self.central_agent.handle_request_bytes(self.body)
+        second = self.central_agent.handle_request_bytes(self.body)
+        with patch.object(SpecializedAgentA, "perform_task") as mock_perform_task:
+            third = self.central_agent.handle_request_bytes(self.body)
+        mock_perform_task.assert_not_called()
+        # The first answer is encoded once and attached to the cache entry the agent stored
+        self.assertIs(first, second)
+        self.assertIs(second, third)
+        counters = self.central_agent.metrics.snapshot()["counters"]
+        self.assertEqual(counters["result_cache"]["MCPStubServerA"], {"encoded_hit": 2})
+        self.assertEqual(counters["requests"]["MCPStubServerA"], {"solved": 3})
+
+    def test_escalated_answers_are_not_attached(self):
+        body = b'{"mcp_server": "MCPStubServerA", "data": {"error": true}}'
+        self.central_agent.handle_request_bytes(body)
+        self.assertEqual(self.central_agent.result_caches.get("MCPStubServerA").stats()["encoded"], 0)
+
+    def test_open_circuit_bypasses_the_encoded_cache(self):
+        self.central_agent.handle_request_bytes(self.body)
+        self.central_agent.handle_request_bytes(self.body)
+        breaker = self.central_agent.circuit_breakers.get("MCPStubServerA")
+        breaker._open_locked(breaker.clock())
+        response = json.loads(self.central_agent.handle_request_bytes(self.body))
+        self.assertIn("Enriched and solved by MCPStubServerC", response["data"])
+
+
+class TestHandleRequestBytesAsync(unittest.IsolatedAsyncioTestCase):
+
+    async def test_async_bytes_api(self):
+        central_agent = CentralAgent(result_cache_settings={"MCPStubServerA": {}}, json_codec="json")
+        body = b'{"mcp_server": "MCPStubServerA", "data": 1}'
+        first = await central_agent.handle_request_bytes_async(body)
+        self.assertEqual(json.loads(first), {"success": True, "data": "Processed data from MCPStubServerA: 1"})
+        self.assertIs(await central_agent.handle_request_bytes_async(body), await central_agent.handle_request_bytes_async(body))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import MagicMock
+from agents.server_pool import (
+    POOL_CLOSED, POOL_EXHAUSTED, PoolClosedError, PoolExhaustedError, ServerPool, ServerPoolError, ServerPoolRegistry,
+)
+from agents.specialized_agents import SpecializedAgentA
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestServerPool(unittest.TestCase):
+
+    def test_reuses_warm_session(self):
+        factory = MagicMock(side_effect=lambda: object())
+        pool = ServerPool("MCPStubServerA", factory)
+        with pool.session() as first:
+            pass
+        with pool.session() as second:
+            pass
+        self.assertIs(first, second)
+        self.assertEqual(factory.call_count, 1)
+        stats = pool.stats()
+        self.assertEqual(stats["created"], 1)
+        self.assertEqual(stats["reused"], 1)
+        self.assertEqual(stats["checkouts"], 2)
+        self.assertEqual(stats["idle"], 1)
+        self.assertEqual(stats["in_use"], 0)
+
+    def test_bounded_size_and_acquire_timeout(self):
+        pool = ServerPool("MCPStubServerA", object, max_size=2, acquire_timeout=0.01)
+        pool.checkout()
+        pool.checkout()
+        with self.assertRaises(PoolExhaustedError):
+            pool.checkout()
+        stats = pool.stats()
+        self.assertEqual(stats["size"], 2)
+        self.assertEqual(stats["acquire_timeouts"], 1)
+
+    def test_waiter_gets_returned_session(self):
+        pool = ServerPool("MCPStubServerA", object, max_size=1, acquire_timeout=2.0)
+        session = pool.checkout()
+        received = []
+        waiter = threading.Thread(target=lambda: received.append(pool.checkout()))
+        waiter.start()
+        pool.checkin(session)
+        waiter.join(timeout=2.0)
+        self.assertEqual(received, [session])
+        self.assertEqual(pool.stats()["acquire_waits"], 1)
+
+    def test_idle_eviction_closes_sessions(self):
+        clock = FakeClock()
+        sessions = []
+        def factory():
+            sessions.append(MagicMock())
+            return sessions[-1]
+        pool = ServerPool("MCPStubServerA", factory, idle_timeout=10.0, clock=clock)
+        with pool.session():
+            pass
+        clock.now = 11.0
+        self.assertEqual(pool.evict_idle(), 1)
+        sessions[0].close.assert_called_once_with()
+        with pool.session() as session:
+            self.assertIs(session, sessions[1])
+        self.assertEqual(pool.stats()["closed_idle"], 1)
+
+    def test_failed_health_check_replaces_session(self):
+        healthy = {"ok": True}
+        pool = ServerPool("MCPStubServerA", MagicMock, health_check=lambda session: healthy["ok"])
+        with pool.session() as first:
+            pass
+        healthy["ok"] = False
+        with pool.session() as second:
+            pass
+        self.assertIsNot(first, second)
+        first.close.assert_called_once_with()
+        self.assertEqual(pool.stats()["failed_health_checks"], 1)
+
+    def test_closed_session_is_not_handed_out(self):
+        pool = ServerPool("MCPStubServerA", MagicMock)
+        with pool.session() as first:
+            pass
+        first.closed = True  # e.g. its multiplexed connection broke while idle
+        with pool.session() as second:
+            pass
+        self.assertIsNot(first, second)
+        self.assertEqual(pool.stats()["failed_health_checks"], 1)
+
+    def test_session_discarded_after_error(self):
+        pool = ServerPool("MCPStubServerA", MagicMock)
+        with self.assertRaises(RuntimeError):
+            with pool.session() as session:
+                raise RuntimeError("transport broke")
+        session.close.assert_called_once_with()
+        self.assertEqual(pool.stats()["size"], 0)
+
+    def test_factory_returning_none(self):
+        pool = ServerPool("MCPStubServerX", lambda: None, max_size=1)
+        with self.assertRaises(ServerPoolError):
+            pool.checkout()
+        # The failed creation must not leak capacity
+        self.assertEqual(pool.stats()["size"], 0)
+
+
+class TestServerPoolAsync(unittest.IsolatedAsyncioTestCase):
+
+    async def test_async_checkout_waits_without_blocking_loop(self):
+        pool = ServerPool("MCPStubServerA", object, max_size=1, acquire_timeout=1.0)
+        in_use = 0
+        peak = 0
+        async def use():
+            nonlocal in_use, peak
+            async with pool.session_async():
+                in_use += 1
+                peak = max(peak, in_use)
+                await asyncio.sleep(0.005)
+                in_use -= 1
+        await asyncio.gather(*(use() for _ in range(5)))
+        self.assertEqual(peak, 1)
+        stats = pool.stats()
+        self.assertEqual(stats["created"], 1)
+        self.assertEqual(stats["checkouts"], 5)
+        self.assertGreater(stats["acquire_waits"], 0)
+
+    async def test_async_acquire_timeout(self):
+        pool = ServerPool("MCPStubServerA", object, max_size=1, acquire_timeout=0.01)
+        await pool.checkout_async()
+        with self.assertRaises(PoolExhaustedError):
+            await pool.checkout_async()
+
+
+class TestServerPoolRegistry(unittest.TestCase):
+
+    def test_pool_is_shared_per_name_and_configurable(self):
+        registry = ServerPoolRegistry(max_size=4)
+        registry.configure("MCPStubServerA", max_size=2)
+        pool = registry.pool("MCPStubServerA", object)
+        self.assertIs(registry.pool("MCPStubServerA", object), pool)
+        self.assertEqual(pool.max_size, 2)
+        self.assertEqual(registry.pool("MCPStubServerB", object).max_size, 4)
+        registry.configure("MCPStubServerA", max_size=8)
+        self.assertEqual(pool.max_size, 8)
+        self.assertEqual(set(registry.stats()), {"MCPStubServerA", "MCPStubServerB"})
+
+    def test_specialized_agent_reuses_pooled_server(self):
+        registry = ServerPoolRegistry()
+        agent = SpecializedAgentA(allowed_mcp_servers=["MCPStubServerA"], server_pools=registry)
+        agent.perform_task({"mcp_server": "MCPStubServerA", "data": {"n": 1}})
+        agent.perform_task({"mcp_server": "MCPStubServerA", "data": {"n": 2}})
+        stats = registry.stats()["MCPStubServerA"]
+        self.assertEqual(stats["created"], 1)
+        self.assertEqual(stats["reused"], 1)
+
+    def test_specialized_agent_pool_exhaustion_fails_task(self):
+        registry = ServerPoolRegistry(max_size=1, acquire_timeout=0.01)
+        agent = SpecializedAgentA(allowed_mcp_servers=["MCPStubServerA"], server_pools=registry)
+        agent.server_pool("MCPStubServerA").checkout()
+        response = agent.perform_task({"mcp_server": "MCPStubServerA", "data": {"n": 1}})
+        self.assertFalse(response["solved"])
+        self.assertIn("Timed out", response["error"])
+        self.assertEqual(response["error_code"], POOL_EXHAUSTED)
+
+    def test_closed_pool_is_not_a_configuration_error(self):
+        registry = ServerPoolRegistry()
+        agent = SpecializedAgentA(allowed_mcp_servers=["MCPStubServerA"], server_pools=registry)
+        agent.server_pool("MCPStubServerA").close()
+        with self.assertRaises(PoolClosedError):
+            agent.server_pool("MCPStubServerA").checkout()
+        response = agent.perform_task({"mcp_server": "MCPStubServerA", "data": {"n": 1}})
+        self.assertEqual(response["error_code"], POOL_CLOSED)
+        self.assertEqual(response["error"], "Pool for MCPStubServerA is closed")
+
+
+if __name__ == '__main__':
+    unittest.main()
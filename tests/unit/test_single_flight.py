@@ -0,0 +1,207 @@
+import asyncio
+import threading
+import time
+import unittest
+from agents.central_agent import CentralAgent
+from agents.deadline import DeadlineExceeded
+from agents.single_flight import SingleFlight
+from mcp_stubs.stub_servers import MCPStubServerA
+
+
+class CountingServerA(MCPStubServerA):
+    calls = 0
+
+    def solve(self, task_data):
+        CountingServerA.calls += 1
+        return super().solve(task_data)
+
+    async def solve_async(self, task_data):
+        CountingServerA.calls += 1
+        return await super().solve_async(task_data)
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_concurrent_callers_share_one_execution(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def work():
+            calls.append(1)
+            started.set()
+            release.wait()
+            return {"value": 42}
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do("k", work)))
+        leader.start()
+        started.wait()
+        followers = [threading.Thread(target=lambda: results.append(flight.do("k", work))) for _ in range(4)]
+        for follower in followers:
+            follower.start()
+        while flight.coalesced < 4:
+            time.sleep(0.001)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.executed, 1)
+        self.assertEqual(flight.coalesced, 4)
+        self.assertEqual(sorted(shared for _, shared in results), [False, True, True, True, True])
+        self.assertTrue(all(result == {"value": 42} for result, _ in results))
+        self.assertEqual(flight.in_flight(), 0)
+
+    def test_follower_gives_up_after_its_timeout(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        leader = threading.Thread(target=flight.do, args=("k", lambda: release.wait(5)))
+        leader.start()
+        while not flight.in_flight():
+            time.sleep(0.001)
+        start = time.monotonic()
+        with self.assertRaises(DeadlineExceeded):
+            flight.do("k", lambda: "unused", timeout=0.05)
+        self.assertLess(time.monotonic() - start, 1.0)
+        release.set()
+        leader.join()
+
+    def test_sequential_calls_are_not_coalesced(self):
+        flight = SingleFlight()
+        self.assertEqual(flight.do("k", lambda: 1), (1, False))
+        self.assertEqual(flight.do("k", lambda: 2), (2, False))
+        self.assertEqual(flight.coalesced, 0)
+
+    def test_leader_error_propagates(self):
+        flight = SingleFlight()
+
+        def fail():
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            flight.do("k", fail)
+        self.assertEqual(flight.in_flight(), 0)
+
+
+class TestSingleFlightAsync(unittest.IsolatedAsyncioTestCase):
+
+    async def test_async_callers_share_one_execution(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "done"
+
+        results = await asyncio.gather(*(flight.do_async("k", work) for _ in range(10)))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.coalesced, 9)
+        self.assertEqual([result for result, _ in results], ["done"] * 10)
+
+    async def test_cancelled_leader_does_not_cancel_followers(self):
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        leader = asyncio.ensure_future(flight.do_async("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do_async("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        self.assertEqual(await follower, ("done", True))
+
+
+class TestCentralAgentCoalescing(unittest.TestCase):
+
+    def setUp(self):
+        CountingServerA.calls = 0
+
+    def test_identical_threaded_requests_hit_server_once(self):
+        central_agent = CentralAgent()
+        central_agent.specialized_agent_a_instance.create_server = lambda target: CountingServerA(target, latency=0.05)
+        request = {"mcp_server": "MCPStubServerA", "data": {"info": "burst"}}
+        responses = []
+        threads = [threading.Thread(target=lambda: responses.append(central_agent.handle_client_request(dict(request))))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(responses), 8)
+        self.assertTrue(all(response == responses[0] for response in responses))
+        self.assertEqual(len({id(response) for response in responses}), 8)
+        self.assertEqual(CountingServerA.calls + central_agent.single_flight.coalesced, 8)
+        self.assertLess(CountingServerA.calls, 8)
+
+    def test_coalesced_callers_keep_their_own_deadlines(self):
+        central_agent = CentralAgent()
+        central_agent.specialized_agent_a_instance.create_server = lambda target: CountingServerA(target, latency=0.5)
+        request = {"mcp_server": "MCPStubServerA", "data": {"info": "slow"}}
+        leader_responses = []
+        leader = threading.Thread(
+            target=lambda: leader_responses.append(central_agent.handle_client_request(dict(request), timeout=5.0)))
+        leader.start()
+        while not central_agent.single_flight.in_flight():
+            time.sleep(0.001)
+        start = time.monotonic()
+        response = central_agent.handle_client_request(dict(request), timeout=0.05)
+        self.assertLess(time.monotonic() - start, 0.4)
+        self.assertFalse(response["success"])
+        self.assertIn("Deadline exceeded", response["error"])
+        leader.join()
+        self.assertTrue(leader_responses[0]["success"])
+        self.assertEqual(central_agent.single_flight.coalesced, 1)
+        self.assertEqual(central_agent.metrics.snapshot()["counters"]["deadline"]["MCPStubServerA"]["coalesced_wait"], 1)
+
+    def test_coalescing_can_be_disabled(self):
+        central_agent = CentralAgent(coalesce_requests=False)
+        self.assertIsNone(central_agent.single_flight)
+        response = central_agent.handle_client_request({"mcp_server": "MCPStubServerB", "data": {"info": "x"}})
+        self.assertTrue(response["success"])
+
+
+class TestCentralAgentCoalescingAsync(unittest.IsolatedAsyncioTestCase):
+
+    async def test_identical_async_requests_hit_server_once(self):
+        CountingServerA.calls = 0
+        central_agent = CentralAgent()
+        central_agent.specialized_agent_a_instance.create_server = lambda target: CountingServerA(target, latency=0.02)
+        requests = [{"mcp_server": "MCPStubServerA", "data": {"info": "burst"}} for _ in range(20)]
+        responses = await asyncio.gather(*(central_agent.handle_client_request_async(r) for r in requests))
+        self.assertEqual(CountingServerA.calls, 1)
+        self.assertEqual(central_agent.single_flight.coalesced, 19)
+        self.assertTrue(all(response["success"] for response in responses))
+
+    async def test_coalesced_async_callers_keep_their_own_deadlines(self):
+        central_agent = CentralAgent()
+        central_agent.specialized_agent_a_instance.create_server = lambda target: CountingServerA(target, latency=0.5)
+        request = {"mcp_server": "MCPStubServerA", "data": {"info": "slow"}}
+        leader = asyncio.ensure_future(central_agent.handle_client_request_async(dict(request), timeout=5.0))
+        await asyncio.sleep(0.01)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        response = await central_agent.handle_client_request_async(dict(request), timeout=0.05)
+        self.assertLess(loop.time() - start, 0.4)
+        self.assertFalse(response["success"])
+        self.assertIn("Deadline exceeded", response["error"])
+        self.assertTrue((await leader)["success"])
+        self.assertEqual(central_agent.single_flight.coalesced, 1)
+
+    async def test_different_payloads_are_not_coalesced(self):
+        CountingServerA.calls = 0
+        central_agent = CentralAgent()
+        central_agent.specialized_agent_a_instance.create_server = lambda target: CountingServerA(target, latency=0.01)
+        requests = [{"mcp_server": "MCPStubServerA", "data": {"n": i}} for i in range(5)]
+        await asyncio.gather(*(central_agent.handle_client_request_async(r) for r in requests))
+        self.assertEqual(CountingServerA.calls, 5)
+        self.assertEqual(central_agent.single_flight.coalesced, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,5 @@
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from agents.specialized_agents import SpecializedAgentA, SpecializedAgentB
 # Assuming mcp_stubs.stub_servers will be in the python path or PYTHONPATH is set up
 from mcp_stubs.stub_servers import MCPStubServerA, MCPStubServerB
@@ -100,5 +100,85 @@ class TestSpecializedAgents(unittest.TestCase):
         self.assertIn("cannot access MCPStubServerB", response["error"])
         self.assertEqual(response["partial_data"], task_details)
 
+class TestSpecializedAgentsBatch(unittest.TestCase):
+
+    @patch('agents.specialized_agents.MCPStubServerA')
+    def test_perform_tasks_single_server_round_trip(self, MockMCPStubServerA):
+        mock_server_instance = MockMCPStubServerA.return_value
+        mock_server_instance.solve_many.return_value = [
+            {"success": True, "data": "first"},
+            {"success": False, "error": "ServerA error"},
+        ]
+
+        agent = SpecializedAgentA(allowed_mcp_servers=["MCPStubServerA"])
+        tasks = [
+            {"mcp_server": "MCPStubServerA", "data": {"n": 1}},
+            {"mcp_server": "MCPStubServerX", "data": {"n": 2}},
+            {"mcp_server": "MCPStubServerA", "data": {"n": 3}},
+        ]
+        responses = agent.perform_tasks(tasks)
+
+        MockMCPStubServerA.assert_called_once_with("MCPStubServerA")
+        mock_server_instance.solve_many.assert_called_once_with([{"n": 1}, {"n": 3}])
+        mock_server_instance.solve.assert_not_called()
+        self.assertEqual(responses[0], {"solved": True, "result": "first"})
+        self.assertFalse(responses[1]["solved"])
+        self.assertIn("cannot access MCPStubServerX", responses[1]["error"])
+        self.assertEqual(responses[2], {"solved": False, "error": "ServerA error", "partial_data": tasks[2]})
+
+    def test_perform_tasks_empty_batch(self):
+        agent = SpecializedAgentB(allowed_mcp_servers=["MCPStubServerB"])
+        self.assertEqual(agent.perform_tasks([]), [])
+
+class TestSpecializedAgentsAsync(unittest.IsolatedAsyncioTestCase):
+
+    @patch('agents.specialized_agents.MCPStubServerA')
+    async def test_specialized_agent_a_perform_task_async_success(self, MockMCPStubServerA):
+        mock_server_instance = MockMCPStubServerA.return_value
+        mock_server_instance.solve_async = AsyncMock(return_value={"success": True, "data": "ServerA processed data"})
+
+        agent = SpecializedAgentA(allowed_mcp_servers=["MCPStubServerA"])
+        task_details = {"mcp_server": "MCPStubServerA", "data": {"info": "Task for A"}}
+
+        response = await agent.perform_task_async(task_details)
+
+        MockMCPStubServerA.assert_called_once_with("MCPStubServerA")
+        mock_server_instance.solve_async.assert_awaited_once_with({"info": "Task for A"})
+        self.assertTrue(response["solved"])
+        self.assertEqual(response["result"], "ServerA processed data")
+
+    @patch('agents.specialized_agents.MCPStubServerB')
+    async def test_specialized_agent_b_perform_task_async_mcp_failure(self, MockMCPStubServerB):
+        mock_server_instance = MockMCPStubServerB.return_value
+        mock_server_instance.solve_async = AsyncMock(return_value={"success": False, "error": "ServerB error"})
+
+        agent = SpecializedAgentB(allowed_mcp_servers=["MCPStubServerB"])
+        task_details = {"mcp_server": "MCPStubServerB", "data": {"info": "Task for B"}}
+
+        response = await agent.perform_task_async(task_details)
+
+        self.assertFalse(response["solved"])
+        self.assertEqual(response["error"], "ServerB error")
+        self.assertEqual(response["partial_data"], task_details)
+
+    async def test_specialized_agent_a_perform_task_async_server_not_allowed(self):
+        agent = SpecializedAgentA(allowed_mcp_servers=["MCPStubServerX"])
+        task_details = {"mcp_server": "MCPStubServerA", "data": {"info": "Task for A"}}
+
+        response = await agent.perform_task_async(task_details)
+
+        self.assertFalse(response["solved"])
+        self.assertIn("cannot access MCPStubServerA", response["error"])
+
+    async def test_specialized_agent_a_perform_task_async_incorrect_configuration(self):
+        # Allowed, but SpecializedAgentA has no server implementation for it
+        agent = SpecializedAgentA(allowed_mcp_servers=["MCPStubServerB"])
+        task_details = {"mcp_server": "MCPStubServerB", "data": {"info": "Task for B"}}
+
+        response = await agent.perform_task_async(task_details)
+
+        self.assertFalse(response["solved"])
+        self.assertEqual(response["error"], "Incorrect server configuration for SpecializedAgentA.")
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,138 @@
+import time
+import unittest
+from agents.agent_squad import AgentSquad
+from agents.central_agent import CentralAgent
+from agents.deadline import Deadline
+from agents.escalation import NO_AGENT, Escalation
+from mcp_stubs.stub_servers import MCPStubServerC
+
+
+def chunked_server(chunk_size=10, chunk_latency=0.0, latency=0.0):
+    return lambda: MCPStubServerC("MCPStubServerC", latency=latency, chunk_size=chunk_size, chunk_latency=chunk_latency)
+
+
+def escalation(data):
+    return Escalation({"mcp_server": "Unknown", "data": data}, NO_AGENT, "No specialized agent for this MCP.")
+
+
+class TestStubServerChunkedMode(unittest.TestCase):
+
+    def test_stream_reassembles_to_the_whole_answer(self):
+        server = MCPStubServerC("MCPStubServerC", chunk_size=7)
+        events = list(server.enrich_and_solve_stream("payload"))
+        self.assertGreater(len(events), 1)
+        self.assertTrue(all(event["success"] and len(event["chunk"]) <= 7 for event in events))
+        self.assertEqual("".join(event["chunk"] for event in events), server.enrich_and_solve("payload")["data"])
+
+    def test_whole_answer_pays_the_generation_time(self):
+        server = MCPStubServerC("MCPStubServerC", chunk_size=20, chunk_latency=0.01)
+        chunks = len(list(server.enrich_and_solve_stream("payload")))
+        started = time.perf_counter()
+        server.enrich_and_solve("payload")
+        self.assertGreaterEqual(time.perf_counter() - started, 0.01 * (chunks - 1))
+
+
+class TestAgentSquadStream(unittest.TestCase):
+
+    def setUp(self):
+        self.squad = AgentSquad(squad_name="TestSquad")
+        self.squad.create_server = chunked_server(chunk_size=10)
+
+    def test_chunks_match_the_non_streaming_result(self):
+        events = list(self.squad.enrich_and_solve_stream(escalation("stream me")))
+        self.assertGreater(len(events), 1)
+        self.assertTrue(all(event["solved"] for event in events))
+        whole = AgentSquad(squad_name="Other").enrich_and_solve(escalation("stream me"))
+        self.assertEqual("".join(event["chunk"] for event in events), whole["result"])
+        self.assertEqual(self.squad.mcp_server_c.stats()["in_use"], 0)
+
+    def test_completed_stream_is_cached(self):
+        self.squad.result_caches.configure("MCPStubServerC")
+        events = list(self.squad.enrich_and_solve_stream(escalation("again")))
+        cached = list(self.squad.enrich_and_solve_stream(escalation("again")))
+        self.assertEqual(cached, [{"solved": True, "chunk": "".join(event["chunk"] for event in events)}])
+        self.assertEqual(self.squad.mcp_server_c.stats()["checkouts"], 1)
+
+    def test_first_chunk_arrives_before_the_whole_answer(self):
+        self.squad.create_server = chunked_server(chunk_size=10, chunk_latency=0.01)
+        started = time.perf_counter()
+        stream = self.squad.enrich_and_solve_stream(escalation("slow"))
+        next(stream)
+        first_chunk = time.perf_counter() - started
+        list(stream)
+        self.assertLess(first_chunk, (time.perf_counter() - started) / 2)
+        histograms = self.squad.metrics.snapshot()["histograms"]
+        self.assertEqual(histograms["mcp_enrich_and_solve_first_chunk"]["MCPStubServerC"]["count"], 1)
+
+    def test_deadline_ends_the_stream_and_discards_the_session(self):
+        self.squad.create_server = chunked_server(chunk_size=10, chunk_latency=0.02)
+        events = list(self.squad.enrich_and_solve_stream(escalation("late"), deadline=Deadline(0.03)))
+        self.assertTrue(events[0]["solved"])
+        self.assertEqual(events[-1], {"solved": False, "error": "TestSquad did not finish before the deadline."})
+        self.assertEqual(self.squad.mcp_server_c.stats()["size"], 0)
+
+    def test_abandoned_stream_releases_the_session(self):
+        stream = self.squad.enrich_and_solve_stream(escalation("abandon"))
+        next(stream)
+        self.assertEqual(self.squad.mcp_server_c.stats()["in_use"], 1)
+        stream.close()
+        self.assertEqual(self.squad.mcp_server_c.stats()["in_use"], 0)
+
+
+class TestAgentSquadStreamAsync(unittest.IsolatedAsyncioTestCase):
+
+    async def test_async_stream_matches_sync_stream(self):
+        squad = AgentSquad(squad_name="TestSquad")
+        squad.create_server = chunked_server(chunk_size=10)
+        events = [event async for event in squad.enrich_and_solve_stream_async(escalation("async"))]
+        other = AgentSquad(squad_name="Other")
+        other.create_server = chunked_server(chunk_size=10)
+        self.assertEqual(events, list(other.enrich_and_solve_stream(escalation("async"))))
+
+    async def test_async_deadline_bounds_the_wait_for_a_chunk(self):
+        squad = AgentSquad(squad_name="TestSquad")
+        squad.create_server = chunked_server(chunk_size=10, chunk_latency=0.5)
+        started = time.perf_counter()
+        events = [event async for event in squad.enrich_and_solve_stream_async(escalation("late"), deadline=Deadline(0.05))]
+        self.assertLess(time.perf_counter() - started, 0.4)
+        self.assertEqual(events[-1], {"solved": False, "error": "TestSquad did not finish before the deadline."})
+        self.assertEqual(squad.mcp_server_c.stats()["in_use"], 0)
+
+
+class TestCentralAgentStream(unittest.TestCase):
+
+    def setUp(self):
+        self.central_agent = CentralAgent()
+        self.central_agent.agent_squad.create_server = chunked_server(chunk_size=10)
+
+    def test_escalation_is_streamed_through(self):
+        events = list(self.central_agent.handle_client_request_stream({"mcp_server": "UnknownServer", "data": "d"}))
+        self.assertGreater(len(events), 1)
+        self.assertTrue(all(event["success"] for event in events))
+        expected = CentralAgent().handle_client_request({"mcp_server": "UnknownServer", "data": "d"})
+        self.assertEqual("".join(event["chunk"] for event in events), expected["data"])
+        self.assertEqual(self.central_agent.metrics.snapshot()["counters"]["requests"]["unrouted"], {"escalated": 1})
+
+    def test_specialized_answer_is_a_single_chunk(self):
+        events = list(self.central_agent.handle_client_request_stream({"mcp_server": "MCPStubServerA", "data": "d"}))
+        self.assertEqual(events, [{"success": True, "chunk": "Processed data from MCPStubServerA: d"}])
+
+    def test_invalid_request_yields_one_error(self):
+        events = list(self.central_agent.handle_client_request_stream({"data": "d"}))
+        self.assertEqual(events, [{"success": False, "error": "Invalid request: Missing 'mcp_server' key in request."}])
+
+
+class TestCentralAgentStreamAsync(unittest.IsolatedAsyncioTestCase):
+
+    async def test_async_escalation_is_streamed_through(self):
+        central_agent = CentralAgent()
+        central_agent.agent_squad.create_server = chunked_server(chunk_size=10)
+        request = {"mcp_server": "MCPStubServerA", "data": {"error": True}}
+        events = [event async for event in central_agent.handle_client_request_stream_async(request)]
+        self.assertGreater(len(events), 1)
+        expected = await CentralAgent().handle_client_request_async(request)
+        self.assertEqual("".join(event["chunk"] for event in events), expected["data"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,7 @@
+import asyncio
+import time
 import unittest
+from unittest.mock import patch
 from mcp_stubs.stub_servers import MCPStubServerA, MCPStubServerB, MCPStubServerC
 
 class TestMCPStubServers(unittest.TestCase):
@@ -85,5 +88,93 @@ class TestMCPStubServers(unittest.TestCase):
         self.assertIn("Enriched and solved by TestServerC", response["data"])
         self.assertIn("Initial data for comprehensive analysis with comprehensive analysis", response["data"])
 
+class TestMCPStubServersBatch(unittest.TestCase):
+
+    def test_solve_many_preserves_order_and_per_item_errors(self):
+        server = MCPStubServerA(server_name="TestServerA")
+        responses = server.solve_many([{"n": 1}, {"error": True}, {"n": 3}])
+        self.assertEqual([response["success"] for response in responses], [True, False, True])
+        self.assertIn("{'n': 3}", responses[2]["data"])
+
+    def test_solve_many_pays_latency_once_per_batch(self):
+        server = MCPStubServerB(server_name="TestServerB", latency=0.02)
+        start = time.perf_counter()
+        server.solve_many([{"n": i} for i in range(20)])
+        self.assertLess(time.perf_counter() - start, 0.2)
+
+    def test_enrich_and_solve_many(self):
+        server = MCPStubServerC(server_name="TestServerC")
+        responses = server.enrich_and_solve_many(["first", "second"])
+        self.assertEqual(len(responses), 2)
+        self.assertIn("first with comprehensive analysis", responses[0]["data"])
+        self.assertIn("second with comprehensive analysis", responses[1]["data"])
+
+    def test_batches_apply_the_failure_rate_to_every_item(self):
+        failing_a = MCPStubServerA(server_name="TestServerA", failure_rate=1.0)
+        failing_c = MCPStubServerC(server_name="TestServerC", failure_rate=1.0)
+        for responses in (failing_a.solve_many([{"n": 1}, {"n": 2}]), failing_c.enrich_and_solve_many(["a", "b"])):
+            self.assertEqual([response["success"] for response in responses], [False, False])
+            self.assertIn("Simulated replica failure", responses[0]["error"])
+        with patch("mcp_stubs.stub_servers.random.random", side_effect=[0.9, 0.1, 0.9]):
+            responses = MCPStubServerA(server_name="TestServerA", failure_rate=0.5).solve_many([1, 2, 3])
+        self.assertEqual([response["success"] for response in responses], [True, False, True])
+
+    def test_streams_apply_the_failure_rate(self):
+        server = MCPStubServerC(server_name="TestServerC", chunk_size=4, failure_rate=1.0)
+        (event,) = list(server.enrich_and_solve_stream("payload"))
+        self.assertFalse(event["success"])
+        self.assertIn("Simulated replica failure", event["error"])
+
+class TestMCPStubServersAsync(unittest.IsolatedAsyncioTestCase):
+
+    async def test_mcp_stub_server_a_solve_async_success(self):
+        server = MCPStubServerA(server_name="TestServerA")
+        response = await server.solve_async({"data": "Async task data"})
+        self.assertTrue(response["success"])
+        self.assertIn("Processed data from TestServerA", response["data"])
+
+    async def test_mcp_stub_server_b_solve_async_error(self):
+        server = MCPStubServerB(server_name="TestServerB")
+        response = await server.solve_async({"error": True})
+        self.assertFalse(response["success"])
+        self.assertIn("Simulated processing error in TestServerB", response["error"])
+
+    async def test_mcp_stub_server_c_enrich_and_solve_async(self):
+        server = MCPStubServerC(server_name="TestServerC")
+        response = await server.enrich_and_solve_async("Async partial")
+        self.assertTrue(response["success"])
+        self.assertIn("Async partial with comprehensive analysis", response["data"])
+
+    async def test_mcp_stub_server_a_enrich_and_solve_async_not_implemented(self):
+        server = MCPStubServerA(server_name="TestServerA")
+        with self.assertRaises(NotImplementedError):
+            await server.enrich_and_solve_async("Partial data")
+
+    async def test_async_stream_applies_the_failure_rate(self):
+        server = MCPStubServerC(server_name="TestServerC", chunk_size=4, failure_rate=1.0)
+        events = [event async for event in server.enrich_and_solve_stream_async("payload")]
+        self.assertEqual(len(events), 1)
+        self.assertFalse(events[0]["success"])
+
+    async def test_latency_is_injected_and_overlaps(self):
+        servers = [MCPStubServerA(server_name=f"TestServerA{i}", latency=0.05) for i in range(20)]
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(server.solve_async({"info": i}) for i, server in enumerate(servers)))
+        elapsed = time.perf_counter() - start
+        self.assertTrue(all(response["success"] for response in responses))
+        self.assertGreaterEqual(elapsed, 0.05)
+        # 20 sequential calls would take a full second
+        self.assertLess(elapsed, 0.5)
+
+    async def test_latency_accepts_a_sampling_callable(self):
+        samples = []
+        def sample():
+            samples.append(0.001)
+            return 0.001
+        server = MCPStubServerB(server_name="TestServerB", latency=sample)
+        await server.solve_async({"info": "x"})
+        server.solve({"info": "y"})
+        self.assertEqual(len(samples), 2)
+
 if __name__ == '__main__':
     unittest.main()
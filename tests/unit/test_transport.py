@@ -0,0 +1,326 @@
+import asyncio
+import concurrent.futures
+import json
+import os
+import queue
+import socket
+import tempfile
+import threading
+import unittest
+from agents.central_agent import CentralAgent
+from agents.transport import (
+    JSONRPCSession,
+    MCPClient,
+    MCPTransportError,
+    MultiplexedChannel,
+    MultiplexedConnection,
+    TransportRegistry,
+    _StreamTransport,
+)
+from mcp_stubs.server import StubMCPServer, start_server_process
+from mcp_stubs.stub_servers import MCPStubServerA, MCPStubServerC
+
+
+def connect_in_thread(test: unittest.TestCase, server) -> JSONRPCSession:
+    # A session with a StubMCPServer served on a thread over a socket pair
+    client, served = socket.socketpair()
+    stub = StubMCPServer(server, workers=2)
+    thread = threading.Thread(target=stub.serve, args=(served.makefile("rb"), served.makefile("wb")), daemon=True)
+    thread.start()
+    session = JSONRPCSession(server.server_name, client.makefile("rb"), client.makefile("wb"), on_close=client.close)
+    test.addCleanup(stub.executor.shutdown)
+    test.addCleanup(served.close)
+    test.addCleanup(session.close)
+    return session
+
+
+def multiplex_in_thread(test: unittest.TestCase, server, window: int = 32) -> MultiplexedConnection:
+    # A multiplexed connection with a StubMCPServer served on a thread over a socket pair
+    client, served = socket.socketpair()
+    stub = StubMCPServer(server, workers=8)
+    thread = threading.Thread(target=stub.serve, args=(served.makefile("rb"), served.makefile("wb")), daemon=True)
+    thread.start()
+
+    def shutdown():
+        client.shutdown(socket.SHUT_RDWR)
+        client.close()
+
+    connection = MultiplexedConnection(server.server_name, client.makefile("rb"), client.makefile("wb"), window,
+                                       on_close=shutdown)
+    test.addCleanup(stub.executor.shutdown)
+    test.addCleanup(served.close)
+    test.addCleanup(connection.close)
+    return connection
+
+
+class ScriptedServer:
+    # Answers initialize itself and queues every other request, so a test decides when
+    # (and in which order) each one is answered
+    def __init__(self, test: unittest.TestCase):
+        client, self.socket = socket.socketpair()
+        self.requests = queue.Queue()
+        self._writer = self.socket.makefile("wb")
+        threading.Thread(target=self._serve, daemon=True).start()
+        self.connection_args = (client.makefile("rb"), client.makefile("wb"))
+        test.addCleanup(self.socket.close)
+        test.addCleanup(client.close)
+
+    def _serve(self):
+        for line in iter(self.socket.makefile("rb").readline, b""):
+            message = json.loads(line)
+            if message.get("method") == "initialize":
+                self.answer(message["id"], {"serverInfo": {"name": "Scripted"}})
+            elif "id" in message:
+                self.requests.put(message)
+
+    def answer(self, request_id, result: dict):
+        self._writer.write(json.dumps({"jsonrpc": "2.0", "id": request_id, "result": result}).encode() + b"\n")
+        self._writer.flush()
+
+    def next_request(self) -> dict:
+        return self.requests.get(timeout=5)
+
+
+class TestJSONRPCSession(unittest.TestCase):
+
+    def test_tools_are_called_over_json_rpc(self):
+        session = connect_in_thread(self, MCPStubServerA("MCPStubServerA"))
+        self.assertEqual(session.server_info["name"], "MCPStubServerA")
+        self.assertIn("solve", [tool["name"] for tool in session.list_tools()])
+        self.assertEqual(session.solve({"info": "x"}),
+                         {"success": True, "data": "Processed data from MCPStubServerA: {'info': 'x'}"})
+        self.assertEqual(session.solve({"error": True}),
+                         {"success": False, "error": "Simulated processing error in MCPStubServerA"})
+        self.assertEqual([r["success"] for r in session.solve_many(["a", {"error": True}])], [True, False])
+        self.assertTrue(asyncio.run(session.solve_async("y"))["success"])
+
+    def test_streamed_chunks_arrive_as_progress_notifications(self):
+        session = connect_in_thread(self, MCPStubServerC("MCPStubServerC", chunk_size=8))
+        expected = "Enriched and solved by MCPStubServerC: x with comprehensive analysis"
+        chunks = [event["chunk"] for event in session.enrich_and_solve_stream("x")]
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual("".join(chunks), expected)
+
+        async def collect():
+            return [event["chunk"] async for event in session.enrich_and_solve_stream_async("x")]
+
+        self.assertEqual("".join(asyncio.run(collect())), expected)
+
+    def test_payload_size_and_error_rate(self):
+        session = connect_in_thread(self, MCPStubServerA("MCPStubServerA", payload_bytes=4096, failure_rate=1.0))
+        self.assertEqual(session.solve("x"), {"success": False, "error": "Simulated replica failure in MCPStubServerA"})
+        padded = connect_in_thread(self, MCPStubServerA("MCPStubServerA", payload_bytes=4096))
+        self.assertEqual(len(padded.solve("x")["data"]), 4096)
+
+    def test_server_errors_raise_transport_errors(self):
+        session = connect_in_thread(self, MCPStubServerC("MCPStubServerC"))
+        with self.assertRaises(MCPTransportError):
+            session.call_tool("unknown", {})
+        with self.assertRaises(MCPTransportError):
+            session.solve("not a dict")  # MCPStubServerC.solve fails on the server
+        # The session is still usable
+        self.assertTrue(session.enrich_and_solve("x")["success"])
+        session.close()
+        with self.assertRaises(MCPTransportError):
+            session.solve({})
+
+    def test_unknown_transport(self):
+        with self.assertRaises(ValueError):
+            TransportRegistry({"MCPStubServerA": {"transport": "carrier-pigeon"}})
+
+    def test_incomplete_clients_and_transports_cannot_be_created(self):
+        class NoStream(MCPClient):
+            def call_tool(self, name, arguments):
+                return {}
+
+        class NoKey(_StreamTransport):
+            def _open(self, server_name, **server_options):
+                return None, None, None
+
+        for incomplete in (NoStream, NoKey):
+            with self.assertRaises(TypeError):
+                incomplete()
+
+
+class TestMultiplexedConnection(unittest.TestCase):
+
+    def test_out_of_order_responses_reach_their_callers(self):
+        server = ScriptedServer(self)
+        connection = MultiplexedConnection("Scripted", *server.connection_args)
+        self.addCleanup(connection.close)
+        futures = [connection.request("tools/call", {"name": "solve", "arguments": {"data": index}})
+                   for index in range(3)]
+        requests = [server.next_request() for _ in range(3)]
+        self.assertEqual(len({request["id"] for request in requests}), 3)
+        for request in reversed(requests):
+            server.answer(request["id"], {"data": request["params"]["arguments"]["data"]})
+        self.assertEqual([future.result(timeout=5)["data"] for future in futures], [0, 1, 2])
+        self.assertEqual(connection.stats()["max_outstanding"], 3)
+
+    def test_window_limits_outstanding_requests(self):
+        server = ScriptedServer(self)
+        connection = MultiplexedConnection("Scripted", *server.connection_args, window=2)
+        self.addCleanup(connection.close)
+        first = connection.request("ping", {})
+        connection.request("ping", {})
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            third = executor.submit(connection.request, "ping", {})
+            requests = [server.next_request(), server.next_request()]
+            with self.assertRaises(queue.Empty):
+                server.requests.get(timeout=0.05)  # the third waits for a slot
+            self.assertEqual(connection.stats()["window_waits"], 1)
+            server.answer(requests[0]["id"], {})
+            first.result(timeout=5)
+            server.answer(server.next_request()["id"], {"third": True})
+            self.assertEqual(third.result(timeout=5).result(timeout=5), {"third": True})
+        self.assertEqual(connection.stats()["max_outstanding"], 2)
+
+    def test_a_broken_connection_fails_pending_requests(self):
+        server = ScriptedServer(self)
+        connection = MultiplexedConnection("Scripted", *server.connection_args)
+        channel = MultiplexedChannel(connection)
+        pending = connection.request("ping", {})
+        server.next_request()
+        server.socket.shutdown(socket.SHUT_RDWR)
+        with self.assertRaises(MCPTransportError):
+            pending.result(timeout=5)
+        self.assertTrue(channel.closed)
+        with self.assertRaises(MCPTransportError):
+            channel.solve("x")
+
+    def test_channels_share_one_connection(self):
+        connection = multiplex_in_thread(self, MCPStubServerA("MCPStubServerA", latency=0.02), window=8)
+        channels = [MultiplexedChannel(connection) for _ in range(2)]
+        for channel in channels:
+            self.assertTrue(connection.attach())
+        self.assertEqual(channels[0].solve({"info": "x"}),
+                         {"success": True, "data": "Processed data from MCPStubServerA: {'info': 'x'}"})
+        self.assertEqual([r["success"] for r in channels[1].solve_many(["a", {"error": True}])], [True, False])
+
+        async def fan_out():
+            return await asyncio.gather(*(channels[i % 2].solve_async(i) for i in range(16)))
+
+        responses = asyncio.run(fan_out())
+        self.assertEqual([r["data"] for r in responses], [f"Processed data from MCPStubServerA: {i}" for i in range(16)])
+        stats = connection.stats()
+        self.assertEqual(stats["max_outstanding"], 8)  # 16 concurrent calls through a window of 8
+        self.assertGreater(stats["window_waits"], 0)
+        channels[0].close()
+        self.assertFalse(connection.closed)
+        channels[1].close()
+        self.assertTrue(connection.closed)
+
+    def test_streamed_chunks_on_a_channel(self):
+        connection = multiplex_in_thread(self, MCPStubServerC("MCPStubServerC", chunk_size=8))
+        connection.attach()
+        channel = MultiplexedChannel(connection)
+        expected = "Enriched and solved by MCPStubServerC: x with comprehensive analysis"
+        self.assertEqual("".join(event["chunk"] for event in channel.enrich_and_solve_stream("x")), expected)
+
+        async def collect():
+            return [event["chunk"] async for event in channel.enrich_and_solve_stream_async("x")]
+
+        self.assertEqual("".join(asyncio.run(collect())), expected)
+        with self.assertRaises(MCPTransportError):
+            channel.call_tool("unknown", {})
+        self.assertTrue(channel.enrich_and_solve("x")["success"])
+
+
+class TestStubServerProcesses(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self._directory.cleanup)
+        self.path = os.path.join(self._directory.name, "a.sock")
+        self.process = start_server_process("MCPStubServerA", self.path, latency=0.001)
+        self.addCleanup(self.process.wait)
+        self.addCleanup(self.process.terminate)
+
+    def test_requests_cross_a_unix_socket(self):
+        central_agent = CentralAgent(transports={"MCPStubServerA": {"transport": "unix", "path": self.path}})
+        self.addCleanup(central_agent.close)
+        request = {"mcp_server": "MCPStubServerA", "data": {"info": "x"}}
+        expected = {"success": True, "data": "Processed data from MCPStubServerA: {'info': 'x'}"}
+        self.assertEqual(central_agent.handle_client_request(request), expected)
+        self.assertEqual(asyncio.run(central_agent.handle_client_request_async(request)), expected)
+        self.assertEqual(central_agent.handle_client_requests([request, request]), [expected, expected])
+        with central_agent.specialized_agent_a_instance.server_pool("MCPStubServerA").session() as session:
+            self.assertIsInstance(session, JSONRPCSession)
+
+    def test_pooled_sessions_multiplex_one_connection(self):
+        central_agent = CentralAgent(transports={
+            "MCPStubServerA": {"transport": "unix", "path": self.path, "multiplex": True, "window": 4},
+        })
+        self.addCleanup(central_agent.close)
+        requests = [{"mcp_server": "MCPStubServerA", "data": index} for index in range(24)]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+            responses = list(executor.map(central_agent.handle_client_request, requests))
+        self.assertEqual([r["data"] for r in responses], [f"Processed data from MCPStubServerA: {i}" for i in range(24)])
+        with central_agent.specialized_agent_a_instance.server_pool("MCPStubServerA").session() as session:
+            self.assertIsInstance(session, MultiplexedChannel)
+        stats = central_agent.transports.stats()["MCPStubServerA"]
+        self.assertEqual(stats["connections_opened"], 1)
+        self.assertLessEqual(stats["multiplexed"][0]["max_outstanding"], 4)
+        central_agent.close()
+        self.assertEqual(central_agent.transports.stats()["MCPStubServerA"]["multiplexed"], [])
+
+    def test_escalations_run_over_stdio(self):
+        central_agent = CentralAgent(transports={"MCPStubServerC": {"transport": "stdio"}})
+        self.addCleanup(central_agent.close)
+        request = {"mcp_server": "UnknownServer", "data": "x"}
+        expected = "Enriched and solved by MCPStubServerC: x with comprehensive analysis"
+        self.assertEqual(central_agent.handle_client_request(request), {"success": True, "data": expected})
+        events = list(central_agent.handle_client_request_stream(request))
+        self.assertEqual("".join(event.get("chunk", "") for event in events), expected)
+
+    def test_a_dead_server_fails_over_to_agent_squad(self):
+        central_agent = CentralAgent(transports={"MCPStubServerA": {"transport": "unix", "path": self.path}})
+        self.addCleanup(central_agent.close)
+        request = {"mcp_server": "MCPStubServerA", "data": "x"}
+        self.assertTrue(central_agent.handle_client_request(request)["success"])
+        self.process.terminate()
+        self.process.wait()
+        response = central_agent.handle_client_request({"mcp_server": "MCPStubServerA", "data": "y"})
+        self.assertEqual(response["data"], "Enriched and solved by MCPStubServerC: y with comprehensive analysis")
+        counters = central_agent.metrics.snapshot()["counters"]["mcp_calls"]["MCPStubServerA"]
+        self.assertEqual(counters["transport_error"], 1)
+
+
+
+class TestSlowServer(unittest.TestCase):
+
+    def test_async_deadline_does_not_stall_the_loop(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "slow.sock")
+        process = start_server_process("MCPStubServerA", path, latency=2.0)
+        self.addCleanup(process.wait)
+        self.addCleanup(process.terminate)
+        central_agent = CentralAgent(transports={"MCPStubServerA": {"transport": "unix", "path": path}})
+        self.addCleanup(central_agent.close)
+
+        async def call_and_tick():
+            # A ticker on the same loop measures how long the loop is blocked
+            gaps = []
+
+            async def tick():
+                last = loop.time()
+                while True:
+                    await asyncio.sleep(0.01)
+                    gaps.append(loop.time() - last)
+                    last = loop.time()
+
+            loop = asyncio.get_running_loop()
+            ticker = asyncio.ensure_future(tick())
+            start = loop.time()
+            await central_agent.handle_client_request_async({"mcp_server": "MCPStubServerA", "data": "x"}, timeout=0.2)
+            elapsed = loop.time() - start
+            ticker.cancel()
+            return elapsed, max(gaps)
+
+        elapsed, longest_gap = asyncio.run(call_and_tick())
+        self.assertLess(elapsed, 1.0)
+        self.assertLess(longest_gap, 0.5)
+
+if __name__ == '__main__':
+    unittest.main()